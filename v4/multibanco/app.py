@@ -15,9 +15,12 @@ import threading
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import io
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import streamlit as st
@@ -25,8 +28,10 @@ from dotenv import load_dotenv
 from docx import Document
 from pypdf import PdfReader
 
-# CrewAI
-from crewai import Agent, Task, Crew, Process, LLM
+# CrewAI (e o LiteLLM, que ele carrega) só é importado ao iniciar uma análise:
+# o import leva alguns segundos e atrasaria a primeira renderização da página.
+if TYPE_CHECKING:
+    from crewai import Agent, Task, LLM
 
 # =============================================================================
 # CONFIGURAÇÃO DE VARIÁVEIS DE AMBIENTE E LOG
@@ -71,27 +76,334 @@ class StreamlitLogHandler(logging.Handler):
             pass  # Descarta silenciosamente se a fila estiver cheia
 
 
-def render_log_line(line: str, container) -> None:
+# Linhas mantidas por painel (as mais antigas são descartadas) e intervalo
+# mínimo entre dois redesenhos do mesmo painel
+_LOG_MAX_LINHAS = int(os.getenv("LOG_PAINEL_MAX_LINHAS", "400"))
+_LOG_INTERVALO_QUADRO = float(os.getenv("LOG_PAINEL_INTERVALO_S", "0.25"))
+
+# Severidade numa única regex: cada alternativa é um lookahead sobre a linha
+# inteira, tentadas na ordem de prioridade (erro vence aviso, que vence tarefa...).
+# Casada contra line.lower(): IGNORECASE custa ~4x mais em linhas longas.
+_RE_SEVERIDADE_LOG = re.compile(
+    r"^(?:"
+    r"(?=.*(?:error|erro|exception|traceback))(?P<erro>)"
+    r"|(?=.*(?:warn|aviso))(?P<aviso>)"
+    r"|(?=.*(?:task|tarefa|iniciando|starting))(?P<tarefa>)"
+    r"|(?=.*(?:agent|agente|thinking|pensando))(?P<agente>)"
+    r"|(?=.*(?:action|ação|tool|ferramenta))(?P<acao>)"
+    r"|(?=.*(?:final answer|resposta final|finished|concluído|complete))(?P<concluido>)"
+    r")",
+    re.DOTALL,
+)
+_ICONES_SEVERIDADE_LOG = {
+    "erro": "🔴", "aviso": "🟡", "tarefa": "📋", "agente": "🤖", "acao": "⚙️", "concluido": "✅",
+}
+
+
+def classificar_linha_log(line: str) -> str:
+    """
+    Retorna o ícone da linha de log de acordo com o conteúdo ("  " quando
+    nenhuma palavra-chave casa).
+    """
+    m = _RE_SEVERIDADE_LOG.match(line.lower())
+    return _ICONES_SEVERIDADE_LOG[m.lastgroup] if m else "  "
+
+
+class PainelLog:
+    """
+    Painel de log de um container renderizado em um único elemento.
+    As linhas ficam num buffer circular (max_linhas) e são redesenhadas juntas,
+    no máximo uma vez a cada `intervalo` segundos, num bloco de código — em vez
+    de um elemento do Streamlit por linha. Usado apenas pela thread principal.
+    """
+
+    def __init__(self, container, max_linhas: int = _LOG_MAX_LINHAS, intervalo: float = _LOG_INTERVALO_QUADRO):
+        self._area = container.empty()
+        self._linhas: deque = deque(maxlen=max_linhas)
+        self._descartadas = 0
+        self.intervalo = intervalo
+        self._pendente = False
+        self._ultimo_quadro = 0.0
+
+    def prazo(self) -> float | None:
+        """Segundos até o próximo redesenho permitido, ou None sem linhas pendentes."""
+        if not self._pendente:
+            return None
+        return max(0.0, self.intervalo - (time.monotonic() - self._ultimo_quadro))
+
+    def adicionar(self, line: str) -> None:
+        if len(self._linhas) == self._linhas.maxlen:
+            self._descartadas += 1
+        self._linhas.append(f"{classificar_linha_log(line)} {line}")
+        self._pendente = True
+
+    def drenar(self, fila: queue.Queue, forcar: bool = False) -> bool:
+        """Move tudo que está na fila para o buffer e redesenha se for a hora."""
+        recebeu = False
+        while True:
+            try:
+                self.adicionar(fila.get_nowait())
+            except queue.Empty:
+                break
+            recebeu = True
+        self.renderizar(forcar)
+        return recebeu
+
+    def renderizar(self, forcar: bool = False) -> None:
+        agora = time.monotonic()
+        if not self._pendente or (not forcar and agora - self._ultimo_quadro < self.intervalo):
+            return
+        cabecalho = (
+            [f"… {self._descartadas} linha(s) anterior(es) omitida(s) — veja o arquivo de log"]
+            if self._descartadas else []
+        )
+        self._area.code("\n".join(cabecalho + list(self._linhas)), language=None)
+        self._pendente = False
+        self._ultimo_quadro = agora
+
+
+# =============================================================================
+# TAREFAS EM SEGUNDO PLANO
+# =============================================================================
+#
+# A thread principal do Streamlit espera num único threading.Event ("sinal"),
+# acionado por cada linha de log na fila (FilaSinalizada) e pelo término do
+# futuro. A interface reage assim que há algo para mostrar, sem laços de
+# time.sleep; o único timeout é o do redesenho adiado do painel de log.
+
+class FilaSinalizada(queue.Queue):
+    """
+    queue.Queue que aciona `sinal` a cada item inserido, acordando a thread
+    principal que espera pelo evento.
+    """
+
+    def __init__(self, sinal: threading.Event, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.sinal = sinal
+
+    def _put(self, item) -> None:
+        super()._put(item)
+        self.sinal.set()
+
+
+class TarefaSegundoPlano:
+    """
+    Executa `alvo()` num ThreadPoolExecutor de um worker e aciona `sinal`
+    quando o futuro termina (com resultado ou exceção).
+    """
+
+    def __init__(self, alvo, sinal: threading.Event | None = None, nome: str = "tarefa"):
+        self.sinal = sinal or threading.Event()
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=nome)
+        self.futuro = pool.submit(alvo)
+        self.futuro.add_done_callback(lambda _futuro: self.sinal.set())
+        pool.shutdown(wait=False)
+
+
+def _menor_prazo(paineis) -> float | None:
+    prazos = [p.prazo() for p in paineis if p is not None]
+    prazos = [p for p in prazos if p is not None]
+    return min(prazos) if prazos else None
+
+
+def acompanhar_tarefa(tarefa: TarefaSegundoPlano, painel_log: "PainelLog", fila_log: queue.Queue):
     """
-    Renderiza uma linha de log com ícone e cor de acordo com o conteúdo.
-    Chamada apenas pela thread principal do Streamlit.
+    Laço da thread principal: drena o log a cada sinal e devolve o resultado
+    do alvo (ou relança a exceção dele) quando a tarefa termina.
     """
-    line_lower = line.lower()
-
-    if any(k in line_lower for k in ("error", "erro", "exception", "traceback")):
-        container.error(f"🔴 {line}")
-    elif any(k in line_lower for k in ("warning", "warn", "aviso")):
-        container.warning(f"🟡 {line}")
-    elif any(k in line_lower for k in ("task", "tarefa", "iniciando", "starting")):
-        container.info(f"📋 {line}")
-    elif any(k in line_lower for k in ("agent", "agente", "thinking", "pensando")):
-        container.info(f"🤖 {line}")
-    elif any(k in line_lower for k in ("action", "ação", "tool", "ferramenta")):
-        container.info(f"⚙️ {line}")
-    elif any(k in line_lower for k in ("final answer", "resposta final", "finished", "concluído", "complete")):
-        container.success(f"✅ {line}")
-    else:
-        container.text(f"   {line}")
+    while True:
+        tarefa.sinal.wait(_menor_prazo([painel_log]))
+        tarefa.sinal.clear()
+        terminou = tarefa.futuro.done()
+        painel_log.drenar(fila_log, forcar=terminou)
+        if terminou:
+            return tarefa.futuro.result()
+
+
+# =============================================================================
+# EXECUÇÃO CONCORRENTE DE ARQUIVOS
+# =============================================================================
+
+class RoteadorLogPorThread(logging.Handler):
+    """
+    Handler único registrado no logger raiz durante uma execução concorrente:
+    envia cada registro para a fila do arquivo cuja thread o emitiu. Registros
+    de threads não associadas a um arquivo vão para a fila geral.
+    """
+
+    def __init__(self, fila_geral: queue.Queue):
+        super().__init__()
+        self.fila_geral = fila_geral
+        self._filas: dict[int, queue.Queue] = {}
+        self._lock = threading.Lock()
+
+    def associar(self, fila: queue.Queue) -> None:
+        with self._lock:
+            self._filas[threading.get_ident()] = fila
+
+    def desassociar(self) -> None:
+        with self._lock:
+            self._filas.pop(threading.get_ident(), None)
+
+    def emit(self, record: logging.LogRecord):
+        fila = self._filas.get(record.thread, self.fila_geral)
+        try:
+            fila.put_nowait(self.format(record))
+        except queue.Full:
+            pass
+
+
+class LimitadorTaxa:
+    """
+    Limite de chamadas por minuto (janela deslizante de 60 s) compartilhado
+    entre threads. max_por_minuto <= 0 desativa o limite.
+    """
+
+    def __init__(self, max_por_minuto: int):
+        self.max_por_minuto = max_por_minuto
+        self._instantes: deque = deque()
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> None:
+        while self.max_por_minuto > 0:
+            with self._lock:
+                agora = time.monotonic()
+                while self._instantes and agora - self._instantes[0] >= 60:
+                    self._instantes.popleft()
+                if len(self._instantes) < self.max_por_minuto:
+                    self._instantes.append(agora)
+                    return
+                espera = 60 - (agora - self._instantes[0])
+            logger.info(f"Limite de {self.max_por_minuto} chamadas/min atingido; aguardando {espera:.1f}s")
+            time.sleep(espera)
+
+
+# Um limitador por modelo, compartilhado por todas as sessões do processo
+_LIMITADORES: dict[str, LimitadorTaxa] = {}
+_LIMITADORES_LOCK = threading.Lock()
+
+
+def obter_limitador(chave: str, max_por_minuto: int) -> LimitadorTaxa:
+    with _LIMITADORES_LOCK:
+        limitador = _LIMITADORES.setdefault(chave, LimitadorTaxa(max_por_minuto))
+        limitador.max_por_minuto = max_por_minuto
+        return limitador
+
+
+def aplicar_limite_taxa(llm, limitador: LimitadorTaxa):
+    """Faz cada llm.call passar pelo limitador (vale para todas as crews que usam este LLM)."""
+    # get_llm é cache_resource: guarda a chamada original para não empilhar
+    # limitadores a cada execução sobre a mesma instância
+    chamada_original = getattr(llm, "_call_sem_limite", None) or llm.call
+    llm._call_sem_limite = chamada_original
+
+    def _call_limitado(*args, **kwargs):
+        limitador.aguardar()
+        return chamada_original(*args, **kwargs)
+
+    llm.call = _call_limitado
+    return llm
+
+
+def executar_arquivos_concorrentes(
+    docs: list[dict],
+    processar,
+    max_workers: int,
+    rotulo: str = "🤖 Agente trabalhando em",
+) -> dict[str, dict]:
+    """
+    Executa `processar(doc)` para cada arquivo num pool de threads limitado a
+    `max_workers`, mantendo uma caixa de status e um painel de log por arquivo.
+    Toda a interação com o Streamlit acontece na thread principal.
+
+    Returns:
+        {filename: {"value": retorno de processar, "error": exceção ou None}},
+        na ordem de `docs`.
+    """
+    total = len(docs)
+    progress_bar = st.progress(0, text=f"📂 {total} arquivo(s) na fila — até {max_workers} em paralelo")
+
+    # Log, início e fim de cada arquivo acordam a thread principal
+    sinal = threading.Event()
+    paineis: dict[str, tuple] = {}
+    for doc in docs:
+        status_box = st.status(f"⏳ Na fila: {doc['filename']}", expanded=False)
+        with status_box:
+            st.markdown("##### 📡 Log de Execução em Tempo Real")
+            painel_log = PainelLog(st.container(height=380, border=False))
+        paineis[doc["filename"]] = (status_box, painel_log, FilaSinalizada(sinal, maxsize=500))
+
+    fila_geral: queue.Queue = FilaSinalizada(sinal, maxsize=500)
+    log_geral = None
+    eventos: queue.Queue = FilaSinalizada(sinal)
+    roteador = RoteadorLogPorThread(fila_geral)
+    roteador.setFormatter(
+        logging.Formatter("%(asctime)s | %(name)s | %(message)s", datefmt="%H:%M:%S")
+    )
+    root_logger = logging.getLogger()
+    root_logger.addHandler(roteador)
+
+    resultados = {doc["filename"]: {"value": None, "error": None} for doc in docs}
+
+    def _tarefa(doc: dict):
+        roteador.associar(paineis[doc["filename"]][2])
+        eventos.put(doc["filename"])
+        try:
+            return processar(doc)
+        except Exception as exc:
+            logger.error(f"Erro ao processar {doc['filename']}: {exc}", exc_info=True)
+            raise
+        finally:
+            roteador.desassociar()
+
+    def _drenar_logs(forcar: bool = False):
+        nonlocal log_geral
+        for _, painel_log, fila in paineis.values():
+            painel_log.drenar(fila, forcar)
+        if not fila_geral.empty() and log_geral is None:
+            log_geral = PainelLog(st.expander("📡 Log geral", expanded=False).container(height=200, border=False))
+        if log_geral is not None:
+            log_geral.drenar(fila_geral, forcar)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="arquivo") as pool:
+            futuros = {pool.submit(_tarefa, doc): doc["filename"] for doc in docs}
+            for futuro in futuros:
+                futuro.add_done_callback(lambda _futuro: sinal.set())
+            pendentes = set(futuros)
+            concluidos = 0
+            while pendentes:
+                # Timeout só para o redesenho adiado de algum painel de log
+                sinal.wait(_menor_prazo([p[1] for p in paineis.values()] + [log_geral]))
+                sinal.clear()
+                feitos = {f for f in pendentes if f.done()}
+                pendentes -= feitos
+                while not eventos.empty():
+                    nome = eventos.get_nowait()
+                    paineis[nome][0].update(label=f"{rotulo}: {nome}", state="running", expanded=True)
+                _drenar_logs()
+                for futuro in feitos:
+                    nome = futuros[futuro]
+                    status_box = paineis[nome][0]
+                    try:
+                        resultados[nome]["value"] = futuro.result()
+                        status_box.update(label=f"✅ Concluído: {nome}", state="complete", expanded=False)
+                    except Exception as exc:
+                        resultados[nome]["error"] = exc
+                        paineis[nome][1].drenar(paineis[nome][2], forcar=True)
+                        status_box.update(label=f"❌ Erro em {nome}", state="error", expanded=True)
+                        status_box.error(f"Erro: {exc}")
+                    concluidos += 1
+                    progress_bar.progress(
+                        concluidos / total,
+                        text=f"✅ {concluidos} de {total} arquivos concluídos",
+                    )
+            _drenar_logs(forcar=True)
+    finally:
+        root_logger.removeHandler(roteador)
+
+    return resultados
+
 
 
 # =============================================================================
@@ -195,8 +507,10 @@ def save_agent_outputs(individual_results: dict, timestamp: datetime):
 # =============================================================================
 
 @st.cache_resource
-def get_llm(model_choice: str, custom_model: str, temperature: float, api_key: str) -> LLM:
+def get_llm(model_choice: str, custom_model: str, temperature: float, api_key: str) -> "LLM":
     """Cria instância do LLM nativo do CrewAI."""
+    from crewai import LLM
+
     if not api_key:
         st.error("⚠️ API Key não configurada!")
         st.stop()
@@ -221,6 +535,8 @@ def get_llm(model_choice: str, custom_model: str, temperature: float, api_key: s
 
 def create_agents(llm) -> list:
     """Cria os agentes especializados do Open Finance."""
+    from crewai import Agent
+
     multibank_analyst = Agent(
         role="Analista de Controle Multibanco",
         goal="""Compreender as receitas e despesas detalhadamente de cada mês e categorizar
@@ -260,8 +576,10 @@ PROFESSORA-UNIVERSIDADE-ANHEMBI e PREFEITURA-GASTRO.""",
     return [multibank_analyst]
 
 
-def create_consolidator_agent(llm) -> Agent:
+def create_consolidator_agent(llm) -> "Agent":
     """Cria o agente consolidador de CSVs de múltiplos extratos."""
+    from crewai import Agent
+
     return Agent(
         role="Consolidador Financeiro Multi-Extrato",
         goal="""Receber os dados CSV brutos gerados pela análise de múltiplos extratos bancários
@@ -287,8 +605,10 @@ Nunca inventa transações — apenas padroniza e organiza o que foi recebido.""
     )
 
 
-def create_consolidation_task(consolidator_agent: Agent, csvs_por_arquivo: dict) -> Task:
+def create_consolidation_task(consolidator_agent: "Agent", csvs_por_arquivo: dict) -> "Task":
     """Cria a task de consolidação recebendo o dicionário {filename: csv_bruto}."""
+    from crewai import Task
+
     blocos = "\n\n".join(
         f"=== EXTRATO: {fname} ===\n{csv_text}"
         for fname, csv_text in csvs_por_arquivo.items()
@@ -374,6 +694,8 @@ def texto_para_dataframe(csv_texto: str) -> pd.DataFrame | None:
 
 def create_tasks(agents: list, extratos_consolidados: str) -> list:
     """Cria as tasks encadeadas."""
+    from crewai import Task
+
     task_analise = Task(
         description=f"""Realize uma análise financeira rigorosa com base no seu objetivo (goal)
 utilizando EXCLUSIVAMENTE os dados dos seguintes extratos bancários consolidados do mês:
@@ -524,106 +846,53 @@ def main():
         if not extratos:
             st.warning("Envie os extratos na aba Input")
 
-        if st.button("🚀 Iniciar Análise", type="primary"):
-            llm = get_llm("gemini/gemini-2.5-flash", custom_model, temperature, api_key)
-            agents = create_agents(llm)
-            resultados = {}
-
-            # ── Barra de progresso geral (por arquivo) ────────────────────────
-            progress_bar = st.progress(0, text="Aguardando início...")
+        # ── Concorrência entre arquivos ──────────────────────────────────────
+        col_par, col_rpm = st.columns(2)
+        max_paralelo = col_par.number_input(
+            "📂 Arquivos em paralelo",
+            min_value=1,
+            max_value=8,
+            value=min(3, max(1, len(extratos))),
+            help="Quantos extratos são processados ao mesmo tempo.",
+        )
+        limite_rpm = col_rpm.number_input(
+            "⏱️ Limite global de chamadas LLM por minuto",
+            min_value=0,
+            max_value=1000,
+            value=30,
+            help=(
+                "Teto compartilhado por todos os extratos (e sessões) que usam o mesmo "
+                "modelo, para não estourar a cota do provedor. 0 = sem limite."
+            ),
+        )
 
-            for i, doc in enumerate(extratos):
-                filename = doc["filename"]
-                text = doc["content"]
-                total = len(extratos)
+        if st.button("🚀 Iniciar Análise", type="primary"):
+            from crewai import Crew, Process
 
-                progress_bar.progress(
-                    i / total,
-                    text=f"📂 Processando arquivo {i + 1} de {total}: **{filename}**",
+            llm = get_llm("gemini/gemini-2.5-flash", custom_model, temperature, api_key)
+            aplicar_limite_taxa(llm, obter_limitador(llm.model, int(limite_rpm)))
+
+            # Agentes e tasks são montados aqui (lendo o session_state na thread
+            # principal); cada arquivo recebe instâncias próprias.
+            crews_por_arquivo = {}
+            for doc in extratos:
+                agents = create_agents(llm)
+                crews_por_arquivo[doc["filename"]] = Crew(
+                    agents=agents,
+                    tasks=create_tasks(agents, doc["content"]),
+                    process=Process.sequential,
+                    verbose=True,
                 )
 
-                # ── Painel de logs em tempo real ──────────────────────────────
-                with st.status(
-                    f"🤖 Agente trabalhando em: {filename}", expanded=True
-                ) as status_box:
-
-                    st.markdown("##### 📡 Log de Execução em Tempo Real")
-                    log_container = st.container(height=380, border=False)
+            def _run_crew(doc: dict) -> str:
+                return str(crews_por_arquivo[doc["filename"]].kickoff())
 
-                    # Fila thread-safe para receber mensagens do CrewAI
-                    log_queue: queue.Queue = queue.Queue(maxsize=500)
-
-                    # Registra o handler temporariamente no logger raiz
-                    handler = StreamlitLogHandler(log_queue)
-                    handler.setFormatter(
-                        logging.Formatter("%(asctime)s | %(name)s | %(message)s",
-                                          datefmt="%H:%M:%S")
-                    )
-                    root_logger = logging.getLogger()
-                    root_logger.addHandler(handler)
-
-                    # Resultado que a thread vai preencher
-                    thread_result: dict = {"value": None, "error": None}
-
-                    def _run_crew(result_holder: dict):
-                        """Executa o CrewAI em thread separada."""
-                        try:
-                            tasks = create_tasks(agents, text)
-                            crew = Crew(
-                                agents=agents,
-                                tasks=tasks,
-                                process=Process.sequential,
-                                verbose=True,
-                            )
-                            result_holder["value"] = str(crew.kickoff())
-                        except Exception as exc:
-                            result_holder["error"] = exc
-                            logger.error(f"Erro durante kickoff: {exc}", exc_info=True)
-
-                    # Inicia a thread
-                    crew_thread = threading.Thread(
-                        target=_run_crew,
-                        args=(thread_result,),
-                        daemon=True,
-                    )
-                    crew_thread.start()
-
-                    # ── Loop de polling: drena a fila e atualiza a UI ─────────
-                    while crew_thread.is_alive():
-                        drained = False
-                        while not log_queue.empty():
-                            line = log_queue.get_nowait()
-                            render_log_line(line, log_container)
-                            drained = True
-                        if not drained:
-                            time.sleep(0.15)
-
-                    # Drena qualquer mensagem que ficou após o join
-                    while not log_queue.empty():
-                        render_log_line(log_queue.get_nowait(), log_container)
-
-                    crew_thread.join()
-
-                    # Remove o handler temporário para não duplicar em próximas iterações
-                    root_logger.removeHandler(handler)
-
-                    # Verifica resultado
-                    if thread_result["error"]:
-                        status_box.update(
-                            label=f"❌ Erro em {filename}", state="error", expanded=True
-                        )
-                        st.error(f"Erro: {thread_result['error']}")
-                    else:
-                        resultados[filename] = thread_result["value"]
-                        status_box.update(
-                            label=f"✅ Concluído: {filename}", state="complete", expanded=False
-                        )
-
-                # Atualiza barra de progresso após cada arquivo
-                progress_bar.progress(
-                    (i + 1) / total,
-                    text=f"✅ {i + 1} de {total} arquivos concluídos",
-                )
+            execucao = executar_arquivos_concorrentes(extratos, _run_crew, int(max_paralelo))
+            resultados = {
+                filename: res["value"]
+                for filename, res in execucao.items()
+                if res["error"] is None
+            }
 
             st.session_state["results"] = resultados
             # Persiste os textos brutos para o agente consolidador usar na Tab 4
@@ -681,9 +950,10 @@ def main():
 
                 with st.status("🤖 Agente Consolidador trabalhando...", expanded=True) as status_consolidador:
                     st.markdown("##### 📡 Log de Consolidação em Tempo Real")
-                    log_container_cons = st.container(height=320, border=False)
+                    painel_log_cons = PainelLog(st.container(height=320, border=False))
 
-                    log_queue_cons: queue.Queue = queue.Queue(maxsize=500)
+                    sinal_cons = threading.Event()
+                    log_queue_cons: queue.Queue = FilaSinalizada(sinal_cons, maxsize=500)
                     handler_cons = StreamlitLogHandler(log_queue_cons)
                     handler_cons.setFormatter(
                         logging.Formatter("%(asctime)s | %(name)s | %(message)s", datefmt="%H:%M:%S")
@@ -693,8 +963,10 @@ def main():
 
                     thread_result_cons: dict = {"value": None, "error": None}
 
-                    def _run_consolidation(result_holder: dict):
-                        """Executa o agente consolidador em thread separada."""
+                    def _run_consolidation() -> str:
+                        """Executa o agente consolidador em segundo plano."""
+                        from crewai import Crew, Process
+
                         try:
                             llm_cons = get_llm(
                                 "gemini/gemini-2.5-flash", custom_model, temperature, api_key
@@ -707,30 +979,19 @@ def main():
                                 process=Process.sequential,
                                 verbose=True,
                             )
-                            result_holder["value"] = str(crew_cons.kickoff())
+                            return str(crew_cons.kickoff())
                         except Exception as exc:
-                            result_holder["error"] = exc
                             logger.error(f"Erro na consolidação: {exc}", exc_info=True)
+                            raise
 
-                    thread_cons = threading.Thread(
-                        target=_run_consolidation,
-                        args=(thread_result_cons,),
-                        daemon=True,
-                    )
-                    thread_cons.start()
-
-                    while thread_cons.is_alive():
-                        drained = False
-                        while not log_queue_cons.empty():
-                            render_log_line(log_queue_cons.get_nowait(), log_container_cons)
-                            drained = True
-                        if not drained:
-                            time.sleep(0.15)
-
-                    while not log_queue_cons.empty():
-                        render_log_line(log_queue_cons.get_nowait(), log_container_cons)
-
-                    thread_cons.join()
+                    try:
+                        thread_result_cons["value"] = acompanhar_tarefa(
+                            TarefaSegundoPlano(_run_consolidation, sinal_cons, nome="consolidacao"),
+                            painel_log_cons,
+                            log_queue_cons,
+                        )
+                    except Exception as exc:
+                        thread_result_cons["error"] = exc
                     root_logger.removeHandler(handler_cons)
 
                     if thread_result_cons["error"]:
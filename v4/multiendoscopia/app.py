@@ -6,18 +6,34 @@ Instalar:
 
 Executar:
     streamlit run app_endoscopia.py
+
+Sem interface (transformação → correlação → cobrança):
+    python cli.py ENTRADAS -o SAIDA
 """
 
 import os
+import contextvars
 import logging
 import queue
 import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import csv
+import functools
+import hashlib
+import importlib
 import io
+import json
 import re
+import sqlite3
+import subprocess
+import sys
+import uuid
+from typing import TYPE_CHECKING, Callable
 
 import pandas as pd
 import streamlit as st
@@ -25,8 +41,80 @@ from dotenv import load_dotenv
 from docx import Document
 from pypdf import PdfReader
 
-# CrewAI
-from crewai import Agent, Task, Crew, Process, LLM
+# CrewAI (e o LiteLLM, que ele carrega) leva segundos para importar e inicializa
+# telemetria/armazenamento no import: só é importado dentro das funções dos
+# modos LLM — ver precarregar_crewai
+if TYPE_CHECKING:
+    from crewai import Agent, Task, Crew, LLM
+    from crewai.events import LLMStreamChunkEvent
+
+# Motor local (pacote motor/: leitura, transformação, correlação, TUSS, cobrança),
+# compartilhado com cli.py e os benchmarks; importá-lo não tem efeitos colaterais
+import motor
+import motor.tuss
+from motor.leitura import (
+    abas_para_texto,
+    _engine_excel,
+)
+from motor.transform import (
+    transformar_abas_arquivo,
+    transformar_texto_arquivo,
+    _colapsar_quebras_entre_aspas,
+    _consolidar_blocos,
+    _csv_para_df,
+    _detectar_cabecalho_producao,
+    _detectar_tipo_por_cabecalho,
+    _df_como_csv_lido,
+    _df_para_csv,
+    _df_tipado,
+    _df_tipado_para_texto,
+    _identificar_tipo_arquivo,
+    _linha_e_valida,
+    _nomes_colunas_csv,
+    _normalizar_nulos_csv,
+    _padronizar_datas,
+)
+from motor.similaridade import (
+    _extrair_valor_numerico,
+    _normalizar_nome_paciente,
+    _sao_anatomicamente_divergentes,
+    _similaridade_procedimento,
+)
+from motor.correlate import (
+    correlacionar_dataframes,
+    correlacionar_incremental,
+    _determinar_status_correlacao,
+    _extrair_tokens_nome,
+    _tokens_fuzzy_em_comum,
+)
+from motor.tuss import (
+    verificar_tuss_adicionais,
+    _TUSS_DIR,
+    _TUSS_VALORES_PATH,
+    _construir_desc_por_codigo,
+    _construir_desc_por_tuss_code,
+    _construir_indice_tuss_repasse,
+    _enriquecer_com_valores_tuss,
+    _gerar_valores_tuss,
+)
+from motor.cobranca import (
+    gerar_formulario_cobranca,
+    montar_itens_cobranca,
+    preparar_df_cobranca,
+)
+from motor.jobs import (
+    JOB_CONCLUIDO,
+    JOB_ERRO,
+    JOB_EXECUTANDO,
+    JOB_PENDENTE,
+    _ESTADOS_JOB_ATIVOS,
+    FilaJobs,
+)
+from motor.diferenca import diferenca_tabelas
+
+# Tabelas TUSS em cache do Streamlit; .clear() força a releitura após gerar os arquivos
+_carregar_tabela_tuss = st.cache_data(show_spinner=False)(motor.tuss._carregar_tabela_tuss)
+_carregar_valores_tuss = st.cache_data(show_spinner=False)(motor.tuss._carregar_valores_tuss)
 
 # =============================================================================
 # CONFIGURAÇÃO DE VARIÁVEIS DE AMBIENTE E LOG
@@ -183,22 +271,548 @@ class StreamlitLogHandler(logging.Handler):
             pass
 
 
-def render_log_line(line: str, container) -> None:
-    line_lower = line.lower()
-    if any(k in line_lower for k in ("error", "erro", "exception", "traceback")):
-        container.error(f"🔴 {line}")
-    elif any(k in line_lower for k in ("warning", "warn", "aviso")):
-        container.warning(f"🟡 {line}")
-    elif any(k in line_lower for k in ("task", "tarefa", "iniciando", "starting")):
-        container.info(f"📋 {line}")
-    elif any(k in line_lower for k in ("agent", "agente", "thinking", "pensando")):
-        container.info(f"🤖 {line}")
-    elif any(k in line_lower for k in ("action", "ação", "tool", "ferramenta")):
-        container.info(f"⚙️ {line}")
-    elif any(k in line_lower for k in ("final answer", "resposta final", "finished", "concluído", "complete")):
-        container.success(f"✅ {line}")
-    else:
-        container.text(f"   {line}")
+# Linhas mantidas por painel (as mais antigas são descartadas) e intervalo
+# mínimo entre dois redesenhos do mesmo painel
+_LOG_MAX_LINHAS = int(os.getenv("LOG_PAINEL_MAX_LINHAS", "400"))
+_LOG_INTERVALO_QUADRO = float(os.getenv("LOG_PAINEL_INTERVALO_S", "0.25"))
+
+# Severidade numa única regex: cada alternativa é um lookahead sobre a linha
+# inteira, tentadas na ordem de prioridade (erro vence aviso, que vence tarefa...).
+# Casada contra line.lower(): IGNORECASE custa ~4x mais em linhas longas.
+_RE_SEVERIDADE_LOG = re.compile(
+    r"^(?:"
+    r"(?=.*(?:error|erro|exception|traceback))(?P<erro>)"
+    r"|(?=.*(?:warn|aviso))(?P<aviso>)"
+    r"|(?=.*(?:task|tarefa|iniciando|starting))(?P<tarefa>)"
+    r"|(?=.*(?:agent|agente|thinking|pensando))(?P<agente>)"
+    r"|(?=.*(?:action|ação|tool|ferramenta))(?P<acao>)"
+    r"|(?=.*(?:final answer|resposta final|finished|concluído|complete))(?P<concluido>)"
+    r")",
+    re.DOTALL,
+)
+_ICONES_SEVERIDADE_LOG = {
+    "erro": "🔴", "aviso": "🟡", "tarefa": "📋", "agente": "🤖", "acao": "⚙️", "concluido": "✅",
+}
+
+
+def classificar_linha_log(line: str) -> str:
+    """Ícone da linha de log ("  " quando nenhuma palavra-chave casa)."""
+    m = _RE_SEVERIDADE_LOG.match(line.lower())
+    return _ICONES_SEVERIDADE_LOG[m.lastgroup] if m else "  "
+
+
+class PainelLog:
+    """
+    Log de um container em um único elemento: as linhas ficam num buffer
+    circular (max_linhas) e são redesenhadas juntas, no máximo uma vez a cada
+    `intervalo` segundos, num bloco de código. Substitui um elemento do
+    Streamlit por linha, que com o modo verbose chegava a milhares.
+    """
+
+    def __init__(self, container, max_linhas: int = _LOG_MAX_LINHAS, intervalo: float = _LOG_INTERVALO_QUADRO):
+        self._area = container.empty()
+        self._linhas: deque = deque(maxlen=max_linhas)
+        self._descartadas = 0
+        self.intervalo = intervalo
+        self._pendente = False
+        self._ultimo_quadro = 0.0
+
+    def prazo(self) -> float | None:
+        """Segundos até o próximo redesenho permitido, ou None sem linhas pendentes."""
+        if not self._pendente:
+            return None
+        return max(0.0, self.intervalo - (time.monotonic() - self._ultimo_quadro))
+
+    def adicionar(self, line: str) -> None:
+        if len(self._linhas) == self._linhas.maxlen:
+            self._descartadas += 1
+        self._linhas.append(f"{classificar_linha_log(line)} {line}")
+        self._pendente = True
+
+    def drenar(self, fila: queue.Queue, forcar: bool = False) -> bool:
+        """Move tudo que está na fila para o buffer e redesenha se for a hora."""
+        recebeu = False
+        while True:
+            try:
+                self.adicionar(fila.get_nowait())
+            except queue.Empty:
+                break
+            recebeu = True
+        self.renderizar(forcar)
+        return recebeu
+
+    def renderizar(self, forcar: bool = False) -> None:
+        agora = time.monotonic()
+        if not self._pendente or (not forcar and agora - self._ultimo_quadro < self.intervalo):
+            return
+        cabecalho = (
+            [f"… {self._descartadas} linha(s) anterior(es) omitida(s) — veja o arquivo de log"]
+            if self._descartadas else []
+        )
+        self._area.code("\n".join(cabecalho + list(self._linhas)), language=None)
+        self._pendente = False
+        self._ultimo_quadro = agora
+
+
+# =============================================================================
+# TAREFAS EM SEGUNDO PLANO
+# =============================================================================
+#
+# A thread principal do Streamlit espera num único threading.Event ("sinal"),
+# acionado por: linha de log ou token nas filas (FilaSinalizada), progresso
+# reportado pela tarefa e término do futuro. Assim a interface reage assim
+# que há algo para mostrar, sem laços de time.sleep; o único timeout é o do
+# redesenho adiado de um painel (PainelLog/PainelStreaming.prazo).
+
+class FilaSinalizada(queue.Queue):
+    """queue.Queue que aciona `sinal` a cada item inserido."""
+
+    def __init__(self, sinal: threading.Event, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.sinal = sinal
+
+    def _put(self, item) -> None:
+        super()._put(item)
+        self.sinal.set()
+
+
+class TarefaSegundoPlano:
+    """
+    Executa `alvo(reportar)` num ThreadPoolExecutor de um worker, levando o
+    contexto atual. `reportar(fracao, mensagem)` é o callback de progresso
+    que o alvo repassa ao motor (ex.: correlacionar_dataframes(progresso=...)).
+    """
+
+    def __init__(self, alvo, sinal: threading.Event | None = None, nome: str = "tarefa"):
+        self.sinal = sinal or threading.Event()
+        self.progresso: tuple[float, str] = (0.0, "")
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=nome)
+        self.futuro = submeter_no_contexto(pool, alvo, self.reportar)
+        self.futuro.add_done_callback(lambda _futuro: self.sinal.set())
+        pool.shutdown(wait=False)
+
+    def reportar(self, fracao: float, mensagem: str) -> None:
+        self.progresso = (min(1.0, max(0.0, fracao)), mensagem)
+        self.sinal.set()
+
+
+def _menor_prazo(paineis) -> float | None:
+    prazos = [p.prazo() for p in paineis if p is not None]
+    prazos = [p for p in prazos if p is not None]
+    return min(prazos) if prazos else None
+
+
+def acompanhar_tarefa(
+    tarefa: TarefaSegundoPlano,
+    barra=None,
+    painel_log: "PainelLog | None" = None,
+    fila_log: queue.Queue | None = None,
+    painel_stream: "PainelStreaming | None" = None,
+):
+    """
+    Laço da thread principal: a cada sinal atualiza a barra com o progresso
+    real, drena o log e os tokens. Devolve o resultado do alvo (ou relança
+    a exceção dele).
+    """
+    ultimo = None
+    while True:
+        tarefa.sinal.wait(_menor_prazo((painel_log, painel_stream)))
+        tarefa.sinal.clear()
+        terminou = tarefa.futuro.done()
+        if barra is not None and tarefa.progresso != ultimo:
+            ultimo = tarefa.progresso
+            barra.progress(ultimo[0], text=ultimo[1] or None)
+        if painel_log is not None:
+            painel_log.drenar(fila_log, forcar=terminou)
+        if painel_stream is not None:
+            painel_stream.drenar(forcar=terminou)
+        if terminou:
+            return tarefa.futuro.result()
+
+
+# =============================================================================
+# EXECUÇÃO CONCORRENTE DE ARQUIVOS
+# =============================================================================
+
+# (roteador, fila) do arquivo em processamento no contexto atual. emit() roda na
+# thread que gerou o registro, então basta ler a variável de contexto; threads
+# auxiliares disparadas com submeter_no_contexto herdam o arquivo.
+_FILA_LOG_ARQUIVO: contextvars.ContextVar = contextvars.ContextVar("fila_log_arquivo", default=None)
+
+
+class RoteadorLogPorThread(logging.Handler):
+    """
+    Handler único registrado no logger raiz durante uma execução concorrente:
+    envia cada registro para a fila do arquivo cujo contexto o emitiu. Registros
+    fora de um arquivo (ou de outra execução) vão para a fila geral.
+    """
+
+    def __init__(self, fila_geral: queue.Queue):
+        super().__init__()
+        self.fila_geral = fila_geral
+
+    def associar(self, fila: queue.Queue) -> contextvars.Token:
+        return _FILA_LOG_ARQUIVO.set((self, fila))
+
+    def desassociar(self, token: contextvars.Token) -> None:
+        _FILA_LOG_ARQUIVO.reset(token)
+
+    def emit(self, record: logging.LogRecord):
+        atual = _FILA_LOG_ARQUIVO.get()
+        fila = atual[1] if atual is not None and atual[0] is self else self.fila_geral
+        try:
+            fila.put_nowait(self.format(record))
+        except queue.Full:
+            pass
+
+
+def submeter_no_contexto(pool, funcao, *args):
+    """pool.submit que leva junto o contexto atual (painel de log do arquivo)."""
+    return pool.submit(contextvars.copy_context().run, funcao, *args)
+
+
+class LimitadorTaxa:
+    """
+    Limite de chamadas por minuto (janela deslizante de 60 s) compartilhado
+    entre threads. max_por_minuto <= 0 desativa o limite.
+    """
+
+    def __init__(self, max_por_minuto: int):
+        self.max_por_minuto = max_por_minuto
+        self._instantes: deque = deque()
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> None:
+        while self.max_por_minuto > 0:
+            with self._lock:
+                agora = time.monotonic()
+                while self._instantes and agora - self._instantes[0] >= 60:
+                    self._instantes.popleft()
+                if len(self._instantes) < self.max_por_minuto:
+                    self._instantes.append(agora)
+                    return
+                espera = 60 - (agora - self._instantes[0])
+            logger.info(f"Limite de {self.max_por_minuto} chamadas/min atingido; aguardando {espera:.1f}s")
+            time.sleep(espera)
+
+
+# Um limitador por modelo, compartilhado por todas as sessões do processo
+_LIMITADORES: dict[str, LimitadorTaxa] = {}
+_LIMITADORES_LOCK = threading.Lock()
+
+
+def obter_limitador(chave: str, max_por_minuto: int) -> LimitadorTaxa:
+    with _LIMITADORES_LOCK:
+        limitador = _LIMITADORES.setdefault(chave, LimitadorTaxa(max_por_minuto))
+        limitador.max_por_minuto = max_por_minuto
+        return limitador
+
+
+def aplicar_limite_taxa(llm, limitador: LimitadorTaxa):
+    """Faz cada llm.call passar pelo limitador (vale para todas as crews que usam este LLM)."""
+    # get_llm é cache_resource: guarda a chamada original para não empilhar
+    # limitadores a cada execução sobre a mesma instância
+    chamada_original = getattr(llm, "_call_sem_limite", None) or llm.call
+    llm._call_sem_limite = chamada_original
+
+    def _call_limitado(*args, **kwargs):
+        limitador.aguardar()
+        return chamada_original(*args, **kwargs)
+
+    llm.call = _call_limitado
+    return llm
+
+
+def executar_arquivos_concorrentes(
+    docs: list[dict],
+    processar,
+    max_workers: int,
+    rotulo: str = "🤖 Agente trabalhando em",
+    receptor_tokens: "ReceptorTokensStream | None" = None,
+) -> dict[str, dict]:
+    """
+    Executa `processar(doc)` para cada arquivo num pool de threads limitado a
+    `max_workers`, mantendo uma caixa de status e um painel de log por arquivo.
+    Com `receptor_tokens`, cada caixa também mostra os tokens do modelo e a
+    prévia do CSV enquanto ele é gerado. Toda a interação com o Streamlit
+    acontece na thread principal.
+
+    Returns:
+        {filename: {"value": retorno de processar, "error": exceção ou None}},
+        na ordem de `docs`.
+    """
+    total = len(docs)
+    progress_bar = st.progress(0, text=f"📂 {total} arquivo(s) na fila — até {max_workers} em paralelo")
+
+    # Log, tokens, início e fim de cada arquivo acordam a thread principal
+    sinal = threading.Event()
+    paineis: dict[str, tuple] = {}
+    streams: dict[str, PainelStreaming] = {}
+    for doc in docs:
+        status_box = st.status(f"⏳ Na fila: {doc['filename']}", expanded=False)
+        with status_box:
+            if receptor_tokens is not None:
+                streams[doc["filename"]] = PainelStreaming(sinal)
+            st.markdown("##### 📡 Log de Execução em Tempo Real")
+            painel_log = PainelLog(st.container(height=380, border=False))
+        paineis[doc["filename"]] = (status_box, painel_log, FilaSinalizada(sinal, maxsize=500))
+
+    fila_geral: queue.Queue = FilaSinalizada(sinal, maxsize=500)
+    log_geral = None
+    eventos: queue.Queue = FilaSinalizada(sinal)
+    roteador = RoteadorLogPorThread(fila_geral)
+    roteador.setFormatter(
+        logging.Formatter("%(asctime)s | %(name)s | %(message)s", datefmt="%H:%M:%S")
+    )
+    root_logger = logging.getLogger()
+    root_logger.addHandler(roteador)
+
+    resultados = {doc["filename"]: {"value": None, "error": None} for doc in docs}
+
+    def _tarefa(doc: dict):
+        token = roteador.associar(paineis[doc["filename"]][2])
+        token_stream = (
+            receptor_tokens.associar(streams[doc["filename"]].fila)
+            if receptor_tokens is not None else None
+        )
+        eventos.put(doc["filename"])
+        try:
+            return processar(doc)
+        except Exception as exc:
+            logger.error(f"Erro ao processar {doc['filename']}: {exc}", exc_info=True)
+            raise
+        finally:
+            if token_stream is not None:
+                receptor_tokens.desassociar(token_stream)
+            roteador.desassociar(token)
+
+    def _drenar_logs(forcar: bool = False):
+        nonlocal log_geral
+        for painel_stream in streams.values():
+            painel_stream.drenar(forcar)
+        for _, painel_log, fila in paineis.values():
+            painel_log.drenar(fila, forcar)
+        if not fila_geral.empty() and log_geral is None:
+            log_geral = PainelLog(st.expander("📡 Log geral", expanded=False).container(height=200, border=False))
+        if log_geral is not None:
+            log_geral.drenar(fila_geral, forcar)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="arquivo") as pool:
+            futuros = {pool.submit(_tarefa, doc): doc["filename"] for doc in docs}
+            for futuro in futuros:
+                futuro.add_done_callback(lambda _futuro: sinal.set())
+            pendentes = set(futuros)
+            concluidos = 0
+            while pendentes:
+                # Timeout só para o redesenho adiado de algum painel
+                sinal.wait(_menor_prazo(
+                    [p[1] for p in paineis.values()] + list(streams.values()) + [log_geral]
+                ))
+                sinal.clear()
+                feitos = {f for f in pendentes if f.done()}
+                pendentes -= feitos
+                while not eventos.empty():
+                    nome = eventos.get_nowait()
+                    paineis[nome][0].update(label=f"{rotulo}: {nome}", state="running", expanded=True)
+                _drenar_logs()
+                for futuro in feitos:
+                    nome = futuros[futuro]
+                    status_box = paineis[nome][0]
+                    try:
+                        resultados[nome]["value"] = futuro.result()
+                        status_box.update(label=f"✅ Concluído: {nome}", state="complete", expanded=False)
+                    except Exception as exc:
+                        resultados[nome]["error"] = exc
+                        paineis[nome][1].drenar(paineis[nome][2], forcar=True)
+                        status_box.update(label=f"❌ Erro em {nome}", state="error", expanded=True)
+                        status_box.error(f"Erro: {exc}")
+                    concluidos += 1
+                    progress_bar.progress(
+                        concluidos / total,
+                        text=f"✅ {concluidos} de {total} arquivos concluídos",
+                    )
+            _drenar_logs(forcar=True)
+    finally:
+        root_logger.removeHandler(roteador)
+
+    return resultados
+
+
+# =============================================================================
+# STREAMING DE TOKENS DOS AGENTES
+# =============================================================================
+#
+# Com o LLM em modo stream, o CrewAI emite um LLMStreamChunkEvent por pedaço
+# de texto, de forma síncrona na thread que fez a chamada. O receptor lê a
+# variável de contexto (como o RoteadorLogPorThread) e põe o pedaço na fila do
+# arquivo/correlação em andamento; a thread principal drena a fila, conta as
+# linhas do CSV já completas e mostra uma prévia antes do kickoff terminar.
+
+# (receptor, fila) da execução em andamento no contexto atual
+_FILA_TOKENS: contextvars.ContextVar = contextvars.ContextVar("fila_tokens", default=None)
+
+
+class ReceptorTokensStream:
+    """
+    Handler de LLMStreamChunkEvent registrado só durante a execução
+    (`with` ou registrar/remover). Cada pedaço vai para a fila associada ao contexto que
+    fez a chamada; pedaços de outros contextos/sessões são ignorados.
+    """
+
+    def registrar(self) -> None:
+        from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+        crewai_event_bus.register_handler(LLMStreamChunkEvent, self._ao_receber)
+
+    def remover(self) -> None:
+        from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+        crewai_event_bus.off(LLMStreamChunkEvent, self._ao_receber)
+
+    def __enter__(self) -> "ReceptorTokensStream":
+        self.registrar()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.remover()
+
+    def associar(self, fila: queue.Queue) -> contextvars.Token:
+        return _FILA_TOKENS.set((self, fila))
+
+    def desassociar(self, token: contextvars.Token) -> None:
+        _FILA_TOKENS.reset(token)
+
+    def _ao_receber(self, _fonte, evento: "LLMStreamChunkEvent") -> None:
+        atual = _FILA_TOKENS.get()
+        if atual is None or atual[0] is not self or not evento.chunk:
+            return
+        # Fila sem limite: descartar um pedaço quebraria a leitura do CSV
+        atual[1].put_nowait((evento.call_id, evento.chunk))
+
+
+class LeitorCSVIncremental:
+    """
+    Lê o CSV de uma resposta à medida que os pedaços chegam. Ignora o texto
+    antes do cabeçalho (Thought/Final Answer/cerca ```csv), junta registros
+    com quebra de linha entre aspas e para na cerca de fechamento ou no bloco
+    de resumo. Guarda só a contagem e as últimas linhas para a prévia.
+    """
+
+    def __init__(self, max_previa: int = 10):
+        self.cabecalho: list[str] | None = None
+        self.linhas = 0
+        self.previa: deque = deque(maxlen=max_previa)
+        self._pendente = ""
+        self._registro = ""
+        self._encerrado = False
+
+    def alimentar(self, trecho: str) -> None:
+        *completas, self._pendente = (self._pendente + trecho).split("\n")
+        for linha in completas:
+            self._linha(linha)
+
+    def _linha(self, linha: str) -> None:
+        if self._encerrado:
+            return
+        if self._registro:
+            linha = f"{self._registro}\n{linha}"
+            self._registro = ""
+        if linha.count('"') % 2:
+            self._registro = linha
+            return
+
+        texto = linha.strip()
+        if "Final Answer:" in texto:
+            # A resposta de verdade começa aqui; o que veio antes era raciocínio
+            texto = texto.split("Final Answer:", 1)[1].strip()
+            self.cabecalho, self.linhas = None, 0
+            self.previa.clear()
+        if texto.startswith("```") or texto.startswith("# RESUMO"):
+            self._encerrado = self.cabecalho is not None
+            return
+        if not texto:
+            return
+
+        campos = next(csv.reader([texto]))
+        if self.cabecalho is None:
+            if len(campos) >= 3:
+                self.cabecalho = [c.strip() for c in campos]
+            return
+        if len(campos) >= 2:
+            self.linhas += 1
+            self.previa.append(campos)
+
+    def previa_df(self) -> pd.DataFrame | None:
+        if self.cabecalho is None or not self.previa:
+            return None
+        n = len(self.cabecalho)
+        linhas = [(campos + [""] * n)[:n] for campos in self.previa]
+        return pd.DataFrame(linhas, columns=_nomes_colunas_csv(self.cabecalho))
+
+
+class PainelStreaming:
+    """
+    Área (dentro de uma caixa de status) com o contador de linhas, o final do
+    texto gerado e a prévia do CSV. `fila` recebe (call_id, pedaço) do
+    ReceptorTokensStream; `drenar` roda na thread principal. Cada chamada ao
+    LLM (um bloco do map-reduce, uma nova tentativa) tem seu próprio leitor.
+    """
+
+    def __init__(
+        self,
+        sinal: threading.Event | None = None,
+        max_caracteres: int = 1500,
+        intervalo: float = _LOG_INTERVALO_QUADRO,
+    ):
+        self.fila: queue.Queue = FilaSinalizada(sinal) if sinal is not None else queue.Queue()
+        self.max_caracteres = max_caracteres
+        self.intervalo = intervalo
+        self._leitores: dict[str, LeitorCSVIncremental] = {}
+        self._atual: LeitorCSVIncremental | None = None
+        self._cauda = ""
+        self._pendente = False
+        self._ultimo_quadro = 0.0
+        self._contador = st.empty()
+        self._texto = st.empty()
+        self._previa = st.empty()
+
+    @property
+    def linhas(self) -> int:
+        return sum(leitor.linhas for leitor in self._leitores.values())
+
+    def prazo(self) -> float | None:
+        if not self._pendente:
+            return None
+        return max(0.0, self.intervalo - (time.monotonic() - self._ultimo_quadro))
+
+    def drenar(self, forcar: bool = False) -> bool:
+        novos = []
+        while True:
+            try:
+                call_id, pedaco = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            self._atual = self._leitores.setdefault(call_id, LeitorCSVIncremental())
+            self._atual.alimentar(pedaco)
+            novos.append(pedaco)
+        if novos:
+            self._cauda = (self._cauda + "".join(novos))[-self.max_caracteres:]
+            self._pendente = True
+        agora = time.monotonic()
+        if self._pendente and (forcar or agora - self._ultimo_quadro >= self.intervalo):
+            self._renderizar()
+            self._pendente = False
+            self._ultimo_quadro = agora
+        return bool(novos)
+
+    def _renderizar(self) -> None:
+        self._contador.caption(
+            f"✍️ Modelo gerando — **{self.linhas}** linha(s) de CSV recebidas "
+            f"em {len(self._leitores)} chamada(s)"
+        )
+        self._texto.code(self._cauda, language=None)
+        previa = self._atual.previa_df()
+        if previa is not None:
+            self._previa.dataframe(previa, use_container_width=True, hide_index=True)
 
 
 # =============================================================================
@@ -241,44 +855,20 @@ def read_text_file(file) -> str:
         return None
 
 
-def read_excel_file(file) -> str:
+def ler_abas_excel(file, tempos: list | None = None) -> list[tuple[str, pd.DataFrame]] | None:
+    """motor.ler_abas_excel com o erro exibido na interface; None se a leitura falhar."""
     try:
-        file.seek(0)
-        # Identifica a extensão do arquivo
-        file_extension = file.name.split('.')[-1].lower()
-        
-        # Define o engine correto: xlrd para .xls e openpyxl para .xlsx
-        engine = "openpyxl" if file_extension == "xlsx" else "xlrd"
-        
-        # Lê o arquivo Excel com o engine apropriado
-        xls = pd.ExcelFile(file, engine=engine)
-        
-        blocos = []
-        for sheet_name in xls.sheet_names:
-            df = xls.parse(sheet_name, dtype=str)
-            df.fillna("", inplace=True)
-            df.dropna(axis=1, how="all", inplace=True)
-            df.dropna(axis=0, how="all", inplace=True)
-            
-            if df.empty:
-                continue
-                
-            # Remove quebras de linha internas em células
-            df = df.apply(lambda col: col.map(
-                lambda v: re.sub(r"[\r\n]+", " ", str(v)).strip() if isinstance(v, str) else v
-            ))
-            
-            csv_str = df.to_csv(index=False, sep=",", encoding="utf-8")
-            blocos.append(f"=== ABA: {sheet_name} ===\n{csv_str}")
-            
-        if not blocos:
-            st.warning("O arquivo Excel não contém dados nas abas.")
-            return None
-            
-        return "\n\n".join(blocos)
+        return motor.ler_abas_excel(file, tempos=tempos)
+    except motor.PlanilhaSemDadosError as e:
+        st.warning(str(e))
     except Exception as e:
-        st.error(f"Erro ao ler arquivo Excel (.{file_extension}): {e}")
-        return None
+        st.error(f"Erro ao ler arquivo Excel (.{file.name.split('.')[-1].lower()}): {e}")
+    return None
+
+
+def read_excel_file(file) -> str:
+    abas = ler_abas_excel(file)
+    return abas_para_texto(abas) if abas else None
 
 
 def extract_text_from_file(uploaded_file) -> str:
@@ -302,3068 +892,1264 @@ def extract_text_from_file(uploaded_file) -> str:
 
 
 # =============================================================================
-# FUNÇÕES DE TRANSFORMAÇÃO DE ARQUIVOS
-# =============================================================================
-
-# =============================================================================
-# CONSTANTES
-# =============================================================================
-
-# Padrão da linha de título informativo (descartada)
-_RE_LINHA_INFORMATIVA = re.compile(
-    r"CONTROLE DE EXAMES E PROCEDIMENTOS NA ENDOSCOPIA",
-    re.IGNORECASE,
-)
-
-# Colunas canônicas do formato PRODUCAO com QTD (2026) — 13 campos
-_COLUNAS_COM_QTD = [
-    "QTD", "Data", "Paciente", "NrAtendimento",
-    "Convenio", "Origem", "Procedimento",
-    "ProcedimentosAdicionais", "MedicoExecutor",
-    "LocalSetor", "Sala", "Carater", "Observacao",
-]
-
-# Colunas canônicas do formato PRODUCAO sem QTD (legado 2025) — 13 campos
-# O primeiro campo é Data (sem QTD), e há EXAME REALIZADO 1 + EXAME REALIZADO 2
-_COLUNAS_SEM_QTD = [
-    "Data", "Paciente", "NrAtendimento",
-    "Convenio", "Origem", "Procedimento", "Procedimento2",
-    "ProcedimentosAdicionais", "MedicoExecutor",
-    "LocalSetor", "Sala", "Carater", "Observacao",
-]
-
-# Colunas canônicas do formato PRODUCAO 2025 NOVO (MAIO+ 2025) — 12 campos
-# Sem QTD, sem EXAME REALIZADO 1/2, apenas EXAME REALIZADO único
-_COLUNAS_2025_NOVO = [
-    "Data", "Paciente", "NrAtendimento",
-    "Convenio", "Origem", "Procedimento",
-    "ProcedimentosAdicionais", "MedicoExecutor",
-    "LocalSetor", "Sala", "Carater", "Observacao",
-]
-
-# =============================================================================
-# MAPEAMENTOS DE COLUNAS → NOMES PADRONIZADOS
-# =============================================================================
-
-_MAP_PRODUCAO = {
-    "qtd":                                   "QTD",
-    "data":                                  "Data",
-    "nome do paciente":                      "Paciente",
-    "nº atendimento":                        "NrAtendimento",
-    "n° atendimento":                        "NrAtendimento",
-    "n atendimento":                         "NrAtendimento",
-    "nr atendimento":                        "NrAtendimento",
-    "convênio":                              "Convenio",
-    "convenio":                              "Convenio",
-    "origem":                                "Origem",
-    "exame realizado":                       "Procedimento",      # com ou sem espaço trailing
-    "exame realizado 1":                     "Procedimento",
-    "exame realizado 2":                     "Procedimento2",
-    "procedimento adicional":                "ProcedimentosAdicionais",
-    "procedimentos adicionais":              "ProcedimentosAdicionais",
-    "procedimento adocional":                "ProcedimentosAdicionais",  # typo real do arquivo
-    "médico executor":                       "MedicoExecutor",
-    "medico executor":                       "MedicoExecutor",
-    "local / setor":                         "LocalSetor",
-    "local/setor":                           "LocalSetor",
-    "sala":                                  "Sala",
-    "carater":                               "Carater",
-    "caráter":                               "Carater",
-    "observação + procedimentos adicionais": "Observacao",
-    "observacao":                            "Observacao",
-    "observação":                            "Observacao",
-}
-
-# Mapeamento para formato 2025 NOVO (MAIO+ 2025) - sem QTD, sem EXAME REALIZADO 1/2
-_MAP_PRODUCAO_2025_NOVO = {
-    "data":                                  "Data",
-    "nome do paciente":                      "Paciente",
-    "nº atendimento":                        "NrAtendimento",
-    "n° atendimento":                        "NrAtendimento",
-    "n atendimento":                         "NrAtendimento",
-    "nr atendimento":                        "NrAtendimento",
-    "convênio":                              "Convenio",
-    "convenio":                              "Convenio",
-    "origem":                                "Origem",
-    "exame realizado":                       "Procedimento",
-    "procedimentos adicionais":              "ProcedimentosAdicionais",
-    "procedimento adicional":                "ProcedimentosAdicionais",
-    "médico executor":                       "MedicoExecutor",
-    "medico executor":                       "MedicoExecutor",
-    "local / setor":                         "LocalSetor",
-    "local/setor":                           "LocalSetor",
-    "sala":                                  "Sala",
-    "carater":                               "Carater",
-    "caráter":                               "Carater",
-    "observação + procedimentos adicionais": "Observacao",
-    "observacao":                            "Observacao",
-    "observação":                            "Observacao",
-}
-
-# Mapeamento para formato 2026 (com QTD no início)
-_MAP_PRODUCAO_2026 = {
-    "qtd":                                   "QTD",
-    "data":                                  "Data",
-    "nome do paciente":                      "Paciente",
-    "nº atendimento":                        "NrAtendimento",
-    "n° atendimento":                        "NrAtendimento",
-    "n atendimento":                         "NrAtendimento",
-    "nr atendimento":                        "NrAtendimento",
-    "convênio":                              "Convenio",
-    "convenio":                              "Convenio",
-    "origem":                                "Origem",
-    "exame realizado":                       "Procedimento",
-    "procedimento":                          "Procedimento",
-    "procedimentos adicionais":              "ProcedimentosAdicionais",
-    "procedimento adicional":                "ProcedimentosAdicionais",
-    "médico executor":                       "MedicoExecutor",
-    "medico executor":                       "MedicoExecutor",
-    "local / setor":                         "LocalSetor",
-    "local/setor":                           "LocalSetor",
-    "sala":                                  "Sala",
-    "carater":                               "Carater",
-    "caráter":                               "Carater",
-    "observação + procedimentos adicionais": "Observacao",
-    "observacao":                            "Observacao",
-    "observação":                            "Observacao",
-}
-
-_MAP_REPASSE = {
-    "ds estabelecimento": "Estabelecimento",
-    "cnpj estabelecimento": "CNPJ",
-    "ds terceiro": "Terceiro",
-    "ds status": "Status",
-    "nr repasse terceiro": "NrRepasse",
-    "tipo": "TipoItem",
-    "nr atendimento": "NrAtendimento",
-    "tp atend": "TipoAtendimento",
-    "nr interno conta": "NrInternoConta",
-    "paciente": "Paciente",
-    "convenio": "Convenio",
-    "convênio": "Convenio",
-    "ds categoria": "Categoria",
-    "cód item tuss": "CodigoTUSS",
-    "cod item tuss": "CodigoTUSS",
-    "ds procedimento": "Procedimento",
-    "via unid med": "Via",
-    "nm medico executor": "MedicoExecutor",
-    "médico executor": "MedicoExecutor",
-    "porcentagem": "Porcentagem",
-    "ds funcao": "Funcao",
-    "ds especialidade": "Especialidade",
-    "qt procedimento": "QtProcedimento",
-    "dt procedimento": "Data",
-    "vl liberado": "ValorLiberado",
-    "valor liberado": "ValorLiberado"
-}
-
-# Conjunto de todas as colunas canônicas do REPASSE (derivado automaticamente do mapa)
-# Usado para garantir que todas as colunas estejam presentes após o processamento
-_COLUNAS_CANONICAS_REPASSE = set(_MAP_REPASSE.values())
-
-# =============================================================================
-# FUNÇÕES AUXILIARES PRIVADAS
+# CONFIGURAÇÃO DO LLM
 # =============================================================================
 
-def _normalizar_coluna(col: str) -> str:
-    return re.sub(r"\s+", " ", col.strip()).lower()
+_PRECARGA_CREWAI_LOCK = threading.Lock()
+_precarga_crewai: threading.Thread | None = None
 
 
-def _renomear_colunas(df: pd.DataFrame, mapa: dict) -> pd.DataFrame:
-    novo = {
-        col: mapa[_normalizar_coluna(col)]
-        for col in df.columns
-        if _normalizar_coluna(col) in mapa
-    }
-    return df.rename(columns=novo)
-
-
-def _detectar_formato_producao(df: pd.DataFrame, nome_aba: str = "") -> str:
-    """
-    Detecta o formato da planilha baseado nas colunas e nome da aba.
-    Retorna: '2025_LEGADO' (JAN-ABR 2025), '2025_NOVO' (MAI+ 2025), '2026'
-    """
-    colunas_norm = [_normalizar_coluna(col) for col in df.columns]
-    aba_upper = nome_aba.upper()
-    
-    # Formato 2025 LEGADO: tem "EXAME REALIZADO 1" e "EXAME REALIZADO 2"
-    if "exame realizado 1" in colunas_norm or "exame realizado 2" in colunas_norm:
-        return "2025_LEGADO"
-    
-    # Formato 2026: tem coluna QTD no início
-    if "qtd" in colunas_norm:
-        return "2026"
-    
-    # Formato 2025 NOVO (a partir de MAIO): sem QTD, sem EXAME REALIZADO 1/2
-    # Tem apenas "EXAME REALIZADO" e "PROCEDIMENTOS ADICIONAIS"
-    if "exame realizado" in colunas_norm and "procedimentos adicionais" in colunas_norm:
-        return "2025_NOVO"
-    
-    # Fallback: tenta detectar pelo nome da aba
-    if "2025" in aba_upper:
-        # Se é JAN-ABR 2025, provavelmente é legado
-        meses_legado = ["JANEIRO", "FEVEREIRO", "MARÇO", "MARCO", "ABRIL"]
-        if any(mes in aba_upper for mes in meses_legado):
-            return "2025_LEGADO"
-        return "2025_NOVO"
-    
-    return "2026"
+def _importar_crewai() -> None:
+    t0 = time.perf_counter()
+    try:
+        importlib.import_module("crewai")
+        logger.info(f"CrewAI pré-carregado em {time.perf_counter() - t0:.1f}s")
+    except Exception as e:
+        logger.warning(f"Pré-carga do CrewAI falhou (o import será refeito no uso): {e}")
 
 
-def _padronizar_data(valor: str) -> str:
+def precarregar_crewai() -> None:
     """
-    Converte qualquer formato de data reconhecível para DD/MM/AAAA.
-
-    Formatos suportados (em ordem de tentativa):
-      1. Serial numérico do Excel  — ex: 45344  → 22/02/2024
-         Origem: arquivos de REPASSE exportados diretamente do Excel sem
-         formatação de célula, onde a data fica como inteiro (dias desde
-         30/12/1899, conforme convenção do Excel/Lotus).
-         Faixa válida: 40000–50000 (aprox. 2009–2036) para evitar
-         confundir com NrAtendimento ou outros números de 5 dígitos.
-      2. ISO 8601  — ex: 2024-04-24 ou 2024-04-24 00:00:00
-      3. Demais formatos reconhecidos pelo pandas (dayfirst=True)
+    Importa o CrewAI numa thread daemon assim que um modo LLM é escolhido: o
+    import corre enquanto o usuário confere as opções e o clique em executar
+    já encontra o módulo carregado. No modo local nada é importado.
     """
-    if pd.isna(valor):
-        return ""
+    global _precarga_crewai
+    with _PRECARGA_CREWAI_LOCK:
+        if _precarga_crewai is None and "crewai" not in sys.modules:
+            _precarga_crewai = threading.Thread(target=_importar_crewai, name="precarga-crewai", daemon=True)
+            _precarga_crewai.start()
 
-    s = str(valor).strip()
 
-    try:
-        # 1. Serial numérico do Excel (5 dígitos na faixa 40000–50000)
-        if re.match(r'^\d{5}$', s) and 40000 <= int(s) <= 50000:
-            from datetime import date, timedelta
-            dt = date(1899, 12, 30) + timedelta(days=int(s))
-            return dt.strftime("%d/%m/%Y")
-
-        # 2. ISO 8601 (YYYY-MM-DD ou YYYY-MM-DD HH:MM:SS)
-        if re.match(r'^\d{4}-\d{2}-\d{2}', s):
-            dt = pd.to_datetime(s, format='ISO8601')
-            return dt.strftime("%d/%m/%Y")
-
-        # 3. Outros formatos reconhecidos pelo pandas
-        dt = pd.to_datetime(s, dayfirst=True)
-        return dt.strftime("%d/%m/%Y")
-
-    except Exception:
-        return s
+@st.cache_resource
+def get_llm(
+    provider: str,
+    model_name: str,
+    temperature: float,
+    api_key: str,
+    base_url: str = None,
+    stream: bool = False,
+) -> "LLM":
+    from crewai import LLM
 
+    if not api_key:
+        st.error("⚠️ API Key não configurada!")
+        st.stop()
 
-def _corrigir_data_malformada(data: str, aba_origem: str) -> str:
-    """
-    Corrige datas malformadas usando o mês da AbaOrigemDados como referência.
-    Exemplos:
-    - 18/032025 + ABA: MARÇO 2025 → 18/03/2025
-    - 170/2025 + ABA: MAIO 2025 → 17/05/2025
-    - 2706/2025 + ABA: JUNHO 2025 → 27/06/2025
-    """
-    if not data or not aba_origem:
-        return data
+    model_name = model_name.strip()
     
-    # Extrai mês e ano da AbaOrigemDados
-    meses = {
-        "JANEIRO": "01", "FEVEREIRO": "02", "MARÇO": "03", "MARCO": "03",
-        "ABRIL": "04", "MAIO": "05", "JUNHO": "06",
-        "JULHO": "07", "AGOSTO": "08", "SETEMBRO": "09",
-        "OUTUBRO": "10", "NOVEMBRO": "11", "DEZEMBRO": "12"
+    # Mapeamento de prefixos por provider
+    provider_prefixes = {
+        "Google Gemini": "google/",
+        "OpenAI": "openai/",
+        "Anthropic": "anthropic/",
+        "Groq": "groq/",
+        "Ollama": "ollama/",
+        "Azure OpenAI": "azure/",
+        "AWS Bedrock": "bedrock/",
+        "Cohere": "cohere/",
+        "HuggingFace": "huggingface/",
+        "OpenRouter": "openrouter/",
+        "Mistral AI": "mistral/",
+        "Grok (X.AI)": "xai/",
     }
     
-    mes_ref = None
-    ano_ref = None
-    aba_upper = aba_origem.upper()
-    
-    for nome_mes, num_mes in meses.items():
-        if nome_mes in aba_upper:
-            mes_ref = num_mes
-            # Extrai ano (4 dígitos)
-            match_ano = re.search(r'20\d{2}', aba_upper)
-            if match_ano:
-                ano_ref = match_ano.group()
-            break
-    
-    if not mes_ref or not ano_ref:
-        return data
-    
-    # Padrões de datas malformadas
-    data_limpa = data.replace("/", "").replace("-", "").strip()
-    
-    # Padrão: 18032025 (sem separadores)
-    if len(data_limpa) == 8 and data_limpa.isdigit():
-        dia = data_limpa[:2]
-        mes = data_limpa[2:4]
-        ano = data_limpa[4:]
-        if mes == mes_ref:  # Valida se o mês bate
-            return f"{dia}/{mes}/{ano}"
-    
-    # Padrão: 170/2025 (dia com 3 dígitos)
-    if re.match(r'^\d{3}/\d{4}$', data):
-        dia = data[:2]  # Pega os 2 primeiros dígitos
-        ano = data[-4:]
-        return f"{dia}/{mes_ref}/{ano}"
-    
-    # Padrão: 2706/2025 (dia+mes sem separador)
-    if re.match(r'^\d{4}/\d{4}$', data):
-        dia = data[:2]
-        mes = data[2:4]
-        ano = data[-4:]
-        if mes == mes_ref:  # Valida se o mês bate
-            return f"{dia}/{mes}/{ano}"
+    prefix = provider_prefixes.get(provider, "")
     
-    # Padrão: 17/042025 (ano sem separador)
-    if re.match(r'^\d{2}/\d{6}$', data):
-        dia = data[:2]
-        mes = data[3:5]
-        ano = data[5:]
-        if mes == mes_ref:  # Valida se o mês bate
-            return f"{dia}/{mes}/{ano}"
+    # Adiciona prefixo se não existir
+    if prefix and not model_name.startswith(prefix):
+        model_name = f"{prefix}{model_name}"
     
-    return data
-
-
-def _padronizar_valor(valor: str) -> str:
-    """Remove R$, espaços e normaliza separadores decimais."""
-    s = str(valor).strip() if valor else ""
-    if not s:
-        return ""
-    s = re.sub(r"[R$\s]", "", s)
-    if re.search(r"\d\.\d{3},", s):      # 1.234,56 → 1234.56
-        s = s.replace(".", "").replace(",", ".")
-    else:
-        s = s.replace(",", ".")           # 664,61 → 664.61
-    return re.sub(r"[,.]$", "", s)
-
+    try:
+        llm_params = {
+            "model": model_name,
+            "api_key": api_key,
+            "temperature": temperature
+        }
+        # Em stream o LLM emite LLMStreamChunkEvent a cada pedaço (ver ReceptorTokensStream)
+        if stream:
+            llm_params["stream"] = True
+        
+        # Adiciona base_url se fornecido (para Ollama, Azure, etc)
+        if base_url and base_url.strip():
+            llm_params["base_url"] = base_url.strip()
+        
+        return LLM(**llm_params)
+    except Exception as e:
+        st.error(f"Erro ao inicializar o modelo '{model_name}': {e}")
+        st.info(f"Verifique se o nome do modelo e a API Key estão corretos para {provider}")
+        st.stop()
 
-def _identificar_tipo_arquivo(nome_aba: str, nome_arquivo: str = "") -> str:
-    """
-    Retorna 'REPASSE' ou 'PRODUCAO'.
-    Prioridade: nome_aba → nome_arquivo → fallback PRODUCAO.
-    """
-    if "REPASSE" in nome_aba.upper():
-        return "REPASSE"
-    if "REPASSE" in nome_arquivo.upper():
-        return "REPASSE"
-    return "PRODUCAO"
 
+# =============================================================================
+# CACHE DE RESPOSTAS DO LLM
+# =============================================================================
+# Reexecutar o Analista ou o Correlacionador sobre o mesmo arquivo, com a mesma
+# configuração, devolve a resposta gravada em disco em vez de gastar tokens de
+# novo. A chave é o hash do que determina a resposta: descrição renderizada das
+# tasks, configuração do agente (role/goal/backstory/templates), modelo e
+# temperatura. Entradas menos acessadas recentemente são descartadas quando o
+# arquivo passa de LLM_CACHE_MAX_MB.
 
-def _detectar_tipo_por_cabecalho(linhas: list[str]) -> str:
-    """
-    Detecta o tipo (PRODUCAO ou REPASSE) inspecionando as primeiras linhas.
-    Usa colunas exclusivas do REPASSE como indicadores.
-    """
-    _COLS_REPASSE = {
-        "ds estabelecimento", "ds terceiro", "nr repasse terceiro",
-        "ds procedimento", "nm medico executor", "dt procedimento",
-        "vl liberado", "cód item tuss", "ds categoria",
-    }
-    for linha in linhas[:3]:
-        cols = {c.strip().lower() for c in linha.split(",")}
-        if cols & _COLS_REPASSE:
-            return "REPASSE"
-    return "PRODUCAO"
+_LLM_CACHE_PATH   = Path(os.getenv("LLM_CACHE_PATH", str(_TUSS_DIR / "llm_respostas_cache.sqlite")))
+_LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+_LLM_CACHE_VERSAO = 1  # incrementar ao mudar o formato da chave ou da resposta gravada
 
 
-def _linha_e_valida(linha: str) -> bool:
+def chave_cache_crew(crew: "Crew", cfg: dict) -> str:
     """
-    Descarta:
-    - linhas em branco ou só vírgulas/espaços
-    - linhas com apenas 1 valor não vazio (ex: "429,,,,,,,,,,,")
-    - linha de título informativo ("CONTROLE DE EXAMES...")
-    - linha com colunas todas 'Unnamed: N'
+    Chave de conteúdo de uma Crew já montada. Deve ser calculada na thread
+    principal (cfg vem do session_state). Provedor e endpoint entram na chave:
+    o mesmo nome de modelo em dois servidores (Ollama, APIs compatíveis com
+    OpenAI) não compartilha respostas.
     """
-    s = linha.strip()
-    if not s or re.match(r"^[,\s]*$", s):
-        return False
-    nao_vazios = [p.strip() for p in s.split(",") if p.strip()]
-    if len(nao_vazios) <= 1:
-        return False
-    if _RE_LINHA_INFORMATIVA.search(s):
-        return False
-    if all(re.match(r"^unnamed\s*:\s*\d+$", v, re.I) for v in nao_vazios):
-        return False
-    
-    return True
+    modelos = []
+    for agente in crew.agents:
+        llm = agente.llm
+        modelos.append({
+            "provedor": getattr(llm, "provider", None),
+            "endpoint": getattr(llm, "base_url", None) or getattr(llm, "api_base", None),
+            "modelo": getattr(llm, "model", str(llm)),
+            "temperatura": getattr(llm, "temperature", None),
+        })
+    payload = json.dumps(
+        {
+            "versao": _LLM_CACHE_VERSAO,
+            "tasks": [[t.description, t.expected_output] for t in crew.tasks],
+            "cfg": cfg,
+            "llm": modelos,
+        },
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
-def _detectar_cabecalho_producao(linhas: list[str]) -> tuple[str, int]:
+class CacheRespostasLLM:
     """
-    Inspeciona as primeiras linhas válidas e retorna:
-      ("COM_QTD", idx)   — cabeçalho explícito com a coluna QTD
-      ("SEM_QTD", idx)   — cabeçalho explícito sem QTD (formato 2025)
-      ("SEM_HEADER", 0)  — sem cabeçalho; dados começam na linha 0
-
-    idx = índice em `linhas` onde está o cabeçalho (ou 0 se não houver).
+    Cache persistente (SQLite) de respostas do LLM com descarte LRU por tamanho.
+    Seguro para uso a partir das threads de execução concorrente: cada operação
+    abre sua própria conexão e as escritas são serializadas por um lock.
     """
-    for idx, linha in enumerate(linhas[:5]):
-        upper = linha.upper()
-        campos = [c.strip() for c in linha.split(",")]
 
-        # Cabeçalho 2026 com QTD
-        if "QTD" in campos[0].upper() and "DATA" in upper:
-            return "COM_QTD", idx
+    def __init__(self, caminho: Path, max_bytes: int):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Métricas do processo (desde o início do servidor)
+        self.hits = 0
+        self.misses = 0
+        self.tokens_economizados = 0
+        with self._conectar() as con:
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave         TEXT PRIMARY KEY,
+                    resposta      TEXT NOT NULL,
+                    tamanho       INTEGER NOT NULL,
+                    tokens        INTEGER NOT NULL DEFAULT 0,
+                    criado_em     REAL NOT NULL,
+                    ultimo_acesso REAL NOT NULL,
+                    acessos       INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON respostas (ultimo_acesso)")
+
+    def _conectar(self) -> sqlite3.Connection:
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(self.caminho, timeout=30)
+
+    def obter(self, chave: str) -> str | None:
+        with self._lock, self._conectar() as con:
+            linha = con.execute(
+                "SELECT resposta, tokens FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                self.misses += 1
+                return None
+            con.execute(
+                "UPDATE respostas SET ultimo_acesso = ?, acessos = acessos + 1 WHERE chave = ?",
+                (time.time(), chave),
+            )
+            self.hits += 1
+            self.tokens_economizados += linha[1]
+            return linha[0]
+
+    def gravar(self, chave: str, resposta: str, tokens: int = 0) -> None:
+        tamanho = len(resposta.encode("utf-8"))
+        if tamanho > self.max_bytes:
+            return
+        agora = time.time()
+        with self._lock, self._conectar() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO respostas "
+                "(chave, resposta, tamanho, tokens, criado_em, ultimo_acesso, acessos) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (chave, resposta, tamanho, tokens, agora, agora),
+            )
+            self._descartar_excedente(con)
+
+    def remover(self, chave: str) -> None:
+        with self._lock, self._conectar() as con:
+            con.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+
+    def _descartar_excedente(self, con: sqlite3.Connection) -> None:
+        total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removidas = 0
+        for chave, tamanho in con.execute(
+            "SELECT chave, tamanho FROM respostas ORDER BY ultimo_acesso"
+        ).fetchall():
+            con.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            total -= tamanho
+            removidas += 1
+            if total <= self.max_bytes:
+                break
+        logger.info(f"Cache LLM: {removidas} resposta(s) antiga(s) descartada(s) (limite {self.max_bytes} bytes)")
+
+    def limpar(self) -> None:
+        with self._lock, self._conectar() as con:
+            con.execute("DELETE FROM respostas")
+        self.hits = self.misses = self.tokens_economizados = 0
+
+    def estatisticas(self) -> dict:
+        with self._conectar() as con:
+            entradas, tamanho, acessos = con.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COALESCE(SUM(acessos), 0) FROM respostas"
+            ).fetchone()
+        return {
+            "entradas": entradas,
+            "tamanho_bytes": tamanho,
+            "acessos_totais": acessos,
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_economizados": self.tokens_economizados,
+        }
 
-        # Cabeçalho 2025 sem QTD — começa com DATA
-        if campos[0].strip().upper() in ("DATA",) and "NOME DO PACIENTE" in upper:
-            return "SEM_QTD", idx
 
-    return "SEM_HEADER", 0
+@st.cache_resource
+def obter_cache_llm() -> CacheRespostasLLM | None:
+    """Instância única por processo; cai para /tmp se o diretório do app não for gravável."""
+    max_bytes = int(_LLM_CACHE_MAX_MB * 1024 * 1024)
+    for caminho in (_LLM_CACHE_PATH, Path("/tmp/endoscopia_cache") / _LLM_CACHE_PATH.name):
+        try:
+            return CacheRespostasLLM(caminho, max_bytes)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Cache LLM indisponível em {caminho}: {e}")
+    return None
 
 
-def _atribuir_colunas(df: pd.DataFrame, formato: str, nome_aba: str = "") -> pd.DataFrame:
+def kickoff_com_cache(crew: "Crew", chave: str | None, cache: CacheRespostasLLM | None) -> str:
     """
-    Atribui cabeçalho canônico a DataFrames sem cabeçalho explícito.
+    Crew.kickoff() passando pelo cache de respostas. Com chave/cache None a
+    Crew é executada normalmente. Respostas vazias não são gravadas.
     """
-    n = len(df.columns)
-    
-    # Detecta qual base usar baseado no número de colunas e nome da aba
-    if n == 12:
-        # 12 colunas = formato 2025 NOVO (MAIO+ 2025)
-        base = _COLUNAS_2025_NOVO
-    elif n == 13:
-        # 13 colunas: pode ser COM_QTD (2026) ou SEM_QTD (2025 LEGADO)
-        # Verifica se primeira coluna parece QTD
-        amostra = df.iloc[:, 0].dropna().head(5).tolist()
-        primeiro_parece_qtd = all(
-            re.match(r"^\d*$", str(v).strip()) for v in amostra if str(v).strip()
-        )
-        base = _COLUNAS_COM_QTD if primeiro_parece_qtd else _COLUNAS_SEM_QTD
-    else:
-        # Fallback: tenta detectar pelo nome da aba
-        if "2025" in nome_aba.upper():
-            meses_legado = ["JANEIRO", "FEVEREIRO", "MARÇO", "MARCO", "ABRIL"]
-            if any(mes in nome_aba.upper() for mes in meses_legado):
-                base = _COLUNAS_SEM_QTD
-            else:
-                base = _COLUNAS_2025_NOVO
-        else:
-            base = _COLUNAS_COM_QTD
-
-    df.columns = (base + [f"Extra_{k}" for k in range(n - len(base))])[:n] if n <= len(base) else \
-                 base + [f"Extra_{k}" for k in range(n - len(base))]
-    return df
+    if cache is not None and chave is not None:
+        try:
+            resposta = cache.obter(chave)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache LLM: falha na leitura, executando sem cache: {e}")
+            resposta = None
+        if resposta is not None:
+            logger.info(f"Cache LLM: resposta reaproveitada ({chave[:12]}) — kickoff não executado")
+            return resposta
+
+    resultado = crew.kickoff()
+    resposta = str(resultado)
+
+    if cache is not None and chave is not None and resposta.strip():
+        uso = getattr(resultado, "token_usage", None)
+        tokens = int(getattr(uso, "total_tokens", 0) or 0)
+        try:
+            cache.gravar(chave, resposta, tokens)
+            logger.info(f"Cache LLM: resposta gravada ({chave[:12]}, {tokens} tokens)")
+        except sqlite3.Error as e:
+            logger.warning(f"Cache LLM: falha ao gravar resposta: {e}")
+    return resposta
+
+
+def render_metricas_cache_llm(cache: CacheRespostasLLM, chave_ui: str) -> None:
+    """Métricas do cache de respostas do LLM + botão para esvaziá-lo."""
+    est = cache.estatisticas()
+    consultas = est["hits"] + est["misses"]
+    taxa = f"{est['hits'] / consultas:.0%}" if consultas else "—"
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("♻️ Hits", est["hits"])
+    c2.metric("🆕 Misses", est["misses"])
+    c3.metric("🎯 Taxa de acerto", taxa)
+    c4.metric("🪙 Tokens economizados", f"{est['tokens_economizados']:,}".replace(",", "."))
+    c5.metric("🗄️ Respostas em disco", est["entradas"])
+    st.caption(
+        f"Arquivo: `{cache.caminho.name}` — {est['tamanho_bytes'] / 1024 / 1024:.2f} MB "
+        f"de {cache.max_bytes / 1024 / 1024:.0f} MB · {est['acessos_totais']} reaproveitamento(s) acumulado(s). "
+        "Hits/misses contam desde o início do servidor."
+    )
+    if st.button("🗑️ Limpar cache de respostas", key=f"limpar_cache_llm_{chave_ui}"):
+        cache.limpar()
+        st.rerun()
 
 
 # =============================================================================
-# PROCESSADORES POR TIPO
+# CRIAÇÃO DOS AGENTES  ← usam session_state quando disponível
 # =============================================================================
 
-def _processar_aba_producao(df: pd.DataFrame, nome_aba: str) -> pd.DataFrame:
-    """
-    Normaliza um DataFrame de PRODUCAO:
-    - Detecta formato (2025_LEGADO, 2025_NOVO, 2026)
-    - Renomeia colunas pelo mapa apropriado
-    - Garante QTD (0 se ausente), Data, Paciente, Procedimento
-    - Gera linhas extras para 'Procedimento2' (EXAME REALIZADO 2 das abas 2025 LEGADO)
-    - Adiciona TipoArquivo = 'PRODUCAO' e AbaOrigemDados
-    - Descarta linhas sem Paciente válido
-    """
-    # Detecta formato baseado nas colunas e nome da aba
-    formato = _detectar_formato_producao(df, nome_aba)
-    
-    # Seleciona mapa apropriado
-    if formato == "2025_LEGADO":
-        mapa = _MAP_PRODUCAO
-    elif formato == "2025_NOVO":
-        mapa = _MAP_PRODUCAO_2025_NOVO
-    else:  # 2026
-        mapa = _MAP_PRODUCAO_2026
-    
-    # CORREÇÃO: Remove primeira coluna se for Unnamed e formato não é 2026
-    # Isso acontece quando pandas lê cabeçalho sem QTD mas dados têm coluna extra
-    if formato != "2026" and len(df.columns) > 0:
-        primeira_col = str(df.columns[0]).lower()
-        if "unnamed" in primeira_col or primeira_col.strip() in ("", "nan"):
-            df = df.iloc[:, 1:]  # Remove primeira coluna
-    
-    df = _renomear_colunas(df, mapa)
-    
-    # CORREÇÃO: Limpa valores "Unnamed: N" dos dados (problema do Excel)
-    for col in df.columns:
-        df[col] = df[col].apply(
-            lambda v: "" if str(v).strip().upper().startswith("UNNAMED:") else v
-        )
-
-    for col in ("QTD", "Data", "Paciente", "Procedimento", "Procedimento2",
-                "Convenio", "Origem", "NrAtendimento", "MedicoExecutor",
-                "LocalSetor", "Sala", "Carater", "Observacao",
-                "ProcedimentosAdicionais"):
-        if col not in df.columns:
-            df[col] = ""
-
-    # Normaliza QTD
-    df["QTD"] = df["QTD"].apply(
-        lambda v: "0" if str(v).strip() in ("", "nan", "NaN") else str(v).strip()
-    )
+def create_agents(llm, verbose_mode: bool = False) -> list:
+    from crewai import Agent
 
-    # Primeiro aplica padronização básica
-    df["Data"] = df["Data"].apply(_padronizar_data)
-    
-    # Depois corrige datas malformadas usando AbaOrigemDados
-    df["Data"] = df.apply(
-        lambda row: _corrigir_data_malformada(row["Data"], nome_aba),
-        axis=1
-    )
-    
-    # Tenta padronizar novamente após correção
-    df["Data"] = df["Data"].apply(_padronizar_data)
-    
-    df["Paciente"]     = df["Paciente"].apply(
-        lambda v: re.sub(r"\s+", " ", str(v).strip()).upper()
-    )
-    df["Procedimento"] = df["Procedimento"].apply(
-        lambda v: str(v).strip().upper() if str(v).strip() not in ("", "-", "nan") else ""
+    cfg = _get_analista_cfg()
+    multiendoscopia_analista = Agent(
+        role=cfg["role"],
+        goal=cfg["goal"],
+        backstory=cfg["backstory"],
+        llm=llm,
+        verbose=verbose_mode,
+        allow_delegation=False,
     )
+    return [multiendoscopia_analista]
 
-    linhas_saida = []
-    for _, row in df.iterrows():
-        paciente = str(row.get("Paciente", "")).strip()
-        # Descarta linhas de formatação sem paciente real
-        if not paciente or paciente in ("NAN", ""):
-            continue
-
-        linha_principal = row.copy()
-        linha_principal["TipoArquivo"]    = "PRODUCAO"
-        linha_principal["AbaOrigemDados"] = f"ABA: {nome_aba}"
-        linhas_saida.append(linha_principal)
-
-        # Trata Procedimento2 (EXAME REALIZADO 2 das abas 2025 LEGADO) como linha extra
-        proc2 = str(row.get("Procedimento2", "")).strip().upper()
-        if proc2 and proc2 not in ("", "-", "NAN", "NONE"):
-            extra = row.copy()
-            extra["Procedimento"]    = proc2
-            extra["Procedimento2"]   = ""
-            extra["Observacao"]      = "PROCEDIMENTO_ADICIONAL"
-            extra["TipoArquivo"]     = "PRODUCAO"
-            extra["AbaOrigemDados"]  = f"ABA: {nome_aba}"
-            extra["QTD"]             = "0"
-            linhas_saida.append(extra)
-
-    df_saida = pd.DataFrame(linhas_saida)
-    df_saida.drop(columns=["Procedimento2"], inplace=True, errors="ignore")
-    # Remove colunas lixo: Extra_N e duplicatas pandas (sufixo .1, .2, ...)
-    lixo = [c for c in df_saida.columns
-            if re.match(r"^Extra_\d+$", str(c)) or re.search(r"\.\d+$", str(c))]
-    df_saida.drop(columns=lixo, inplace=True, errors="ignore")
-    return df_saida
-
-
-def _processar_aba_repasse(df: pd.DataFrame, nome_aba: str) -> pd.DataFrame:
-    """
-    Normaliza um DataFrame de REPASSE:
-    - Renomeia colunas pelo mapa
-    - Limpa valores "Unnamed: N" gerados pelo pandas ao ler Excel
-    - Garante que TODAS as colunas canonicas do _MAP_REPASSE existam (vazias se ausentes)
-    - Padroniza Data, Paciente e ValorLiberado
-    - Adiciona TipoArquivo = 'REPASSE' e AbaOrigemDados
-    - Remove colunas lixo: Extra_N e duplicatas pandas (sufixo .1, .2, ...)
-    """
-    df = _renomear_colunas(df, _MAP_REPASSE)
-
-    # Limpa valores "Unnamed: N" nos dados (problema do Excel com colunas sem cabecalho)
-    for col in df.columns:
-        df[col] = df[col].apply(
-            lambda v: "" if str(v).strip().upper().startswith("UNNAMED:") else v
-        )
 
-    # Garante TODAS as colunas canonicas do _MAP_REPASSE, nao apenas um subconjunto.
-    # Isso evita que colunas ausentes no arquivo fisico (ex: NrAtendimento) sejam
-    # omitidas do CSV de saida. Derivado automaticamente do mapa - sem listas manuais.
-    for col in _COLUNAS_CANONICAS_REPASSE:
-        if col not in df.columns:
-            df[col] = ""
+def create_correlator_agent(llm, verbose_mode: bool = False, cfg: dict | None = None) -> "Agent":
+    from crewai import Agent
 
-    df["Data"]          = df["Data"].apply(_padronizar_data)
-    df["Paciente"]      = df["Paciente"].apply(
-        lambda v: re.sub(r"\s+", " ", str(v).strip()).upper()
+    cfg = cfg or _get_correlacionador_cfg()
+    return Agent(
+        role=cfg["role"],
+        goal=cfg["goal"],
+        backstory=cfg["backstory"],
+        llm=llm,
+        verbose=verbose_mode,
+        allow_delegation=False,
     )
-    df["ValorLiberado"] = df["ValorLiberado"].apply(_padronizar_valor)
-    df["TipoArquivo"]   = "REPASSE"
-    df["AbaOrigemDados"] = f"ABA: {nome_aba}"
-
-    # Remove colunas lixo: Extra_N e duplicatas pandas (sufixo .1, .2, ...)
-    # Alinhado com o mesmo tratamento ja feito em _processar_aba_producao
-    lixo = [c for c in df.columns
-            if re.match(r"^Extra_\d+$", str(c)) or re.search(r"\.\d+$", str(c))]
-    df.drop(columns=lixo, inplace=True, errors="ignore")
-    return df
 
 
-# =============================================================================
-# PROCESSAMENTO DE UM BLOCO TEXTO (UMA ABA)
-# =============================================================================
+def create_correlation_task(correlator_agent: "Agent", csvs_por_arquivo: dict) -> "Task":
+    from crewai import Task
 
-def _processar_bloco_texto(
-    dados_aba: str,
-    nome_aba: str,
-    nome_arquivo: str,
-) -> str:
-    """Filtra, detecta formato e processa o texto de uma única aba."""
-
-    # FIX defensivo: colapsa \n internos em campos entre aspas (origem: CSV/TXT)
-    dados_aba = re.sub(
-        r'"([^"]*)"',
-        lambda m: '"' + m.group(1).replace('\n', ' ').replace('\r', '') + '"',
-        dados_aba,
+    cfg = _get_correlacionador_cfg()
+    blocos = "\n\n".join(
+        f"=== ARQUIVO: {fname} ===\n{csv_text}"
+        for fname, csv_text in csvs_por_arquivo.items()
+    )
+    description = cfg["task_description_template"].replace("{blocos}", blocos)
+    return Task(
+        description=description,
+        expected_output=cfg["task_expected_output"],
+        agent=correlator_agent,
     )
-    # ── 1. Filtrar linhas inválidas ──────────────────────────────────────────
-    linhas_validas = [l for l in dados_aba.splitlines() if _linha_e_valida(l)]
-    if not linhas_validas:
-        return ""
-
-    tipo = _identificar_tipo_arquivo(nome_aba, nome_arquivo)
-    if tipo == "PRODUCAO":
-        tipo = _detectar_tipo_por_cabecalho(linhas_validas)
-
-    # ── 2. REPASSE — cabeçalho sempre explícito ──────────────────────────────
-    if tipo == "REPASSE":
-        try:
-            df = pd.read_csv(io.StringIO("\n".join(linhas_validas)), dtype=str)
-            df.fillna("", inplace=True)
-            df_proc = _processar_aba_repasse(df, nome_aba)
-            return df_proc.to_csv(index=False, encoding="utf-8")
-        except Exception as exc:
-            logger.warning(f"Erro REPASSE '{nome_aba}': {exc}")
-            return ""
-
-    # ── 3. PRODUCAO — detecta formato ────────────────────────────────────────
-    formato, idx_hdr = _detectar_cabecalho_producao(linhas_validas)
-
-    if formato in ("COM_QTD", "SEM_QTD"):
-        # Cabeçalho explícito na linha idx_hdr; descarta linhas anteriores
-        linhas_csv = linhas_validas[idx_hdr:]
-        try:
-            df = pd.read_csv(io.StringIO("\n".join(linhas_csv)), dtype=str)
-            df.fillna("", inplace=True)
-        except Exception as exc:
-            logger.warning(f"Erro PRODUCAO com header '{nome_aba}': {exc}")
-            return ""
-    else:
-        # SEM_HEADER: nenhum cabeçalho encontrado → aplica cabeçalho canônico
-        try:
-            df = pd.read_csv(
-                io.StringIO("\n".join(linhas_validas)),
-                header=None, dtype=str,
-            )
-            df.fillna("", inplace=True)
-            df = _atribuir_colunas(df, formato, nome_aba)
-        except Exception as exc:
-            logger.warning(f"Erro PRODUCAO sem header '{nome_aba}': {exc}")
-            return ""
-
-    df_proc = _processar_aba_producao(df, nome_aba)
-    return df_proc.to_csv(index=False, encoding="utf-8")
-
-
-def _consolidar_blocos(blocos_csv: list[str]) -> str:
-    """Une múltiplos CSVs em um único, com cabeçalho único na primeira linha."""
-    dfs = []
-    for bloco in blocos_csv:
-        bloco = bloco.strip()
-        if not bloco:
-            continue
-        try:
-            df = pd.read_csv(io.StringIO(bloco), dtype=str)
-            df.fillna("", inplace=True)
-            dfs.append(df)
-        except Exception:
-            pass
-    if not dfs:
-        return ""
-    df_final = pd.concat(dfs, ignore_index=True, sort=False)
-    df_final.fillna("", inplace=True)
-    return df_final.to_csv(index=False, encoding="utf-8")
 
 
 # =============================================================================
-# FUNÇÃO PÚBLICA PRINCIPAL
+# CACHE DE RESULTADOS DA SESSÃO
 # =============================================================================
-
-def transformar_csv_arquivo(
-    conteudo_texto: str,
-    nome_arquivo: str = "",
-    desmembrar_procedimentos_adicionais: bool = False,
-) -> str:
-    """
-    Transforma o conteúdo extraído de um arquivo de endoscopia (PRODUCAO ou REPASSE)
-    em um CSV padronizado puro, sem linhas vazias ou texto explicativo.
-
-    Regras aplicadas:
-    - Remove linhas completamente vazias, com só vírgulas (ex: "429,,,,,,,,,,,,")
-      ou com apenas um valor não vazio
-    - Remove linhas informativas de título ("CONTROLE DE EXAMES E PROCEDIMENTOS
-      NA ENDOSCOPIA / MÊS ANO,Unnamed: 1,Unnamed: 2,...")
-    - Extrai o nome da aba do marcador "=== ABA: <nome> ===" e insere na coluna
-      AbaOrigemDados (ex: "ABA: JANEIRO 2026")
-    - Primeira linha do CSV = cabeçalho obrigatório
-    - Data padronizada para DD/MM/AAAA
-    - Paciente em MAIÚSCULAS sem espaços extras
-    - TipoArquivo = 'PRODUCAO' ou 'REPASSE' (identificado pelo nome da aba/arquivo)
-    - Coluna QTD incluída; preenchida com "0" quando ausente na aba de origem
-    - Abas com formato legado 2025 (EXAME REALIZADO 1 / EXAME REALIZADO 2) têm
-      "EXAME REALIZADO 2" tratado como linha extra de procedimento
-    - Todas as colunas canônicas do _MAP_REPASSE são sempre incluídas no CSV de REPASSE,
-      mesmo que o arquivo físico não as contenha (ficam vazias)
-
-    Args:
-        conteudo_texto:   Texto extraído por extract_text_from_file.
-                          Para Excel: contém blocos "=== ABA: <nome> ===" separando abas.
-        nome_arquivo:     Nome original do arquivo (fallback para identificar tipo).
-        desmembrar_procedimentos_adicionais:
-                          Se True E TipoArquivo for PRODUCAO, chama
-                          desmembrar_procedimentos_adicionais_csv_arquivo antes de retornar.
-
-    Returns:
-        CSV puro (str) com cabeçalho na primeira linha, ou "" em caso de falha total.
-    """
-    blocos_csv: list[str] = []
-
-    # Divide por marcadores de aba (formato gerado por read_excel_file)
-    partes = re.split(r"(===\s*ABA:\s*.+?===)", conteudo_texto)
-
-    if len(partes) > 1:
-        it = iter(partes[1:])
-        for marcador, dados_aba in zip(it, it):
-            nome_aba = re.sub(r"===\s*ABA:\s*|===", "", marcador).strip()
-            dados_aba = dados_aba.strip()
-            if not dados_aba:
-                continue
-            try:
-                bloco = _processar_bloco_texto(dados_aba, nome_aba, nome_arquivo)
-                if bloco:
-                    blocos_csv.append(bloco)
-            except Exception as exc:
-                logger.warning(f"Falha ao processar aba '{nome_aba}': {exc}")
+# Resultados derivados (tabela estilizada, CSV de download, itens de cobrança,
+# abas extraídas dos uploads) ficam num LRU por sessão, chaveado pelo digest
+# blake2b do conteúdo completo — dois resultados diferentes nunca compartilham
+# entrada, e o mesmo conteúdo reaproveita o que já foi calculado. O tamanho é
+# limitado por sessão (entradas e bytes estimados); o menos usado sai primeiro.
+
+_SESSAO_CACHE_MAX_ITENS = int(os.getenv("SESSAO_CACHE_MAX_ITENS", "32"))
+_SESSAO_CACHE_MAX_MB    = float(os.getenv("SESSAO_CACHE_MAX_MB", "256"))
+
+
+def digest_conteudo(dados) -> str:
+    """blake2b (128 bits) do conteúdo completo de bytes, texto ou DataFrame."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(dados, pd.DataFrame):
+        h.update("\x1f".join(map(str, dados.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(dados, index=False).to_numpy().tobytes())
+    elif isinstance(dados, str):
+        h.update(dados.encode("utf-8"))
     else:
-        # Arquivo CSV/TXT simples sem marcador de aba
-        nome_aba = re.sub(r"\.[^.]+$", "", nome_arquivo)
-        try:
-            bloco = _processar_bloco_texto(conteudo_texto.strip(), nome_aba, nome_arquivo)
-            if bloco:
-                blocos_csv.append(bloco)
-        except Exception as exc:
-            logger.error(f"Falha ao processar '{nome_arquivo}': {exc}")
-            return ""
-
-    if not blocos_csv:
-        return ""
-
-    resultado = _consolidar_blocos(blocos_csv)
-
-    # Desmembramento opcional (só PRODUCAO)
-    if desmembrar_procedimentos_adicionais and _identificar_tipo_arquivo(nome_arquivo) == "PRODUCAO":
-        resultado = desmembrar_procedimentos_adicionais_csv_arquivo(resultado)
+        h.update(bytes(dados))
+    return h.hexdigest()
 
-    return resultado
 
+def _tamanho_estimado(valor) -> int:
+    """Bytes aproximados de um valor em cache (DataFrames com memory_usage profundo)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (str, bytes)):
+        return len(valor)
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_tamanho_estimado(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamanho_estimado(v) for v in valor.values())
+    return sys.getsizeof(valor)
 
-# =============================================================================
-# FUNÇÃO PÚBLICA: DESMEMBRAMENTO DE PROCEDIMENTOS ADICIONAIS
-# =============================================================================
 
-def desmembrar_procedimentos_adicionais_csv_arquivo(csv_texto: str) -> str:
+class CacheSessao:
     """
-    Recebe um CSV de PRODUCAO já padronizado e desmembra a coluna
-    'ProcedimentosAdicionais' em linhas extras.
-
-    Regras:
-    - Para cada valor em 'ProcedimentosAdicionais', gera uma LINHA EXTRA com:
-        * Procedimento  = nome do procedimento adicional (MAIÚSCULAS)
-        * Observacao    = "PROCEDIMENTO_ADICIONAL"
-        * QTD           = "0"
-        * demais campos = replicados da linha principal
-    - A linha principal mantém sua Observacao original (vazia ou com valor já existente).
-    - Não altera linhas de REPASSE (TipoArquivo != 'PRODUCAO').
-    - Remove a coluna 'ProcedimentosAdicionais' do CSV final.
-    - Delimitadores suportados: ponto-e-vírgula, '+', quebra de linha.
-      Vírgulas são delimitadoras apenas quando não fazem parte de número decimal.
-
-    Args:
-        csv_texto: CSV puro (string) com cabeçalho na primeira linha.
-
-    Returns:
-        CSV puro (string) com as linhas extras já inseridas e sem
-        a coluna 'ProcedimentosAdicionais'.
+    LRU de resultados derivados de uma sessão. A chave é (namespace, digest,
+    parâmetros); `obter` devolve o valor guardado ou calcula com `criar`.
+    Valores maiores que o limite inteiro de bytes não são guardados.
     """
-    if not csv_texto or not csv_texto.strip():
-        return csv_texto
 
+    def __init__(self, max_itens: int = _SESSAO_CACHE_MAX_ITENS, max_mb: float = _SESSAO_CACHE_MAX_MB):
+        self.max_itens = max_itens
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._itens: OrderedDict[tuple, tuple[object, int]] = OrderedDict()
+        self._bytes = 0
+
+    def obter(self, namespace: str, digest: str, *parametros, criar: Callable[[], object]):
+        chave = (namespace, digest, parametros)
+        if chave in self._itens:
+            self._itens.move_to_end(chave)
+            return self._itens[chave][0]
+        valor = criar()
+        self.guardar(chave, valor)
+        return valor
+
+    def contem(self, namespace: str, digest: str, *parametros) -> bool:
+        return (namespace, digest, parametros) in self._itens
+
+    def guardar(self, chave: tuple, valor) -> None:
+        tamanho = _tamanho_estimado(valor)
+        self._descartar(chave)
+        if tamanho > self.max_bytes:
+            logger.info(f"Cache da sessão: {chave[0]} com {tamanho / 1e6:.1f} MB excede o limite — não guardado")
+            return
+        self._itens[chave] = (valor, tamanho)
+        self._bytes += tamanho
+        while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+            _, (_, tamanho_antigo) = self._itens.popitem(last=False)
+            self._bytes -= tamanho_antigo
+
+    def remover(self, namespace: str | None = None) -> None:
+        """Remove as entradas de um namespace (ou todas)."""
+        for chave in [c for c in self._itens if namespace is None or c[0] == namespace]:
+            self._descartar(chave)
+
+    def _descartar(self, chave: tuple) -> None:
+        item = self._itens.pop(chave, None)
+        if item is not None:
+            self._bytes -= item[1]
+
+    def resumo(self) -> dict:
+        """{namespace: (entradas, bytes)} — para diagnóstico na interface."""
+        resumo: dict[str, tuple[int, int]] = {}
+        for (namespace, *_), (_, tamanho) in self._itens.items():
+            n, b = resumo.get(namespace, (0, 0))
+            resumo[namespace] = (n + 1, b + tamanho)
+        return resumo
+
+
+def cache_sessao() -> CacheSessao:
+    """Cache de resultados da sessão atual (criado no primeiro uso)."""
+    if "_cache_sessao" not in st.session_state:
+        st.session_state["_cache_sessao"] = CacheSessao()
+    return st.session_state["_cache_sessao"]
+
+
+def _rss_processo_bytes() -> int | None:
+    """RSS atual do processo (Linux, /proc); None quando indisponível."""
     try:
-        df = pd.read_csv(io.StringIO(csv_texto.strip()), dtype=str)
-        df.fillna("", inplace=True)
-    except Exception as exc:
-        logger.warning(f"desmembrar_procedimentos_adicionais_csv_arquivo: erro ao ler CSV: {exc}")
-        return csv_texto
-
-    if "ProcedimentosAdicionais" not in df.columns:
-        return csv_texto
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
 
-    linhas_saida = []
-    for _, row in df.iterrows():
-        linhas_saida.append(row.copy())
 
-        # Só desmembra linhas de PRODUCAO
-        if str(row.get("TipoArquivo", "")).strip().upper() != "PRODUCAO":
+def relatorio_memoria_sessao() -> pd.DataFrame:
+    """
+    Bytes estimados de cada chave do session_state, do maior para o menor.
+    Entradas de cache_sessao() aparecem por namespace; chaves abaixo de 64 KB
+    são somadas em "(outras chaves)".
+    """
+    linhas: list[tuple[str, str, int]] = []
+    pequenas = 0
+    for chave, valor in st.session_state.items():
+        # Por nome: cada rerun redefine a classe CacheSessao do script
+        if type(valor).__name__ == "CacheSessao":
+            for namespace, (n, tamanho) in valor.resumo().items():
+                linhas.append((f"cache_sessao · {namespace}", f"{n} entrada(s)", tamanho))
             continue
-
-        proc_adicionais = str(row.get("ProcedimentosAdicionais", "")).strip()
-        if proc_adicionais.upper() in ("", "NAN", "NONE", "NAN", "-"):
+        tamanho = _tamanho_estimado(valor)
+        if tamanho < 64 * 1024:
+            pequenas += tamanho
             continue
-
-        # Delimitadores: ; | + | quebra de linha
-        # Vírgula apenas quando não separa dígitos (evita quebrar "1,234")
-        separados = re.split(r"[;+\n\r]+|(?<!\d),(?!\d)", proc_adicionais)
-
-        for proc in separados:
-            proc = proc.strip().upper()
-            if not proc or proc in ("-", ""):
-                continue
-            extra = row.copy()
-            extra["Procedimento"]            = proc
-            extra["ProcedimentosAdicionais"] = ""
-            extra["Observacao"]              = "PROCEDIMENTO_ADICIONAL"
-            extra["QTD"]                     = "0"
-            linhas_saida.append(extra)
-
-    df_saida = pd.DataFrame(linhas_saida)
-    df_saida.drop(columns=["ProcedimentosAdicionais"], inplace=True, errors="ignore")
-    df_saida.fillna("", inplace=True)
-    return df_saida.to_csv(index=False, encoding="utf-8")
-
-###############################################################################
+        descricao = type(valor).__name__
+        if isinstance(valor, pd.DataFrame):
+            descricao = f"DataFrame {valor.shape[0]:,}×{valor.shape[1]}"
+        elif isinstance(valor, dict):
+            descricao = f"dict ({len(valor)} itens)"
+        linhas.append((str(chave), descricao, tamanho))
+    linhas.append(("(outras chaves)", "", pequenas))
+    df = pd.DataFrame(linhas, columns=["Chave", "Tipo", "Bytes"]).sort_values("Bytes", ascending=False)
+    df["MB"] = (df["Bytes"] / 1024 / 1024).round(2)
+    return df.drop(columns="Bytes").reset_index(drop=True)
 
 
 # =============================================================================
-# FUNÇÕES DE CORRELAÇÃO LOCAL
+# UTILITÁRIOS DE CSV
 # =============================================================================
 
-from datetime import datetime, timedelta
-from difflib import SequenceMatcher
-from typing import Dict, List, Tuple, Optional
-
-# Dicionário de sinônimos e variações de procedimentos
-SINONIMOS_PROCEDIMENTOS = {
-    # Colonoscopia e variações
-    "COLONO": ["COLONOSCOPIA", "COLONOSCOPIA INCLUI", "RETOSSIGMOIDOSCOPIA"],
-    "COLONOSCOPIA": ["COLONO", "COLONOSCOPIA INCLUI", "RETOSSIGMOIDOSCOPIA"],
-    "COLONOCOPIA": ["COLONO", "COLONOSCOPIA"],  # Typo comum
-    "RETOSSIGMOIDOSCOPIA": ["COLONOSCOPIA", "COLONO"],
-    
-    # Endoscopia Digestiva Alta
-    "ENDOSCOPIA": ["EDA", "ENDOSCOPIA DIGESTIVA ALTA", "ESOFAGOGASTRODUODENOSCOPIA", "ESOFAGO GASTRO DUODENOSCOPIA"],
-    "EDA": ["ENDOSCOPIA", "ENDOSCOPIA DIGESTIVA ALTA", "ESOFAGOGASTRODUODENOSCOPIA"],
-    "ENDOCOSPIA": ["ENDOSCOPIA"],  # Typo
-    "ENDDOSCOPIA": ["ENDOSCOPIA"],  # Typo
-    "ESOFAGOGASTRODUODENOSCOPIA": ["ENDOSCOPIA", "EDA"],
-    "ESOFAGO GASTRO DUODENOSCOPIA": ["ENDOSCOPIA", "EDA"],
-    
-    # Ecoendoscopia
-    "ECOENDOSCOPIA": ["ECOEDA", "ULTRASSOM ENDOSCOPICO"],
-    "ECOEDA": ["ECOENDOSCOPIA", "ULTRASSOM ENDOSCOPICO"],
-    
-    # Teste de Urease / H. Pylori
-    "TESTE": ["PESQUISA", "EXAME"],
-    "UREASE": ["H PYLORI", "HELICOBACTER", "HELICOBACTER PYLORI"],
-    "TESTE DE UREASE": ["PESQUISA H PYLORI", "TESTE UREASE", "UREASE", "H PYLORI", "HELICOBACTER"],
-    "TESTE DA UREASE": ["TESTE DE UREASE", "PESQUISA H PYLORI", "HELICOBACTER"],
-    "HP": ["H PYLORI", "HELICOBACTER"],
-    "HPYLORI": ["H PYLORI", "HELICOBACTER"],
-    "HELICOBACTER": ["H PYLORI", "UREASE", "HP"],
-    "HELICOBACTER PYLORI": ["H PYLORI", "UREASE", "HP"],
-    
-    # Anátomo Patológico / Biópsia / Citologia
-    "ANATOMO": ["BIOPSIA", "CITOLOGIA", "AP"],
-    "ANATOMIA": ["BIOPSIA", "CITOLOGIA", "AP"],
-    "ANATOMIA PATOLOGICA": ["BIOPSIA", "CITOLOGIA", "AP", "ANÁTOMO PATOLÓGICO"],
-    "ANATOMO PATOLOGICA": ["BIOPSIA", "CITOLOGIA", "AP", "ANÁTOMO PATOLÓGICO"],
-    "ANATOMO PATOLOGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANÁTOMO PATOLÓGICO", "ANATOMOPATOLOGICO"],
-    "ANÁTOMO PATOLÓGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANATOMO PATOLOGICO", "ANATOMOPATOLOGICO"],
-    "ANÁTOMO PATLÓGICO": ["ANÁTOMO PATOLÓGICO", "BIOPSIA", "AP"],  # Typo
-    "ANATOMOPATOLOGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANATOMO PATOLOGICO"],
-    "ANÁTOMOPATOLOGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANÁTOMO PATOLÓGICO"],
-    "AP": ["ANATOMO PATOLOGICO", "BIOPSIA", "CITOLOGIA", "ANÁTOMO PATOLÓGICO", "ANATOMOPATOLOGICO"],
-    "BIOPSIA": ["ANATOMO PATOLOGICO", "AP", "CITOLOGIA", "BIOPSIAS"],
-    "BIOPSIAS": ["BIOPSIA", "ANATOMO PATOLOGICO", "AP"],
-    "BIOPSIA SERIADO": ["BIOPSIA", "ANÁTOMO PATOLÓGICO", "AP"],
-    "CITOLOGIA": ["BIOPSIA", "ANATOMO PATOLOGICO", "AP"],
-    
-    # Polipectomia
-    "POLIPECTOMIA": ["POLIPO", "RESSECCAO POLIPO", "RETIRADA POLIPO"],
-    "POLIPO": ["POLIPECTOMIA", "RESSECCAO POLIPO"],
-    "PÓLIPO": ["POLIPECTOMIA", "POLIPO"],
-    "POLIOECTOMIA": ["POLIPECTOMIA"],  # Typo
-    
-    # Hemostasia
-    "HEMOSTASIA": ["HEMOSTASE", "CONTROLE SANGRAMENTO", "HEMOSTASE ENDOSCOPICA"],
-    "HEMOSTASE": ["HEMOSTASIA", "CONTROLE SANGRAMENTO"],
-    
-    # Mucosectomia
-    "MUCOSECTOMIA": ["RESSECCAO MUCOSA", "RESSECCAO ENDOSCOPICA"],
-    
-    # Tatuagem
-    "TATUAGEM": ["MARCACAO", "TATUAGEM ENDOSCOPICA"],
-    
-    # Biópsia Hepática
-    "BIOPSIA HEPATICA": ["BIOPSIA", "HEPATICA"],
-    "HEPATICA": ["BIOPSIA HEPATICA", "FIGADO"],
-    
-    # CPRE / Colangiopancreatografia / Papilotomia
-    "CPRE": ["COLANGIOPANCREATOGRAFIA", "COLANGIOPANCREATOGRAFIA RETROGRADA", "PAPILOTOMIA"],
-    "COLANGIOPANCREATOGRAFIA": ["CPRE", "PAPILOTOMIA", "COLANGIOPANCREATOGRAFIA RETROGRADA"],
-    "COLANGIOPANCREATOGRAFIA RETROGRADA": ["CPRE", "COLANGIOPANCREATOGRAFIA", "PAPILOTOMIA"],
-    "PAPILOTOMIA": ["CPRE", "COLANGIOPANCREATOGRAFIA"],
-    "PAPILOTOMIA ENDOSCOPICA": ["CPRE", "PAPILOTOMIA"],
-    
-    # Dilatação
-    "DILATACAO": ["DILATAÇÃO", "DILATACAO PNEUMATICA"],
-    "DILATAÇÃO": ["DILATACAO", "DILATACAO PNEUMATICA"],
-    
-    # Gastrostomia
-    "GASTROSTOMIA": ["GTT", "GASTROSTOMIA ENDOSCOPICA"],
-    "GASTROSTOMIA ENDOSCOPICA": ["GASTROSTOMIA", "GTT"],
-    "GTT": ["GASTROSTOMIA"],
-    
-    # Passagem de Sonda
-    "SONDA": ["PASSAGEM SONDA", "SONDA NASO ENTERAL", "SONDA NASOENTERAL"],
-    "PASSAGEM DE SONDA": ["SONDA", "SONDA NASO ENTERAL", "PASSAGEM SONDAS"],
-    "PASSAGEM DE SONDAS": ["PASSAGEM DE SONDA", "SONDA"],
-    "SONDA NASO ENTERAL": ["SONDA", "PASSAGEM SONDA"],
-    
-    # Anuscopia / Retoscopia
-    "ANUSCOPIA": ["RETOSCOPIA", "EXAME ANORRETAL"],
-    "RETOSCOPIA": ["ANUSCOPIA"],
-    
-    # Prótese
-    "PROTESE": ["COLOCACAO PROTESE", "IMPLANTE PROTESE"],
-    "PRÓTESE": ["PROTESE", "COLOCACAO PROTESE"],
-    "COLOCACAO DE PROTESE": ["PROTESE", "IMPLANTE PROTESE"],
-    "COLOCACAO PROTESE": ["PROTESE", "COLOCACAO DE PROTESE"],
-    
-    # Visita Hospitalar
-    "VISITA": ["VISITA HOSPITALAR", "VISITA PACIENTE INTERNADO", "HOSPITALAR"],
-    "VISITA HOSPITALAR": ["VISITA", "VISITA PACIENTE INTERNADO", "HOSPITALAR"],
-    "HOSPITALAR": ["VISITA", "VISITA HOSPITALAR"],
-    
-    # Cromoscopia
-    "CROMOSCOPIA": ["CROMOSCOPIA ENDOSCOPICA", "COLORACAO"],
-    
-    # Esôfago
-    "ESOFAGO": ["ESOFAGICO", "ESOFAGICA"],
-    "ESOFAGICO": ["ESOFAGO"],
-    
-    # Cálculo / Coledociano
-    "CALCULO": ["CALCULOSE", "PEDRA"],
-    "COLEDOCIANO": ["COLECOCO", "BILIAR"],
-    
-    # Drenagem
-    "DRENAGEM": ["DRENAGEM BILIAR", "DESCOMPRESSAO"],
-    "DESCOMPRESSAO": ["DRENAGEM"],
-    "DESCOMPRESSAO COLONICA": ["DESCOMPRESSAO", "COLONICA"],
-    "COLONICA": ["COLON", "COLONOSCOPIA"],
-    
-    # Ostomia
-    "OSTOMIA": ["GASTROSTOMIA", "COLOSTOMIA"],
-    "TROCA DE GTT": ["GTT", "GASTROSTOMIA"],
-}
-
-# Pares anatomicamente incompatíveis: EDA (trato alto) ≠ Colonoscopia (trato baixo).
-# Usados para sinalizar matches via SequenceMatcher acidental (ex: ENDOSCOPIA↔COLONOSCOPIA
-# compartilham "OSCOPIA" como substring, gerando sim=0.73 acima do limiar 0.65).
-_PARES_ANATOMICAMENTE_DIVERGENTES: list[frozenset] = [
-    frozenset({"ENDOSCOPIA", "COLONOSCOPIA"}),
-    frozenset({"ENDOSCOPIA", "COLONO"}),
-    frozenset({"ENDOSCOPIA", "RETOSSIGMOIDOSCOPIA"}),
-    frozenset({"EDA", "COLONOSCOPIA"}),
-    frozenset({"EDA", "COLONO"}),
-    frozenset({"EDA", "RETOSSIGMOIDOSCOPIA"}),
+COLUNAS_ESPERADAS = [
+    "Data", "NrAtendProducao", "NrAtendRepasse", "Paciente", "Convenio",
+    "Procedimento", "CodigoTUSS", "MedicoExecutor",
+    "QtProcedimento", "ValorLiberado", "StatusCorrelacao", "Observacao",
 ]
 
-# Palavras-chave de procedimentos companion (Urease/Helicobacter standalone).
-_KEYWORDS_COMPANION_PROC = {"UREASE", "HELICOBACTER"}
-# Palavras-chave de procedimentos principais — excluem uma linha do perfil companion.
-_KEYWORDS_PRINCIPAL_PROC = {
-    "ENDOSCOPIA", "COLONOSCOPIA", "COLONO", "ECOENDOSCOPIA",
-    "GASTROSTOMIA", "MUCOSECTOMIA", "CPRE", "COLANGIOPANCREATOGRAFIA",
-    "PAPILOTOMIA", "BRONCOSCOPIA", "RETOSSIGMOIDOSCOPIA",
-}
-
-
-def _sao_anatomicamente_divergentes(proc1: str, proc2: str) -> bool:
-    """
-    Retorna True quando os dois procedimentos pertencem a grupos anatômicos
-    reconhecidamente distintos (ex: ENDOSCOPIA/EDA vs COLONOSCOPIA/trato baixo).
-    Não bloqueia o match — apenas sinaliza para revisão humana via status.
-    """
-    p1 = _normalizar_procedimento(proc1)
-    p2 = _normalizar_procedimento(proc2)
-    tokens1 = set(p1.split())
-    tokens2 = set(p2.split())
-    for par in _PARES_ANATOMICAMENTE_DIVERGENTES:
-        t1, t2 = tuple(par)
-        if (t1 in tokens1 and t2 in tokens2) or (t2 in tokens1 and t1 in tokens2):
-            return True
-    return False
-
-
-def _e_procedimento_companion(proc: str) -> bool:
-    """
-    Retorna True para procedimentos reconhecidamente acompanhantes/adicionais
-    (ex: Teste de Urease standalone) que na PRODUCAO costumam estar em
-    ProcedimentosAdicionais. Exclui procedimentos compostos que já contêm o
-    exame principal no nome (ex: 'EDA Com Biópsia E Teste De Urease').
-    """
-    p_norm = _normalizar_procedimento(proc)
-    tokens = set(p_norm.split())
-    return bool(tokens & _KEYWORDS_COMPANION_PROC) and not bool(tokens & _KEYWORDS_PRINCIPAL_PROC)
-
-
-def _normalizar_procedimento(proc: str) -> str:
-    """Normaliza nome de procedimento para comparação semântica."""
-    if not proc or str(proc).strip() in ("", "nan", "NaN"):
-        return ""
-    s = str(proc).upper().strip()
-    # Remove acentos
-    s = s.replace('Á', 'A').replace('É', 'E').replace('Í', 'I').replace('Ó', 'O').replace('Ú', 'U')
-    s = s.replace('Â', 'A').replace('Ê', 'E').replace('Ô', 'O')
-    s = s.replace('Ã', 'A').replace('Õ', 'O')
-    s = s.replace('Ç', 'C')
-    s = re.sub(r'[^\w\s]', ' ', s)
-    s = re.sub(r'\s+', ' ', s).strip()
-    # Remove plural (S no final de palavras)
-    s = re.sub(r'\bBIOPSIAS\b', 'BIOPSIA', s)
-    s = re.sub(r'\bPOLIPOS\b', 'POLIPO', s)
-    s = re.sub(r'\bSONDAS\b', 'SONDA', s)
-    # Remove separadores comuns em procedimentos compostos
-    s = re.sub(r'\s*[/+]\s*', ' ', s)  # Remove / e +
-    return s
-
-def _expandir_abreviacao(proc: str) -> str:
-    """Expande abreviações comuns de procedimentos."""
-    ABREVIACOES = {
-        "COLONO": "COLONOSCOPIA",
-        "EDA": "ENDOSCOPIA DIGESTIVA ALTA",
-        "RETO": "RETOSSIGMOIDOSCOPIA",
-        "RETOSSIGMOIDO": "RETOSSIGMOIDOSCOPIA",
-        "POLIPECTOMIA": "POLIPECTOMIA",
-        "LIGADURA": "LIGADURA ELASTICA",
-        "DILATACAO": "DILATACAO ESOFAGICA",
-        "ESCLEROSE": "ESCLEROTERAPIA",
-        "MUCOSECTOMIA": "MUCOSECTOMIA",
-        "HEMOSTASIA": "HEMOSTASIA ENDOSCOPICA",
-    }
-    proc_norm = _normalizar_procedimento(proc)
-    
-    # Verifica match exato
-    if proc_norm in ABREVIACOES:
-        return ABREVIACOES[proc_norm]
-    
-    # Verifica se começa com abreviação
-    for abrev, expandido in ABREVIACOES.items():
-        if proc_norm.startswith(abrev + " ") or proc_norm == abrev:
-            return proc_norm.replace(abrev, expandido, 1)
-    
-    return proc_norm
-
-def _match_palavra_contida(proc1: str, proc2: str) -> bool:
-    """Verifica se um procedimento está contido no outro ou compartilha palavra-chave."""
-    p1 = _normalizar_procedimento(proc1).strip()
-    p2 = _normalizar_procedimento(proc2).strip()
-    
-    if not p1 or not p2:
-        return False
-    
-    # Verifica contenção direta
-    if p1 in p2 or p2 in p1:
-        return True
-    
-    # Verifica se primeira palavra significativa é igual (mínimo 4 caracteres)
-    palavras1 = [p for p in p1.split() if len(p) >= 4]
-    palavras2 = [p for p in p2.split() if len(p) >= 4]
-    
-    if palavras1 and palavras2:
-        # Verifica se primeira palavra significativa é igual
-        if palavras1[0] == palavras2[0]:
-            return True
-        # Verifica se alguma palavra significativa está contida
-        for palavra in palavras1:
-            if len(palavra) >= 6 and any(palavra in p2_word or p2_word in palavra for p2_word in palavras2):
-                return True
-    
-    return False
-
-def _verificar_sinonimo(proc1: str, proc2: str) -> bool:
-    """Verifica se dois procedimentos são sinônimos conhecidos."""
-    p1_norm = _normalizar_procedimento(proc1)
-    p2_norm = _normalizar_procedimento(proc2)
-    
-    # Verifica match direto no dicionário
-    for chave, sinonimos in SINONIMOS_PROCEDIMENTOS.items():
-        if chave in p1_norm:
-            for sin in sinonimos:
-                if sin in p2_norm:
-                    return True
-        if chave in p2_norm:
-            for sin in sinonimos:
-                if sin in p1_norm:
-                    return True
-    
-    # Para procedimentos compostos (ex: "ANATOMO + POLIPECTOMIA")
-    # Verifica se todas as palavras-chave de um estão no outro
-    palavras1 = set(p1_norm.split())
-    palavras2 = set(p2_norm.split())
-    
-    # Se tem pelo menos 2 palavras em comum e são palavras-chave
-    palavras_chave = {'BIOPSIA', 'POLIPECTOMIA', 'POLIPO', 'ANATOMO', 'TESTE', 'UREASE', 
-                      'MUCOSECTOMIA', 'HEMOSTASIA', 'ENDOSCOPIA', 'COLONOSCOPIA', 'COLONO'}
-    comuns = palavras1 & palavras2 & palavras_chave
-    if len(comuns) >= 2:
-        return True
-    
-    return False
-
-def _similaridade_procedimento(proc1: str, proc2: str, cache: Dict = None) -> float:
-    """Calcula similaridade entre dois procedimentos (0.0 a 1.0) com cache e sinônimos."""
-    if cache is not None:
-        key = (proc1, proc2)
-        if key in cache:
-            return cache[key]
-    
-    # Expande abreviações antes de comparar
-    p1_expandido = _expandir_abreviacao(proc1)
-    p2_expandido = _expandir_abreviacao(proc2)
-    
-    if not p1_expandido or not p2_expandido:
-        return 0.0
-    
-    # Match exato após expansão
-    if p1_expandido == p2_expandido:
-        if cache is not None:
-            cache[(proc1, proc2)] = 1.0
-        return 1.0
-    
-    # Verifica match por palavra contida
-    if _match_palavra_contida(p1_expandido, p2_expandido):
-        if cache is not None:
-            cache[(proc1, proc2)] = 0.95
-        return 0.95
-    
-    # Verifica sinônimos conhecidos
-    if _verificar_sinonimo(proc1, proc2):
-        if cache is not None:
-            cache[(proc1, proc2)] = 1.0
-        return 1.0
-    
-    # Verifica se um contém o outro (palavras-chave)
-    palavras1 = set(p1_expandido.split())
-    palavras2 = set(p2_expandido.split())
-    intersecao = palavras1 & palavras2
-    
-    if intersecao:
-        # Se tem palavras em comum, calcula similaridade
-        ratio = len(intersecao) / max(len(palavras1), len(palavras2))
-        if ratio >= 0.4:
-            score = SequenceMatcher(None, p1_expandido, p2_expandido).ratio()
-            if cache is not None:
-                cache[(proc1, proc2)] = score
-            return score
-    
-    # Fallback para SequenceMatcher completo
-    score = SequenceMatcher(None, p1_expandido, p2_expandido).ratio()
-    if cache is not None:
-        cache[(proc1, proc2)] = score
-    return score
-
-def _datas_compativeis(data1: str, data2: str, tolerancia_dias: int = 1) -> bool:
-    """Verifica se duas datas são compatíveis (tolerância ±N dias)."""
-    if data1 == data2:
-        return True
-    try:
-        d1 = datetime.strptime(data1, "%d/%m/%Y")
-        d2 = datetime.strptime(data2, "%d/%m/%Y")
-        return abs((d1 - d2).days) <= tolerancia_dias
-    except:
-        return False
-
-def _extrair_valor_numerico(valor: str) -> float:
-    """Extrai valor numérico de string."""
-    if not valor or str(valor).strip() in ("", "nan", "NaN"):
-        return 0.0
-    try:
-        s = str(valor).replace("R$", "").replace(",", ".").strip()
-        return float(s)
-    except:
-        return 0.0
-
-def _normalizar_nome_paciente(nome: str) -> str:
-    """Normaliza nome de paciente removendo acentos e caracteres especiais."""
-    if not nome or str(nome).strip() in ("", "nan", "NaN"):
-        return ""
-    s = str(nome).upper().strip()
-    # Remove acentos
-    s = s.replace('Á', 'A').replace('É', 'E').replace('Í', 'I').replace('Ó', 'O').replace('Ú', 'U')
-    s = s.replace('Â', 'A').replace('Ê', 'E').replace('Ô', 'O')
-    s = s.replace('Ã', 'A').replace('Õ', 'O')
-    s = s.replace('Ç', 'C')
-    s = s.replace('À', 'A').replace('È', 'E').replace('Ì', 'I').replace('Ò', 'O').replace('Ù', 'U')
-    s = s.replace('Ü', 'U').replace('Ö', 'O').replace('Ä', 'A')
-    # Remove caracteres especiais, mantém apenas letras e espaços
-    s = re.sub(r'[^A-Z\s]', '', s)
-    s = re.sub(r'\s+', ' ', s).strip()
-    return s
-
-def _criar_indice_repasse(df_rep: pd.DataFrame) -> Dict[Tuple[str, str], List[int]]:
-    """Cria índice para busca rápida no REPASSE por (Data, Paciente)."""
-    indice = {}
-    for idx, row in df_rep.iterrows():
-        data = row.get("Data", "")
-        paciente = _normalizar_nome_paciente(row.get("Paciente", ""))
-        key = (data, paciente)
-        if key not in indice:
-            indice[key] = []
-        indice[key].append(idx)
-    return indice
-
-def _criar_indice_repasse_atendimento(df_rep: pd.DataFrame) -> Dict[Tuple[str, str], List[int]]:
-    """Cria índice para busca rápida no REPASSE por (Data, NrAtendimento)."""
-    indice = {}
-    for idx, row in df_rep.iterrows():
-        data = row.get("Data", "")
-        nr_atend = str(row.get("NrAtendimento", "")).strip()
-        if nr_atend and nr_atend not in ("", "nan", "NaN"):
-            key = (data, nr_atend)
-            if key not in indice:
-                indice[key] = []
-            indice[key].append(idx)
-    return indice
-
-def _determinar_status_correlacao(valor_liberado: float, tem_match: bool) -> str:
-    """Determina o status de correlação baseado no valor liberado."""
-    if not tem_match:
-        return "NAO_FATURADO_NO_REPASSE"
-    
-    if valor_liberado == 0:
-        return "CORRELACIONADO_COM_GLOSA_TOTAL"
-    elif valor_liberado > 0:
-        return "CORRELACIONADO"
-    else:
-        return "CORRELACIONADO"
-
-def _extrair_tokens_nome(nome: str) -> list[str]:
-    """
-    Retorna os tokens significativos do nome normalizado, limitado a 4.
 
-    Remove partículas (DE, DA, DO, DOS, DAS, E) e tokens curtos (≤ 2 chars).
-    Usado pelo FB1 para gerar combinações de busca por partes do nome.
+def extrair_csv_do_texto(texto: str) -> str:
+    match = re.search(r"```(?:csv)?\s*\n(.*?)```", texto, re.DOTALL | re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    linhas_csv = [
+        linha for linha in texto.splitlines()
+        if linha.count(",") >= 4 or linha.startswith("Data,")
+    ]
+    return "\n".join(linhas_csv).strip()
 
-    Exemplos:
-        "MARIA DAS GRACAS SILVA"  → ["MARIA", "GRACAS", "SILVA"]
-        "JOAO DE SOUZA PEREIRA"   → ["JOAO", "SOUZA", "PEREIRA"]
-        "ANA"                     → ["ANA"]
-    """
-    PARTICULAS = {"DE", "DA", "DO", "DOS", "DAS", "E"}
-    partes = _normalizar_nome_paciente(nome).split()
-    validos = [p for p in partes if p not in PARTICULAS and len(p) > 2]
-    return validos[:4]  # limita a 4 tokens
 
+def separar_resumo_do_csv(texto_csv: str) -> tuple[str, str]:
+    marcador = "# RESUMO_DIVERGENCIAS_POR_CONVENIO"
+    if marcador in texto_csv:
+        partes = texto_csv.split(marcador, 1)
+        return partes[0].strip(), partes[1].strip()
+    return texto_csv.strip(), ""
 
-def _tokens_fuzzy_em_comum(
-    tokens_prod: list[str],
-    nome_rep_norm: str,
-    limiar_token: float = 0.82,
-) -> list[tuple[str, str, float]]:
-    """
-    Para cada token da PRODUCAO, encontra o token mais similar no REPASSE
-    usando SequenceMatcher. Retorna apenas os pares que atingem o limiar.
 
-    Cada token do REPASSE só pode ser usado uma vez (match exclusivo),
-    evitando que um único token do REPASSE satisfaça múltiplos tokens da PRODUCAO.
+def texto_para_dataframe(csv_texto: str) -> pd.DataFrame | None:
+    try:
+        csv_limpo = extrair_csv_do_texto(csv_texto)
+        csv_dados, _ = separar_resumo_do_csv(csv_limpo)
+        df = pd.read_csv(io.StringIO(csv_dados), sep=",", dtype=str)
+        df.columns = [c.strip() for c in df.columns]
+        return df
+    except Exception as e:
+        logger.warning(f"Falha ao converter CSV para DataFrame: {e}")
+        return None
 
-    Retorna lista de (token_prod, token_rep, score) ordenada por score desc.
 
-    Exemplo:
-        tokens_prod = ["MICHELE", "KAROLINNE", "FERNANDES"]
-        nome_rep    = "MICHELLE KAROLINNE FERNANDES GUERREIRO"
-        → [("MICHELE","MICHELLE",0.93), ("KAROLINNE","KAROLINNE",1.0), ("FERNANDES","FERNANDES",1.0)]
-    """
-    tokens_rep = [t for t in nome_rep_norm.split() if len(t) > 2]
-    usados: set[str] = set()
-    resultado: list[tuple[str, str, float]] = []
-
-    for tp in tokens_prod:
-        melhor_rep = None
-        melhor_s = 0.0
-        for tr in tokens_rep:
-            if tr in usados:
-                continue
-            s = SequenceMatcher(None, tp, tr).ratio()
-            if s >= limiar_token and s > melhor_s:
-                melhor_s = s
-                melhor_rep = tr
-        if melhor_rep is not None:
-            resultado.append((tp, melhor_rep, round(melhor_s, 3)))
-            usados.add(melhor_rep)
-
-    return sorted(resultado, key=lambda x: x[2], reverse=True)
-
-
-def _buscar_fallback1_combinacoes_nome(
-    data_prod: str,
-    nome_prod: str,
-    df_rep: pd.DataFrame,
-    indice_repasse: Dict[Tuple[str, str], List[int]],
-    proc_prod: str,
-    cache_similaridade: Dict,
-    limiar_similaridade: float = 0.65,
-    limiar_token: float = 0.82,
-    min_tokens_similares: int = 3,
-) -> Tuple[Optional[int], float]:
+def _registrar_correlacao(
+    df: pd.DataFrame | None,
+    resumo: str = "",
+    csv_bruto: str = "",
+) -> None:
     """
-    Fallback 1 — Similaridade fuzzy por token + Data ±1 dia + Procedimento.
-
-    Estratégia:
-      Para cada candidato no REPASSE (dentro de ±1 dia), compara token a token
-      o nome da PRODUCAO com o nome do REPASSE usando SequenceMatcher por token.
-      Aceita o match se AMBAS as condições forem satisfeitas:
-        1. >= min_tokens_similares tokens com similaridade >= limiar_token
-        2. O primeiro token da PRODUCAO tem um similar no REPASSE
-           (evita matches onde só sobrenomes coincidem)
-
-    Por que fuzzy e não match exato:
-      Typos reais como MICHELE/MICHELLE, VASCONCELOS/VASCONCELLOS,
-      APPARECIDA/APARECIDA passam no limiar 0.82 e seriam perdidos
-      com match exato de string.
-
-    Por que primeiro token obrigatório:
-      Impede que pares de sobrenomes genéricos (SILVA+SANTOS, PEREIRA+SILVA)
-      matcheiem pacientes completamente diferentes.
-
-    Por que min 3 tokens:
-      Com apenas 2 tokens, combinações como MARIA+SILVA ou FABIANO+SILVA
-      ainda geram falsos positivos frequentes em bases hospitalares.
-
-    Parâmetros:
-        limiar_token:        similaridade mínima por par de tokens (padrão 0.82)
-        min_tokens_similares: quantidade mínima de tokens similares (padrão 3)
-
-    Retorna (idx, score_procedimento) do melhor candidato, ou (None, 0.0).
+    Guarda o resultado da correlação (DataFrame no formato de exibição) na sessão
+    com o digest do seu conteúdo, que chaveia os derivados em cache_sessao().
+    Na sessão fica a forma tipada (_df_tipado: datas, valores e category);
+    exportação e cobrança voltam ao texto com _df_tipado_para_texto.
+    `csv_bruto` só é preenchido quando a origem foi texto (LLM), para o
+    fallback de exibição. Estado de widgets do resultado anterior é descartado.
     """
-    tokens_prod = _extrair_tokens_nome(nome_prod)
-    if len(tokens_prod) < min_tokens_similares:
-        # Não há tokens suficientes para atingir o mínimo — não tenta
-        return None, 0.0
-
-    primeiro_token = tokens_prod[0]
+    for _k in list(st.session_state.keys()):
+        if _k.startswith("cob_") or _k == "corr_show_table":
+            del st.session_state[_k]
+    if df is not None:
+        _bytes_texto = _tamanho_estimado(df)
+        df = _df_tipado(df)
+        st.session_state["corr_memoria"] = (_bytes_texto, _tamanho_estimado(df))
+    else:
+        st.session_state.pop("corr_memoria", None)
+    st.session_state["df_correlacionado"] = df
+    st.session_state["resumo_correlacao"] = resumo
+    st.session_state["csv_correlacionado_bruto"] = csv_bruto
+    st.session_state["corr_digest"] = digest_conteudo(df if df is not None else csv_bruto)
 
-    melhor_idx: Optional[int] = None
-    melhor_score: float = 0.0
 
-    datas_candidatas = [data_prod]
+def _registrar_correlacao_local(df: pd.DataFrame, origem: str = "correlação") -> None:
+    """Registra um resultado de correlacionar_dataframes e regenera o tuss_valores.csv."""
+    df_fresh = _df_como_csv_lido(df)
+    _registrar_correlacao(df_fresh)
     try:
-        data_dt = datetime.strptime(data_prod, "%d/%m/%Y")
-        datas_candidatas += [
-            (data_dt + timedelta(days=d)).strftime("%d/%m/%Y")
-            for d in [-1, 1]
-        ]
-    except ValueError:
-        pass
-
-    for data_cand in datas_candidatas:
-        for (data_rep, pac_rep), idxs in indice_repasse.items():
-            if data_rep != data_cand:
-                continue
-
-            # Avalia tokens fuzzy contra o nome normalizado do candidato
-            matches = _tokens_fuzzy_em_comum(tokens_prod, pac_rep, limiar_token)
+        if not df_fresh.empty:
+            _gerar_valores_tuss(df_fresh)
+            _carregar_valores_tuss.clear()
+            logger.info(f"tuss_valores.csv atualizado pós-{origem}")
+    except Exception as e:
+        logger.warning(f"tuss_valores pós-{origem} ignorado: {e}")
 
-            # Condição 1: mínimo de tokens similares
-            if len(matches) < min_tokens_similares:
-                continue
 
-            # Condição 2: primeiro token da PRODUCAO deve ter similar no REPASSE
-            primeiro_tem_match = any(tp == primeiro_token for tp, tr, s in matches)
-            if not primeiro_tem_match:
-                continue
+def _texto_diferenca(resumo: dict) -> str:
+    return (
+        f"➕ {resumo['adicionadas']:,} adicionada(s) · ➖ {resumo['removidas']:,} removida(s) · "
+        f"✏️ {resumo['alteradas']:,} alterada(s) · {resumo['inalteradas']:,} sem mudança"
+    ).replace(",", ".")
 
-            # Candidato passou nas duas condições — avalia procedimento
-            for i in idxs:
-                if df_rep.at[i, "_matched"]:
-                    continue
-                proc_rep = df_rep.iloc[i].get("Procedimento", "")
-                score = _similaridade_procedimento(proc_prod, proc_rep, cache_similaridade)
-                if score >= limiar_similaridade and score > melhor_score:
-                    melhor_score = score
-                    melhor_idx = i
-
-    return melhor_idx, melhor_score
-
-
-def _buscar_fallback2_paciente_proc_data_ampla(
-    data_prod: str,
-    paciente_norm: str,
-    proc_prod: str,
-    df_rep: pd.DataFrame,
-    indice_repasse: Dict[Tuple[str, str], List[int]],
-    cache_similaridade: Dict,
-    limiar_similaridade: float = 0.65,
-    tolerancia_dias: int = 7,
-) -> Tuple[Optional[int], float]:
-    """
-    Fallback 2 — Nome exato + Procedimento ≥ limiar + Data ±7 dias.
 
-    Usa o mesmo índice por (data, paciente), mas varre a janela de 2 a 7 dias
-    (os ±1 dia já foram cobertos pela chave principal). O nome deve ser idêntico
-    após normalização; o procedimento deve atingir o mesmo limiar de similaridade.
+def render_diferenca_upload(nome: str) -> None:
+    """Resumo da diferença linha a linha do arquivo frente ao upload anterior, se houver."""
+    resumo = st.session_state.get("diferencas_upload", {}).get(nome)
+    if resumo is not None:
+        st.caption(f"🔁 Desde o upload anterior: {_texto_diferenca(resumo)}")
 
-    Cenário típico resolvido:
-        Procedimento realizado em 10/03, lançado no REPASSE como 14/03
-        → ±1 dia não bate, mas ±7 dias captura.
 
-    Retorna (idx, score) do melhor candidato, ou (None, 0.0).
+def _registrar_transformacao(dfs: dict[str, pd.DataFrame]) -> None:
     """
-    melhor_idx: Optional[int] = None
-    melhor_score: float = 0.0
-
-    try:
-        data_dt = datetime.strptime(data_prod, "%d/%m/%Y")
-    except ValueError:
-        return None, 0.0
-
-    for delta in range(-tolerancia_dias, tolerancia_dias + 1):
-        if abs(delta) <= 1:
-            continue  # ±1 dia já coberto pela chave principal
-        data_candidata = (data_dt + timedelta(days=delta)).strftime("%d/%m/%Y")
-        key = (data_candidata, paciente_norm)
-        if key not in indice_repasse:
-            continue
-        for i in indice_repasse[key]:
-            if df_rep.at[i, "_matched"]:
-                continue
-            proc_rep = df_rep.iloc[i].get("Procedimento", "")
-            score = _similaridade_procedimento(proc_prod, proc_rep, cache_similaridade)
-            if score >= limiar_similaridade and score > melhor_score:
-                melhor_score = score
-                melhor_idx = i
-
-    return melhor_idx, melhor_score
+    Guarda as tabelas da transformação local na sessão (aba Resultados + Correlação).
+    Arquivos já transformados com o mesmo nome (reenvio da planilha corrigida)
+    ganham em "diferencas_upload" o resumo da diferença linha a linha
+    (motor.diferenca: adicionadas, removidas, alteradas); arquivos com outro
+    nome não são comparados. Tabelas vindas do modo LLM têm outras colunas e
+    normalização, então não servem de base para a comparação.
+    """
+    anteriores = (
+        st.session_state.get("dfs_transformados", {})
+        if st.session_state.get("origem_transformados") == "local" else {}
+    )
+    diferencas = {
+        nome: diferenca_tabelas(anteriores[nome], df).resumo()
+        for nome, df in dfs.items() if nome in anteriores
+    }
+    st.session_state["diferencas_upload"] = diferencas
+    # CSV só para exibição/download na aba Resultados
+    st.session_state["results"] = {nome: _df_para_csv(df) for nome, df in dfs.items()}
+    # No modo local as tabelas já vêm prontas — seguem como DataFrame
+    st.session_state["dfs_transformados"] = dfs
+    st.session_state["origem_transformados"] = "local"
 
 
 # =============================================================================
-# TABELA TUSS — geração, carregamento e verificação pós-correlação
+# CRIAÇÃO DAS TASKS  ← usa session_state quando disponível
 # =============================================================================
 
-_TUSS_DIR = Path(__file__).parent
-_TUSS_LOOKUP_PATH = _TUSS_DIR / "tuss_lookup_table.csv"
-_TUSS_VALORES_PATH = _TUSS_DIR / "tuss_valores.csv"
-_TUSS_XLSX_PATH    = _TUSS_DIR / "TUSS (ATUALIZADO).xlsx"
-
-# Mapeamento PRODUCAO→TUSS embutido. Atualizar quando o XLSX mudar (re-executar _gerar_tabela_tuss).
-_TABELA_TUSS_EMBUTIDA: dict[str, dict] = {
-    'ANUSCOPIA_': {"TipoCobranca": 'sem_mapeamento_tuss', "CodigosTUSS": '', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Sem correspondência exata TUSS'},
-    'COLONO_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
-    'COLONO_ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
-    'COLONO_ANATOMO PATLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
-    'COLONO_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
-    'COLONO_ANATOMO PATOLOGICO+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Mucosectomia'},
-    'COLONO_ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
-    'COLONO_ANATOMO PATOLOGICO+TATUAGEM': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202135', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Tatuagem'},
-    'COLONO_ANATOMO PATOLOGICO+MUCOSECTOMIA+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202712, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia, Mucosectomia E Polipectomia'},
-    'COLONO_ANATOMO PATOLOGICO+POLIPO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
-    'COLONO_ANATOMO+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Mucosectomia'},
-    'COLONO_ANATOMO+POLIOECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
-    'COLONO_ANATOMOPATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
-    'COLONO_ANATOMOPATOLOGICO+POLIPO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
-    'COLONO_BRADES': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
-    'COLONO_MUCOSECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Mucosectomia'},
-    'COLONO_POLEPECTOMIA+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202542, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Polipectomia E Mucosectomia'},
-    'COLONO_POLIECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
-    'COLONO_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
-    'COLONO_POLIPECTOMIA+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202542, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Polipectomia E Mucosectomia'},
-    'COLONO_POLIPOECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
-    'COLONO_RETIRADA DE CORPO ESRANHO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202569', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Retirada de corpo estranho do cólon'},
-    'COLONO_TESTE DE UREASE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
-    'COLONO_TESTE DE UREASE+ANATOMO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
-    'COLONO_TESTE UREASE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
-    'COLONOCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
-    'COLONOCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
-    'COLONOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
-    'COLONOSCOPIA_-': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
-    'COLONOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
-    'COLONOSCOPIA_ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
-    'COLONOSCOPIA_BIOPSIA SERIADO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
-    'COLONOSCOPIA_DESCOMPRESSAO COLONICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202143', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Descompressão colônica por colonoscopia'},
-    'COLONOSCOPIA_HEMOSTASIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202313', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Hemostasias de cólon'},
-    'COLONOSCOPIA_MUCOSECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Mucosectomia'},
-    'COLONOSCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
-    'COLONOSCOPIA_TESTE DE UREASE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
-    'COLONOSCOPIA_TESTE DE UREASE - NEGATIVO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
-    'COLONOSCOPIA_TESTE UREASE - NEGATIVO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
-    'COLONOSCOPIA_TESTE UREASE+ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
-    'CPRE_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
-    'CPRE_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201074, 40202038', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica Com Biópsia'},
-    'CPRE_COLOCACAO DE PROTESE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40813320', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colocação De Stent Biliar'},
-    'CPRE_PROTESE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40813320', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colocação De Stent Biliar'},
-    'CPRE_RETIRADA DE PROTESE BILIAR': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
-    'ECOEDA ALTA C+PUNCAO_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202240, 40202038', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Punção E Biópsia'},
-    'ECOEDA ALTA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
-    'ECOENDOCOPIA ALTA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
-    'ECOENDOSCOPIA BAIXA_': {"TipoCobranca": 'sem_mapeamento_tuss', "CodigosTUSS": '', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Não há código TUSS específico para baixa na tabela (apenas alta)'},
-    'ECOENDOSCOPIA ALTA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
-    'ECOENDOSCOPIA ALTA_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201104, 40202038', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Biópsia E/Ou Citologia'},
-    'ECOENDOSCOPIA ALTA_ANATOMOPATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201104, 40202038', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Biópsia E/Ou Citologia'},
-    'ECOENDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
-    'ECOENDOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201104, 40202038', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Biópsia E/Ou Citologia'},
-    'ENCOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
-    'ENCOSCOPIA_TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDDOSCOPIA_ANATOMO PATOLOGICO+TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOCOSPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
-    'ENDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
-    'ENDOSCOPIA_ENDOSCOPIA': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
-    'ENDOSCOPIA_UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_ANATOMIA PATOLOGICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Polipectomia'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO+HP+CICATRIZ GASTRICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO+TESTE DE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO+HPYLORI+BUBO GASTRICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO+TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_ANATOMO PATOLOGICO+POLIPO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Polipectomia'},
-    'ENDOSCOPIA_ANATOMO+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202470', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Mucosectomia'},
-    'ENDOSCOPIA_ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Polipectomia'},
-    'ENDOSCOPIA_ANATOMOPATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
-    'ENDOSCOPIA_ANATOMOPATOLOGICO+TESTE DE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_BIOPSIA HEPATICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
-    'ENDOSCOPIA_COM DILATACAO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202186', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Dilatação De Esôfago Com Balão Pneumático'},
-    'ENDOSCOPIA_CPRE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
-    'ENDOSCOPIA_DILATACAO DE OSTOMIA+TROCA DE GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
-    'ENDOSCOPIA_DILATACAO ESOFAGICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202186', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Dilatação De Esôfago Com Balão Pneumático'},
-    'ENDOSCOPIA_DILATACAO PNEUMATICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202186', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Dilatação De Esôfago Com Balão Pneumático'},
-    'ENDOSCOPIA_GASTROSTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
-    'ENDOSCOPIA_GASTROSTOMIA (1ª PASSGEM)': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
-    'ENDOSCOPIA_GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
-    'ENDOSCOPIA_GTT 1ª PASSAGEM': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
-    'ENDOSCOPIA_HEMOCLIP': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202291', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Hemostasia mecânica do esôfago, estômago ou duodeno'},
-    'ENDOSCOPIA_HEMOSTASIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202291', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Hemostasia mecânica do esôfago, estômago ou duodeno'},
-    'ENDOSCOPIA_HEMOSTASIA LEVE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202291', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Hemostasia mecânica do esôfago, estômago ou duodeno'},
-    'ENDOSCOPIA_HPYLORI': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_HPYLORI+POLIPOS GASTRICOS+LIGADURA ELASTICA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550, 40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease, Polipectomia E Ligadura'},
-    'ENDOSCOPIA_LIGADURA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Ligadura Elástica Do Esôfago, Estômago Ou Duodeno'},
-    'ENDOSCOPIA_LIGADURA DE VARIZES ESOFAGO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Ligadura Elástica Do Esôfago, Estômago Ou Duodeno'},
-    'ENDOSCOPIA_LIGADURA ELASTICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Ligadura Elástica Do Esôfago, Estômago Ou Duodeno'},
-    'ENDOSCOPIA_MUCOSECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202470', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Mucosectomia Do Esôfago, Estômago Ou Duodeno'},
-    'ENDOSCOPIA_PASSAGEM SNE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
-    'ENDOSCOPIA_PASSAGEM DE SNE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
-    'ENDOSCOPIA_PASSAGEM DE SONDA NASO ENTERAL': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
-    'ENDOSCOPIA_PASSAGEM DE SONDA NASOENTERAL': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
-    'ENDOSCOPIA_PASSAGEN SNE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
-    'ENDOSCOPIA_PLASMA DE ARGONIO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40201376', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Aplicação de plasma de argônio por endoscopia digestiva alta'},
-    'ENDOSCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Polipectomia Do Esôfago, Estômago Ou Duodeno (Independente Do Número De Pólipos)'},
-    'ENDOSCOPIA_REMOCAO DE BALAO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202577', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Retirada de corpo estranho do esôfago, estômago ou duodeno'},
-    'ENDOSCOPIA_RETIRADA DE CORPO ESTRANHO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202577', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Retirada de corpo estranho do esôfago, estômago ou duodeno'},
-    'ENDOSCOPIA_RETIRADA DE GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202577', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Retirada de corpo estranho do esôfago, estômago ou duodeno'},
-    'ENDOSCOPIA_TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE DE UEASE+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
-    'ENDOSCOPIA_TESTE DE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE DE UREASE - NEGATIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
-    'ENDOSCOPIA_TESTE DE UREASE - POSITIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO+POLIOECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
-    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE DE UREASE+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
-    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
-    'ENDOSCOPIA_TESTE DE UREASE+POLIPECTOMIA+ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
-    'ENDOSCOPIA_TESTE DE UREASEA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE DE URESE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE E UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE UREASE - NEGATIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE UREASE - POSITIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE UREASE+ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
-    'ENDOSCOPIA_TESTE UREASE+ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
-    'ENDOSCOPIA_TROCA DE GTT (BOTTON)': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
-    'ENDOSCOPIA_TROCA DE GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
-    'ENDOSCOPIA_TROCA GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
-    'EXAME REALIZADO_PROCEDIMENTOS ADICIONAIS': {"TipoCobranca": 'sem_mapeamento_tuss', "CodigosTUSS": '', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Erro de leitura de cabeçalho do PDF'},
-    'GASTROSTOMIA 1ª PASSAGEM_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
-    'GASTROSTOMIA ENDOSCOPICA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
-    'GASTROSTOMIA ENDOSCOPICA_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202283, 40202038', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica Com Biópsia E/Ou Citologia'},
-    'GASTROSTOMIA ENDOSCOPICA_GASTROSTOMIA+ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202283, 40202038', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica Com Biópsia E/Ou Citologia'},
-    'GASTROSTOMIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
-    'GTT_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
-    'HEMOSTASIA_POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202291, 40202550', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Endoscopia Alta Com Hemostasia E Polipectomia'},
-    'LIGADURA ELASTICA_HEMOSTASIA LEVE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202453, 40202291', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Endoscopia Alta Com Ligadura E Hemostasia'},
-    'MUCOSECTOMIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202470', "codigo_base_proc_principal": '40202470', "Descricao_REPASSE": 'Mucosectomia Do Esôfago, Estômago Ou Duodeno'},
-    'MUCOSECTOMIA_POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202470, 40202550', "codigo_base_proc_principal": '40202470', "Descricao_REPASSE": 'Endoscopia Alta Com Mucosectomia E Polipectomia'},
-    'PASSAGEM DE SNE_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40202534', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
-    'PASSAGEM DE SONDA POR ENDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40202534', "Descricao_REPASSE": 'Passagem de Sondas por Endoscopia'},
-    'PASSAGEM SNE_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40202534', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
-    'RETIRADA DE PROTESE TRANSPAPILAR_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
-    'RETO_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
-    'RETO_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
-    'RETOSIGMOIDECTOMIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
-    'RETOSSIGMOIDECTOMIA FLEXIVEL_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
-    'RETOSSIGMOIDECTOMIA FLEXIVEL_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
-    'RETOSSIGMOIDOSCOPIA FLEXIVEL_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
-    'RETOSSIGMOIDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
-    'RETOSSIGMOIDOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
-    'RETOSSIGMOIDOSCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202682', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível Com Polipectomia'},
-    'TROCA DE GTT_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
-    'TROCA DE GTT_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202283, 40202038', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica Com Biópsia E/Ou Citologia'},
-}
-
-# Logo do Hospital São Camilo embutida em base64 (extraída do template original)
-_LOGO_SAOCAMILO_B64 = (
-    "/9j/4AAQSkZJRgABAQEAeAB4AAD/2wBDAAgGBgcGBQgHBwcJCQgKDBQNDAsLDBkSEw8UHRofHh0a"
-    "HBwgJC4nICIsIxwcKDcpLDAxNDQ0Hyc5PTgyPC4zNDL/2wBDAQkJCQwLDBgNDRgyIRwhMjIyMjIy"
-    "MjIyMjIyMjIyMjIyMjIyMjIyMjIyMjIyMjIyMjIyMjIyMjIyMjIyMjIyMjL/wAARCACOAYsDASIA"
-    "AhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQA"
-    "AAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3"
-    "ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWm"
-    "p6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEA"
-    "AwEBAQEBAQEBAQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSEx"
-    "BhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElK"
-    "U1RVVldYWVpjZGVmZ2hpanN0dXZ3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3"
-    "uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oADAMBAAIRAxEAPwD3+iii"
-    "gAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKA"
-    "CiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooqrqG"
-    "o2mlWT3d9OkECDlmP6D1PtQ3bccYuTUYq7ZaorgLP4lDU7zUksrDFvaWUtyjythnKdMgdAan8IfE"
-    "vTPErpaXKix1Bvuxu2UkP+y3r7Hn61mqsHsztq5biqSbnDbfyudxRRRWhwhRRRQAUUUUAFFFFABR"
-    "Wbo+oy6it6ZURfIu5IF291XGCffmkTUZW8SzaaUTyktVmDfxZLEY+nFAGnRWIL/UNTvLmLTDBDbW"
-    "0hie4mQuXkHUKoI4HQknrU2nalcPfzaZqEcaXkSCVXizsljJxuGeQQeCKANWisG3v9U1dp5tPe1g"
-    "tIpWiQzRs7SlTgngjaM5Hc8VZ1fUbrS9FW58uFrotHGRk7AzMFz645oA1aKwr291XRbc3t3JbXVo"
-    "hHnCOMxuik43Dkg4z04q1LqUieIrTT1VDDNbyTFucgqVAx7c0AadFc5e32uWmp2NoJNPYXjuqt5T"
-    "/LtXdz83NbSSy21g01/JFujUvI0akLgc8Ak9qALNFZHh/V5tVtpjdQrBcxON0an+BgGQ/ipH4g1J"
-    "LqUsfiW200InlS2zzFudwKsAB9OaANOiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKK"
-    "KACiiigAooooAKKKKACiioL68g0+xnvLl9kMKF3PoBQNJydluU9e16x8O6a97eyYUcJGPvSN6AV4"
-    "P4j8TX/ia/NxdvtiUnyYFPyxj+p96TxL4iuvEurPeXBKxDKwQ54jX/H1NY9eZXruo7LY/QMoyiGD"
-    "iqlTWo/w8l+rOp8Ex+ZJro/6hE/8hXAocBSCQRggjtXpfw4g86bXuOumOn5//qrzNOEH0qbe4vma"
-    "OV8XVXbl/I9f+H3xLZ3i0bX5sscJb3jnqeyuf5N+det18jkZFe1fCrxpLqcR0HUZC91Am63lY8yR"
-    "jqp9x/L6V1UK1/dkfO5vliinXorTqv1X6np1FFFdZ84FFFFABRRRQBymhrqhfVjZy2axf2jNxNGz"
-    "NnjuGFS6cLseN7r7Y8DyfYEwYVKjG8+pPNamj6dLpy3oldG8+7knXbnhWxgH34pE06VfEs2pF08p"
-    "7VYQvO7IYnP05oAp+Dv+QBz9/wC0T7/97zGzRe/8jxpW3732Sff/ALuVx+tSDT9R0y8uZdMFvNbX"
-    "Mhle3mYoUkPUqwB4PXBHWptO025XUJtT1GSN7uRBEiRZ2Qxg52gnkknkmgCo2m6lo8s82jvFPbSO"
-    "ZWsZvlwx5bY46Z9CMZqrr2ox6p4OhvrZTiSeEhH4IYSgFT6cjFaUzeIW8yKKLTl3EhJzI52jsdmO"
-    "T+OKgn8OlfDUGk2sozFJG5kk/iIcOxOO55oAW/tNU1u3NlcQQ2dnIR57CXzHdQc7V4AGcdaS5AHj"
-    "jTgOgspsf99JW/WZNp0sniO11EOgiht5ImU53EsVII9uKAKetf8AIyeHv+us3/os0eKrkCzt9PxI"
-    "xvZgjrEhZvKHzPgDnoMfjVzUNOlu9W0u7R0CWjyM4OcncuBilXT5X8QvqMzoY0gEMCDOVycuT9cK"
-    "PwoAyV1GGLxZazRw3MUN7EbaTzYGjG9fmTkjrjcKsXH/ACPtj/14S/8Aoa1e13TZNU0xoYHWO5R1"
-    "lgkborqcgn+X41WvtP1FtdtdTtBasY7ZoXjldl5Yg5BAPpQBt0VXs2vGjb7bHAj5+UQuWGPfIFWK"
-    "ACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAoornvFHjDT/DFv++PnXbj"
-    "Mdsh+Y+59B70pSUVdmtGjUrTVOmrtnQ1S1fT01bSLuwkOFuImjz6Ejg/nXjE/wATPEst6biO5hij"
-    "zxAsQKAenPJ+ua7Hw78U7K+ZLfWY1spjwJlOYmPv3X+XvWCxFOfunr1cjx2GSqxV7a6atf15XPJb"
-    "yzn0+9ms7lCk8LlHX3FQV698SPCg1W0GvaaokuIk/fLHz5sf94Y6kfy+leQ1wVabpysfZZdjo4yg"
-    "qi36rs/62PS/hHa+c2suejRpF+e6vI5UMU8sZ6o7KfwNe5fCK1MegXtyR/rrnaPoqj/GvH/E9p9h"
-    "8V6tbYwEu5MfQnI/nW0o2pRZ5NKspZjXj6fgrGVXqPwc8PyTalca9KpEMCmCA/3nP3j+A4/GuE8N"
-    "eHrvxPrUWnWgIB+aWXHESd2P9PU19AXGo6F4F0O3tJJVhhhTbFCvzSSepx3JPJNVQgr88tkYZtiZ"
-    "cv1akrzl0Xb/AIJ0VFeMaz8VNXvJGXTI47GDsSA8h+pPA/AVe8M/FOeOVLbXwJImOBdIuGX/AHlH"
-    "Ue4rdYqm3Y8mXD+NjS9pZX7X1/y/E9ZoqOCeK5gSeCRZInG5HQ5DD1BqSug8Vpp2YUUUUCCioLy9"
-    "tdPtmuLyeOCFeryNgVhDx54cL4+34X++YnC/nigDpKRmVFLMQAO5NRWt3b3tutxazRzQv910bINN"
-    "vrG21K0ktLyISwSY3IScHBz2oAk+0Qf89o/++hTkljkJ2OrY9DmuUuvDngyyu7e0ubO2iuLk4hjZ"
-    "2y59ua29M0DS9GkkfT7NIGkADlSTkDp1NAGlRRVLUdX0/SIRLf3cVuh6bzyfoOpoAu0VzsXjnw7J"
-    "IEN/5eTgNLEyKfxIxXQRyJLGskbq6MMqynII9jQA6iiq95fWunW5nvLiOCIdWkbAoAsUVzQ8feGj"
-    "Ls/tEf73lPj88VvWd7bX9utxaTxzwt0eNsigCeiisu98R6Rpt4LS8v4obggEI2c89KANSiiigAoq"
-    "jqWs6do6xtqF3HbiUkIXzyR1qeyvbbUbRLq0mWaB87XXoe1AE9FFZeoeJNH0q5+z31/FBNtDbGzn"
-    "B70AalFNR1kRXQgqwBBHcVm3viLSNOvRZ3d9FFcHBEbZzz07UAalFRzzx20Ek8zhIo1LOx6ADkmq"
-    "ema5pmsGQafeR3Hl437M8Z6fyoA0KKKCQASTgCgAorn7zxt4esZTFLqUbOpwREpfH4gYq5pniPSN"
-    "YbZY30UsmM+X91vyPNAGpRRRQAUUVR1q9uNP0a7u7W1e6uI4yY4UBJdug4FJuyuVCLnJRW7Of8a+"
-    "NYfDVt9nt9supyrlIz0jH95v6DvXh93d3F9dSXV1M808p3O7nJJrVu9E8TajeS3dzpOpS3Ezbnc2"
-    "7cn8ulNXwl4ibpol/wDjCRXmVZzqPbQ/QstwuFwNO3OnJ7u6/qxjUV0EfgfxPIeNGuB/vFV/mauw"
-    "/DTxRNjNlFEPV51/pms1Tm+jO6WPwsd6kfvRB4X8baj4akWIE3NgT81s56e6nsf0q74j8P2uqQHx"
-    "B4YVp7OVv9ItEX95buf9kdj/AJ4q/a/CLVpCDdX9pCO4QM5/pXdeFPA9n4Vklniup7i5lTY7N8q4"
-    "znhR/XNdEKVSS5ZrT8jwsZmWCoT9vhpe/wBUtpevT0e/qW/B2kPonhWxs5V2zbN8o9GY5I/DOPwr"
-    "zL4j+DtTvfHMUumWbzLqKr8yj5UdRg7j2GAD+de1VHPCtxbyQvnZIpRtpwcEY4PauuVJOCj2PmaG"
-    "YVKWIliOsr3+Z5D/AG5p3w+0p9H0Ix3mrP8A8fl6RlFf0HrjsOg781wd3d3N/dPc3c7zzuctI5yT"
-    "Xp2ofB9CzNpuqMi54juE3Y/4EP8ACsK4+FXiKEnyjZzj/ZlK/wAxXFUp1Xo1ofXYDGZbTTlGouZ7"
-    "t6N/8DyWhxFFdNL8PvFMPXS2f/clQ/1qq/g3xInXRLz8Ez/KsPZz7M9aONw0tqkfvRoeDPGtz4Zu"
-    "RBOXm0yRvni6mM/3l/qO9e5Wt1Be2sVzbSrLBKoZHU5BFfO7eFvEK9dE1D/wHau5+G82v6TqJ0u9"
-    "0y+TT58srSQsFhfGc5PQH+eK6sPUlF8klofPZ5gcPWg8TRkuZb6rX/g/meq0UUV3nxpwaxr4n+Il"
-    "3BejzLLSkHlwN91n45I79/yFdubaBovKMMZjxjYUGMfSuK1qz1Hw34nk8R6dbNd2lwu27gT7w9x+"
-    "QNbuj+L9G1orHb3YS4P/ACwm+V8+nPX8KANe1tLexgEFrCkMQJIRFwAScnipqKyvEmqDRvD95e5w"
-    "6RkR+7ngfqaAOG1uCbxDda/rEBJ/svZHaEf3kO5yP1r0HR9QTVdItL6PpNGGPse4/PNZ3hPSRp/h"
-    "W2tZlzJMhknB7s/Jz+BxWV4GkbT7nVfDsp+aynLw57xt/kfnQB1d/eR6fYXF5McRwxl2/AVyHhDS"
-    "/wC2mfxNrCCe5uHP2ZHGViQHAwP8/rV74hztB4Muwpx5jIh+hYf4VsaBAtv4e06JRgLbR/8AoINA"
-    "Fq5srW8gaC5t45YmGCjqCMVxmjs/hTxg2gGRm029Uy2gc58tu6j8iPyruq4Xx+fs2reHb1eHS625"
-    "9sqaAO2uJ47W3lnlbbHGpdj6ADJryWziu/iJ4pkkupHjsYRu2qf9WmeFH+0e5+tdz4+uGt/B17tO"
-    "DJtj/AsM/pWT8LbdU0O8uMfNJcbSfZVH+Jpgb8fg7w9HAIRpVuVxjLLlj+PWr+l6VZ6NZi0sYvKh"
-    "DFtuc8k+pq7RSARmVEZmICqMknsK8Q1GKfxG2u6+N3lQSJtH+yTgfkADXpXjzVf7L8LXGxsS3P7h"
-    "Px6n8s1W8IaDGngX7LOmGv0Z5MjswwP0xTA1PCWqf2v4as7ljmVV8uT/AHl4P+P41t15n8Nb17HV"
-    "dQ0O4OGyXUH+8pww/LB/CvTKQHm3xJBvNc0bTlODJn8CzBR/Kr3wzvGWyv8ASZTiS0nJAPoeD+oP"
-    "51Q19vtnxY0yDqIfK4+mXqWL/iQfFh0+7BqS5Hpluf8A0IH86YHoteGeJJJNY1DVdYBJgS5W3Q+2"
-    "Dj9F/WvXfE+o/wBleG767Bw6xFU/3jwP1NefyaQbX4SCVl/eSzrct64J2j9P50ID0Tw9cfavDmnT"
-    "ZyWt0z9QMV5p48/5H2H/AHYf513HgCfz/BtkO8e6M/gxrh/Hn/I+w/7sP86APTPEH/Iual/16yf+"
-    "gmuF+FH39U+kf/s1d14g/wCRc1L/AK9ZP/QTXC/Cj7+qfSP/ANmoA9Lrzr4j69cCeHQbJ2DSgNPt"
-    "OC2ThU/Hqfwr0WvIpT9u+LYEnIW9A59EHH8qQHbaF4H0nS7CNLi0huroqDLJKobn0APAFc9448J2"
-    "+mWq63o6G1kgcGVYjgAE8MPQg4r0is3xDAtx4c1KJhkG2f8ARSaAKfhDXTr+gRXEuPtMZ8qbHdh3"
-    "/EYNb1eafCidt2pQZ+UiOT8eRXpdABWdrunzarod5Y291JazTRlY5o2IKN1ByOeorRopNXVioycZ"
-    "KS3R8w32peJdJv5rG81PUYbmFtrobl+vqOeQfWo08U+IY/u65qA/7eG/xr3Lx14Ft/Fdn50O2HVI"
-    "VxFKejj+43t79q+f76xutMvZbO9geC4iOHjccj/Ee9cFSEoPfQ+0wGJoYyHwrmW6t/Whrx+OPFMX"
-    "3devT/vPu/mKvwfE7xdBj/iaCQeksCH+lcjRWanJdTslhMPLeC+5Hotn8ZdfhIF1Z2NyO+AyH9CR"
-    "+leh+DPH9t4vlmt1sZ7a4hQO+fnTGccMO/sa8l8I/D/U/FDrcODaaYD81y45ceiDv9elaviLXbPT"
-    "7Y+HfC+bfToW/fXCN89y47lupH8/pW0as4Lmk9Dy62XYXE1PYUI+91a2j6+fl+R7rUc8y29vLO4Y"
-    "rGhchFySAM8DuaxPBmrPrXhSxu5W3ThfLlPqynBP44z+NeYfEnxbqVt46jj068khGmqu0K3ys5GW"
-    "3DoeCBzXTKqlBS7ng0MvqVcRLD7ON7/Iv6l8a33sul6QNoJAe6k5P/AV6fnXPXHxa8VTk+XNaW4P"
-    "aOAH/wBCJrYk8P6b8SdLk1jRfKsddj/4/LQnEcjevtnsfz9a83v9Pu9LvJLO+t5Le4Q/MjjB+o9R"
-    "7iuWc6i1vofRYTDYGV4KCUlunq/x6eaN6b4heLJyd2tTr/uKq/yFU38YeJZPv69qB+kxH8qxaKy5"
-    "5dz0VhqMdoL7kabeJNdb72tagf8At5f/ABr0T4V6frmq6l/bV9qN82nwbljWSdiJnIx0J5A/nXOe"
-    "BPAFz4puFu7tXh0lG+Z+jTH+6vt6mvf7W1gsrWK2toligiUKiIMBQO1dFCnJvmex4mbY2lTi6FJL"
-    "me/l/wAElooorsPlwrA17wjpeuQuXgWG7xlLiIbWB98dfxq+mu6VJdzWg1C3FxC22SNnCkH8etVt"
-    "Y8UaVo1m8013FJIB8kMbhmc9hgfzoAy/AerXd7Y3en37mS50+XyjITksvOM+vQ/pVLxvJcarrOl6"
-    "BZRpNJu+1Sxu21SF6AnsOv6Vb8B6Zc2Wm3mpX6mKe/lMxVuCq8kZ9OpP5VB4NB1jXdY8ROCUkk+z"
-    "2+eyL/kUwNH7Z4wHTSdM/wDAlv8ACucvZ9V0jxpp2tapa29tHcn7LKYJS4Yepz07flXpFc9420s6"
-    "r4Wu40GZYR50eOuV5/lmkBX+IcDT+DLzaM+WUf8AAMP8a1/D863Ph3TpVOQ1sn6KBVDQLqLxP4Ni"
-    "E53edCYJv94DB/xrF8Lav/wjcj+GtckEDwuTazvwkqE9jQB3dcL4+H2nV/DlinLvdbse2VrrLnWd"
-    "Ms7dp7i/t0jAzkyDn6etcpoiTeKfFjeI5Inj061UxWQcYLnu36n9PSgDU8e2zXPg692jJj2yY9gw"
-    "z+mayPhZcq+jXltn54p92PZgP8DXcTwx3EEkEqho5FKsp7gjBryOP7d8OvE7M8TS2MuVDDpLHnjB"
-    "/vD0/wAaYHsFFc3H498NyW4lOoBDjJR423D2xir9h4hsNS0WXVbeRvs0W/fuGCNvXj/PWkB5/wDE"
-    "O9k1PxLa6VbxvOLZRmKPks7ckD/gIH51vR+MNZijWNPB98qIAqjJ4A/4DWP8PoJNY8TahrtwMlSS"
-    "pP8Aff8AwXj8a9PpgeK3up3Vh41h1ubTZ9PLyCRoZc5YdHI4HXmvaEdZEV0IKsAQR3FcV8TdM+1a"
-    "DFfKuXtJPm/3G4P64rQ8Bar/AGl4WgV2zLanyHyew6H8sUAc1p5+2/GG5c8iEuPptTb/ADq98TLV"
-    "4YtN1mEYltZtpI9+R+o/Ws7wCftnjbV7w8/LIQf95/8A61dz4n07+1PDd9agZdoiyf7w5H8qAOS8"
-    "dah/bFpoemWrZOouspA9DgD9Sfyro/FNki+CL61jGEitsKPQLg/0rg/AEUur+JLaaf5o9NtsJnty"
-    "Qo/U/lXqOqw/aNIvYcZ3wOv5qaAOS+F1x5nh24hzzFcn8iAa5rx5/wAj7D/uw/zrS+E8/wA2p256"
-    "kRyY/MH+lZvjz/kfYf8Adh/nQB6Z4g/5FzUv+vWT/wBBNcL8KPv6p9I//Zq7rxB/yLmpf9esn/oJ"
-    "rzX4d65puitfnULpYBKE2bgTnGc9B70Aet15DcD7B8Wg0nyq16rZ9nH/ANeu/i8a+HZpUij1ONnd"
-    "gqjY3JJwB0rm/iN4euJni1yxRmkhULMEGWAByrj6d6APQ6zPEc623hvUpWOALZx+Yx/WsDQ/iHpN"
-    "5Yx/2jcC1u1UCQMp2sfUEfyrC8Y+L4tdhTRdEWS485x5jqpG/B4VR169T7UgJfhRbsDqVwR8oEcY"
-    "+vJ/wr0qsPwloR0DQYrWTBuHJkmI/vHt+AwK3KACiiigArnfFXg3TPFloEul8q6QfurmMfOnsfUe"
-    "xroqKTSasy6dSdKSnB2aPAZ/hJ4ojvzBFHbTQ54uBMFXHuDyPyNdx4Z+Emm6WyXOsSDULleRHjEK"
-    "n6dW/H8q9GqlrGoppOj3eoONy28TPj1IHA/OslRhHU9Oea4vEJUk7X000b/ryOE+JXiz+z7b+wNO"
-    "cJNIg+0MnHlx9lHoT/L615HU13dzX15Nd3Ll55nLux7k1DXm1ajqSuz7nL8FDB0FTjv1fdnsPwiu"
-    "jJoN9bE/6m53D6Mo/wAK8f8AE139u8Vatc5z5l3Jj6BsD+Vek/CO58l9ZQ9BEkv5bq8jlcyzSSHq"
-    "7lj+JreUr0oo8mlRUcxry/w/irml4d1+78NazDqVmcshxJHniVO6n/PBr6Bn0/QPH3h+3uZoFngm"
-    "TdFIOJIj3APUEHqK+aq9P+DmvSQarcaFIxMFwhmhH911+9+Y/lVUJ2fK9mc+b4Vyh9Yp6Sj+X/AI"
-    "dc+DurWkrPo9xHewE8JIwjkH9D+laHhT4Qyecl34kZQinK2cTZ3f77Dt7D869forpWHgnc8OWc4u"
-    "VPkv8+oyGGO3hSGGNY4kAVUUYCj0Ap9FFbHlbhRRRQBlah4b0bVZPMvdOglkPVyuGP4jmo7LwnoO"
-    "nTCa20yBZR0ZgWI+mc4rZooAbJGk0TxSKGRwVZT3BqKzsrXT7ZbazgSCFSSEQYAzU9FABSEBlIIy"
-    "CMEGlooAq2Om2WmRNFZW0cEbNuKxjAJ9aL7TbLU4fJvrWK4j7CRc4+npVqigDBh8FeHIJRImkwbg"
-    "cjdlgPwJxW6qqihUUKoGAAMAClooAKhubW3vYGguYI5om6pIoYfrU1FAHPjwR4bEm/8AsqHPXGWx"
-    "+Wa1v7MsfsDWItYhaMMGFVAUj6CrVFAFWx02y0yForG2jt42bcVjXAJ9atUUUARXFvDd28lvcRrJ"
-    "DINrowyCKr2GkafpiyLY2kVuJMbxGMbsetXaKAKNho2naW8j2NnDA0gAcxrgt9avUUUAU7HSbDTD"
-    "KbK0igMpy5jXG76/nVsgMCCMg8GlooAoWGiaZpkry2NlDbu42s0a4JHWku9C0q+uxdXVhBNOMYkd"
-    "cnjpWhRQAyaGO4heGVA8cilWU9CD1FZH/CI+H/8AoEWv/fFbVFAGPH4V0GKRJE0q2V0YMpCdCOhr"
-    "YoooAxbvwjoF9KZZ9LgMhOSygrn8sVa07QtL0nJsLGGBjwWVfm/M81oUUAFFFFABRRRQAUUUUAFQ"
-    "XlpDf2c1pcIHhmQo6nuDU9FA02ndHzr4n8N3XhnVWtZgXgbLQTY4kX/EdxWLX0lreiWWv6a9lfR7"
-    "kblWH3kbswPrXhPibwtf+GL7yrlS9u5/c3Cj5XHp7H2rzK9Bwd1sff5Rm8MXFU6jtUX4+a/VGz8O"
-    "Z/Jm17nppkj/AJf/AK680T7o+ld94KkMcmun/qET/wAhXBIpbaqgljgAAZJPpU39xfM1cbYuq+/L"
-    "+Qp4r234W+CpNJgOuajGUvLhNsETDmKM9z7n9BVT4ffDQ2rRazr0I88Ya3tGGdnoz+/t2r1auuhR"
-    "t70j53Ns0U06FF6dX+iCiiiuo+cCiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKAC"
-    "iiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACq99YWupWklpe"
-    "QJPBIMMjjIqxRRuOMnF3Tszg7T4aw6beai9lfsILuzktljlTcYy465zyBVnwj8N9K8MMt1IxvdQA"
-    "4nkXAT/cXt9etdnRWapQWyOyrmOKqpqc99/OwUUUVocQUUUUAFFFFABRRRQAUUUUAFFFFABRRRQA"
-    "UUUUAFFFFABRRRQAUUUUAFFFFABRRRQAUUUUAFFFFABRRRQAUUUUAFFFFABRRRQAUUUUAf/Z"
-)
-
-
-def _criar_workbook_formulario_template():
-    """Cria o workbook do formulário de cobrança programaticamente.
-
-    Reproduz fielmente o layout do template original (mesmas merges, estilos,
-    larguras, bordas e logo do Hospital São Camilo) sem depender de arquivo externo.
-    Retorna um openpyxl.Workbook pronto para receber preenchimento a partir da linha 11.
-    """
-    import base64
-    from io import BytesIO
-    from openpyxl import Workbook
-    from openpyxl.drawing.image import Image as XLImage
-    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-    from openpyxl.utils import get_column_letter
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Plan1"
-
-    # ── Larguras de coluna (idênticas ao template original) ────────────────
-    col_widths = {
-        "A": 12.5, "B": 14.33, "C": 49.5, "D": 23.5, "E": 26.33,
-        "F": 21.5,  "G": 33.33, "H": 12.0, "I": 41.33, "J": 18.66,
-    }
-    for col, w in col_widths.items():
-        ws.column_dimensions[col].width = w
-
-    # ── Alturas de linhas (cabeçalho) ──────────────────────────────────────
-    for r in (1, 3, 4, 6):
-        ws.row_dimensions[r].height = 12
-    ws.row_dimensions[7].height = 15.75
-
-    # ── Estilos reutilizáveis ──────────────────────────────────────────────
-    f8b      = Font(name="Arial", size=8, bold=True)
-    f8       = Font(name="Arial", size=8)
-    center   = Alignment(horizontal="center", vertical="center")
-    left_al  = Alignment(horizontal="left",   vertical="center")
-    thin     = Side(style="thin")
-    b_all    = Border(left=thin, right=thin, top=thin, bottom=thin)
-    b_top_bot = Border(top=thin, bottom=thin)
-    b_left   = Border(left=thin, top=thin, bottom=thin)
-    b_right  = Border(right=thin, top=thin, bottom=thin)
-    fill_azul = PatternFill("solid", fgColor="DDEBF7")  # aproxima o fill de tema das colunas I/J
-
-    # ── Linha 2–3: Título do hospital (merge C2:J3) ────────────────────────
-    ws.merge_cells("C2:J3")
-    ws["C2"].value     = "HOSPITAL  SÃO CAMILO "
-    ws["C2"].font      = f8b
-    ws["C2"].alignment = center
-
-    # ── Linha 5: Título do formulário (merge C5:J5) ───────────────────────
-    ws.merge_cells("C5:J5")
-    ws["C5"].value     = "FORMULÁRIO PARA SOLICITAÇÃO DE REVISÃO DE PROCEDIMENTOS NÃO REPASSADOS "
-    ws["C5"].font      = f8b
-    ws["C5"].alignment = center
-
-    # ── Linha 7: campos de cabeçalho ──────────────────────────────────────
-    ws.merge_cells("A7:C7")
-    ws["A7"].value     = "EMPRESA"       # sobrescrito pelo código chamador
-    ws["A7"].font      = f8b
-    ws["A7"].alignment = left_al
-
-    ws.merge_cells("D7:F7")
-    ws["D7"].value     = "MÉDICO RESPONSÁVEL"   # sobrescrito
-    ws["D7"].font      = f8b
-    ws["D7"].alignment = left_al
-
-    ws["G7"].value     = "DATA: "               # sobrescrito
-    ws["G7"].font      = f8b
-    ws["G7"].alignment = left_al
-
-    ws.merge_cells("I7:J7")
-    ws["I7"].value     = "PRAZO DE RETORNO AO PRESTADOR: 30 dias"
-    ws["I7"].font      = f8b
-    ws["I7"].alignment = left_al
-
-    # ── Linha 9: seções (merge A9:H9 / I9:J9) ────────────────────────────
-    ws.merge_cells("A9:H9")
-    ws["A9"].value     = "PREENCHIMENTO PRESTADOR"
-    ws["A9"].font      = f8b
-    ws["A9"].alignment = center
-    # bordas externas do bloco A9:H9
-    for c in range(1, 9):
-        cell = ws.cell(9, c)
-        cell.font      = f8b
-        cell.alignment = center
-        left_s  = thin if c == 1 else Side()
-        right_s = thin if c == 8 else Side()
-        cell.border = Border(top=thin, bottom=thin, left=left_s, right=right_s)
-
-    ws.merge_cells("I9:J9")
-    ws["I9"].value     = "PREENCHIMENTO CONTAS MÉDICAS"
-    ws["I9"].font      = f8b
-    ws["I9"].alignment = center
-    ws["I9"].fill      = fill_azul
-    for c in (9, 10):
-        cell = ws.cell(9, c)
-        cell.fill   = fill_azul
-        cell.font   = f8b
-        left_s  = thin if c == 9 else Side()
-        cell.border = Border(top=thin, bottom=thin, left=left_s, right=thin)
-
-    # ── Linha 10: cabeçalhos das colunas de dados ─────────────────────────
-    headers = [
-        "DATA ", "Nº ATEND.", "PACIENTE", "CONVÊNIO", "PRESTADOR",
-        "CÓDIGO", "PROCEDIMENTO", "Função", "OBSERVAÇÃO CONTAS MÉDICAS", "VALOR",
-    ]
-    for c, hdr in enumerate(headers, 1):
-        cell = ws.cell(10, c)
-        cell.value     = hdr
-        cell.font      = f8b
-        cell.alignment = center
-        cell.border    = b_all
-        if c in (9, 10):
-            cell.fill  = fill_azul
-
-    # ── Logo do Hospital São Camilo ───────────────────────────────────────
-    try:
-        logo_bytes = base64.b64decode(_LOGO_SAOCAMILO_B64)
-        img        = XLImage(BytesIO(logo_bytes))
-        img.width  = 93   # convertido de EMU: 885825 ÷ 9525
-        img.height = 49   # convertido de EMU: 462915 ÷ 9525
-        ws.add_image(img, "A1")
-    except Exception:
-        pass  # falha silenciosa: logo não é crítica para o formulário
-
-    return wb
-
-
-def _normalizar_chave_tuss(s: str) -> str:
-    """Normaliza chave CONCATENAR: remove acentos, colapsa separadores e espaços."""
-    import unicodedata
-    s = str(s).strip().upper()
-    s = unicodedata.normalize("NFD", s)
-    s = "".join(c for c in s if unicodedata.category(c) != "Mn")
-    s = re.sub(r"[+/;,]+", "+", s)
-    s = re.sub(r"\s*\+\s*", "+", s)
-    return re.sub(r"\s+", " ", s).strip()
-
-
-def _gerar_tabela_tuss(
-    caminho_xlsx: Path = _TUSS_XLSX_PATH,
-    caminho_saida: Path = _TUSS_LOOKUP_PATH,
-) -> pd.DataFrame:
-    """
-    Lê TUSS (ATUALIZADO).xlsx e gera tuss_lookup_table.csv com classificação de tipo
-    de cobrança. Retorna o DataFrame gerado. Chame sempre que o XLSX for atualizado.
-    """
-    import unicodedata
-
-    df = pd.read_excel(caminho_xlsx, sheet_name=0)
-    df.columns = ["Proc_PRODUCAO", "ProcAdic_PRODUCAO", "CONCATENAR", "CodigoTUSS", "Descricao_REPASSE"]
-    # Remover linha de cabeçalho duplicado que entra como dado
-    df = df[~df["Proc_PRODUCAO"].astype(str).str.strip().isin(["EXAME REALIZADO 1", "EXAME REALIZADO 2"])]
-
-    # Mapa código base por procedimento principal (linha sem adicional)
-    codigos_base: dict[str, str] = {}
-    sem_adic = df[df["ProcAdic_PRODUCAO"].isna() | (df["ProcAdic_PRODUCAO"].astype(str).str.strip() == "")]
-    for _, r in sem_adic.iterrows():
-        proc_norm = _normalizar_chave_tuss(str(r["Proc_PRODUCAO"]))
-        raw = str(r["CodigoTUSS"]).strip()
-        sem_tuss = raw.lower() in ("nan", "sem correspondência exata tuss", "sem correspondência")
-        if not sem_tuss:
-            codigos_base[proc_norm] = raw.split(",")[0].strip()
-
-    # Descrições corrigidas por conjunto de códigos (base de conhecimento curada)
-    _CORRECOES_DESC: dict[frozenset, str] = {
-        frozenset(["40201082"]): "Colonoscopia (Inclui A Retossigmoidoscopia)",
-        frozenset(["40202038"]): "Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia",
-        frozenset(["40202186"]): "Dilatação De Esôfago Com Balão Pneumático",
-        frozenset(["40202453"]): "Ligadura Elástica Do Esôfago, Estômago Ou Duodeno",
-        frozenset(["40202470"]): "Mucosectomia Do Esôfago, Estômago Ou Duodeno",
-        frozenset(["40202542"]): "Polipectomia De Cólon (Independente Do Número De Pólipos)",
-        frozenset(["40202550"]): "Polipectomia Do Esôfago, Estômago Ou Duodeno (Independente Do Número De Pólipos)",
-        frozenset(["40202615"]): "Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)",
-        frozenset(["40202666"]): "Colonoscopia Com Biópsia E/Ou Citologia",
-        frozenset(["40202712"]): "Colonoscopia Com Mucosectomia",
-        frozenset(["40813320"]): "Colocação De Stent Biliar",
-        frozenset(["40201082", "40202615"]): "Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori",
-        frozenset(["40201074", "40202038"]): "Colangiopancreatografia Retrógrada Endoscópica Com Biópsia",
-        frozenset(["40201104", "40202038"]): "Ecoendoscopia Alta Com Biópsia E/Ou Citologia",
-        frozenset(["40202283", "40202038"]): "Gastrostomia Endoscópica Com Biópsia E/Ou Citologia",
-        frozenset(["40202666", "40202542"]): "Colonoscopia Com Biópsia E Polipectomia",
-        frozenset(["40202666", "40202712"]): "Colonoscopia Com Biópsia E Mucosectomia",
-        frozenset(["40202666", "40202712", "40202542"]): "Colonoscopia Com Biópsia, Mucosectomia E Polipectomia",
-        frozenset(["40202666", "40202135"]): "Colonoscopia Com Biópsia E Tatuagem",
-        frozenset(["40202542", "40202712"]): "Colonoscopia Com Polipectomia E Mucosectomia",
-        frozenset(["40202038", "40202550"]): "Endoscopia Alta Com Biópsia E Polipectomia",
-        frozenset(["40202038", "40202470"]): "Endoscopia Alta Com Biópsia E Mucosectomia",
-        frozenset(["40202615", "40202550"]): "Endoscopia Alta Com Urease E Polipectomia",
-        frozenset(["40202615", "40202550", "40202453"]): "Endoscopia Alta Com Urease, Polipectomia E Ligadura",
-        frozenset(["40202240", "40202038"]): "Ecoendoscopia Alta Com Punção E Biópsia",
-        frozenset(["40202453", "40202291"]): "Endoscopia Alta Com Ligadura E Hemostasia",
-        frozenset(["40202291", "40202550"]): "Endoscopia Alta Com Hemostasia E Polipectomia",
-        frozenset(["40202470", "40202550"]): "Endoscopia Alta Com Mucosectomia E Polipectomia",
-    }
-
-    registros = []
-    for _, r in df.iterrows():
-        proc_raw  = str(r["Proc_PRODUCAO"]).strip()
-        adic_raw  = str(r["ProcAdic_PRODUCAO"]).strip() if pd.notna(r["ProcAdic_PRODUCAO"]) else ""
-        concat_raw = str(r["CONCATENAR"]).strip()
-        codigos_raw = str(r["CodigoTUSS"]).strip()
-
-        chave_norm = _normalizar_chave_tuss(concat_raw)
-        proc_norm  = _normalizar_chave_tuss(proc_raw)
-        sem_tuss   = codigos_raw.lower() in ("nan", "sem correspondência exata tuss", "sem correspondência")
+def create_tasks(agents: list, conteudo_arquivo: str) -> list:
+    from crewai import Task
 
-        if sem_tuss:
-            codigos_lista, tipo = [], "sem_mapeamento_tuss"
-        else:
-            codigos_lista = [c.strip() for c in codigos_raw.split(",") if c.strip()]
-            base = codigos_base.get(proc_norm)
-            adic_vazio = not adic_raw or adic_raw in ("nan",)
-            if adic_vazio or (len(codigos_lista) == 1 and base and codigos_lista[0] == base):
-                tipo = "unico_cod_tuss_somente_proc_principal"
-            elif len(codigos_lista) > 1:
-                tipo = "multiplos_cod_tuss_proced_adicional"
-            else:
-                tipo = "unico_cod_tuss_inclui_proc_adicional_e_principal"
-
-        chave_frozen = frozenset(codigos_lista)
-        desc = _CORRECOES_DESC.get(chave_frozen, str(r["Descricao_REPASSE"]).strip())
-
-        registros.append({
-            "chave_norm":              chave_norm,
-            "Proc_PRODUCAO_raw":       proc_raw,
-            "ProcAdic_PRODUCAO_raw":   adic_raw,
-            "CONCATENAR_raw":          concat_raw,
-            "CodigosTUSS":             ", ".join(codigos_lista),
-            "QtdCodigos":              len(codigos_lista),
-            "TipoCobranca":            tipo,
-            "codigo_base_proc_principal": codigos_base.get(proc_norm, ""),
-            "Descricao_REPASSE":       desc,
-        })
+    cfg = _get_analista_cfg()
+    description = cfg["task_description_template"].replace("{conteudo_arquivo}", conteudo_arquivo)
+    task_analise = Task(
+        description=description,
+        expected_output=cfg["task_expected_output"],
+        agent=agents[0],
+    )
+    return [task_analise]
 
-    df_out = pd.DataFrame(registros)
-    df_out.to_csv(caminho_saida, index=False, encoding="utf-8-sig")
-    logger.info(f"tuss_lookup_table.csv gerado: {len(df_out)} linhas, {df_out['chave_norm'].nunique()} chaves únicas")
-    return df_out
 
+# =============================================================================
+# TRANSFORMAÇÃO LLM EM BLOCOS (MAP-REDUCE)
+# =============================================================================
+# Arquivos grandes não cabem num único prompt: o conteúdo é dividido pelos
+# marcadores "=== ABA: <nome> ===" e, dentro de cada aba, em janelas de linhas
+# com o cabeçalho repetido. Cada bloco passa pelo Analista em paralelo (com
+# cache e novas tentativas próprias) e os CSVs parciais são unidos em
+# _consolidar_blocos.
 
-def _normalizar_convenio(s: str) -> str:
-    """Normaliza nome de convênio: maiúsculas, sem acentos, espaços colapsados."""
-    import unicodedata as _ud
-    s = str(s).upper().strip()
-    s = _ud.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
-    return re.sub(r"\s+", " ", s)
+_LLM_BLOCO_LINHAS     = int(os.getenv("LLM_BLOCO_LINHAS", "150"))
+_LLM_BLOCO_WORKERS    = int(os.getenv("LLM_BLOCO_WORKERS", "4"))
+_LLM_BLOCO_TENTATIVAS = int(os.getenv("LLM_BLOCO_TENTATIVAS", "3"))
 
 
-def _gerar_valores_tuss(
-    df_correlacao: pd.DataFrame,
-    caminho_saida: Path = _TUSS_VALORES_PATH,
-    ano: int | None = None,
-) -> pd.DataFrame:
+def _separar_cabecalho_aba(linhas: list[str], nome_aba: str, nome_arquivo: str) -> tuple[list[str], list[str]]:
     """
-    Calcula estatísticas de valor por (Convênio, Código TUSS) a partir do
-    DataFrame de correlação e atualiza (ou cria) tuss_valores.csv.
-
-    Estrutura gerada:
-        Ano | Convenio | CodigoTUSS | Descricao | Qtd | Media | UltimoValor | DataUltimo | Confianca
-
-    Uma linha por (Convênio normalizado, Código) + linha Convenio="GERAL" como
-    fallback agregado por código.  Chamada automaticamente pela aba Gerar Cobrança
-    quando o arquivo não existe.
+    Separa (cabeçalho, dados) de uma aba em texto. Linhas vazias/informativas
+    são descartadas como no modo local; texto que não é CSV (PDF/DOCX) segue
+    inteiro, sem cabeçalho.
     """
-    import unicodedata as _ud
-
-    # ── Descrições oficiais ────────────────────────────────────────────────
-    _DESC_OFICIAL: dict[str, str] = {
-        "40201074": "Colangiopancreatografia Retrógrada Endoscópica",
-        "40201082": "Colonoscopia (Inclui A Retossigmoidoscopia)",
-        "40201104": "Ecoendoscopia Alta Sem Punção",
-        "40201120": "Endoscopia Digestiva Alta",
-        "40201171": "Retossigmoidoscopia Flexível",
-        "40201376": "Aplicação De Plasma De Argônio Por Endoscopia Digestiva Alta",
-        "40202038": "Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia",
-        "40202135": "Colonoscopia Com Magnificação E Tatuagem",
-        "40202143": "Descompressão Colônica Por Colonoscopia",
-        "40202186": "Dilatação De Esôfago Com Balão Pneumático",
-        "40202240": "Ecoendoscopia Alta Com Punção",
-        "40202283": "Gastrostomia Endoscópica",
-        "40202291": "Hemostasia Mecânica Do Esôfago, Estômago Ou Duodeno",
-        "40202313": "Hemostasias De Cólon",
-        "40202453": "Ligadura Elástica Do Esôfago, Estômago Ou Duodeno",
-        "40202470": "Mucosectomia Do Esôfago, Estômago Ou Duodeno",
-        "40202534": "Passagem De Sonda Naso-Enteral",
-        "40202542": "Polipectomia De Cólon (Independente Do Número De Pólipos)",
-        "40202550": "Polipectomia Do Esôfago, Estômago Ou Duodeno (Independente Do Número De Pólipos)",
-        "40202569": "Retirada De Corpo Estranho Do Cólon",
-        "40202577": "Retirada De Corpo Estranho Do Esôfago, Estômago Ou Duodeno",
-        "40202615": "Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)",
-        "40202666": "Colonoscopia Com Biópsia E/Ou Citologia",
-        "40202682": "Retossigmoidoscopia Flexível Com Polipectomia",
-        "40202690": "Retossigmoidoscopia Flexível Com Biópsia E/Ou Citologia",
-        "40202712": "Colonoscopia Com Mucosectomia",
-        "40813320": "Colocação De Stent Biliar",
-    }
-
-    def _desc(cod, desc_real_map):
-        return desc_real_map.get(cod) or _DESC_OFICIAL.get(cod) or f"Código TUSS {cod}"
-
-    def _confianca(sub: pd.Series) -> str:
-        qtd = len(sub)
-        if qtd == 0:
-            return "Sem dados"
-        if qtd == 1:
-            return "Baixa"
-        std = float(sub.std())
-        media = float(sub.mean())
-        desvio_pct = (std / media * 100) if media > 0 else 100
-        if qtd >= 5 and desvio_pct <= 5:
-            return "Alta"
-        if qtd >= 5 and desvio_pct <= 20:
-            return "Boa"
-        if qtd >= 2:
-            return "Moderada"
-        return "Baixa"
-
-    # ── Inferir ano dominante ──────────────────────────────────────────────
-    if ano is None:
-        col_data = next((c for c in ["Data_REPASSE", "Data_PRODUCAO"] if c in df_correlacao.columns), None)
-        if col_data:
-            try:
-                anos = df_correlacao[col_data].dropna().astype(str).str.strip().str[-4:].astype(int)
-                ano = int(anos.mode().iloc[0]) if len(anos) > 0 else datetime.now().year
-            except Exception:
-                ano = datetime.now().year
-        else:
-            ano = datetime.now().year
-
-    # ── Preparar dados válidos do REPASSE ──────────────────────────────────
-    df_rep = df_correlacao.copy()
-    df_rep["_cod"]  = (df_rep.get("CodigoTUSS_REPASSE", pd.Series(dtype=str))
-                       .astype(str).str.replace(".0", "", regex=False).str.strip())
-    df_rep["_val"]  = pd.to_numeric(
-        df_rep.get("ValorLiberado_REPASSE", pd.Series(dtype=float)), errors="coerce")
-    df_rep["_data"] = pd.to_datetime(
-        df_rep.get("Data_REPASSE", pd.Series(dtype=str)), dayfirst=True, errors="coerce")
-    df_rep["_conv"] = (df_rep.get("Convenio_PRODUCAO", pd.Series(dtype=str))
-                       .astype(str).apply(_normalizar_convenio))
-
-    # Filtrar: ano corrente, valor > 0, código numérico
-    mask_ano = df_rep["_data"].dt.year == ano
-    mask_val = df_rep["_val"] > 0
-    mask_cod = df_rep["_cod"].str.match(r"^\d+$", na=False)
-    df_ano   = df_rep[mask_ano & mask_val & mask_cod].copy()
-
-    # Mapa de descrição real (mais frequente por código)
-    desc_real_map: dict[str, str] = {}
-    if "Procedimento_REPASSE" in df_correlacao.columns and not df_ano.empty:
-        desc_real = (
-            df_ano.groupby(["_cod", "Procedimento_REPASSE"])
-            .size().reset_index(name="freq")
-            .sort_values(["_cod", "freq"], ascending=[True, False])
-            .groupby("_cod").first().reset_index()[["_cod", "Procedimento_REPASSE"]]
-        )
-        desc_real_map = dict(zip(desc_real["_cod"], desc_real["Procedimento_REPASSE"]))
-
-    novas_linhas: list[dict] = []
-
-    # ── 1. Linhas por (Convênio normalizado, Código) ───────────────────────
-    if not df_ano.empty:
-        df_sorted = df_ano.sort_values("_data")
-        for (conv_norm, cod), grp in df_sorted.groupby(["_conv", "_cod"]):
-            if conv_norm in ("NAN", ""):
-                continue
-            sub   = grp["_val"]
-            ult   = grp.iloc[-1]
-            novas_linhas.append({
-                "Ano":          ano,
-                "Convenio":     conv_norm,
-                "CodigoTUSS":   cod,
-                "Descricao":    _desc(cod, desc_real_map),
-                "Qtd":          len(sub),
-                "Media":        round(float(sub.mean()), 2),
-                "UltimoValor":  round(float(ult["_val"]), 2),
-                "DataUltimo":   ult["_data"].strftime("%d/%m/%Y") if pd.notna(ult["_data"]) else "",
-                "Confianca":    _confianca(sub),
-            })
-
-    # ── 2. Linhas GERAL (fallback agregado por código, todos convênios) ────
-    todos_codigos: set[str] = set(df_ano["_cod"].unique()) if not df_ano.empty else set()
-    # incluir códigos da tabela TUSS mesmo sem valor histórico
-    tabela = _carregar_tabela_tuss()
-    for entry in tabela.values():
-        for c in [x.strip() for x in str(entry.get("CodigosTUSS", "")).split(",") if x.strip()]:
-            if c.isdigit():
-                todos_codigos.add(c)
-
-    df_sorted_geral = df_ano.sort_values("_data") if not df_ano.empty else df_ano
-    for cod in sorted(todos_codigos):
-        sub_geral = df_ano[df_ano["_cod"] == cod]["_val"] if not df_ano.empty else pd.Series(dtype=float)
-        qtd       = len(sub_geral)
-        if qtd > 0:
-            ult_geral = df_sorted_geral[df_sorted_geral["_cod"] == cod].iloc[-1]
-            ultimo_val  = round(float(ult_geral["_val"]), 2)
-            ultimo_data = ult_geral["_data"].strftime("%d/%m/%Y") if pd.notna(ult_geral["_data"]) else ""
-        else:
-            ultimo_val  = None
-            ultimo_data = ""
-        novas_linhas.append({
-            "Ano":          ano,
-            "Convenio":     "GERAL",
-            "CodigoTUSS":   cod,
-            "Descricao":    _desc(cod, desc_real_map),
-            "Qtd":          qtd,
-            "Media":        round(float(sub_geral.mean()), 2) if qtd > 0 else None,
-            "UltimoValor":  ultimo_val,
-            "DataUltimo":   ultimo_data,
-            "Confianca":    _confianca(sub_geral) if qtd > 0 else "Sem dados",
-        })
-
-    if not novas_linhas:
-        logger.warning("_gerar_valores_tuss: nenhum dado de valor encontrado no DataFrame")
-        return pd.DataFrame()
-
-    df_novo = pd.DataFrame(novas_linhas)
-
-    # ── Acumular: preservar anos/convênios anteriores, sobrescrever (Convenio, Ano) atual ──
-    if caminho_saida.exists():
-        df_existente = pd.read_csv(caminho_saida, dtype={"CodigoTUSS": str})
-        # Retrocompatibilidade: CSV antigo sem coluna Convenio → descartar e reger
-        if "Convenio" not in df_existente.columns:
-            logger.info("tuss_valores.csv antigo (sem Convenio) — regerando com nova estrutura")
-            df_existente = pd.DataFrame()
-        else:
-            df_existente = df_existente[df_existente["Ano"] != ano]
-        df_final_val = pd.concat([df_existente, df_novo], ignore_index=True).sort_values(
-            ["Ano", "Convenio", "CodigoTUSS"])
-    else:
-        df_final_val = df_novo
-
-    df_final_val.to_csv(caminho_saida, index=False, encoding="utf-8-sig")
-    n_conv = df_novo[df_novo["Convenio"] != "GERAL"]["Convenio"].nunique()
-    logger.info(f"tuss_valores.csv atualizado: ano={ano}, {n_conv} convênios, {len(df_novo)} linhas")
-    return df_final_val
+    validas = [l for l in linhas if _linha_e_valida(l)]
+    if not validas:
+        return [], [l for l in linhas if l.strip()]
 
+    tipo = _identificar_tipo_arquivo(nome_aba, nome_arquivo)
+    if tipo == "PRODUCAO":
+        tipo = _detectar_tipo_por_cabecalho(validas)
+    if tipo == "REPASSE":
+        return validas[:1], validas[1:]
 
-@st.cache_data(show_spinner=False)
-def _carregar_tabela_tuss() -> dict:
-    """
-    Carrega tuss_lookup_table.csv como dict {chave_norm → entry}.
-    Prioridade: arquivo local → XLSX → constante embutida (_TABELA_TUSS_EMBUTIDA).
-    A constante embutida garante funcionamento em Docker sem volume montado.
-    """
-    if _TUSS_LOOKUP_PATH.exists():
-        df = pd.read_csv(_TUSS_LOOKUP_PATH, dtype={"CodigosTUSS": str, "codigo_base_proc_principal": str})
-        logger.info(f"tabela_tuss carregada do arquivo local ({len(df)} linhas)")
-        return {str(r["chave_norm"]): dict(r) for _, r in df.iterrows()}
-    elif _TUSS_XLSX_PATH.exists():
-        logger.info("tuss_lookup_table.csv não encontrado — gerando a partir do XLSX")
-        df = _gerar_tabela_tuss()
-        return {str(r["chave_norm"]): dict(r) for _, r in df.iterrows()}
-    else:
-        logger.info("tuss_lookup_table.csv não encontrado — usando constante embutida _TABELA_TUSS_EMBUTIDA")
-        return dict(_TABELA_TUSS_EMBUTIDA)
+    formato, idx_hdr = _detectar_cabecalho_producao(validas)
+    if formato == "SEM_HEADER":
+        return [], validas
+    return validas[idx_hdr:idx_hdr + 1], validas[idx_hdr + 1:]
 
 
-@st.cache_data(show_spinner=False)
-def _carregar_valores_tuss() -> dict:
+def dividir_conteudo_em_blocos(
+    conteudo: str,
+    nome_arquivo: str = "",
+    linhas_por_bloco: int = _LLM_BLOCO_LINHAS,
+) -> list[tuple[str, str]]:
     """
-    Carrega tuss_valores.csv como dict de dois níveis (ano mais recente):
-      - chave str  "CodigoTUSS"            → stats GERAL (fallback)
-      - chave tuple (conv_norm, CodigoTUSS) → stats por convênio
+    Divide o conteúdo de um arquivo em blocos para o Analista.
 
-    Retorna {} se arquivo não existir ou sem coluna Convenio (formato antigo).
+    Returns:
+        [(rótulo, texto)] na ordem do arquivo; cada texto começa com o marcador
+        da aba e o cabeçalho, seguidos de no máximo `linhas_por_bloco` linhas.
     """
-    if not _TUSS_VALORES_PATH.exists():
-        logger.warning("tuss_valores.csv não encontrado — será gerado automaticamente")
-        return {}
-    df = pd.read_csv(_TUSS_VALORES_PATH, dtype={"CodigoTUSS": str})
-    if df.empty or "Convenio" not in df.columns:
-        return {}
-    ano_mais_recente = int(df["Ano"].max())
-    df_atual = df[df["Ano"] == ano_mais_recente]
-    resultado: dict = {}
-    for _, r in df_atual.iterrows():
-        cod  = str(r["CodigoTUSS"])
-        conv = str(r.get("Convenio", "GERAL"))
-        stats = dict(r)
-        if conv == "GERAL":
-            resultado[cod] = stats            # fallback por código
-        else:
-            resultado[(conv, cod)] = stats    # específico por plano
-    return resultado
-
-
-def _construir_indice_tuss_repasse(df_rep: pd.DataFrame) -> set:
-    """Retorna set de (paciente_norm, data, codigo_tuss) para lookup O(1)."""
-    idx: set = set()
-    for _, r in df_rep.iterrows():
-        pac  = _normalizar_nome_paciente(str(r.get("Paciente", "")))
-        data = str(r.get("Data", "")).strip()
-        cod  = str(r.get("CodigoTUSS", "")).replace(".0", "").strip()
-        if pac and data and cod and cod != "nan":
-            idx.add((pac, data, cod))
-    return idx
+    linhas_por_bloco = max(1, int(linhas_por_bloco))
+    conteudo = _colapsar_quebras_entre_aspas(conteudo)
+    partes = re.split(r"(===\s*ABA:\s*.+?===)", conteudo)
 
+    abas: list[tuple[str, str]] = []
+    if len(partes) > 1:
+        it = iter(partes[1:])
+        for marcador, dados_aba in zip(it, it):
+            nome_aba = re.sub(r"===\s*ABA:\s*|===", "", marcador).strip()
+            abas.append((nome_aba, dados_aba))
+    else:
+        abas.append((re.sub(r"\.[^.]+$", "", nome_arquivo), conteudo))
 
-def _construir_desc_por_tuss_code(tabela_tuss: dict) -> dict:
-    """
-    Reverse-map {cod_tuss: descricao} a partir do tuss_lookup_table.
-    Prioridade: código que é codigo_base_proc_principal (descrição canônica)
-    sobre códigos adicionais. Ignora entradas 'Sem correspondência exata TUSS'.
-    """
-    desc_map: dict[str, str] = {}
-    # Primeira passagem: apenas entradas onde o código é o código-base (mais canônico)
-    for entry in tabela_tuss.values():
-        desc = str(entry.get("Descricao_REPASSE", "")).strip()
-        if not desc or "sem correspondência" in desc.lower():
-            continue
-        base = str(entry.get("codigo_base_proc_principal", "")).replace(".0", "").strip()
-        if base and base not in desc_map:
-            desc_map[base] = desc
-    # Segunda passagem: demais códigos (adicionais) da combinação
-    for entry in tabela_tuss.values():
-        desc = str(entry.get("Descricao_REPASSE", "")).strip()
-        if not desc or "sem correspondência" in desc.lower():
+    blocos = []
+    for nome_aba, dados_aba in abas:
+        cabecalho, dados = _separar_cabecalho_aba(dados_aba.splitlines(), nome_aba, nome_arquivo)
+        if not dados:
             continue
-        for cod in str(entry.get("CodigosTUSS", "")).split(","):
-            cod = cod.strip().replace(".0", "")
-            if cod and cod != "nan" and cod not in desc_map:
-                desc_map[cod] = desc
-    return desc_map
-
-
-def _construir_desc_por_codigo(df_rep: pd.DataFrame) -> dict:
-    """
-    Retorna dict {codigo_tuss: descricao_oficial} extraído das linhas reais do REPASSE.
-    Usa a descrição mais frequente para cada código como fonte canônica.
-    """
-    if "CodigoTUSS" not in df_rep.columns or "Procedimento" not in df_rep.columns:
-        return {}
-    df_rep = df_rep.copy()
-    df_rep["_cod"] = df_rep["CodigoTUSS"].astype(str).str.replace(".0", "", regex=False).str.strip()
-    grp = (
-        df_rep[df_rep["_cod"].str.match(r"^\d+$", na=False)]
-        .groupby(["_cod", "Procedimento"]).size().reset_index(name="freq")
-        .sort_values(["_cod", "freq"], ascending=[True, False])
-        .groupby("_cod").first().reset_index()
-    )
-    return dict(zip(grp["_cod"], grp["Procedimento"]))
+        prefixo = [f"=== ABA: {nome_aba} ==="] + cabecalho
+        for inicio in range(0, len(dados), linhas_por_bloco):
+            janela = dados[inicio:inicio + linhas_por_bloco]
+            rotulo = f"{nome_aba} [{inicio + 1}–{inicio + len(janela)}]"
+            blocos.append((rotulo, "\n".join(prefixo + janela)))
+    return blocos
 
 
-def _enriquecer_com_valores_tuss(
-    df: pd.DataFrame,
-    valores_tuss: dict,
-    desc_lookup: dict,
-) -> pd.DataFrame:
+def preparar_blocos_llm(
+    llm,
+    conteudo: str,
+    nome_arquivo: str,
+    linhas_por_bloco: int = _LLM_BLOCO_LINHAS,
+    verbose_mode: bool = False,
+) -> list[dict]:
     """
-    Enriquece o DataFrame de correlação com:
-      - ValorEstimado_TUSS: UltimoValor (ou Media) do código esperado, por convênio
-      - DescricaoTUSS: preserva o que verificar_tuss_adicionais já preencheu via
-        Descricao_REPASSE; completa/melhora via desc_lookup quando disponível.
-
-    ValorEstimado_TUSS é preenchido para status que indicam divergência ou ausência:
-      TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES
-      TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE
-      TUSS_CODIGO_PRINCIPAL_DIVERGENTE
-    Também preenche NAO_FATURADO_NO_REPASSE quando CodigosTUSS_Esperados estiver preenchido.
-    DescricaoTUSS é preenchida/completada para qualquer linha com CodigosTUSS_Esperados.
+    Monta uma Crew do Analista por bloco (na thread principal, pois lê o
+    session_state). Returns: [{"rotulo", "crew", "chave"}].
     """
-    if df.empty:
-        return df
-
-    # Garante que as colunas existam sem apagar o que verificar_tuss_adicionais já populou
-    if "ValorEstimado_TUSS" not in df.columns:
-        df = df.copy()
-        df["ValorEstimado_TUSS"] = ""
-    if "DescricaoTUSS" not in df.columns:
-        df = df.copy()
-        df["DescricaoTUSS"] = ""
-
-    _STATUS_COM_VALOR = {
-        "TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES",
-        "TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE",
-        "TUSS_CODIGO_PRINCIPAL_DIVERGENTE",
-    }
-
-    vals:  list = [""] * len(df)
-    # Inicializa preservando DescricaoTUSS já preenchida por verificar_tuss_adicionais
-    descs: list = list(df["DescricaoTUSS"].fillna("").astype(str))
+    from crewai import Crew, Process
 
-    for i, (_, row) in enumerate(df.iterrows()):
-        st_tuss = str(row.get("StatusTUSS", "")).strip()
-        st_corr = str(row.get("StatusCorrelacao", "")).strip().upper()
-        cod = str(row.get("CodigosTUSS_Esperados", "")).split(",")[0].strip().replace(".0", "")
-        if not cod:
-            continue
-
-        quer_valor = (
-            st_tuss in _STATUS_COM_VALOR
-            or st_corr == "NAO_FATURADO_NO_REPASSE"
+    cfg = _get_analista_cfg()
+    preparados = []
+    for rotulo, texto in dividir_conteudo_em_blocos(conteudo, nome_arquivo, linhas_por_bloco):
+        agents = create_agents(llm, verbose_mode)
+        crew = Crew(
+            agents=agents,
+            tasks=create_tasks(agents, texto),
+            process=Process.sequential,
+            verbose=verbose_mode,
         )
+        preparados.append({"rotulo": rotulo, "crew": crew, "chave": chave_cache_crew(crew, cfg)})
+    return preparados
 
-        # Sempre tenta completar DescricaoTUSS se ainda vazia
-        if not descs[i]:
-            d = desc_lookup.get(cod, "")
-            if not d and valores_tuss:
-                d = str(valores_tuss.get(cod, {}).get("Descricao", ""))
-            if d:
-                descs[i] = d
-
-        if not quer_valor or not valores_tuss:
-            continue
-
-        conv  = _normalizar_convenio(str(row.get("Convenio_PRODUCAO", "")))
-        entry = (valores_tuss.get((conv, cod), {}) if conv else {}) or valores_tuss.get(cod, {})
-        v = entry.get("UltimoValor") or entry.get("Media")
-        if v is not None:
-            vals[i] = round(float(v), 2)
-
-        # Melhora descrição se desc_lookup tiver algo mais preciso
-        desc_novo = desc_lookup.get(cod) or str(entry.get("Descricao", ""))
-        if desc_novo and (not descs[i] or descs[i].startswith("Código TUSS ")):
-            descs[i] = desc_novo
 
-    df = df.copy()
-    df["ValorEstimado_TUSS"] = vals
-    df["DescricaoTUSS"]      = descs
-    return df
+def _csv_do_bloco(resposta: str) -> str:
+    """Extrai o CSV parcial da resposta do Analista; ValueError se ilegível."""
+    csv_bloco = extrair_csv_do_texto(resposta)
+    df_bloco = _csv_para_df(csv_bloco)
+    if df_bloco is None or len(df_bloco.columns) <= 1:
+        raise ValueError("resposta sem CSV legível")
+    return csv_bloco
 
 
-def verificar_tuss_adicionais(
-    linhas_resultado: list,
-    df_rep: pd.DataFrame,
-    tabela_tuss: dict,
-    tuss_idx: set,
-) -> list:
+def _executar_bloco_llm(
+    bloco: dict,
+    cache: CacheRespostasLLM | None,
+    tentativas: int,
+    interpretar=_csv_do_bloco,
+):
     """
-    Pós-processamento: para TODA linha CORRELACIONADO (com ou sem ProcedimentosAdicionais),
-    verifica os códigos TUSS esperados e preenche StatusTUSS, CodigosTUSS_Esperados,
-    CodigosTUSS_Ausentes e DescricaoTUSS.
-
-    Casos cobertos:
-    - Proc simples (sem PA): TUSS_PROC_PRINCIPAL_OK / TUSS_CODIGO_PRINCIPAL_DIVERGENTE
-    - PA incorporado no principal: TUSS_ADICIONAL_INCORPORADO_NO_PRINCIPAL
-    - PA com código único: TUSS_PROC_ADICIONAL_RECONHECIDO / TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES
-    - PA com múltiplos códigos: TUSS_TODOS_CODIGOS_ADICIONAIS_FATURADOS / TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE
-    - Companion rows (CORRELACIONADO_PROCEDIMENTO_ADICIONAL sem proc_princ): TUSS_PROC_ADICIONAL_RECONHECIDO
+    Map: roda um bloco até `interpretar(resposta)` aceitar a resposta (sem
+    levantar ValueError) ou esgotar as tentativas.
     """
-    from datetime import timedelta
-
-    for linha in linhas_resultado:
-        status = str(linha.get("StatusCorrelacao", ""))
-        if not status.startswith("CORRELACIONADO"):
-            continue
-
-        proc_adic  = str(linha.get("ProcedimentosAdicionais_PRODUCAO", "")).strip()
-        sem_pa     = not proc_adic or proc_adic == "nan"
-        proc_princ = str(linha.get("Procedimento_PRODUCAO", "")).strip()
-        sem_princ  = not proc_princ or proc_princ == "nan"
-
-        # Causa 2: companion row — CORRELACIONADO_PROCEDIMENTO_ADICIONAL sem proc_princ nem PA
-        # O código já está presente no repasse; apenas registrar como reconhecido.
-        if sem_pa and sem_princ:
-            if status == "CORRELACIONADO_PROCEDIMENTO_ADICIONAL":
-                linha["StatusTUSS"] = "TUSS_PROC_ADICIONAL_RECONHECIDO"
-            continue
-
-        # Monta chave: com PA → "PROC_PA", sem PA → "PROC_"
-        chave = _normalizar_chave_tuss(
-            f"{proc_princ}_{proc_adic}" if not sem_pa else f"{proc_princ}_"
-        )
-        entry = tabela_tuss.get(chave)
-
-        if not entry:
-            linha["StatusTUSS"] = "TUSS_COMBINACAO_SEM_MAPEAMENTO"
-            continue
-
-        tipo       = str(entry.get("TipoCobranca", ""))
-        codigos_raw = str(entry.get("CodigosTUSS", ""))
-        codigos    = [c.strip() for c in codigos_raw.split(",") if c.strip() and c.strip() != "nan"]
-        base       = str(entry.get("codigo_base_proc_principal", "")).replace(".0", "").strip()
-        desc       = str(entry.get("Descricao_REPASSE", "")).strip()
-
-        if tipo == "sem_mapeamento_tuss":
-            linha["StatusTUSS"] = "TUSS_COMBINACAO_SEM_MAPEAMENTO"
-            if desc:
-                linha["DescricaoTUSS"] = desc
-            continue
-
-        # Proc simples sem PA: verificar se o código no REPASSE bate com o esperado
-        if sem_pa and tipo == "unico_cod_tuss_somente_proc_principal":
-            cod_repasse = str(linha.get("CodigoTUSS_REPASSE", "")).replace(".0", "").strip()
-            esperado    = codigos[0] if codigos else ""
-            linha["StatusTUSS"] = (
-                "TUSS_PROC_PRINCIPAL_OK"
-                if esperado and cod_repasse == esperado
-                else "TUSS_CODIGO_PRINCIPAL_DIVERGENTE"
-            )
-            if esperado:
-                linha["CodigosTUSS_Esperados"] = esperado
-            if desc:
-                linha["DescricaoTUSS"] = desc
-            continue
-
-        # PA com código igual ao do proc principal (adicional incorporado)
-        if tipo == "unico_cod_tuss_somente_proc_principal":
-            linha["StatusTUSS"] = "TUSS_ADICIONAL_INCORPORADO_NO_PRINCIPAL"
-            if codigos:
-                linha["CodigosTUSS_Esperados"] = codigos[0]
-            if desc:
-                linha["DescricaoTUSS"] = desc
-            continue
-
-        cod_repasse = str(linha.get("CodigoTUSS_REPASSE", "")).replace(".0", "").strip()
-
-        if tipo == "unico_cod_tuss_inclui_proc_adicional_e_principal":
-            if codigos and cod_repasse == codigos[0]:
-                linha["StatusTUSS"] = "TUSS_PROC_ADICIONAL_RECONHECIDO"
-            else:
-                linha["StatusTUSS"] = "TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES"
-            linha["CodigosTUSS_Esperados"] = codigos[0] if codigos else ""
-            if desc:
-                linha["DescricaoTUSS"] = desc
-            continue
-
-        # tipo == "multiplos_cod_tuss_proced_adicional"
-        # Verificar cada código adicional (diferente do base) no índice do REPASSE
-        pac  = _normalizar_nome_paciente(str(linha.get("Paciente_PRODUCAO", "")))
-        data = str(linha.get("Data_PRODUCAO", "")).strip()
+    ultimo_erro: Exception | None = None
+    for tentativa in range(1, tentativas + 1):
         try:
-            data_dt = datetime.strptime(data, "%d/%m/%Y")
-            datas_check = [(data_dt + timedelta(days=d)).strftime("%d/%m/%Y") for d in (0, -1, 1)]
-        except ValueError:
-            datas_check = [data]
-
-        codigos_adicionais = [c for c in codigos if c != base]
-        if not codigos_adicionais:
-            codigos_adicionais = codigos
-
-        encontrados, ausentes = [], []
-        for cod in codigos_adicionais:
-            achou = any((pac, d, cod) in tuss_idx for d in datas_check)
-            (encontrados if achou else ausentes).append(cod)
-
-        if not ausentes:
-            linha["StatusTUSS"] = "TUSS_TODOS_CODIGOS_ADICIONAIS_FATURADOS"
-        else:
-            linha["StatusTUSS"] = "TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE"
-
-        linha["CodigosTUSS_Esperados"] = ", ".join(codigos_adicionais)
-        if ausentes:
-            linha["CodigosTUSS_Ausentes"] = ", ".join(ausentes)
-        if desc:
-            linha["DescricaoTUSS"] = desc
-
-    return linhas_resultado
+            resposta = kickoff_com_cache(bloco["crew"], bloco["chave"], cache)
+            try:
+                valor = interpretar(resposta)
+                logger.info(f"Bloco {bloco['rotulo']}: concluído (tentativa {tentativa})")
+                return valor
+            except ValueError as exc:
+                ultimo_erro = exc
+                # Resposta inválida não pode voltar do cache na próxima tentativa
+                if cache is not None:
+                    cache.remover(bloco["chave"])
+        except Exception as exc:
+            ultimo_erro = exc
+        if tentativa < tentativas:
+            espera = 2 ** tentativa
+            logger.warning(
+                f"Bloco {bloco['rotulo']}: tentativa {tentativa}/{tentativas} falhou "
+                f"({ultimo_erro}); nova tentativa em {espera}s"
+            )
+            time.sleep(espera)
+    raise RuntimeError(f"Bloco {bloco['rotulo']} falhou após {tentativas} tentativa(s): {ultimo_erro}")
 
 
-def correlacionar_csv_arquivos(
-    csv_producao: str,
-    csv_repasse: str,
-    limiar_similaridade: float = 0.65,
-    tabela_tuss_preloaded: dict | None = None,
-    valores_tuss_preloaded: dict | None = None,
+def executar_blocos_llm(
+    blocos: list[dict],
+    cache: CacheRespostasLLM | None = None,
+    max_workers: int = _LLM_BLOCO_WORKERS,
+    tentativas: int = _LLM_BLOCO_TENTATIVAS,
 ) -> str:
     """
-    Correlaciona dois CSVs (PRODUCAO e REPASSE) usando chave composta otimizada.
-
-    Garantias de schema:
-    - TODAS as colunas canonicas de _MAP_PRODUCAO aparecem com sufixo _PRODUCAO
-    - TODAS as colunas canonicas de _MAP_REPASSE aparecem com sufixo _REPASSE
-    - Colunas ausentes no arquivo fisico ficam vazias — nunca omitidas
-
-    Otimizacoes implementadas:
-    - Indice hash para busca O(1) por Data+Paciente
-    - Fallback por NrAtendimento quando nao encontra por nome
-    - Normalizacao de nomes sem acentos e caracteres especiais
-    - Cache de similaridade de procedimentos
-    - Busca com tolerancia de +-1 dia
+    Map-reduce dos blocos de um arquivo: executa em paralelo e une os CSVs
+    parciais na ordem original com _consolidar_blocos.
 
-    Args:
-        csv_producao: CSV padronizado da PRODUCAO
-        csv_repasse: CSV padronizado do REPASSE
-        limiar_similaridade: Threshold para match de procedimento (0.0-1.0)
-
-    Returns:
-        CSV correlacionado com sufixos _PRODUCAO e _REPASSE em todas as colunas
+    Se algum bloco esgotar as tentativas, levanta RuntimeError listando-os; os
+    blocos bem-sucedidos ficam no cache e não são refeitos na próxima execução.
     """
-    try:
-        # ── Carrega DataFrames ────────────────────────────────────────────────
-        df_prod = pd.read_csv(io.StringIO(csv_producao), dtype=str)
-        df_rep  = pd.read_csv(io.StringIO(csv_repasse),  dtype=str)
-        df_prod.fillna("", inplace=True)
-        df_rep.fillna("",  inplace=True)
-
-        logger.info(f"Correlacao: {len(df_prod)} linhas PRODUCAO, {len(df_rep)} linhas REPASSE")
-
-        # ── Deriva schemas canonicos a partir dos mapas ───────────────────────
-        # Todas as colunas canonicas de cada mapa (valores unicos, ordem estavel)
-        _COLS_PROD = list(dict.fromkeys(
-            list(_MAP_PRODUCAO.values()) +
-            list(_MAP_PRODUCAO_2025_NOVO.values()) +
-            list(_MAP_PRODUCAO_2026.values())
-        ))
-        # Remove Procedimento2 — coluna interna descartada antes de chegar aqui
-        _COLS_PROD = [c for c in _COLS_PROD if c != "Procedimento2"]
-        # AbaOrigemDados e adicionada pelo processador, nao consta nos mapas — inclui explicitamente
-        if "AbaOrigemDados" not in _COLS_PROD:
-            _COLS_PROD.append("AbaOrigemDados")
-
-        _COLS_REP = list(dict.fromkeys(_MAP_REPASSE.values()))
-        # AbaOrigemDados e adicionada pelo processador, nao consta no _MAP_REPASSE — inclui explicitamente
-        if "AbaOrigemDados" not in _COLS_REP:
-            _COLS_REP.append("AbaOrigemDados")
-
-        # Colunas internas/de controle que nao devem aparecer no CSV final
-        _EXCLUIR_PROD = {"TipoArquivo"}
-        _EXCLUIR_REP  = {"TipoArquivo", "_matched"}
-
-        # Garante que todas as colunas canonicas existam nos DataFrames
-        # (arquivo fisico pode nao ter todas)
-        for col in _COLS_PROD:
-            if col not in df_prod.columns:
-                df_prod[col] = ""
-        for col in _COLS_REP:
-            if col not in df_rep.columns:
-                df_rep[col] = ""
-
-        # ── Normaliza datas ───────────────────────────────────────────────────
-        for df in [df_prod, df_rep]:
-            if "Data" in df.columns:
-                df["Data"] = df["Data"].apply(_padronizar_data)
-
-        # ── Cria indices de busca rapida ──────────────────────────────────────
-        indice_repasse      = _criar_indice_repasse(df_rep)
-        indice_atendimento  = _criar_indice_repasse_atendimento(df_rep)
-        logger.info(f"Indice por nome: {len(indice_repasse)} chaves | por atendimento: {len(indice_atendimento)} chaves")
-
-        df_rep["_matched"] = False
-        cache_similaridade: dict = {}
-
-        linhas_resultado       = []
-        matches_encontrados    = 0
-        matches_por_atendimento = 0
-
-        # ── Itera PRODUCAO e busca match no REPASSE ───────────────────────────
-        for _, row_prod in df_prod.iterrows():
-            data_prod     = row_prod.get("Data", "")
-            paciente_norm = _normalizar_nome_paciente(row_prod.get("Paciente", ""))
-            nr_atend_prod = str(row_prod.get("NrAtendimento", "")).strip()
-            proc_prod     = row_prod.get("Procedimento", "")
-
-            candidatos   = []
-            metodo_busca = "1_NOME_COMPLETO_DATA_PROCEDIMENTO"
-
-            # Busca exata por nome
-            key_exata = (data_prod, paciente_norm)
-            if key_exata in indice_repasse:
-                candidatos.extend(indice_repasse[key_exata])
-
-            # Busca com tolerancia de +-1 dia por nome
-            if not candidatos:
-                try:
-                    data_dt = datetime.strptime(data_prod, "%d/%m/%Y")
-                    for delta in [-1, 1]:
-                        key_tol = ((data_dt + timedelta(days=delta)).strftime("%d/%m/%Y"), paciente_norm)
-                        if key_tol in indice_repasse:
-                            candidatos.extend(indice_repasse[key_tol])
-                except Exception:
-                    pass
-
-            # Fallback: busca por NrAtendimento
-            if not candidatos and nr_atend_prod and nr_atend_prod not in ("", "nan", "NaN"):
-                metodo_busca = "2_FALLBACK_NR-ATENDIMENTO_DATA_PROCEDIMENTO"
-                key_atend = (data_prod, nr_atend_prod)
-                if key_atend in indice_atendimento:
-                    candidatos.extend(indice_atendimento[key_atend])
-                if not candidatos:
-                    try:
-                        data_dt = datetime.strptime(data_prod, "%d/%m/%Y")
-                        for delta in [-1, 1]:
-                            key_tol = ((data_dt + timedelta(days=delta)).strftime("%d/%m/%Y"), nr_atend_prod)
-                            if key_tol in indice_atendimento:
-                                candidatos.extend(indice_atendimento[key_tol])
-                    except Exception:
-                        pass
-
-            # Seleciona melhor match por similaridade de procedimento
-            melhor_match = None
-            melhor_score = 0.0
-            melhor_idx   = None
-
-            for idx_rep in candidatos:
-                if df_rep.at[idx_rep, "_matched"]:
-                    continue
-                sim = _similaridade_procedimento(proc_prod, df_rep.iloc[idx_rep].get("Procedimento", ""), cache_similaridade)
-                if sim >= limiar_similaridade and sim > melhor_score:
-                    melhor_score = sim
-                    melhor_match = df_rep.iloc[idx_rep]
-                    melhor_idx   = idx_rep
-
-            # ── Monta linha correlacionada ────────────────────────────────────
-            proc_norm = _normalizar_procedimento(proc_prod)
-            linha_corr: dict = {
-                "ChaveCorrelacao": f"{paciente_norm}_{nr_atend_prod}_{data_prod}_{proc_norm}".replace(" ", "-")
-            }
-
-            # Todas as colunas canonicas da PRODUCAO com sufixo _PRODUCAO
-            for col in _COLS_PROD:
-                if col not in _EXCLUIR_PROD:
-                    linha_corr[f"{col}_PRODUCAO"] = row_prod.get(col, "")
-
-            # ── Fallbacks quando chave principal não encontrou match ──────────
-            metodo_match = metodo_busca  # 1_NOME_COMPLETO ou 2_FALLBACK_NR-ATENDIMENTO
-
-            if melhor_match is None:
-                # Fallback 1: combinações de tokens do nome + data ±1 dia
-                idx_fb1, score_fb1 = _buscar_fallback1_combinacoes_nome(
-                    data_prod, row_prod.get("Paciente", ""),
-                    df_rep, indice_repasse,
-                    proc_prod, cache_similaridade,
-                    limiar_similaridade,
-                )
-                if idx_fb1 is not None:
-                    melhor_match = df_rep.iloc[idx_fb1]
-                    melhor_idx   = idx_fb1
-                    melhor_score = score_fb1
-                    metodo_match = "3_FALLBACK_NOME_PARCIAL_FUZZY_DATA_FIXA"
-
-            if melhor_match is None:
-                # Fallback 2: nome exato + procedimento + data ±7 dias
-                idx_fb2, score_fb2 = _buscar_fallback2_paciente_proc_data_ampla(
-                    data_prod, paciente_norm, proc_prod,
-                    df_rep, indice_repasse, cache_similaridade,
-                    limiar_similaridade,
-                )
-                if idx_fb2 is not None:
-                    melhor_match = df_rep.iloc[idx_fb2]
-                    melhor_idx   = idx_fb2
-                    melhor_score = score_fb2
-                    metodo_match = "4_FALLBACK_NOME_COMPLETO_DATA-FLEXIVEL"
-
-            # ── StatusCorrelacao e SimilaridadeProcedimento ───────────────────
-            if melhor_match is not None:
-                df_rep.at[melhor_idx, "_matched"] = True
-                matches_encontrados += 1
-                if metodo_busca == "2_FALLBACK_NR-ATENDIMENTO_DATA_PROCEDIMENTO":
-                    matches_por_atendimento += 1
-
-                valor_rep   = _extrair_valor_numerico(melhor_match.get("ValorLiberado", "0"))
-                status_base = _determinar_status_correlacao(valor_rep, True)
-
-                # Sufixo de rastreabilidade por método de correlação
-                if metodo_match == "3_FALLBACK_NOME_PARCIAL_FUZZY_DATA_FIXA":
-                    status = f"{status_base}_FALLBACK_1"
-                elif metodo_match == "4_FALLBACK_NOME_COMPLETO_DATA-FLEXIVEL":
-                    status = f"{status_base}_FALLBACK_2"
-                elif metodo_match == "2_FALLBACK_NR-ATENDIMENTO_DATA_PROCEDIMENTO":
-                    status = f"{status_base}_VIA_NR_ATENDIMENTO"
-                else:
-                    status = status_base
-
-                # Ajuste A: sinaliza procedimentos anatomicamente divergentes para revisão humana
-                # (ex: ENDOSCOPIA da PRODUCAO casou com "Colonoscopia" do REPASSE via
-                # similaridade acidental de string — precisam ser conferidos manualmente)
-                if _sao_anatomicamente_divergentes(proc_prod, melhor_match.get("Procedimento", "")):
-                    status = f"{status}_PROCEDIMENTO_DIVERGENTE"
-
-                linha_corr["SimilaridadeProcedimento"] = f"{melhor_score:.2f}"
-                linha_corr["MetodoMatch"]              = metodo_match
-            else:
-                status = "NAO_FATURADO_NO_REPASSE"
-                linha_corr["SimilaridadeProcedimento"] = "0.00"
-                linha_corr["MetodoMatch"]              = "SEM_MATCH"
-
-            linha_corr["StatusCorrelacao"] = status
-
-            # Todas as colunas canonicas do REPASSE com sufixo _REPASSE
-            if melhor_match is not None:
-                for col in _COLS_REP:
-                    if col not in _EXCLUIR_REP:
-                        linha_corr[f"{col}_REPASSE"] = melhor_match.get(col, "")
-            else:
-                for col in _COLS_REP:
-                    if col not in _EXCLUIR_REP:
-                        linha_corr[f"{col}_REPASSE"] = ""
-
-            linhas_resultado.append(linha_corr)
-
-        logger.info(f"Matches encontrados: {matches_encontrados}/{len(df_prod)} ({matches_encontrados/len(df_prod)*100:.1f}%)")
-        logger.info(f"Matches por atendimento: {matches_por_atendimento}")
-
-        # ── Pré-computação para Fallbacks 5 e 6 ──────────────────────────────
-
-        # Fallback 5: índice (paciente_norm, data) das linhas PRODUCAO já correlacionadas.
-        # Permite detectar se um procedimento companion do REPASSE tem um principal
-        # já matcheado no mesmo episódio (mesmo paciente + data ±1 dia).
-        _corr_idx: Dict[Tuple[str, str], bool] = {}
-        for lr in linhas_resultado:
-            if str(lr.get("StatusCorrelacao", "")).startswith("CORRELACIONADO"):
-                pac_lr  = _normalizar_nome_paciente(lr.get("Paciente_PRODUCAO", ""))
-                data_lr = lr.get("Data_PRODUCAO", "")
-                if pac_lr and data_lr:
-                    _corr_idx[(pac_lr, data_lr)] = True
-
-        # Fallback 6: data mínima da PRODUCAO com buffer de 30 dias.
-        # Entradas do REPASSE anteriores a essa data são faturamentos tardios (late billing)
-        # sem correspondência possível na PRODUCAO — recebem status informativo próprio.
-        try:
-            _datas_prod_parsed = [
-                datetime.strptime(d.strip(), "%d/%m/%Y")
-                for d in df_prod["Data"].dropna()
-                if re.match(r"\d{2}/\d{2}/\d{4}", str(d).strip())
-            ]
-            _data_min_producao = min(_datas_prod_parsed) - timedelta(days=30) if _datas_prod_parsed else None
-        except Exception:
-            _data_min_producao = None
-
-        # ── Linhas do REPASSE sem match → inseridas no final ──────────────────
-        nao_matcheados = 0
-        for idx_rep, row_rep in df_rep.iterrows():
-            if row_rep["_matched"]:
-                continue
-            nao_matcheados += 1
-
-            paciente_norm  = _normalizar_nome_paciente(row_rep.get("Paciente", ""))
-            nr_atend_rep   = str(row_rep.get("NrAtendimento", "")).strip()
-            data_rep       = row_rep.get("Data", "")
-            proc_norm      = _normalizar_procedimento(row_rep.get("Procedimento", ""))
-
-            linha_corr = {
-                "ChaveCorrelacao": f"{paciente_norm}_{nr_atend_rep}_{data_rep}_{proc_norm}".replace(" ", "-")
-            }
-
-            # PRODUCAO vazia (schema completo, tudo vazio)
-            for col in _COLS_PROD:
-                if col not in _EXCLUIR_PROD:
-                    linha_corr[f"{col}_PRODUCAO"] = ""
-
-            # Determina status do REPASSE não matcheado (com fallbacks 5 e 6)
-            status_repasse = "REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO"
-            linha_corr["MetodoMatch"] = ""
-
-            # Fallback 5: procedimento companion (Urease/Helicobacter standalone) cujo
-            # procedimento principal já foi correlacionado no mesmo episódio.
-            # Condições: (a) proc é companion puro, (b) mesmo paciente tem CORRELACIONADO
-            # na mesma data ±1 dia. Risco de falso positivo: muito baixo — requer
-            # keyword específico + ausência de proc principal + match de episódio.
-            if _e_procedimento_companion(row_rep.get("Procedimento", "")):
-                try:
-                    _data_rep_dt = datetime.strptime(data_rep, "%d/%m/%Y")
-                    _datas_f5 = [data_rep] + [
-                        (_data_rep_dt + timedelta(days=d)).strftime("%d/%m/%Y")
-                        for d in [-1, 1]
-                    ]
-                except ValueError:
-                    _datas_f5 = [data_rep]
-                for _dc in _datas_f5:
-                    if (paciente_norm, _dc) in _corr_idx:
-                        status_repasse = "CORRELACIONADO_PROCEDIMENTO_ADICIONAL"
-                        linha_corr["MetodoMatch"] = "5_FALLBACK_COMPANION_PROCEDIMENTO_ADICIONAL"
-                        break
-
-            # Fallback 6: data do REPASSE anterior ao período coberto pela PRODUCAO
-            # (faturamento tardio de exames de períodos anteriores ao arquivo enviado).
-            if status_repasse == "REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO" and _data_min_producao:
-                try:
-                    if datetime.strptime(data_rep, "%d/%m/%Y") < _data_min_producao:
-                        status_repasse = "REPASSE_DATA_FORA_DO_PERIODO_PRODUCAO"
-                except ValueError:
-                    pass
-
-            linha_corr["SimilaridadeProcedimento"] = "0.00"
-            linha_corr["StatusCorrelacao"]         = status_repasse
-
-            # REPASSE preenchido (schema completo)
-            for col in _COLS_REP:
-                if col not in _EXCLUIR_REP:
-                    linha_corr[f"{col}_REPASSE"] = row_rep.get(col, "")
-
-            linhas_resultado.append(linha_corr)
-
-        logger.info(f"Linhas REPASSE nao matcheadas: {nao_matcheados}")
-        logger.info(f"Cache de similaridade: {len(cache_similaridade)} entradas")
-
-        # ── Verificação TUSS pós-correlação ───────────────────────────────────
-        tabela_tuss: dict = {}
-        _tuss_debug_log = _TUSS_DIR / "tuss_debug.log"
-        try:
-            def _dbg(msg):
-                """Grava diagnóstico em arquivo para inspeção mesmo sem acesso ao terminal."""
-                import threading
-                linha = f"[{datetime.now().isoformat()} T={threading.current_thread().name}] {msg}\n"
-                logger.info(msg)
-                try:
-                    with open(_tuss_debug_log, "a", encoding="utf-8") as _f:
-                        _f.write(linha)
-                except Exception:
-                    pass
-
-            _dbg(f"TUSS-INIT preloaded={bool(tabela_tuss_preloaded)} len={len(tabela_tuss_preloaded) if tabela_tuss_preloaded else 0}")
-            _dbg(f"TUSS-PATH exists={_TUSS_LOOKUP_PATH.exists()} path={_TUSS_LOOKUP_PATH}")
-
-            if tabela_tuss_preloaded:
-                tabela_tuss = tabela_tuss_preloaded
-                _dbg(f"TUSS-LOAD via preloaded ({len(tabela_tuss)} entradas)")
-            elif _TUSS_LOOKUP_PATH.exists():
-                _df_lookup = pd.read_csv(
-                    _TUSS_LOOKUP_PATH,
-                    dtype={"CodigosTUSS": str, "codigo_base_proc_principal": str},
-                )
-                tabela_tuss = {str(r["chave_norm"]): dict(r) for _, r in _df_lookup.iterrows()}
-                _dbg(f"TUSS-LOAD via read_csv ({len(tabela_tuss)} entradas)")
-            else:
-                tabela_tuss = dict(_TABELA_TUSS_EMBUTIDA)
-                _dbg(f"TUSS-LOAD via embutida ({len(tabela_tuss)} entradas)")
-
-            if tabela_tuss:
-                tuss_idx = _construir_indice_tuss_repasse(df_rep)
-                _dbg(f"TUSS-IDX construído ({len(tuss_idx)} entradas)")
-                linhas_antes = len(linhas_resultado)
-                linhas_resultado = verificar_tuss_adicionais(linhas_resultado, df_rep, tabela_tuss, tuss_idx)
-                n_com_status = sum(1 for l in linhas_resultado if "StatusTUSS" in l)
-                _dbg(f"TUSS-VERIFY concluído: {linhas_antes} linhas, {n_com_status} com StatusTUSS")
-            else:
-                _dbg("TUSS-SKIP tabela_tuss vazia")
-        except Exception as _e_tuss:
-            logger.warning(f"Verificação TUSS ignorada: {_e_tuss}", exc_info=True)
+    if not blocos:
+        raise ValueError("Nenhum bloco de dados para enviar ao agente")
+
+    logger.info(f"Map-reduce: {len(blocos)} bloco(s), até {max_workers} em paralelo")
+    pecas: list[str | None] = [None] * len(blocos)
+    falhas = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="bloco") as pool:
+        futuros = {
+            submeter_no_contexto(pool, _executar_bloco_llm, bloco, cache, tentativas): i
+            for i, bloco in enumerate(blocos)
+        }
+        for futuro in futuros:
+            i = futuros[futuro]
             try:
-                with open(_tuss_debug_log, "a", encoding="utf-8") as _f:
-                    import traceback
-                    _f.write(f"TUSS-EXCEPTION: {_e_tuss}\n{traceback.format_exc()}\n")
-            except Exception:
-                pass
-
-        # ── Monta DataFrame final e ordena por data ───────────────────────────
-        df_final = pd.DataFrame(linhas_resultado)
-        df_final.fillna("", inplace=True)
-
-        # ── Enriquecimento com valores e descrições TUSS ──────────────────────
-        try:
-            # Mesmo padrão: preloaded (não vazio) → fallback para _carregar_valores_tuss
-            # (valores_tuss muda com mais frequência, cache stale menos crítico aqui)
-            _valores_tuss_corr = (
-                valores_tuss_preloaded if valores_tuss_preloaded
-                else _carregar_valores_tuss()
-            )
-            _desc_lookup_corr  = _construir_desc_por_tuss_code(tabela_tuss)
-            df_final = _enriquecer_com_valores_tuss(df_final, _valores_tuss_corr, _desc_lookup_corr)
-            logger.info("Enriquecimento TUSS concluído")
-        except Exception as _e_enr:
-            logger.warning(f"Enriquecimento TUSS ignorado: {_e_enr}", exc_info=True)
-
-        if "Data_PRODUCAO" in df_final.columns:
-            df_final["_sort_date"] = df_final.apply(
-                lambda r: r["Data_PRODUCAO"] if r["Data_PRODUCAO"] else r.get("Data_REPASSE", ""),
-                axis=1,
-            )
-            df_final.sort_values("_sort_date", inplace=True)
-            df_final.drop(columns=["_sort_date"], inplace=True)
-
-        return df_final.to_csv(index=False, encoding="utf-8")
+                pecas[i] = futuro.result()
+            except Exception as exc:
+                falhas.append(blocos[i]["rotulo"])
+                logger.error(str(exc))
 
-    except Exception as e:
-        logger.error(f"Erro na correlacao local: {e}", exc_info=True)
-        return ""
+    if falhas:
+        raise RuntimeError(
+            f"{len(falhas)} de {len(blocos)} bloco(s) falharam: {', '.join(falhas)}. "
+            "Os demais ficaram em cache — execute novamente para refazer só os que falharam."
+        )
+    csv_final = _consolidar_blocos(pecas)
+    logger.info(f"Map-reduce: {len(blocos)} bloco(s) consolidados")
+    return csv_final
 
 
 # =============================================================================
-# CONFIGURAÇÃO DO LLM
+# CORRELAÇÃO HÍBRIDA (LOCAL + LLM SÓ NO RESÍDUO)
 # =============================================================================
+# O motor local resolve a maior parte das linhas; só o que sobra como
+# NAO_FATURADO_NO_REPASSE / REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO vai para o
+# Correlacionador, em janelas de pacientes e datas próximas. O agente apenas
+# indica pares (P<n>, R<n>) entre as linhas enviadas; a fusão no resultado
+# (colunas _REPASSE, status, TUSS) é feita aqui, com as mesmas regras do local.
+
+METODO_MATCH_LLM = "6_LLM_ADJUDICACAO_RESIDUO"
+
+_HIBRIDO_JANELA_DIAS   = int(os.getenv("HIBRIDO_JANELA_DIAS", "7"))
+_HIBRIDO_LINHAS_JANELA = int(os.getenv("HIBRIDO_LINHAS_JANELA", "40"))
+
+_COLS_ADJ_PRODUCAO = ["Data", "Paciente", "NrAtendimento", "Convenio", "Procedimento", "ProcedimentosAdicionais"]
+_COLS_ADJ_REPASSE  = ["Data", "Paciente", "NrAtendimento", "Convenio", "Procedimento", "CodigoTUSS", "ValorLiberado"]
+
+ADJUDICACAO_TASK_TEMPLATE = """
+O batimento automático já foi feito. As linhas abaixo ficaram sem correspondência.
+Para cada linha da PRODUCAO, indique a linha do REPASSE que representa o MESMO atendimento
+(mesmo paciente — o nome pode ter erros de digitação, abreviações ou partes faltando —,
+datas próximas e procedimento equivalente), se existir.
+- Cada ID_PRODUCAO e cada ID_REPASSE aparece no máximo uma vez.
+- Na dúvida, não associe.
+- Retorne APENAS o CSV com cabeçalho ID_PRODUCAO,ID_REPASSE (só o cabeçalho se não houver pares).
+=== PRODUCAO ===
+{linhas_producao}
+=== REPASSE ===
+{linhas_repasse}
+"""
+ADJUDICACAO_EXPECTED_OUTPUT = "CSV puro com cabeçalho ID_PRODUCAO,ID_REPASSE e um par por linha."
 
-@st.cache_resource
-def get_llm(provider: str, model_name: str, temperature: float, api_key: str, base_url: str = None) -> LLM:
-    if not api_key:
-        st.error("⚠️ API Key não configurada!")
-        st.stop()
+_RE_PAR_ADJUDICACAO = re.compile(r"\bP(\d+)\s*[,;|\t]\s*R(\d+)\b", re.IGNORECASE)
 
-    model_name = model_name.strip()
-    
-    # Mapeamento de prefixos por provider
-    provider_prefixes = {
-        "Google Gemini": "google/",
-        "OpenAI": "openai/",
-        "Anthropic": "anthropic/",
-        "Groq": "groq/",
-        "Ollama": "ollama/",
-        "Azure OpenAI": "azure/",
-        "AWS Bedrock": "bedrock/",
-        "Cohere": "cohere/",
-        "HuggingFace": "huggingface/",
-        "OpenRouter": "openrouter/",
-        "Mistral AI": "mistral/",
-        "Grok (X.AI)": "xai/",
-    }
-    
-    prefix = provider_prefixes.get(provider, "")
-    
-    # Adiciona prefixo se não existir
-    if prefix and not model_name.startswith(prefix):
-        model_name = f"{prefix}{model_name}"
-    
+
+def _data_ordinal(data: str) -> int | None:
     try:
-        llm_params = {
-            "model": model_name,
-            "api_key": api_key,
-            "temperature": temperature
-        }
-        
-        # Adiciona base_url se fornecido (para Ollama, Azure, etc)
-        if base_url and base_url.strip():
-            llm_params["base_url"] = base_url.strip()
-        
-        return LLM(**llm_params)
-    except Exception as e:
-        st.error(f"Erro ao inicializar o modelo '{model_name}': {e}")
-        st.info(f"Verifique se o nome do modelo e a API Key estão corretos para {provider}")
-        st.stop()
+        return datetime.strptime(str(data).strip(), "%d/%m/%Y").toordinal()
+    except ValueError:
+        return None
 
 
-# =============================================================================
-# CRIAÇÃO DOS AGENTES  ← usam session_state quando disponível
-# =============================================================================
+def montar_janelas_residuo(
+    df_corr: pd.DataFrame,
+    janela_dias: int = _HIBRIDO_JANELA_DIAS,
+    linhas_por_janela: int = _HIBRIDO_LINHAS_JANELA,
+    limiar_token: float = 0.82,
+) -> list[dict]:
+    """
+    Agrupa o resíduo da correlação local em janelas para o Correlacionador.
 
-def create_agents(llm, verbose_mode: bool = False) -> list:
-    cfg = _get_analista_cfg()
-    multiendoscopia_analista = Agent(
-        role=cfg["role"],
-        goal=cfg["goal"],
-        backstory=cfg["backstory"],
-        llm=llm,
-        verbose=verbose_mode,
-        allow_delegation=False,
-    )
-    return [multiendoscopia_analista]
+    Cada linha NAO_FATURADO_NO_REPASSE leva como candidatas as linhas
+    REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO a até `janela_dias` dias com ao menos
+    um token de nome parecido ou o mesmo NrAtendimento; linhas sem candidatas
+    não são enviadas. As linhas da PRODUCAO são ordenadas por data/paciente e
+    fatiadas em janelas de até `linhas_por_janela`.
+
+    Returns:
+        [{"rotulo", "producao": [índices de df_corr], "repasse": [índices de df_corr]}]
+    """
+    status = df_corr["StatusCorrelacao"].astype(str)
+    res_prod = df_corr[status == "NAO_FATURADO_NO_REPASSE"]
+    res_rep  = df_corr[status == "REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO"]
+    if res_prod.empty or res_rep.empty:
+        return []
+
+    rep_por_dia: dict[int, list] = {}
+    for i, data, pac, atend in zip(
+        res_rep.index, res_rep["Data_REPASSE"], res_rep["Paciente_REPASSE"], res_rep["NrAtendimento_REPASSE"],
+    ):
+        dia = _data_ordinal(data)
+        if dia is not None:
+            rep_por_dia.setdefault(dia, []).append((i, _normalizar_nome_paciente(pac), str(atend).strip()))
+
+    cache_tokens: dict = {}
+    candidatos = []
+    for i, data, pac, atend in zip(
+        res_prod.index, res_prod["Data_PRODUCAO"], res_prod["Paciente_PRODUCAO"], res_prod["NrAtendimento_PRODUCAO"],
+    ):
+        dia = _data_ordinal(data)
+        if dia is None:
+            continue
+        atend = str(atend).strip()
+        tokens = _extrair_tokens_nome(pac)
+        reps = [
+            j
+            for d in range(dia - janela_dias, dia + janela_dias + 1)
+            for j, pac_rep, atend_rep in rep_por_dia.get(d, ())
+            if (atend and atend == atend_rep)
+            or (tokens and _tokens_fuzzy_em_comum(tokens, pac_rep, limiar_token, cache_tokens))
+        ]
+        if reps:
+            candidatos.append((dia, _normalizar_nome_paciente(pac), i, reps))
+
+    candidatos.sort(key=lambda c: (c[0], c[1]))
+    janelas = []
+    for k in range(0, len(candidatos), max(1, linhas_por_janela)):
+        grupo = candidatos[k:k + linhas_por_janela]
+        data_ini = df_corr.at[grupo[0][2], "Data_PRODUCAO"]
+        data_fim = df_corr.at[grupo[-1][2], "Data_PRODUCAO"]
+        janelas.append({
+            "rotulo": f"{data_ini}–{data_fim}",
+            "producao": [c[2] for c in grupo],
+            "repasse": list(dict.fromkeys(j for c in grupo for j in c[3])),
+        })
+    return janelas
 
 
-def create_correlator_agent(llm, verbose_mode: bool = False) -> Agent:
-    cfg = _get_correlacionador_cfg()
-    return Agent(
-        role=cfg["role"],
-        goal=cfg["goal"],
-        backstory=cfg["backstory"],
-        llm=llm,
-        verbose=verbose_mode,
-        allow_delegation=False,
+def _linhas_adjudicacao(df_corr: pd.DataFrame, indices: list, prefixo: str, colunas: list[str], sufixo: str) -> str:
+    """CSV compacto das linhas enviadas ao agente, com ID = prefixo + índice em df_corr."""
+    dados = pd.DataFrame(
+        {c: df_corr.loc[indices, f"{c}{sufixo}"] if f"{c}{sufixo}" in df_corr.columns else "" for c in colunas},
+        index=indices,
     )
+    dados.insert(0, "ID", [f"{prefixo}{i}" for i in indices])
+    return dados.to_csv(index=False).strip()
 
 
-def create_correlation_task(correlator_agent: Agent, csvs_por_arquivo: dict) -> Task:
-    cfg = _get_correlacionador_cfg()
-    blocos = "\n\n".join(
-        f"=== ARQUIVO: {fname} ===\n{csv_text}"
-        for fname, csv_text in csvs_por_arquivo.items()
+def _interpretar_adjudicacao(resposta: str, janela: dict) -> list[tuple[int, int]]:
+    """
+    Pares (índice PRODUCAO, índice REPASSE) aceitos da resposta do agente.
+    Descarta IDs fora da janela e repetições; ValueError se a resposta não
+    trouxer nem pares nem o cabeçalho esperado.
+    """
+    pares = [(int(p), int(r)) for p, r in _RE_PAR_ADJUDICACAO.findall(resposta)]
+    if not pares and "ID_PRODUCAO" not in resposta.upper():
+        raise ValueError("resposta sem o CSV ID_PRODUCAO,ID_REPASSE")
+
+    prod_validos, rep_validos = set(janela["producao"]), set(janela["repasse"])
+    aceitos, usados_p, usados_r = [], set(), set()
+    for p, r in pares:
+        if p in prod_validos and r in rep_validos and p not in usados_p and r not in usados_r:
+            aceitos.append((p, r))
+            usados_p.add(p)
+            usados_r.add(r)
+    if len(aceitos) < len(pares):
+        logger.warning(f"Janela {janela['rotulo']}: {len(pares) - len(aceitos)} par(es) inválido(s) descartado(s)")
+    return aceitos
+
+
+def _aplicar_adjudicacoes(
+    df_corr: pd.DataFrame,
+    pares: list[tuple[int, int]],
+    df_repasse: pd.DataFrame,
+    tabela_tuss: dict,
+    valores_tuss: dict,
+) -> pd.DataFrame:
+    """
+    Funde cada par aceito: a linha da PRODUCAO recebe as colunas _REPASSE,
+    status/similaridade como no motor local (sufixo _VIA_LLM) e MetodoMatch =
+    METODO_MATCH_LLM; a linha avulsa do REPASSE é removida. A verificação e o
+    enriquecimento TUSS são refeitos só nas linhas fundidas.
+    """
+    df = df_corr.copy()
+    cols_rep = [c for c in df.columns if c.endswith("_REPASSE")]
+    cache_sim: dict = {}
+    linhas_prod = [p for p, _ in pares]
+
+    for p, r in pares:
+        df.loc[p, cols_rep] = df.loc[r, cols_rep].to_numpy()
+        proc_prod = str(df.at[p, "Procedimento_PRODUCAO"])
+        proc_rep  = str(df.at[p, "Procedimento_REPASSE"])
+        status = _determinar_status_correlacao(_extrair_valor_numerico(df.at[p, "ValorLiberado_REPASSE"]), True)
+        status = f"{status}_VIA_LLM"
+        if _sao_anatomicamente_divergentes(proc_prod, proc_rep):
+            status = f"{status}_PROCEDIMENTO_DIVERGENTE"
+        df.at[p, "StatusCorrelacao"] = status
+        df.at[p, "MetodoMatch"] = METODO_MATCH_LLM
+        df.at[p, "SimilaridadeProcedimento"] = f"{_similaridade_procedimento(proc_prod, proc_rep, cache_sim):.2f}"
+
+    # ── TUSS das linhas fundidas ──────────────────────────────────────────────
+    cols_tuss = ["StatusTUSS", "CodigosTUSS_Esperados", "CodigosTUSS_Ausentes", "DescricaoTUSS", "ValorEstimado_TUSS"]
+    try:
+        linhas = [
+            {k: v for k, v in df.loc[p].items() if k not in cols_tuss}
+            for p in linhas_prod
+        ]
+        if tabela_tuss:
+            df_rep_tuss = _normalizar_nulos_csv(df_repasse)
+            if "Data" in df_rep_tuss.columns:
+                df_rep_tuss["Data"] = _padronizar_datas(df_rep_tuss["Data"])
+            tuss_idx = _construir_indice_tuss_repasse(df_rep_tuss)
+            linhas = verificar_tuss_adicionais(linhas, df_rep_tuss, tabela_tuss, tuss_idx)
+        sub = pd.DataFrame(linhas, index=linhas_prod).fillna("")
+        sub = _enriquecer_com_valores_tuss(sub, valores_tuss, _construir_desc_por_tuss_code(tabela_tuss))
+        for c in cols_tuss:
+            valores = sub[c].to_numpy() if c in sub.columns else [""] * len(linhas_prod)
+            if c not in df.columns:
+                if not any(str(v) for v in valores):
+                    continue
+                df[c] = ""
+            df.loc[linhas_prod, c] = valores
+    except Exception as exc:
+        logger.warning(f"Verificação TUSS das linhas do LLM ignorada: {exc}", exc_info=True)
+
+    return df.drop(index=[r for _, r in pares]).reset_index(drop=True)
+
+
+def correlacionar_hibrido(
+    df_producao: pd.DataFrame,
+    df_repasse: pd.DataFrame,
+    llm,
+    cfg_correlacionador: dict | None = None,
+    cache: CacheRespostasLLM | None = None,
+    verbose_mode: bool = False,
+    max_workers: int = _LLM_BLOCO_WORKERS,
+    tentativas: int = _LLM_BLOCO_TENTATIVAS,
+    janela_dias: int = _HIBRIDO_JANELA_DIAS,
+    linhas_por_janela: int = _HIBRIDO_LINHAS_JANELA,
+    limiar_similaridade: float = 0.65,
+    tabela_tuss_preloaded: dict | None = None,
+    valores_tuss_preloaded: dict | None = None,
+    progresso: Callable[[float, str], None] | None = None,
+) -> tuple[pd.DataFrame | None, dict]:
+    """
+    correlacionar_dataframes + Correlacionador (LLM) apenas no resíduo.
+
+    Janelas cujo agente falha após as tentativas mantêm o resultado local.
+    `cfg_correlacionador` deve ser lido na thread principal quando a chamada
+    acontece fora dela. `progresso` recebe a etapa local em 0-70% e as
+    janelas concluídas em 70-100%.
+
+    Returns:
+        (DataFrame no formato de correlacionar_dataframes ou None, resumo) —
+        resumo com residuo_producao, residuo_repasse, janelas, linhas_enviadas,
+        linhas_totais, pares_llm e janelas_com_erro.
+    """
+    resumo = {
+        "residuo_producao": 0, "residuo_repasse": 0, "janelas": 0, "linhas_enviadas": 0,
+        "linhas_totais": len(df_producao) + len(df_repasse), "pares_llm": 0, "janelas_com_erro": 0,
+    }
+    def _reportar(fracao: float, mensagem: str) -> None:
+        if progresso is not None:
+            progresso(fracao, mensagem)
+
+    df_corr = correlacionar_dataframes(
+        df_producao, df_repasse, limiar_similaridade, tabela_tuss_preloaded, valores_tuss_preloaded,
+        progresso=lambda fracao, mensagem: _reportar(0.7 * fracao, f"Local — {mensagem}"),
     )
-    description = cfg["task_description_template"].replace("{blocos}", blocos)
-    return Task(
-        description=description,
-        expected_output=cfg["task_expected_output"],
-        agent=correlator_agent,
+    if df_corr is None or df_corr.empty:
+        return df_corr, resumo
+
+    status = df_corr["StatusCorrelacao"].astype(str)
+    resumo["residuo_producao"] = int((status == "NAO_FATURADO_NO_REPASSE").sum())
+    resumo["residuo_repasse"]  = int((status == "REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO").sum())
+
+    janelas = montar_janelas_residuo(df_corr, janela_dias, linhas_por_janela)
+    resumo["janelas"] = len(janelas)
+    resumo["linhas_enviadas"] = sum(len(j["producao"]) + len(j["repasse"]) for j in janelas)
+    logger.info(
+        f"Híbrido: resíduo {resumo['residuo_producao']} PRODUCAO / {resumo['residuo_repasse']} REPASSE → "
+        f"{len(janelas)} janela(s), {resumo['linhas_enviadas']} de {resumo['linhas_totais']} linhas para o LLM"
     )
+    if not janelas:
+        return df_corr, resumo
+
+    from crewai import Crew, Process, Task
+
+    cfg = cfg_correlacionador or _get_correlacionador_cfg()
+    blocos = []
+    for janela in janelas:
+        agente = create_correlator_agent(llm, verbose_mode, cfg)
+        descricao = (
+            ADJUDICACAO_TASK_TEMPLATE
+            .replace("{linhas_producao}", _linhas_adjudicacao(df_corr, janela["producao"], "P", _COLS_ADJ_PRODUCAO, "_PRODUCAO"))
+            .replace("{linhas_repasse}", _linhas_adjudicacao(df_corr, janela["repasse"], "R", _COLS_ADJ_REPASSE, "_REPASSE"))
+        )
+        crew = Crew(
+            agents=[agente],
+            tasks=[Task(description=descricao, expected_output=ADJUDICACAO_EXPECTED_OUTPUT, agent=agente)],
+            process=Process.sequential,
+            verbose=verbose_mode,
+        )
+        blocos.append({"rotulo": janela["rotulo"], "crew": crew, "chave": chave_cache_crew(crew, cfg), "janela": janela})
+
+    pares: list[tuple[int, int]] = []
+    usados_r: set = set()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="janela") as pool:
+        futuros = [
+            submeter_no_contexto(
+                pool, _executar_bloco_llm, bloco, cache, tentativas,
+                functools.partial(_interpretar_adjudicacao, janela=bloco["janela"]),
+            )
+            for bloco in blocos
+        ]
+        _reportar(0.7, f"Correlacionador: 0/{len(blocos)} janela(s)")
+        for n_janela, (bloco, futuro) in enumerate(zip(blocos, futuros), start=1):
+            try:
+                pares_janela = futuro.result()
+            except Exception as exc:
+                resumo["janelas_com_erro"] += 1
+                logger.warning(f"Janela {bloco['rotulo']} mantém o resultado local: {exc}")
+                pares_janela = []
+            # Uma linha do REPASSE pode ser candidata em duas janelas: vale o primeiro par
+            for p, r in pares_janela:
+                if r not in usados_r:
+                    usados_r.add(r)
+                    pares.append((p, r))
+            _reportar(
+                0.7 + 0.3 * n_janela / len(blocos),
+                f"Correlacionador: {n_janela}/{len(blocos)} janela(s) · {len(pares)} par(es)",
+            )
+
+    resumo["pares_llm"] = len(pares)
+    logger.info(f"Híbrido: {len(pares)} par(es) adjudicado(s) pelo LLM")
+    if not pares:
+        return df_corr, resumo
+
+    tabela_tuss  = tabela_tuss_preloaded or _carregar_tabela_tuss()
+    valores_tuss = valores_tuss_preloaded or _carregar_valores_tuss()
+    return _aplicar_adjudicacoes(df_corr, pares, df_repasse, tabela_tuss, valores_tuss), resumo
 
 
 # =============================================================================
-# UTILITÁRIOS DE CSV
+# FILA PERSISTENTE DE JOBS (SEGUNDO PLANO)
 # =============================================================================
+#
+# A fila e o worker ficam em motor.jobs; aqui a interface submete, sobe os
+# workers (`python -m motor.jobs <dir>`, sem Streamlit) e acompanha os jobs.
+# Os modos LLM continuam síncronos: levariam a API key para o disco.
 
-COLUNAS_ESPERADAS = [
-    "Data", "NrAtendProducao", "NrAtendRepasse", "Paciente", "Convenio",
-    "Procedimento", "CodigoTUSS", "MedicoExecutor",
-    "QtProcedimento", "ValorLiberado", "StatusCorrelacao", "Observacao",
-]
+_JOBS_DIR = Path(os.getenv("JOBS_DIR", str(Path(__file__).parent / "jobs")))
+_JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "1"))
+# Intervalo de consulta da fila pelo painel da interface
+_JOBS_POLL_UI_S = 2.0
 
 
-def extrair_csv_do_texto(texto: str) -> str:
-    match = re.search(r"```(?:csv)?\s*\n(.*?)```", texto, re.DOTALL | re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    linhas_csv = [
-        linha for linha in texto.splitlines()
-        if linha.count(",") >= 4 or linha.startswith("Data,")
-    ]
-    return "\n".join(linhas_csv).strip()
+@st.cache_resource
+def obter_fila_jobs() -> FilaJobs | None:
+    """Instância única por processo; cai para /tmp se o diretório do app não for gravável."""
+    for diretorio in (_JOBS_DIR, Path("/tmp/endoscopia_jobs")):
+        try:
+            return FilaJobs(diretorio)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Fila de jobs indisponível em {diretorio}: {e}")
+    return None
 
 
-def separar_resumo_do_csv(texto_csv: str) -> tuple[str, str]:
-    marcador = "# RESUMO_DIVERGENCIAS_POR_CONVENIO"
-    if marcador in texto_csv:
-        partes = texto_csv.split(marcador, 1)
-        return partes[0].strip(), partes[1].strip()
-    return texto_csv.strip(), ""
+# Processos iniciados por este servidor (poll() recolhe os que já saíram)
+_PROCESSOS_WORKER: list[subprocess.Popen] = []
+_PROCESSOS_WORKER_LOCK = threading.Lock()
+
+
+def garantir_workers_jobs(fila: FilaJobs, n_workers: int = _JOBS_WORKERS) -> None:
+    """Sobe processos worker até haver `n_workers` vivos atendendo a fila."""
+    with _PROCESSOS_WORKER_LOCK:
+        _PROCESSOS_WORKER[:] = [p for p in _PROCESSOS_WORKER if p.poll() is None]
+        faltam = n_workers - fila.workers_vivos()
+        for _ in range(max(0, faltam)):
+            # Registrado já aqui (com batimento) para que a próxima verificação não suba outro
+            worker_id = uuid.uuid4().hex
+            fila.registrar_worker(worker_id)
+            processo = subprocess.Popen(
+                [
+                    sys.executable, "-m", "motor.jobs", str(fila.diretorio), "--id", worker_id,
+                    "--log", str((log_dir / "crew_logs.log").resolve()),
+                ],
+                cwd=str(Path(__file__).parent),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                # Sessão própria: o worker não recebe o Ctrl+C/SIGTERM do servidor Streamlit
+                start_new_session=True,
+            )
+            _PROCESSOS_WORKER.append(processo)
+            logger.info(f"Worker de jobs {worker_id[:8]} iniciado (pid {processo.pid})")
 
 
-def texto_para_dataframe(csv_texto: str) -> pd.DataFrame | None:
-    try:
-        csv_limpo = extrair_csv_do_texto(csv_texto)
-        csv_dados, _ = separar_resumo_do_csv(csv_limpo)
-        df = pd.read_csv(io.StringIO(csv_dados), sep=",", dtype=str)
-        df.columns = [c.strip() for c in df.columns]
-        return df
-    except Exception as e:
-        logger.warning(f"Falha ao converter CSV para DataFrame: {e}")
+def _dono_jobs() -> str:
+    """Token desta sessão: dono dos jobs que ela submete (a fila é compartilhada entre sessões)."""
+    return st.session_state.setdefault("dono_jobs", uuid.uuid4().hex)
+
+
+def submeter_job(tipo: str, entrada: dict, rotulo: str) -> str | None:
+    """Enfileira o job, garante os workers e guarda o id para aplicar o resultado nesta sessão."""
+    fila = obter_fila_jobs()
+    if fila is None:
+        st.error("❌ Fila de jobs indisponível — verifique as permissões do diretório JOBS_DIR.")
         return None
+    job_id = fila.submeter(tipo, entrada, _dono_jobs(), rotulo)
+    garantir_workers_jobs(fila)
+    st.session_state.setdefault("jobs_aguardando", {})[tipo] = job_id
+    return job_id
 
 
-# =============================================================================
-# CRIAÇÃO DAS TASKS  ← usa session_state quando disponível
-# =============================================================================
+_ICONES_ESTADO_JOB = {JOB_PENDENTE: "⏳", JOB_EXECUTANDO: "⚙️", JOB_CONCLUIDO: "✅", JOB_ERRO: "❌"}
 
-def create_tasks(agents: list, conteudo_arquivo: str) -> list:
-    cfg = _get_analista_cfg()
-    description = cfg["task_description_template"].replace("{conteudo_arquivo}", conteudo_arquivo)
-    task_analise = Task(
-        description=description,
-        expected_output=cfg["task_expected_output"],
-        agent=agents[0],
-    )
-    return [task_analise]
+
+@st.fragment(run_every=_JOBS_POLL_UI_S)
+def render_jobs_segundo_plano(tipo: str, aplicar) -> None:
+    """
+    Painel dos jobs `tipo` desta sessão (recarregado a cada _JOBS_POLL_UI_S s).
+    O job submetido nesta sessão é aplicado automaticamente ao concluir; os
+    demais concluídos podem ser carregados pelo botão. Job de outra sessão
+    (ex.: aba fechada) só entra no painel informando o id completo.
+    `aplicar(resultado)` grava o resultado no session_state.
+    """
+    fila = obter_fila_jobs()
+    if fila is None:
+        return
+    dono = _dono_jobs()
+    jobs = fila.listar(dono, tipo)
+
+    aguardando = st.session_state.get("jobs_aguardando", {}).get(tipo)
+    ativos = [j for j in jobs if j["estado"] in _ESTADOS_JOB_ATIVOS]
+    if ativos:
+        garantir_workers_jobs(fila)
+
+    with st.expander(f"📥 Jobs em segundo plano ({len(ativos)} ativo(s))", expanded=bool(ativos) or bool(aguardando)):
+        with st.form(f"job_recuperar_{tipo}", clear_on_submit=True, border=False):
+            col_id, col_ok = st.columns([4, 1], vertical_alignment="bottom")
+            job_id = col_id.text_input(
+                "🔑 Recuperar job de outra sessão pelo id",
+                placeholder="id completo informado ao enfileirar",
+            ).strip().lower()
+            if col_ok.form_submit_button("Recuperar") and job_id:
+                if fila.assumir(job_id, tipo, dono):
+                    st.rerun()
+                st.warning("Nenhum job com esse id.")
+        for job in jobs:
+            quando = datetime.fromtimestamp(job["criado_em"]).strftime("%d/%m %H:%M:%S")
+            st.markdown(
+                f"{_ICONES_ESTADO_JOB.get(job['estado'], '•')} `{job['id']}` · {job['rotulo']} · {quando}"
+            )
+            if job["estado"] in _ESTADOS_JOB_ATIVOS:
+                st.progress(job["progresso"], text=job["mensagem"] or "Aguardando um worker livre...")
+            elif job["estado"] == JOB_ERRO:
+                st.error(f"Erro: {job['erro']}")
+            else:
+                if job["mensagem"]:
+                    st.caption(job["mensagem"])
+                col_carregar, col_remover = st.columns(2)
+                if job["id"] == aguardando or col_carregar.button(
+                    "📥 Carregar resultado", key=f"job_carregar_{job['id']}"
+                ):
+                    aplicar(fila.carregar_resultado(job["id"], dono))
+                    st.session_state.get("jobs_aguardando", {}).pop(tipo, None)
+                    st.rerun()
+                if col_remover.button("🗑️ Remover", key=f"job_remover_{job['id']}"):
+                    fila.remover(job["id"], dono)
+                    st.rerun()
 
 
 # =============================================================================
@@ -3664,6 +2450,20 @@ def main():
                  "Desativado: apenas o resultado final (mais econômico).",
         )
 
+        usar_cache_llm = st.toggle(
+            "♻️ Cache de respostas do LLM",
+            value=True,
+            help="Reaproveita a resposta gravada quando o mesmo arquivo é reenviado ao agente "
+                 "com a mesma configuração, modelo e temperatura (sem gastar tokens).",
+        )
+
+        usar_streaming = st.toggle(
+            "📡 Streaming de tokens",
+            value=True,
+            help="Mostra o texto do agente enquanto ele é gerado, com contagem de linhas "
+                 "e prévia do CSV, em vez de esperar o kickoff terminar.",
+        )
+
         st.divider()
         st.header("👥 Agentes Disponíveis")
 
@@ -3682,6 +2482,24 @@ def main():
 - **REPASSE**: planilha emitida pelo hospital com valores faturados e pagos pelos convênios
         """)
 
+        st.divider()
+        with st.expander("🧠 Memória da sessão"):
+            # Sob demanda: memory_usage(deep=True) percorre todas as células de texto
+            if st.button("📏 Medir", key="btn_memoria_sessao"):
+                _rel_mem = relatorio_memoria_sessao()
+                st.dataframe(_rel_mem, hide_index=True, use_container_width=True)
+                _rss = _rss_processo_bytes()
+                st.caption(
+                    f"Sessão: {_rel_mem['MB'].sum():,.1f} MB"
+                    + (f" · processo (todas as sessões): {_rss / 1024 / 1024:,.0f} MB" if _rss else "")
+                )
+                if "corr_memoria" in st.session_state:
+                    _mem_txt, _mem_tip = st.session_state["corr_memoria"]
+                    st.caption(
+                        f"Correlação tipada: {_mem_tip / 1024 / 1024:,.1f} MB "
+                        f"(como texto: {_mem_txt / 1024 / 1024:,.1f} MB)"
+                    )
+
     # ── Tabs ──────────────────────────────────────────────────────────────────
     tab1, tab2, tab3, tab4, tab_cobranca, tab_agents = st.tabs([
         "📄 Input",
@@ -3728,17 +2546,32 @@ def main():
 
         if uploaded_files:
             st.divider()
-            _novos = [f for f in uploaded_files
-                      if f"extract_{f.name}_{f.size}" not in st.session_state]
+
+            def _extrair(file) -> dict:
+                if file.name.rsplit(".", 1)[-1].lower() in ("xlsx", "xls"):
+                    # Excel: abas seguem como DataFrame; o texto é só preview/LLM
+                    _tempos: list = []
+                    _abas = ler_abas_excel(file, tempos=_tempos)
+                    return {
+                        "content": abas_para_texto(_abas) if _abas else None,
+                        "abas": _abas,
+                        "tempos": _tempos,
+                    }
+                return {"content": extract_text_from_file(file), "abas": None, "tempos": None}
+
+            # Extração em cache pelo digest do conteúdo: reenviar um arquivo
+            # corrigido com o mesmo nome (e até o mesmo tamanho) extrai de novo
+            _cache = cache_sessao()
+            _arquivos = [(file, digest_conteudo(file.getvalue())) for file in uploaded_files]
+            _novos = [(f, d) for f, d in _arquivos if not _cache.contem("upload", d, f.name)]
             if _novos:
                 with st.spinner(f"📖 Extraindo dados de {len(_novos)} arquivo(s)..."):
-                    for file in _novos:
-                        _ck = f"extract_{file.name}_{file.size}"
-                        st.session_state[_ck] = extract_text_from_file(file)
-            for file in uploaded_files:
-                _txt = st.session_state.get(f"extract_{file.name}_{file.size}")
-                if _txt:
-                    extratos_texto.append({"filename": file.name, "content": _txt})
+                    for file, _digest in _novos:
+                        _cache.obter("upload", _digest, file.name, criar=lambda: _extrair(file))
+            for file, _digest in _arquivos:
+                _extraido = _cache.obter("upload", _digest, file.name, criar=lambda: _extrair(file))
+                if _extraido["content"]:
+                    extratos_texto.append({"filename": file.name, **_extraido})
 
             st.success(f"✅ {len(extratos_texto)} arquivo(s) processado(s)")
             st.session_state["extratos"] = extratos_texto
@@ -3754,6 +2587,14 @@ def main():
                     c1.metric("Caracteres", len(text))
                     c2.metric("Palavras", len(text.split()))
                     c3.metric("Linhas", len(text.splitlines()))
+
+                    if doc.get("tempos"):
+                        _df_tempos = pd.DataFrame(doc["tempos"])
+                        st.caption(
+                            f"⏱️ Leitura Excel ({_engine_excel(doc['filename'].rsplit('.', 1)[-1].lower())}): "
+                            f"{_df_tempos['Segundos'].sum():.2f}s em {len(_df_tempos) - 1} aba(s)"
+                        )
+                        st.dataframe(_df_tempos, use_container_width=True, hide_index=True)
                     
                     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
                     nome_sem_ext = os.path.splitext(doc["filename"])[0]
@@ -3785,7 +2626,7 @@ def main():
             index=0,
             horizontal=True,
             help=(
-                "**Transformação Local**: usa a função `transformar_csv_arquivo` diretamente, "
+                "**Transformação Local**: usa a função `transformar_abas_arquivo` diretamente, "
                 "sem consumir tokens nem precisar de API Key. Recomendado para arquivos "
                 "Excel/CSV nos formatos padrão PRODUCAO e REPASSE.\n\n"
                 f"**Agente IA ({provider})**: usa o agente CrewAI com o modelo configurado "
@@ -3794,6 +2635,8 @@ def main():
         )
 
         usa_llm = modo_execucao.startswith("🤖")
+        if usa_llm:
+            precarregar_crewai()
 
         # Descrição contextual do modo selecionado
         if usa_llm:
@@ -3805,11 +2648,79 @@ def main():
                 st.warning("⚠️ Preencha a **API Key** na sidebar para usar este modo.")
         else:
             st.info(
-                "🔄 **Modo Local ativo** — A função `transformar_csv_arquivo` será chamada diretamente, "
+                "🔄 **Modo Local ativo** — A função `transformar_abas_arquivo` será chamada diretamente, "
                 "sem uso de IA. Mais rápido e sem custo de tokens. "
                 "Ideal para arquivos Excel nos formatos padrão PRODUCAO e REPASSE."
             )
 
+        # ── Concorrência entre arquivos ──────────────────────────────────────
+        col_par, col_rpm = st.columns(2)
+        max_paralelo = col_par.number_input(
+            "📂 Arquivos em paralelo",
+            min_value=1,
+            max_value=8,
+            value=min(3, max(1, len(extratos))),
+            help="Quantos arquivos são processados ao mesmo tempo.",
+        )
+        limite_rpm = col_rpm.number_input(
+            "⏱️ Limite global de chamadas LLM por minuto",
+            min_value=0,
+            max_value=1000,
+            value=30,
+            disabled=not usa_llm,
+            help=(
+                "Teto compartilhado por todos os arquivos (e sessões) que usam o mesmo "
+                "modelo, para não estourar a cota do provedor. 0 = sem limite."
+            ),
+        )
+
+        # ── Map-reduce por blocos (modo LLM) ─────────────────────────────────
+        usar_blocos = False
+        if usa_llm:
+            usar_blocos = st.toggle(
+                "🧩 Dividir arquivos em blocos (map-reduce)",
+                value=False,
+                help=(
+                    "Divide cada arquivo por aba e em janelas de linhas (cabeçalho repetido), "
+                    "envia os blocos ao Analista em paralelo e une os CSVs parciais. Evita "
+                    "estourar a janela de contexto em planilhas grandes; um bloco com erro é "
+                    "refeito sozinho."
+                ),
+            )
+            if usar_blocos:
+                col_lin, col_blk = st.columns(2)
+                linhas_por_bloco = col_lin.number_input(
+                    "📏 Linhas por bloco",
+                    min_value=10,
+                    max_value=5000,
+                    value=_LLM_BLOCO_LINHAS,
+                    step=10,
+                )
+                blocos_paralelo = col_blk.number_input(
+                    "🧵 Blocos em paralelo por arquivo",
+                    min_value=1,
+                    max_value=16,
+                    value=_LLM_BLOCO_WORKERS,
+                )
+
+        # ── Fila persistente (modo local) ────────────────────────────────────
+        exec_em_segundo_plano = False
+        if not usa_llm:
+            exec_em_segundo_plano = st.toggle(
+                "📥 Executar em segundo plano",
+                value=False,
+                key="exec_segundo_plano",
+                help=(
+                    "Envia a transformação para a fila de jobs atendida por um processo separado. "
+                    "Dá para fechar a aba e voltar depois: o resultado fica salvo em disco."
+                ),
+            )
+
+        cache_llm = obter_cache_llm() if usar_cache_llm else None
+        if usa_llm and cache_llm is not None:
+            with st.expander("♻️ Cache de respostas do LLM", expanded=False):
+                render_metricas_cache_llm(cache_llm, "execucao")
+
         st.divider()
 
         btn_label = f"🚀 Iniciar Análise com {provider}" if usa_llm else "🔄 Iniciar Transformação Local"
@@ -3818,157 +2729,116 @@ def main():
         if st.button(btn_label, type="primary", disabled=btn_disabled):
 
             resultados = {}
-            progress_bar = st.progress(0, text="Aguardando início...")
-
-            # ── MODO LOCAL: transformar_csv_arquivo ───────────────────────────
-            if not usa_llm:
-                for i, doc in enumerate(extratos):
-                    filename = doc["filename"]
-                    text = doc["content"]
-                    total = len(extratos)
-
-                    progress_bar.progress(
-                        i / total,
-                        text=f"📂 Processando arquivo {i + 1} de {total}: **{filename}**",
+            dfs_resultados: dict[str, pd.DataFrame] = {}
+
+            # ── MODO LOCAL EM SEGUNDO PLANO: fila de jobs ────────────────────────
+            if not usa_llm and exec_em_segundo_plano:
+                job_id = submeter_job(
+                    "transformacao_local",
+                    {"extratos": extratos},
+                    ", ".join(doc["filename"] for doc in extratos),
+                )
+                if job_id:
+                    st.success(
+                        f"📥 Job `{job_id}` enfileirado. O resultado é carregado automaticamente "
+                        "ao concluir — ou depois, pela lista de jobs abaixo. Guarde o id para "
+                        "recuperar o resultado em outra sessão."
                     )
 
-                    with st.status(f"🔄 Transformando: {filename}", expanded=True) as status_box:
-                        try:
-                            csv_resultado = transformar_csv_arquivo(text, filename)
-                            if csv_resultado:
-                                resultados[filename] = csv_resultado
-                                status_box.update(
-                                    label=f"✅ Concluído: {filename}",
-                                    state="complete",
-                                    expanded=False,
-                                )
-                            else:
-                                status_box.update(
-                                    label=f"⚠️ Sem dados: {filename}",
-                                    state="error",
-                                    expanded=True,
-                                )
-                                st.warning(
-                                    f"Nenhum dado extraído de **{filename}**. "
-                                    "Verifique se o arquivo está no formato padrão PRODUCAO ou REPASSE."
-                                )
-                        except Exception as exc:
-                            status_box.update(
-                                label=f"❌ Erro em {filename}", state="error", expanded=True
-                            )
-                            st.error(f"Erro ao transformar **{filename}**: {exc}")
-                            logger.error(
-                                f"Erro em transformar_csv_arquivo({filename}): {exc}", exc_info=True
-                            )
+            # ── MODO LOCAL: transformar_abas_arquivo / transformar_texto_arquivo ──
+            elif not usa_llm:
 
-                    progress_bar.progress(
-                        (i + 1) / total,
-                        text=f"✅ {i + 1} de {total} arquivos concluídos",
+                def _transformar(doc: dict) -> pd.DataFrame:
+                    df_resultado = (
+                        transformar_abas_arquivo(doc["abas"], doc["filename"]) if doc.get("abas")
+                        else transformar_texto_arquivo(doc["content"], doc["filename"])
                     )
+                    if df_resultado is None:
+                        raise ValueError(
+                            f"Nenhum dado extraído de {doc['filename']}. "
+                            "Verifique se o arquivo está no formato padrão PRODUCAO ou REPASSE."
+                        )
+                    return df_resultado
 
-                st.session_state["results"] = resultados
-                # No modo local o CSV já vem puro — não precisa de extração adicional
-                st.session_state["csvs_brutos"] = dict(resultados)
+                execucao = executar_arquivos_concorrentes(
+                    extratos, _transformar, int(max_paralelo), rotulo="🔄 Transformando",
+                )
+                for filename, res in execucao.items():
+                    if res["error"] is None:
+                        dfs_resultados[filename] = res["value"]
+
+                _registrar_transformacao(dfs_resultados)
                 st.success(
                     "🎉 Transformação concluída! Veja os resultados na aba **📊 Resultados** "
                     "ou inicie a correlação na aba **🔀 Correlação**."
                 )
+                for _nome_dif, _resumo_dif in st.session_state["diferencas_upload"].items():
+                    st.info(f"🔁 **{_nome_dif}** — desde o upload anterior: {_texto_diferenca(_resumo_dif)}")
 
             # ── MODO LLM: CrewAI + LLM selecionado ───────────────────────────────
             else:
-                llm = get_llm(provider, custom_model, temperature, api_key, base_url)
-                agents = create_agents(llm, verbose_mode)
-
-                for i, doc in enumerate(extratos):
-                    filename = doc["filename"]
-                    text = doc["content"]
-                    total = len(extratos)
-
-                    progress_bar.progress(
-                        i / total,
-                        text=f"📂 Processando arquivo {i + 1} de {total}: **{filename}**",
+                from crewai import Crew, Process
+
+                llm = get_llm(provider, custom_model, temperature, api_key, base_url, usar_streaming)
+                aplicar_limite_taxa(llm, obter_limitador(llm.model, int(limite_rpm)))
+
+                # Agentes, tasks e chaves de cache são montados aqui (lendo o
+                # session_state na thread principal); cada arquivo recebe instâncias próprias.
+                cfg_analista = _get_analista_cfg()
+                crews_por_arquivo = {}
+                for doc in extratos:
+                    if usar_blocos:
+                        crews_por_arquivo[doc["filename"]] = preparar_blocos_llm(
+                            llm, doc["content"], doc["filename"], int(linhas_por_bloco), verbose_mode,
+                        )
+                        continue
+                    agents = create_agents(llm, verbose_mode)
+                    crew = Crew(
+                        agents=agents,
+                        tasks=create_tasks(agents, doc["content"]),
+                        process=Process.sequential,
+                        verbose=verbose_mode,
                     )
+                    crews_por_arquivo[doc["filename"]] = (crew, chave_cache_crew(crew, cfg_analista))
 
-                    with st.status(
-                        f"🤖 Agente trabalhando em: {filename}", expanded=True
-                    ) as status_box:
-
-                        st.markdown("##### 📡 Log de Execução em Tempo Real")
-                        log_container = st.container(height=380, border=False)
-
-                        log_queue: queue.Queue = queue.Queue(maxsize=500)
-                        handler = StreamlitLogHandler(log_queue)
-                        handler.setFormatter(
-                            logging.Formatter("%(asctime)s | %(name)s | %(message)s",
-                                              datefmt="%H:%M:%S")
+                def _run_crew(doc: dict) -> str:
+                    if usar_blocos:
+                        return executar_blocos_llm(
+                            crews_por_arquivo[doc["filename"]], cache_llm, int(blocos_paralelo),
                         )
-                        root_logger = logging.getLogger()
-                        root_logger.addHandler(handler)
-
-                        thread_result: dict = {"value": None, "error": None}
-
-                        def _run_crew(result_holder: dict, _text=text):
-                            try:
-                                tasks = create_tasks(agents, _text)
-                                crew = Crew(
-                                    agents=agents,
-                                    tasks=tasks,
-                                    process=Process.sequential,
-                                    verbose=verbose_mode,
-                                )
-                                result_holder["value"] = str(crew.kickoff())
-                            except Exception as exc:
-                                result_holder["error"] = exc
-                                logger.error(f"Erro durante kickoff: {exc}", exc_info=True)
+                    crew, chave = crews_por_arquivo[doc["filename"]]
+                    return kickoff_com_cache(crew, chave, cache_llm)
 
-                        crew_thread = threading.Thread(
-                            target=_run_crew,
-                            args=(thread_result,),
-                            daemon=True,
+                if usar_streaming:
+                    with ReceptorTokensStream() as receptor:
+                        execucao = executar_arquivos_concorrentes(
+                            extratos, _run_crew, int(max_paralelo), receptor_tokens=receptor,
                         )
-                        crew_thread.start()
-
-                        while crew_thread.is_alive():
-                            drained = False
-                            while not log_queue.empty():
-                                line = log_queue.get_nowait()
-                                render_log_line(line, log_container)
-                                drained = True
-                            if not drained:
-                                time.sleep(0.15)
-
-                        while not log_queue.empty():
-                            render_log_line(log_queue.get_nowait(), log_container)
-
-                        crew_thread.join()
-                        root_logger.removeHandler(handler)
-
-                        if thread_result["error"]:
-                            status_box.update(
-                                label=f"❌ Erro em {filename}", state="error", expanded=True
-                            )
-                            st.error(f"Erro: {thread_result['error']}")
-                        else:
-                            resultados[filename] = thread_result["value"]
-                            status_box.update(
-                                label=f"✅ Concluído: {filename}", state="complete", expanded=False
-                            )
-
-                    progress_bar.progress(
-                        (i + 1) / total,
-                        text=f"✅ {i + 1} de {total} arquivos concluídos",
-                    )
+                else:
+                    execucao = executar_arquivos_concorrentes(extratos, _run_crew, int(max_paralelo))
+                for filename, res in execucao.items():
+                    if res["error"] is None:
+                        resultados[filename] = res["value"]
 
                 st.session_state["results"] = resultados
-                st.session_state["csvs_brutos"] = {
-                    fname: extrair_csv_do_texto(txt)
-                    for fname, txt in resultados.items()
-                }
+                # Fronteira LLM: o texto devolvido pelo agente é lido uma única vez
+                for fname, txt in resultados.items():
+                    _df_llm = _csv_para_df(extrair_csv_do_texto(txt))
+                    if _df_llm is not None:
+                        dfs_resultados[fname] = _df_llm
+                st.session_state["dfs_transformados"] = dfs_resultados
+                # Diferença entre uploads só compara saídas do modo local entre si
+                st.session_state["origem_transformados"] = "llm"
+                st.session_state.pop("diferencas_upload", None)
                 st.success(
                     "🎉 Análise concluída! Veja os resultados na aba **📊 Resultados** "
                     "ou inicie a correlação na aba **🔀 Correlação**."
                 )
 
+        render_jobs_segundo_plano(
+            "transformacao_local", lambda resultado: _registrar_transformacao(resultado["dfs"])
+        )
+
     # ── TAB 3: RESULTADOS ─────────────────────────────────────────────────────
     with tab3:
         st.header("📊 Resultados por Arquivo")
@@ -4008,59 +2878,53 @@ def main():
             "Identifica glosas, divergências de valor e procedimentos não faturados."
         )
 
-        csvs_brutos = st.session_state.get("csvs_brutos", {})
+        render_jobs_segundo_plano("correlacao_local", _registrar_correlacao_local)
 
-        if not csvs_brutos:
+        dfs_transformados = st.session_state.get("dfs_transformados", {})
+
+        if not dfs_transformados:
             st.info("⬅️ Primeiro processe os arquivos na aba **🚀 Execução**.")
         else:
             # Identifica arquivos PRODUCAO e REPASSE
-            csv_producao = None
-            csv_repasse = None
+            df_producao = None
+            df_repasse = None
             nome_producao = ""
             nome_repasse = ""
             
-            for fname, csv_txt in csvs_brutos.items():
-                # Detecta tipo pelo conteúdo
-                if "TipoArquivo" in csv_txt:
-                    linhas = csv_txt.split("\n")
-                    if len(linhas) > 1:
-                        # Verifica primeira linha de dados
-                        if "PRODUCAO" in linhas[1]:
-                            csv_producao = csv_txt
-                            nome_producao = fname
-                        elif "REPASSE" in linhas[1]:
-                            csv_repasse = csv_txt
-                            nome_repasse = fname
+            for fname, df_arq in dfs_transformados.items():
+                # Detecta tipo pelo conteúdo (TipoArquivo da primeira linha de dados)
+                if "TipoArquivo" in df_arq.columns and len(df_arq) > 0:
+                    tipo_arq = str(df_arq["TipoArquivo"].iloc[0]).upper()
+                    if "PRODUCAO" in tipo_arq:
+                        df_producao = df_arq
+                        nome_producao = fname
+                    elif "REPASSE" in tipo_arq:
+                        df_repasse = df_arq
+                        nome_repasse = fname
             
             # Mostra preview dos arquivos identificados
             col_prev1, col_prev2 = st.columns(2)
             with col_prev1:
-                if csv_producao:
+                if df_producao is not None:
                     st.success(f"✅ PRODUCAO: {nome_producao}")
+                    render_diferenca_upload(nome_producao)
                 else:
                     st.warning("⚠️ Arquivo PRODUCAO não identificado")
             with col_prev2:
-                if csv_repasse:
+                if df_repasse is not None:
                     st.success(f"✅ REPASSE: {nome_repasse}")
+                    render_diferenca_upload(nome_repasse)
                 else:
                     st.warning("⚠️ Arquivo REPASSE não identificado")
             
-            if not csv_producao or not csv_repasse:
+            if df_producao is None or df_repasse is None:
                 st.error(
                     "❌ É necessário ter exatamente 1 arquivo PRODUCAO e 1 arquivo REPASSE processados. "
                     "Verifique se os arquivos foram processados corretamente na aba Execução."
                 )
             else:
-                # Informações dos arquivos testados — cacheado para não re-parsear a cada render
-                _prev_key = f"corr_prev_{hash((csv_producao + csv_repasse)[:300])}"
-                if _prev_key not in st.session_state:
-                    _dp = texto_para_dataframe(csv_producao)
-                    _dr = texto_para_dataframe(csv_repasse)
-                    st.session_state[_prev_key] = (
-                        _dp if _dp is not None else pd.DataFrame(),
-                        _dr if _dr is not None else pd.DataFrame(),
-                    )
-                df_prod_prev, df_rep_prev = st.session_state[_prev_key]
+                # Informações dos arquivos testados — DataFrames já em memória
+                df_prod_prev, df_rep_prev = df_producao, df_repasse
                 linhas_prod = len(df_prod_prev)
                 linhas_rep  = len(df_rep_prev)
 
@@ -4071,7 +2935,7 @@ def main():
                 with col_info2:
                     st.metric("**REPASSE:**", f"{linhas_rep} linhas")
 
-                with st.expander(f"📋 Preview dos CSVs ({len(csvs_brutos)} arquivo(s))", expanded=False):
+                with st.expander(f"📋 Preview dos CSVs ({len(dfs_transformados)} arquivo(s))", expanded=False):
                     st.markdown("**PRODUCAO:**")
                     if not df_prod_prev.empty:
                         st.dataframe(df_prod_prev.head(5), use_container_width=True)
@@ -4089,42 +2953,119 @@ def main():
                     "Escolha como realizar a correlação:",
                     options=[
                         "🔄 Correlação Local (sem API Key)",
+                        f"🧠 Híbrido — Local + {provider} só no resíduo (requer API Key)",
                         f"🤖 Correlação com Agente IA — {provider} (requer API Key)",
                     ],
                     index=0,
                     horizontal=True,
                     help=(
-                        "**Correlação Local**: usa a função `correlacionar_csv_arquivos` com "
+                        "**Correlação Local**: usa a função `correlacionar_dataframes` com "
                         "correspondência semântica de procedimentos. Rápido e sem custo de tokens.\n\n"
+                        f"**Híbrido ({provider})**: roda a correlação local e envia ao agente apenas "
+                        "as linhas que sobraram sem par, agrupadas por paciente/data. Uma fração "
+                        "dos tokens da correlação completa por LLM.\n\n"
                         f"**Agente IA ({provider})**: usa o agente Correlacionador com LLM para "
                         "interpretação mais flexível. Requer API Key."
                     ),
                 )
                 
-                usa_llm_corr = modo_correlacao.startswith("🤖")
+                modo_hibrido_corr = modo_correlacao.startswith("🧠")
+                usa_llm_corr = modo_hibrido_corr or modo_correlacao.startswith("🤖")
+                if usa_llm_corr:
+                    precarregar_crewai()
                 
                 if usa_llm_corr:
-                    st.info(
-                        f"🤖 **Modo LLM ativo** — O Agente Correlacionador ({provider}) irá realizar "
-                        "o batimento dos dados. Requer **API Key** configurada na sidebar."
-                    )
+                    if modo_hibrido_corr:
+                        st.info(
+                            "🧠 **Modo Híbrido ativo** — A correlação local resolve o que conseguir; "
+                            f"o Agente Correlacionador ({provider}) decide só os pares entre linhas "
+                            "NAO_FATURADO_NO_REPASSE e REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO próximas "
+                            "em data e nome."
+                        )
+                    else:
+                        st.info(
+                            f"🤖 **Modo LLM ativo** — O Agente Correlacionador ({provider}) irá realizar "
+                            "o batimento dos dados. Requer **API Key** configurada na sidebar."
+                        )
                     if not api_key and provider != "Ollama":
                         st.warning("⚠️ Preencha a **API Key** na sidebar para usar este modo.")
+                    _cache_llm_corr = obter_cache_llm() if usar_cache_llm else None
+                    if _cache_llm_corr is not None:
+                        with st.expander("♻️ Cache de respostas do LLM", expanded=False):
+                            render_metricas_cache_llm(_cache_llm_corr, "correlacao")
                 else:
                     st.info(
-                        "🔄 **Modo Local ativo** — A função `correlacionar_csv_arquivos` será chamada "
+                        "🔄 **Modo Local ativo** — A função `correlacionar_dataframes` será chamada "
                         "diretamente com correspondência semântica de procedimentos. Rápido e sem custo."
                     )
+                corr_em_segundo_plano = not usa_llm_corr and st.toggle(
+                    "📥 Executar em segundo plano",
+                    value=False,
+                    key="corr_segundo_plano",
+                    help=(
+                        "Envia a correlação para a fila de jobs atendida por um processo separado. "
+                        "Dá para fechar a aba e voltar depois: o resultado fica salvo em disco."
+                    ),
+                )
+                corr_incremental = not usa_llm_corr and not corr_em_segundo_plano and st.toggle(
+                    "♻️ Recorrelacionar só o que mudou",
+                    value=False,
+                    key="corr_incremental",
+                    disabled="estado_correlacao" not in st.session_state,
+                    help=(
+                        "Reaproveita a última correlação local desta sessão: só as linhas PRODUCAO "
+                        "novas/alteradas e as vizinhas (±7 dias) de mudanças no PRODUCAO ou no "
+                        "REPASSE são casadas de novo. Se uma linha alterada disputar o mesmo REPASSE "
+                        "com uma linha mantida, vale o casamento anterior — o resultado pode diferir "
+                        "da correlação completa. Desligado, tudo é correlacionado do zero.\n\n"
+                        "O estado só vive nesta sessão e o REPASSE enviado é tratado como completo: "
+                        "serve para recorrelacionar após corrigir planilhas. O fechamento mensal "
+                        "(PRODUCAO acumulada + só o REPASSE do mês) roda pela linha de comando: "
+                        "`python cli.py ... --estado DIR`."
+                    ),
+                )
                 
                 st.divider()
                 
-                btn_label_corr = f"🤖 Gerar Correlação com {provider}" if usa_llm_corr else "🔄 Gerar Correlação Local"
+                btn_label_corr = (
+                    f"🧠 Gerar Correlação Híbrida com {provider}" if modo_hibrido_corr
+                    else f"🤖 Gerar Correlação com {provider}" if usa_llm_corr
+                    else "🔄 Gerar Correlação Local"
+                )
                 btn_disabled_corr = usa_llm_corr and not api_key and provider != "Ollama"
 
                 if st.button(btn_label_corr, type="primary", disabled=btn_disabled_corr):
                     
-                    # ── MODO LOCAL: correlacionar_csv_arquivos (com thread para não travar UI) ──
-                    if not usa_llm_corr:
+                    # ── MODO LOCAL NA FILA DE JOBS: processo worker, resultado em disco ──
+                    if corr_em_segundo_plano:
+                        _tabela_tuss_job: dict = {}
+                        _valores_tuss_job: dict = {}
+                        try:
+                            _carregar_tabela_tuss.clear()
+                            _carregar_valores_tuss.clear()
+                            _tabela_tuss_job = _carregar_tabela_tuss()
+                            _valores_tuss_job = _carregar_valores_tuss()
+                        except Exception as _e_pre_job:
+                            logger.warning(f"Pré-carga TUSS ignorada: {_e_pre_job}")
+                        _job_id = submeter_job(
+                            "correlacao_local",
+                            {
+                                "df_producao": df_producao,
+                                "df_repasse": df_repasse,
+                                "tabela_tuss": _tabela_tuss_job,
+                                "valores_tuss": _valores_tuss_job,
+                            },
+                            f"{nome_producao} × {nome_repasse}",
+                        )
+                        if _job_id:
+                            st.success(
+                                f"📥 Job `{_job_id}` enfileirado. O resultado é carregado "
+                                "automaticamente ao concluir — ou depois, pela lista de jobs abaixo. "
+                                "Guarde o id para recuperar o resultado em outra sessão."
+                            )
+
+                    # ── MODO LOCAL: correlacionar_dataframes (em segundo plano, com progresso real) ──
+                    elif not usa_llm_corr:
                         with st.status("🔄 Correlacionando localmente...", expanded=True) as status_local:
                             st.markdown("##### ⏳ Aguarde — correlacionando PRODUCAO × REPASSE...")
                             _prog_local = st.progress(0, "Iniciando correlação...")
@@ -4145,75 +3086,54 @@ def main():
 
                             _res_local: dict = {"value": None, "error": None}
 
+                            # Sempre devolve um estado novo (a próxima correlação pode ser
+                            # incremental); só parte do anterior com o toggle ligado
                             def _run_local_corr(
-                                holder,
-                                _prod=csv_producao,
-                                _rep=csv_repasse,
+                                reportar,
+                                _prod=df_producao,
+                                _rep=df_repasse,
                                 _tab=_tabela_tuss_pre,
                                 _vals=_valores_tuss_pre,
+                                _estado=st.session_state.get("estado_correlacao") if corr_incremental else None,
                             ):
-                                try:
-                                    holder["value"] = correlacionar_csv_arquivos(
-                                        _prod, _rep,
-                                        tabela_tuss_preloaded=_tab,
-                                        valores_tuss_preloaded=_vals,
-                                    )
-                                except Exception as _exc:
-                                    holder["error"] = _exc
-                                    logger.error(f"Erro em correlacionar_csv_arquivos: {_exc}", exc_info=True)
-
-                            _t_local = threading.Thread(
-                                target=_run_local_corr, args=(_res_local,), daemon=True
-                            )
-                            _t_local.start()
-
-                            _step = 0
-                            _msgs = [
-                                "Indexando REPASSE...", "Correlacionando por nome e data...",
-                                "Aplicando fallbacks...", "Verificando códigos TUSS...",
-                                "Finalizando...",
-                            ]
-                            while _t_local.is_alive():
-                                _prog_local.progress(
-                                    min(0.9, _step * 0.18),
-                                    _msgs[min(_step, len(_msgs) - 1)],
+                                return correlacionar_incremental(
+                                    _prod, _rep, _estado,
+                                    tabela_tuss_preloaded=_tab,
+                                    valores_tuss_preloaded=_vals,
+                                    progresso=reportar,
+                                    repasse_completo=True,
                                 )
-                                _step += 1
-                                time.sleep(0.8)
 
-                            _t_local.join()
-                            _prog_local.progress(1.0, "Concluído!")
+                            try:
+                                _res_local["value"] = acompanhar_tarefa(
+                                    TarefaSegundoPlano(_run_local_corr, nome="correlacao-local"),
+                                    barra=_prog_local,
+                                )
+                            except Exception as _exc:
+                                _res_local["error"] = _exc
+                                logger.error(f"Erro em correlacionar_dataframes: {_exc}", exc_info=True)
 
+                            _df_local, _estado_local = _res_local["value"] or (None, None)
                             if _res_local["error"]:
                                 status_local.update(
                                     label="❌ Erro na correlação local",
                                     state="error", expanded=True
                                 )
                                 st.error(f"Erro: {_res_local['error']}")
-                            elif _res_local["value"]:
-                                st.session_state["csv_correlacionado"] = _res_local["value"]
-                                # Invalida caches dependentes do resultado anterior
-                                for _k in list(st.session_state.keys()):
-                                    if (
-                                        _k.startswith("corr_df_")
-                                        or _k.startswith("corr_style_")
-                                        or _k.startswith("corr_csv_dl_")
-                                        or _k.startswith("cob_")
-                                        or _k == "corr_show_table"
-                                    ):
-                                        del st.session_state[_k]
-                                # Gera/atualiza tuss_valores.csv imediatamente
-                                try:
-                                    _df_fresh = texto_para_dataframe(
-                                        extrair_csv_do_texto(_res_local["value"])
+                            elif _df_local is not None:
+                                # Só impressões e casamentos por linha (REPASSE completo a cada execução).
+                                # Fica só na sessão: o estado entre meses é o do cli.py --estado
+                                st.session_state["estado_correlacao"] = _estado_local
+                                _resumo_inc = _estado_local["resumo"]
+                                if not _resumo_inc["completa"]:
+                                    st.caption(
+                                        f"♻️ {_resumo_inc['recalculadas']:,} de {len(df_producao):,} linhas "
+                                        "PRODUCAO casadas de novo; as demais mantiveram a correlação anterior."
+                                        .replace(",", ".")
                                     )
-                                    if _df_fresh is not None and not _df_fresh.empty:
-                                        _prog_local.progress(1.0, "Calculando estimativas de valor TUSS...")
-                                        _gerar_valores_tuss(_df_fresh)
-                                        _carregar_valores_tuss.clear()
-                                        logger.info("tuss_valores.csv atualizado pós-correlação")
-                                except Exception as _e_tv:
-                                    logger.warning(f"tuss_valores pós-correlação ignorado: {_e_tv}")
+                                # Gera/atualiza tuss_valores.csv imediatamente
+                                _prog_local.progress(1.0, "Calculando estimativas de valor TUSS...")
+                                _registrar_correlacao_local(_df_local)
                                 status_local.update(
                                     label="✅ Correlação local concluída!",
                                     state="complete", expanded=False
@@ -4225,13 +3145,95 @@ def main():
                                 )
                                 st.error("Não foi possível gerar a correlação. Verifique os logs.")
                     
+                    # ── MODO HÍBRIDO: local + Correlacionador só no resíduo ──────
+                    elif modo_hibrido_corr:
+                        with st.status("🧠 Correlação híbrida em andamento...", expanded=True) as status_hib:
+                            st.markdown("##### 📡 Log de Correlação em Tempo Real")
+                            painel_log_hib = PainelLog(st.container(height=320, border=False))
+
+                            _prog_hib = st.progress(0, "Iniciando correlação híbrida...")
+                            sinal_hib = threading.Event()
+                            log_queue_hib: queue.Queue = FilaSinalizada(sinal_hib, maxsize=500)
+                            handler_hib = StreamlitLogHandler(log_queue_hib)
+                            handler_hib.setFormatter(
+                                logging.Formatter("%(asctime)s | %(name)s | %(message)s", datefmt="%H:%M:%S")
+                            )
+                            root_logger = logging.getLogger()
+                            root_logger.addHandler(handler_hib)
+
+                            # Tudo que lê o session_state/cache do Streamlit fica na thread principal
+                            _tabela_tuss_hib: dict = {}
+                            _valores_tuss_hib: dict = {}
+                            try:
+                                _carregar_tabela_tuss.clear()
+                                _carregar_valores_tuss.clear()
+                                _tabela_tuss_hib = _carregar_tabela_tuss()
+                                _valores_tuss_hib = _carregar_valores_tuss()
+                            except Exception as _e_pre_hib:
+                                logger.warning(f"Pré-carga TUSS ignorada: {_e_pre_hib}")
+                            llm_hib = get_llm(provider, custom_model, temperature, api_key, base_url)
+                            cfg_hib = _get_correlacionador_cfg()
+                            cache_hib = obter_cache_llm() if usar_cache_llm else None
+
+                            _res_hib: dict = {"value": None, "resumo": {}, "error": None}
+
+                            def _run_hibrido(reportar):
+                                try:
+                                    return correlacionar_hibrido(
+                                        df_producao, df_repasse, llm_hib, cfg_hib, cache_hib, verbose_mode,
+                                        tabela_tuss_preloaded=_tabela_tuss_hib,
+                                        valores_tuss_preloaded=_valores_tuss_hib,
+                                        progresso=reportar,
+                                    )
+                                except Exception as exc:
+                                    logger.error(f"Erro na correlação híbrida: {exc}", exc_info=True)
+                                    raise
+
+                            try:
+                                _res_hib["value"], _res_hib["resumo"] = acompanhar_tarefa(
+                                    TarefaSegundoPlano(_run_hibrido, sinal_hib, nome="correlacao-hibrida"),
+                                    barra=_prog_hib,
+                                    painel_log=painel_log_hib,
+                                    fila_log=log_queue_hib,
+                                )
+                            except Exception as exc:
+                                _res_hib["error"] = exc
+                            root_logger.removeHandler(handler_hib)
+
+                            if _res_hib["error"] or _res_hib["value"] is None:
+                                status_hib.update(
+                                    label="❌ Erro na correlação híbrida", state="error", expanded=True
+                                )
+                                st.error(f"Erro: {_res_hib['error'] or 'correlação local falhou — verifique os logs.'}")
+                            else:
+                                _rh = _res_hib["resumo"]
+                                _registrar_correlacao_local(_res_hib["value"], "correlação híbrida")
+                                status_hib.update(
+                                    label=(
+                                        f"✅ Correlação híbrida concluída — {_rh.get('pares_llm', 0)} par(es) "
+                                        f"pelo LLM em {_rh.get('janelas', 0)} janela(s)"
+                                    ),
+                                    state="complete", expanded=False,
+                                )
+                                st.caption(
+                                    f"🧠 Resíduo local: {_rh.get('residuo_producao', 0)} PRODUCAO / "
+                                    f"{_rh.get('residuo_repasse', 0)} REPASSE · "
+                                    f"{_rh.get('linhas_enviadas', 0)} de {_rh.get('linhas_totais', 0)} linhas "
+                                    "enviadas ao LLM"
+                                    + (f" · ⚠️ {_rh['janelas_com_erro']} janela(s) mantiveram o resultado local"
+                                       if _rh.get("janelas_com_erro") else "")
+                                )
+
                     # ── MODO LLM: Agente Correlacionador ──────────────────────────
                     else:
                         with st.status("🤖 Agente Correlacionador trabalhando...", expanded=True) as status_corr:
+                            sinal_corr = threading.Event()
+                            receptor_corr = ReceptorTokensStream() if usar_streaming else None
+                            painel_stream_corr = PainelStreaming(sinal_corr) if usar_streaming else None
                             st.markdown("##### 📡 Log de Correlação em Tempo Real")
-                            log_container_corr = st.container(height=320, border=False)
+                            painel_log_corr = PainelLog(st.container(height=320, border=False))
 
-                            log_queue_corr: queue.Queue = queue.Queue(maxsize=500)
+                            log_queue_corr: queue.Queue = FilaSinalizada(sinal_corr, maxsize=500)
                             handler_corr = StreamlitLogHandler(log_queue_corr)
                             handler_corr.setFormatter(
                                 logging.Formatter("%(asctime)s | %(name)s | %(message)s", datefmt="%H:%M:%S")
@@ -4240,17 +3242,26 @@ def main():
                             root_logger.addHandler(handler_corr)
 
                             thread_result_corr: dict = {"value": None, "error": None}
+                            cfg_corr = _get_correlacionador_cfg()
+                            cache_corr = obter_cache_llm() if usar_cache_llm else None
+
+                            def _run_correlation(_reportar):
+                                from crewai import Crew, Process
 
-                            def _run_correlation(result_holder: dict):
+                                token_stream = (
+                                    receptor_corr.associar(painel_stream_corr.fila)
+                                    if receptor_corr is not None else None
+                                )
                                 try:
                                     llm_corr = get_llm(
-                                        provider, custom_model, temperature, api_key, base_url
+                                        provider, custom_model, temperature, api_key, base_url,
+                                        usar_streaming,
                                     )
                                     correlator = create_correlator_agent(llm_corr, verbose_mode)
-                                    # Passa apenas PRODUCAO e REPASSE
+                                    # Passa apenas PRODUCAO e REPASSE (fronteira LLM: CSV)
                                     csvs_para_correlacao = {
-                                        nome_producao: csv_producao,
-                                        nome_repasse: csv_repasse
+                                        nome_producao: _df_para_csv(df_producao),
+                                        nome_repasse: _df_para_csv(df_repasse),
                                     }
                                     task_corr = create_correlation_task(correlator, csvs_para_correlacao)
                                     crew_corr = Crew(
@@ -4259,31 +3270,30 @@ def main():
                                         process=Process.sequential,
                                         verbose=verbose_mode,
                                     )
-                                    result_holder["value"] = str(crew_corr.kickoff())
+                                    return kickoff_com_cache(
+                                        crew_corr, chave_cache_crew(crew_corr, cfg_corr), cache_corr
+                                    )
                                 except Exception as exc:
-                                    result_holder["error"] = exc
                                     logger.error(f"Erro na correlação: {exc}", exc_info=True)
+                                    raise
+                                finally:
+                                    if token_stream is not None:
+                                        receptor_corr.desassociar(token_stream)
 
-                            thread_corr = threading.Thread(
-                                target=_run_correlation,
-                                args=(thread_result_corr,),
-                                daemon=True,
-                            )
-                            thread_corr.start()
-
-                            while thread_corr.is_alive():
-                                drained = False
-                                while not log_queue_corr.empty():
-                                    render_log_line(log_queue_corr.get_nowait(), log_container_corr)
-                                    drained = True
-                                if not drained:
-                                    time.sleep(0.15)
-
-                            while not log_queue_corr.empty():
-                                render_log_line(log_queue_corr.get_nowait(), log_container_corr)
-
-                            thread_corr.join()
+                            if receptor_corr is not None:
+                                receptor_corr.registrar()
+                            try:
+                                thread_result_corr["value"] = acompanhar_tarefa(
+                                    TarefaSegundoPlano(_run_correlation, sinal_corr, nome="correlacao-llm"),
+                                    painel_log=painel_log_corr,
+                                    fila_log=log_queue_corr,
+                                    painel_stream=painel_stream_corr,
+                                )
+                            except Exception as exc:
+                                thread_result_corr["error"] = exc
                             root_logger.removeHandler(handler_corr)
+                            if receptor_corr is not None:
+                                receptor_corr.remover()
 
                             if thread_result_corr["error"]:
                                 status_corr.update(
@@ -4294,21 +3304,13 @@ def main():
                                 status_corr.update(
                                     label="✅ Correlação concluída!", state="complete", expanded=False
                                 )
-                                st.session_state["csv_correlacionado"] = thread_result_corr["value"]
-                                # Invalida caches dependentes e gera tuss_valores.csv
-                                for _k in list(st.session_state.keys()):
-                                    if (
-                                        _k.startswith("corr_df_")
-                                        or _k.startswith("corr_style_")
-                                        or _k.startswith("corr_csv_dl_")
-                                        or _k.startswith("cob_")
-                                        or _k == "corr_show_table"
-                                    ):
-                                        del st.session_state[_k]
+                                # Fronteira LLM: o texto do agente é lido uma única vez
+                                _csv_dados_llm, _resumo_llm = separar_resumo_do_csv(
+                                    extrair_csv_do_texto(thread_result_corr["value"] or "")
+                                )
+                                _df_fresh_llm = texto_para_dataframe(_csv_dados_llm)
+                                _registrar_correlacao(_df_fresh_llm, _resumo_llm, _csv_dados_llm)
                                 try:
-                                    _df_fresh_llm = texto_para_dataframe(
-                                        extrair_csv_do_texto(thread_result_corr["value"])
-                                    )
                                     if _df_fresh_llm is not None and not _df_fresh_llm.empty:
                                         _gerar_valores_tuss(_df_fresh_llm)
                                         _carregar_valores_tuss.clear()
@@ -4317,22 +3319,14 @@ def main():
                                     logger.warning(f"tuss_valores pós-correlação LLM ignorado: {_e_tv_llm}")
 
             # ── Exibe resultado correlacionado ────────────────────────────────
-            csv_correlacionado_raw = st.session_state.get("csv_correlacionado")
-
-            if csv_correlacionado_raw:
+            if "corr_digest" in st.session_state:
                 st.divider()
 
-                # Cache do parse — evita re-parsear 5000+ linhas a cada interação de filtro
-                _df_cache_key = f"corr_df_{hash(csv_correlacionado_raw[:300])}"
-                if _df_cache_key not in st.session_state:
-                    _csv_limpo = extrair_csv_do_texto(csv_correlacionado_raw)
-                    _csv_dados_str, _resumo_str = separar_resumo_do_csv(_csv_limpo)
-                    st.session_state[_df_cache_key] = (
-                        texto_para_dataframe(_csv_dados_str),
-                        _csv_dados_str,
-                        _resumo_str,
-                    )
-                df_final, csv_dados_str, resumo_str = st.session_state[_df_cache_key]
+                # Resultado já em DataFrame — sem parse a cada interação de filtro;
+                # derivados (style, CSV) em cache_sessao() pelo digest do resultado
+                _corr_digest = st.session_state["corr_digest"]
+                df_final   = st.session_state.get("df_correlacionado")
+                resumo_str = st.session_state.get("resumo_correlacao", "")
 
                 st.subheader("📊 Tabela Correlacionada")
 
@@ -4363,13 +3357,14 @@ def main():
                     n_fora_periodo            = (status_col.str.upper() == "REPASSE_DATA_FORA_DO_PERIODO_PRODUCAO").sum()
 
                     # Contagem por MetodoMatch
-                    mm = df_final.get("MetodoMatch", pd.Series(dtype=str)).fillna("")
+                    mm = df_final.get("MetodoMatch", pd.Series(dtype=str)).astype(object).fillna("")
                     n_m1  = (mm == "1_NOME_COMPLETO_DATA_PROCEDIMENTO").sum()
                     n_m2  = mm.str.startswith("2_FALLBACK_NR-ATENDIMENTO").sum()
                     n_m3  = (mm == "3_FALLBACK_NOME_PARCIAL_FUZZY_DATA_FIXA").sum()
                     n_m4  = (mm == "4_FALLBACK_NOME_COMPLETO_DATA-FLEXIVEL").sum()
                     n_m5  = (mm == "5_FALLBACK_COMPANION_PROCEDIMENTO_ADICIONAL").sum()
                     n_sem = (mm == "SEM_MATCH").sum()
+                    n_m6  = (mm == METODO_MATCH_LLM).sum()
 
                     def _perc(n, base):
                         return f"{n / base * 100:.1f}%" if base > 0 else "0.0%"
@@ -4412,9 +3407,18 @@ def main():
                         delta_color="off",
                         help="Urease/Helicobacter companion: principal já correlacionado no mesmo episódio",
                     )
+                    if n_m6:
+                        mc6, *_ = st.columns(5)
+                        mc6.metric(
+                            "6 LLM no Resíduo",
+                            f"{n_m6}",
+                            delta=_perc(n_m6, total_linhas),
+                            delta_color="off",
+                            help="Par decidido pelo Agente Correlacionador no modo híbrido, entre linhas que a correlação local deixou sem match",
+                        )
 
                     # ── Linha 1b: TUSS (se disponível) ───────────────────────
-                    tuss_col = df_final.get("StatusTUSS", pd.Series(dtype=str)).fillna("")
+                    tuss_col = df_final.get("StatusTUSS", pd.Series(dtype=str)).astype(object).fillna("")
                     n_tuss_downgrade  = (tuss_col.str.upper() == "TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES").sum()
                     n_tuss_ausente    = (tuss_col.str.upper() == "TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE").sum()
                     n_tuss_princ_div  = (tuss_col.str.upper() == "TUSS_CODIGO_PRINCIPAL_DIVERGENTE").sum()
@@ -4487,7 +3491,7 @@ def main():
                                 _df_breakdown = (
                                     df_final[_mask_elig]
                                     .assign(_val_num=pd.to_numeric(_val_col[_mask_elig], errors="coerce"))
-                                    .groupby(_conv_col[_mask_elig].fillna("(sem convênio)"))
+                                    .groupby(_conv_col[_mask_elig].astype(object).fillna("(sem convênio)"))
                                     .agg(Itens=("_val_num", "count"), ValorTotal=("_val_num", "sum"))
                                     .sort_values("ValorTotal", ascending=False)
                                     .reset_index()
@@ -4572,15 +3576,21 @@ def main():
                         _mask &= df_final["CodigoTUSS"].isin(filtro_tuss)
                     df_filtrado = df_final[_mask]
                     _n_filtrado = len(df_filtrado)
+                    # Chave estável da combinação de filtros (independe da ordem de seleção)
+                    _chave_filtros = (
+                        tuple(sorted(filtro_convenio)),
+                        tuple(sorted(filtro_status)),
+                        tuple(sorted(filtro_tuss)),
+                    )
 
                     # Styling vetorizado (axis=None): ~60× mais rápido que apply(axis=1) por linha
                     def _build_style_df(df: pd.DataFrame) -> pd.DataFrame:
                         import numpy as _np
                         # Índice alinhado — necessário após filtro booleano criar índice esparso
                         _empty = pd.Series("", index=df.index, dtype=str)
-                        _st  = (df["StatusCorrelacao"].fillna("").str.upper()
+                        _st  = (df["StatusCorrelacao"].astype(object).fillna("").str.upper()
                                 if "StatusCorrelacao" in df.columns else _empty)
-                        _tss = (df["StatusTUSS"].fillna("").str.upper()
+                        _tss = (df["StatusTUSS"].astype(object).fillna("").str.upper()
                                 if "StatusTUSS" in df.columns else _empty)
                         cor  = pd.Series("", index=df.index, dtype=str)
                         cor[_st.str.contains("NAO_IDENTIFICADO",    na=False)] = "background-color: #e2e3e5"
@@ -4644,39 +3654,33 @@ def main():
                         # ── Camada 2: cache do style por combinação de filtro ─
                         # _build_style_df só reexecuta quando os filtros mudam;
                         # interações não relacionadas reutilizam o resultado cacheado
-                        _filter_hash = hash((
-                            frozenset(filtro_convenio),
-                            frozenset(filtro_status),
-                            frozenset(filtro_tuss),
-                        ))
-                        _style_cache_key = f"corr_style_{_df_cache_key}_{_filter_hash}"
-                        if _style_cache_key not in st.session_state:
-                            # Remove caches de style anteriores para não acumular memória
-                            for _sk in [k for k in st.session_state if k.startswith("corr_style_")]:
-                                del st.session_state[_sk]
-                            st.session_state[_style_cache_key] = _build_style_df(df_display)
-                        _cached_style = st.session_state[_style_cache_key]
+                        _cached_style = cache_sessao().obter(
+                            "corr_style", _corr_digest, _chave_filtros,
+                            criar=lambda: _build_style_df(df_display),
+                        )
 
                         st.dataframe(
                             df_display.style.apply(lambda _: _cached_style, axis=None),
                             use_container_width=True,
                             height=460,
+                            column_config={
+                                c: st.column_config.DatetimeColumn(c, format="DD/MM/YYYY")
+                                for c in df_display.columns
+                                if pd.api.types.is_datetime64_any_dtype(df_display[c])
+                            },
                         )
 
                     # ── Download CSV — sem cap, sempre disponível ─────────────
-                    # Cacheado em session_state para evitar to_csv() a cada render
-                    _csv_dl_key = f"corr_csv_dl_{_df_cache_key}_{hash((frozenset(filtro_convenio), frozenset(filtro_status), frozenset(filtro_tuss)))}"
-                    if _csv_dl_key not in st.session_state:
-                        for _ck in [k for k in st.session_state if k.startswith("corr_csv_dl_")]:
-                            del st.session_state[_ck]
-                        st.session_state[_csv_dl_key] = df_filtrado.to_csv(
-                            index=False, sep=",", encoding="utf-8-sig"
-                        )
+                    # Em cache_sessao() para evitar to_csv() a cada render
+                    _csv_dl = cache_sessao().obter(
+                        "corr_csv", _corr_digest, _chave_filtros,
+                        criar=lambda: _df_tipado_para_texto(df_filtrado).to_csv(index=False, sep=",").encode("utf-8-sig"),
+                    )
                     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
                     _dl_col, _log_col = st.columns([3, 1])
                     _dl_col.download_button(
                         label=f"⬇️ Baixar CSV Correlacionado ({_n_filtrado:,} linhas)",
-                        data=st.session_state[_csv_dl_key].encode("utf-8-sig"),
+                        data=_csv_dl,
                         file_name=f"correlacao_endoscopia_{ts}.csv",
                         mime="text/csv",
                         type="primary",
@@ -4695,6 +3699,10 @@ def main():
 
                 else:
                     st.warning("⚠️ Não foi possível renderizar o DataFrame. Exibindo CSV bruto.")
+                    csv_dados_str = (
+                        st.session_state.get("csv_correlacionado_bruto")
+                        or _df_para_csv(_df_tipado_para_texto(df_final))
+                    )
                     st.text_area("CSV bruto", value=csv_dados_str, height=300)
                     st.download_button(
                         label="⬇️ Baixar CSV Bruto",
@@ -4716,29 +3724,21 @@ def main():
             "preenchido automaticamente com os casos identificados na correlação."
         )
 
-        csv_corr_raw = st.session_state.get("csv_correlacionado")
-        if not csv_corr_raw:
+        _corr_digest = st.session_state.get("corr_digest")
+        if _corr_digest is None:
             st.info("⬅️ Execute a correlação na aba **🔀 Correlação** primeiro.")
         else:
             from io import BytesIO
-            from openpyxl.styles import PatternFill, Font
-
-            # Carregar dados de correlação — cacheado para não re-parsear em cada interação
-            _cob_df_key = f"cob_df_{hash(csv_corr_raw[:300])}"
-            if _cob_df_key not in st.session_state:
-                _csv_limpo = extrair_csv_do_texto(csv_corr_raw)
-                _csv_dados, _ = separar_resumo_do_csv(_csv_limpo)
-                _df_tmp = texto_para_dataframe(_csv_dados)
+
+            # Colunas auxiliares de data — calculadas uma vez por resultado de correlação.
+            # Segue tipado (compacto); vira texto só onde o motor de cobrança lê as linhas
+            def _preparar_cobranca():
+                _df_tmp = st.session_state.get("df_correlacionado")
                 if _df_tmp is not None and not _df_tmp.empty:
-                    # Pré-computar colunas de data vetorizadas uma única vez
-                    _df_tmp["_dt_prod"] = pd.to_datetime(
-                        _df_tmp.get("Data_PRODUCAO", pd.Series(dtype=str)),
-                        dayfirst=True, errors="coerce",
-                    )
-                    _df_tmp["_ano_prod"] = _df_tmp["_dt_prod"].dt.year.astype("Int64")
-                    _df_tmp["_mes_prod"] = _df_tmp["_dt_prod"].dt.month.astype("Int64")
-                st.session_state[_cob_df_key] = _df_tmp
-            df_corr = st.session_state[_cob_df_key]
+                    _df_tmp = preparar_df_cobranca(_df_tmp)
+                return _df_tmp
+
+            df_corr = cache_sessao().obter("cob_df", _corr_digest, criar=_preparar_cobranca)
             if df_corr is None or df_corr.empty:
                 st.error("Não foi possível carregar os dados de correlação.")
                 st.stop()
@@ -4746,7 +3746,7 @@ def main():
             valores_tuss = _carregar_valores_tuss()
             if not valores_tuss and not df_corr.empty:
                 with st.spinner("Calculando estimativas de valor a partir do histórico de repasse..."):
-                    _gerar_valores_tuss(df_corr)
+                    _gerar_valores_tuss(_df_tipado_para_texto(df_corr))
                 _carregar_valores_tuss.clear()
                 valores_tuss = _carregar_valores_tuss()
 
@@ -4755,80 +3755,6 @@ def main():
                 if st.session_state.get("csv_repasse_raw") else pd.DataFrame()
             )
 
-            # ── Descricao de código: REPASSE real > tabela DESC_OFICIAL ───────
-            _DESC_OFICIAL_COB = {
-                "40201074": "Colangiopancreatografia Retrógrada Endoscópica",
-                "40201082": "Colonoscopia (Inclui A Retossigmoidoscopia)",
-                "40201120": "Endoscopia Digestiva Alta",
-                "40201171": "Retossigmoidoscopia Flexível",
-                "40202038": "Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia",
-                "40202283": "Gastrostomia Endoscópica",
-                "40202291": "Hemostasia Mecânica Do Esôfago, Estômago Ou Duodeno",
-                "40202313": "Hemostasias De Cólon",
-                "40202453": "Ligadura Elástica Do Esôfago, Estômago Ou Duodeno",
-                "40202470": "Mucosectomia Do Esôfago, Estômago Ou Duodeno",
-                "40202534": "Passagem De Sonda Naso-Enteral",
-                "40202542": "Polipectomia De Cólon (Independente Do Número De Pólipos)",
-                "40202550": "Polipectomia Do Esôfago, Estômago Ou Duodeno (Independente Do Número De Pólipos)",
-                "40202577": "Retirada De Corpo Estranho Do Esôfago, Estômago Ou Duodeno",
-                "40202615": "Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)",
-                "40202666": "Colonoscopia Com Biópsia E/Ou Citologia",
-                "40202682": "Retossigmoidoscopia Flexível Com Polipectomia",
-                "40202690": "Retossigmoidoscopia Flexível Com Biópsia E/Ou Citologia",
-                "40202712": "Colonoscopia Com Mucosectomia",
-                "40813320": "Colocação De Stent Biliar",
-            }
-
-            # Reverse-map de descrições canônicas a partir do tuss_lookup_table
-            _desc_tuss_lookup = _construir_desc_por_tuss_code(_carregar_tabela_tuss())
-
-            def _desc_cod(cod: str) -> str:
-                cod = str(cod).replace(".0", "").strip()
-                return (desc_por_cod.get(cod)           # 1º: REPASSE real
-                        or _desc_tuss_lookup.get(cod)   # 2º: tuss_lookup_table ← novo
-                        or _DESC_OFICIAL_COB.get(cod)   # 3º: dict hardcoded
-                        or f"Código TUSS {cod}")
-
-            def _lookup_entry(cod: str, convenio: str = "") -> dict:
-                """Busca stats do código TUSS: primeiro específico por convênio, depois GERAL."""
-                c = str(cod).replace(".0", "").strip()
-                conv_norm = _normalizar_convenio(convenio) if convenio else ""
-                if conv_norm:
-                    entry = valores_tuss.get((conv_norm, c), {})
-                    if entry:
-                        return entry
-                return valores_tuss.get(c, {})   # fallback GERAL
-
-            def _valor_estimado(
-                cod_esperado: str,
-                cod_pago: str | None,
-                tipo_origem: str,
-                convenio: str = "",
-            ) -> tuple[float | None, str]:
-                """Retorna (valor_estimado, confiança) usando o valor mais recente por plano."""
-                ce = str(cod_esperado).replace(".0", "").strip()
-                cp = str(cod_pago or "").replace(".0", "").strip()
-
-                def _val_base(entry: dict) -> float | None:
-                    """Retorna UltimoValor se disponível, senão Media."""
-                    v = entry.get("UltimoValor") or entry.get("Media")
-                    return float(v) if v is not None else None
-
-                entry_esp  = _lookup_entry(ce, convenio)
-                conf       = str(entry_esp.get("Confianca", "Sem dados"))
-
-                if tipo_origem == "downgrade" and cp:
-                    entry_pago = _lookup_entry(cp, convenio)
-                    v_esp  = _val_base(entry_esp)
-                    v_pago = _val_base(entry_pago)
-                    if v_esp is not None and v_pago is not None:
-                        return round(v_esp - v_pago, 2), conf
-                elif tipo_origem in ("ausente", "nao_faturado"):
-                    v = _val_base(entry_esp)
-                    if v is not None:
-                        return round(v, 2), conf
-                return None, "Sem dados"
-
             # ── Seção 1: Filtros ──────────────────────────────────────────────
             st.subheader("1. Filtros")
 
@@ -4887,89 +3813,18 @@ def main():
                 help="NAO_FATURADO_NO_REPASSE — procedimento inteiro ausente do repasse")
 
             # ── Montar itens de cobrança ──────────────────────────────────────
-            # Cache do loop pesado: chave = hash dos dados + flags de tipo (sem filtro de período)
-            _itens_key = f"cob_itens_{hash(csv_corr_raw[:300])}_{inc_downgrade}_{inc_ausente}_{inc_nao_faturado}"
-            if _itens_key not in st.session_state:
-                _todos_itens: list[dict] = []
-                # Carregar tabela TUSS uma única vez (fora do loop)
-                _tabela_tuss_loop = _carregar_tabela_tuss()
-                for _idx_row, _row in df_corr.iterrows():
-                    _conv = str(_row.get("Convenio_PRODUCAO", "")).strip()
-                    _ano_r = _row.get("_ano_prod")
-                    _mes_r = _row.get("_mes_prod")
-                    _ano_i = int(_ano_r) if pd.notna(_ano_r) else None
-                    _mes_i = int(_mes_r) if pd.notna(_mes_r) else None
-                    _sc   = str(_row.get("StatusCorrelacao", "")).upper()
-                    _st_t = str(_row.get("StatusTUSS", "")).upper()
-
-                    if inc_downgrade and _st_t == "TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES":
-                        _cod_esp  = str(_row.get("CodigosTUSS_Esperados", "")).strip()
-                        _cod_pago = str(_row.get("CodigoTUSS_REPASSE", "")).replace(".0", "").strip()
-                        _val, _conf = _valor_estimado(_cod_esp, _cod_pago, "downgrade", convenio=_conv)
-                        _obs = (f"Faturado como {_cod_pago} — {_desc_cod(_cod_pago)}. "
-                                f"Correto conforme TUSS: {_cod_esp} — {_desc_cod(_cod_esp)}. "
-                                f"Solicita revisão e reprocessamento.")
-                        _todos_itens.append({"_origem": "downgrade", "_conf": _conf,
-                            "_ano": _ano_i, "_mes": _mes_i,
-                            "DATA": _row.get("Data_PRODUCAO", ""),
-                            "NR_ATEND": _row.get("NrAtendimento_REPASSE", ""),
-                            "PACIENTE": _row.get("Paciente_PRODUCAO", ""),
-                            "CONVENIO": _conv,
-                            "PRESTADOR": _row.get("MedicoExecutor_PRODUCAO", ""),
-                            "CODIGO": _cod_esp,
-                            "PROCEDIMENTO": _desc_cod(_cod_esp),
-                            "FUNCAO": _row.get("Funcao_REPASSE", "Cirurgiao"),
-                            "OBSERVACAO": _obs,
-                            "VALOR": _val,
-                        })
-                    elif inc_ausente and _st_t == "TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE":
-                        _ausentes_str = str(_row.get("CodigosTUSS_Ausentes", _row.get("CodigosTUSS_Esperados", ""))).strip()
-                        for _cod_aus in [c.strip() for c in _ausentes_str.split(",") if c.strip()]:
-                            _val, _conf = _valor_estimado(_cod_aus, None, "ausente", convenio=_conv)
-                            _proc_adic = str(_row.get("ProcedimentosAdicionais_PRODUCAO", "")).strip()
-                            _nr_base   = str(_row.get("NrAtendimento_REPASSE", "")).strip()
-                            _obs = (f"Procedimento adicional '{_proc_adic}' realizado junto ao "
-                                    f"{_row.get('Procedimento_PRODUCAO','')} não consta no repasse. "
-                                    f"Código TUSS: {_cod_aus}. "
-                                    f"Nr atendimento base: {_nr_base}. Solicita inclusão.")
-                            _todos_itens.append({"_origem": "ausente", "_conf": _conf,
-                                "_ano": _ano_i, "_mes": _mes_i,
-                                "DATA": _row.get("Data_PRODUCAO", ""),
-                                "NR_ATEND": _nr_base,
-                                "PACIENTE": _row.get("Paciente_PRODUCAO", ""),
-                                "CONVENIO": _conv,
-                                "PRESTADOR": _row.get("MedicoExecutor_PRODUCAO", ""),
-                                "CODIGO": _cod_aus,
-                                "PROCEDIMENTO": _desc_cod(_cod_aus),
-                                "FUNCAO": _row.get("Funcao_REPASSE", "Cirurgiao"),
-                                "OBSERVACAO": _obs,
-                                "VALOR": _val,
-                            })
-                    elif inc_nao_faturado and _sc == "NAO_FATURADO_NO_REPASSE":
-                        _proc_p = str(_row.get("Procedimento_PRODUCAO", "")).strip()
-                        _chave_base = _normalizar_chave_tuss(f"{_proc_p}_")
-                        _entry_base = _tabela_tuss_loop.get(_chave_base, {})
-                        _cod_base = str(_entry_base.get("CodigosTUSS", "")).split(",")[0].strip() if _entry_base else ""
-                        _val, _conf = _valor_estimado(_cod_base, None, "nao_faturado", convenio=_conv) if _cod_base else (None, "Sem dados")
-                        _obs = (f"Procedimento {_proc_p} realizado em {_row.get('Data_PRODUCAO','')} "
-                                f"não localizado no repasse. Solicita inclusão e faturamento.")
-                        _todos_itens.append({"_origem": "nao_faturado", "_conf": _conf,
-                            "_ano": _ano_i, "_mes": _mes_i,
-                            "DATA": _row.get("Data_PRODUCAO", ""),
-                            "NR_ATEND": _row.get("NrAtendimento_PRODUCAO", ""),
-                            "PACIENTE": _row.get("Paciente_PRODUCAO", ""),
-                            "CONVENIO": _conv,
-                            "PRESTADOR": _row.get("MedicoExecutor_PRODUCAO", ""),
-                            "CODIGO": _cod_base,
-                            "PROCEDIMENTO": _desc_cod(_cod_base) if _cod_base else _proc_p,
-                            "FUNCAO": "Cirurgiao",
-                            "OBSERVACAO": _obs,
-                            "VALOR": _val,
-                        })
-                st.session_state[_itens_key] = _todos_itens
+            # Cache do loop pesado: chave = digest dos dados + flags de tipo (sem filtro de período)
+            _todos_itens = cache_sessao().obter(
+                "cob_itens", _corr_digest, inc_downgrade, inc_ausente, inc_nao_faturado,
+                criar=lambda: montar_itens_cobranca(
+                    _df_tipado_para_texto(df_corr), valores_tuss, _carregar_tabela_tuss(), desc_por_cod,
+                    incluir_downgrade=inc_downgrade,
+                    incluir_ausente=inc_ausente,
+                    incluir_nao_faturado=inc_nao_faturado,
+                ),
+            )
 
             # Filtro de período aplicado como máscara barata sobre o cache
-            _todos_itens = st.session_state[_itens_key]
             itens = [
                 i for i in _todos_itens
                 if (i["_ano"], i["_mes"]) in filtro_periodos
@@ -5095,61 +3950,19 @@ def main():
                 st.subheader("5. Gerar formulário")
                 if st.button("⚙️ Gerar Formulário XLSX", type="primary", key="cob_gerar"):
                     try:
-                        wb = _criar_workbook_formulario_template()
-                        ws = wb["Plan1"]
-
-                        # Preencher campos de cabeçalho variáveis
-                        ws["A7"] = campo_empresa
-                        ws["G7"] = f"DATA: {campo_data.strftime('%d/%m/%Y')}"
-
-                        # Ordenar itens por DATA antes de escrever no XLSX
-                        _df_sort = pd.DataFrame(itens)
-                        _df_sort["_dt"] = pd.to_datetime(
-                            _df_sort["DATA"].astype(str), dayfirst=True, errors="coerce"
+                        xlsx_bytes = gerar_formulario_cobranca(
+                            itens, campo_empresa, campo_data, estimar_valor,
                         )
-                        _df_sort = _df_sort.sort_values("_dt", na_position="last").drop(columns=["_dt"])
-                        itens_xlsx = _df_sort.to_dict("records")
-
-                        # Estilos
-                        _fill_baixa_conf = PatternFill("solid", fgColor="FFF3CD")
-                        _font_normal = Font(name="Arial", size=9)
-
-                        for i, item in enumerate(itens_xlsx):
-                            row_num = 11 + i
-                            ws.cell(row_num, 1).value = item["DATA"]
-                            ws.cell(row_num, 2).value = item["NR_ATEND"]
-                            ws.cell(row_num, 3).value = str(item["PACIENTE"]).title()
-                            ws.cell(row_num, 4).value = item["CONVENIO"]
-                            ws.cell(row_num, 5).value = item["PRESTADOR"]
-                            ws.cell(row_num, 6).value = item["CODIGO"]
-                            ws.cell(row_num, 7).value = item["PROCEDIMENTO"]
-                            ws.cell(row_num, 8).value = item["FUNCAO"]
-                            ws.cell(row_num, 9).value = item["OBSERVACAO"]
-
-                            if estimar_valor:
-                                val = item.get("VALOR")
-                                conf = item.get("_conf", "Sem dados")
-                                ws.cell(row_num, 10).value = val
-                                if conf in ("Baixa", "Sem dados"):
-                                    ws.cell(row_num, 10).fill = _fill_baixa_conf
-                            # Fonte uniforme
-                            for col in range(1, 11):
-                                ws.cell(row_num, col).font = _font_normal
-
-                        # Salvar em buffer
-                        buf = BytesIO()
-                        wb.save(buf)
-                        buf.seek(0)
 
                         _anos_sel = sorted({p[0] for p in filtro_periodos})
                         _periodo_slug = "_".join(str(a) for a in _anos_sel)[:20] if _anos_sel else "todos"
                         ts_now = datetime.now().strftime("%Y%m%d_%H%M%S")
                         fname = f"formulario_cobranca_{_periodo_slug}_{ts_now}.xlsx"
 
-                        st.success(f"Formulário gerado: {len(itens_xlsx)} linhas")
+                        st.success(f"Formulário gerado: {len(itens)} linhas")
                         st.download_button(
                             label="⬇️ Baixar Formulário XLSX",
-                            data=buf.getvalue(),
+                            data=xlsx_bytes,
                             file_name=fname,
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                             type="primary",
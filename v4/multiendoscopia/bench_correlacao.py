@@ -0,0 +1,200 @@
+"""
+Benchmark da correlação local (correlacionar_dataframes) sobre dados sintéticos.
+
+Para cada escala gera PRODUCAO/REPASSE com gerador_sintetico.py (mesma seed →
+mesmos dados) e mede, num processo Python novo por escala:
+    - tempo e vazão (linhas PRODUCAO + REPASSE por segundo)
+    - pico de memória (RSS máximo do processo) e RSS antes da correlação
+    - distribuição de MetodoMatch e taxa de acerto de cada método contra o
+      gabarito do gerador (Observacao_PRODUCAO == NrInternoConta_REPASSE)
+    - taxa de match da PRODUCAO comparada à esperada (linhas com REPASSE gerado)
+
+Com --incremental mede o fechamento mensal (correlacionar_incremental): o
+estado é montado com PRODUCAO/REPASSE anteriores ao último mês dos dados e a
+incremental recebe a PRODUCAO completa e só o REPASSE do último mês; compara
+tempo e resultado com a correlação completa sobre os mesmos dados.
+
+O cache de similaridade em disco (proc_similaridade_cache.csv) é usado como na
+aplicação; a primeira execução após alterar os sinônimos inclui o custo de
+recalcular a matriz.
+
+Uso:
+    python bench_correlacao.py [linhas ...] [--seed 42] [--json] [--incremental]
+    python bench_correlacao.py 1000 10000 100000
+    python bench_correlacao.py 1000000 --json > resultado.json
+    python bench_correlacao.py 100000 --incremental
+"""
+
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Métodos aplicados às linhas PRODUCAO (os demais marcam linhas só do REPASSE,
+# sem gabarito a comparar)
+_METODOS_PRODUCAO = (
+    "1_NOME_COMPLETO_DATA_PROCEDIMENTO",
+    "2_FALLBACK_NR-ATENDIMENTO_DATA_PROCEDIMENTO",
+    "3_FALLBACK_NOME_PARCIAL_FUZZY_DATA_FIXA",
+    "4_FALLBACK_NOME_COMPLETO_DATA-FLEXIVEL",
+    "SEM_MATCH",
+)
+
+
+def _rss_pico_mb() -> float:
+    # ru_maxrss em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir(linhas: int, seed: int) -> dict:
+    """Gera os dados e correlaciona uma vez neste processo."""
+    import gerador_sintetico
+    import motor
+
+    logging.disable(logging.CRITICAL)
+    t0 = time.perf_counter()
+    df_producao, df_repasse, injetados = gerador_sintetico.gerar_producao_repasse(linhas, seed=seed)
+    t_geracao = time.perf_counter() - t0
+    rss_antes = _rss_pico_mb()
+
+    t0 = time.perf_counter()
+    df_corr = motor.correlacionar_dataframes(df_producao, df_repasse)
+    segundos = time.perf_counter() - t0
+    if df_corr is None:
+        raise RuntimeError("correlacionar_dataframes retornou None")
+
+    metodo = df_corr["MetodoMatch"].fillna("").replace("", "(REPASSE sem PRODUCAO)")
+    acerto = df_corr["Observacao_PRODUCAO"] == df_corr["NrInternoConta_REPASSE"]
+    metodos = {}
+    for nome, grupo in acerto.groupby(metodo):
+        metodos[nome] = {
+            "linhas": int(grupo.size),
+            "acerto": float(grupo.mean()) if nome in _METODOS_PRODUCAO[:-1] else None,
+        }
+
+    n_prod, n_rep = len(df_producao), len(df_repasse)
+    casados_prod = sum(v["linhas"] for k, v in metodos.items() if k in _METODOS_PRODUCAO and k != "SEM_MATCH")
+    return {
+        "linhas_producao": n_prod,
+        "linhas_repasse": n_rep,
+        "linhas_resultado": len(df_corr),
+        "geracao_s": t_geracao,
+        "segundos": segundos,
+        "linhas_por_s": (n_prod + n_rep) / segundos,
+        "rss_antes_mb": rss_antes,
+        "rss_pico_mb": _rss_pico_mb(),
+        "match_producao": casados_prod / n_prod,
+        "match_esperado": 1 - injetados["sem_repasse"] / n_prod,
+        "metodos": metodos,
+        "injetados": injetados,
+    }
+
+
+def medir_incremental(linhas: int, seed: int) -> dict:
+    """Estado até o penúltimo mês; incremental com o último mês × correlação completa."""
+    import pandas as pd
+
+    import gerador_sintetico
+    import motor
+
+    logging.disable(logging.CRITICAL)
+    df_producao, df_repasse, _ = gerador_sintetico.gerar_producao_repasse(linhas, seed=seed)
+    data_prod = pd.to_datetime(df_producao["Data"], format="%d/%m/%Y", errors="coerce")
+    data_rep = pd.to_datetime(df_repasse["Data"], format="%d/%m/%Y", errors="coerce")
+    inicio_mes = data_prod.max().to_period("M").to_timestamp()
+    repasse_anterior = df_repasse[data_rep < inicio_mes]
+    repasse_mes = df_repasse[~(data_rep < inicio_mes)]
+
+    _, estado = motor.correlacionar_incremental(df_producao[data_prod < inicio_mes], repasse_anterior)
+
+    t0 = time.perf_counter()
+    df_incremental, estado = motor.correlacionar_incremental(df_producao, repasse_mes, estado)
+    segundos_incremental = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df_completa = motor.correlacionar_dataframes(
+        df_producao, pd.concat([repasse_anterior, repasse_mes], ignore_index=True),
+    )
+    segundos_completa = time.perf_counter() - t0
+
+    chave = ["ChaveCorrelacao", "NrInternoConta_REPASSE", "MetodoMatch", "StatusCorrelacao"]
+    contagem_inc = df_incremental[chave].astype(str).value_counts()
+    contagem_comp = df_completa[chave].astype(str).value_counts()
+    return {
+        "linhas_producao": len(df_producao),
+        "linhas_repasse_mes": len(repasse_mes),
+        "segundos_completa": segundos_completa,
+        "segundos_incremental": segundos_incremental,
+        "resumo": estado["resumo"],
+        "linhas_divergentes": int(contagem_inc.sub(contagem_comp, fill_value=0).abs().sum()) // 2,
+        "identico": bool(df_incremental.equals(df_completa)),
+    }
+
+
+def _medir_em_processo_novo(linhas: int, seed: int, incremental: bool = False) -> dict:
+    proc = subprocess.run(
+        [sys.executable, __file__, "--medir", str(linhas), "--seed", str(seed)]
+        + (["--incremental"] if incremental else []),
+        capture_output=True, text=True, cwd=Path(__file__).parent, stdin=subprocess.DEVNULL,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _imprimir(r: dict) -> None:
+    print(f"\n=== PRODUCAO {r['linhas_producao']} × REPASSE {r['linhas_repasse']} "
+          f"→ {r['linhas_resultado']} linhas correlacionadas")
+    print(f"Geração: {r['geracao_s']:.2f}s | Correlação: {r['segundos']:.2f}s "
+          f"({r['linhas_por_s']:,.0f} linhas/s)")
+    print(f"Memória: pico {r['rss_pico_mb']:.0f} MB (antes da correlação {r['rss_antes_mb']:.0f} MB)")
+    print(f"Match PRODUCAO: {r['match_producao']:.2%} (esperado ~{r['match_esperado']:.2%})")
+    print(f"{'MetodoMatch':<48} {'linhas':>9} {'% result.':>9} {'acerto':>8}")
+    for nome, m in sorted(r["metodos"].items()):
+        acerto = "" if m["acerto"] is None else f"{m['acerto']:.2%}"
+        print(f"{nome:<48} {m['linhas']:>9} {m['linhas'] / r['linhas_resultado']:>9.2%} {acerto:>8}")
+
+
+def _imprimir_incremental(r: dict) -> None:
+    resumo = r["resumo"]
+    print(f"\n=== PRODUCAO {r['linhas_producao']} · REPASSE do mês {r['linhas_repasse_mes']} "
+          f"({resumo['producao']['adicionadas']} linhas PRODUCAO novas, {resumo['recalculadas']} recalculadas)")
+    print(f"Completa: {r['segundos_completa']:.2f}s | Incremental: {r['segundos_incremental']:.2f}s "
+          f"({r['segundos_completa'] / r['segundos_incremental']:.1f}×)")
+    print(f"Resultado idêntico à completa: {'sim' if r['identico'] else 'não'} "
+          f"({r['linhas_divergentes']} linhas divergentes)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark da correlação local sobre dados sintéticos.")
+    parser.add_argument("linhas", nargs="*", type=int, default=[1_000, 10_000, 100_000],
+                        help="Escalas (linhas PRODUCAO); padrão: 1000 10000 100000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Mede o fechamento mensal incremental contra a correlação completa")
+    parser.add_argument("--medir", type=int, help=argparse.SUPPRESS)  # execução interna por escala
+    args = parser.parse_args(argv)
+
+    if args.medir:
+        medicao = medir_incremental if args.incremental else medir
+        print(json.dumps(medicao(args.medir, args.seed)))
+        return 0
+
+    resultados = []
+    for linhas in args.linhas:
+        resultado = _medir_em_processo_novo(linhas, args.seed, args.incremental)
+        resultados.append(resultado)
+        if not args.json:
+            (_imprimir_incremental if args.incremental else _imprimir)(resultado)
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
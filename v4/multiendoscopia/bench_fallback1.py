@@ -0,0 +1,137 @@
+"""
+Benchmark do Fallback 1 (_buscar_fallback1_combinacoes_nome).
+
+Compara a varredura completa de `indice_repasse` (implementação anterior) com a
+busca pelo índice secundário por data (_criar_indice_repasse_por_data) sobre um
+REPASSE sintético, conferindo que ambas retornam o mesmo candidato.
+
+Uso:
+    python bench_fallback1.py [linhas_repasse] [consultas]
+    python bench_fallback1.py 50000 300
+"""
+
+import logging
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from motor import correlate, similaridade
+
+logging.disable(logging.CRITICAL)
+
+_PRIMEIROS = ["MARIA", "JOAO", "ANA", "JOSE", "MICHELE", "FABIANO", "APARECIDA", "LUCAS",
+              "KAROLINNE", "CARLOS", "FERNANDA", "PAULO", "BEATRIZ", "RAFAEL", "JULIANA"]
+_SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "PEREIRA", "FERNANDES", "VASCONCELOS",
+               "GUERREIRO", "LIMA", "COSTA", "RIBEIRO", "ALMEIDA", "CARVALHO", "GOMES"]
+_PROCEDIMENTOS = ["Endoscopia Digestiva Alta", "Colonoscopia (Inclui A Retossigmoidoscopia)",
+                  "Colonoscopia Com Biópsia E/Ou Citologia", "Retossigmoidoscopia Flexível"]
+
+
+def _nome(rng: random.Random) -> str:
+    return " ".join([rng.choice(_PRIMEIROS)] + rng.sample(_SOBRENOMES, rng.choice([2, 3])))
+
+
+def _typo(nome: str, rng: random.Random) -> str:
+    partes = nome.split()
+    i = rng.randrange(1, len(partes))
+    p = partes[i]
+    j = rng.randrange(1, len(p))
+    partes[i] = p[:j] + p[j - 1] + p[j:]
+    return " ".join(partes)
+
+
+def _gerar_repasse(n: int, rng: random.Random, dias: int = 365) -> pd.DataFrame:
+    inicio = date(2025, 1, 1)
+    linhas = [
+        {
+            "Data": (inicio + timedelta(days=rng.randrange(dias))).strftime("%d/%m/%Y"),
+            "Paciente": _nome(rng),
+            "Procedimento": rng.choice(_PROCEDIMENTOS),
+        }
+        for _ in range(n)
+    ]
+    df = pd.DataFrame(linhas)
+    df["_matched"] = False
+    return df
+
+
+def _fallback1_varredura_completa(data_prod, nome_prod, df_rep, indice_repasse, proc_prod, cache,
+                                  limiar_similaridade=0.65, limiar_token=0.82, min_tokens=3):
+    """Implementação anterior: percorre todas as chaves do índice para cada data candidata."""
+    tokens_prod = correlate._extrair_tokens_nome(nome_prod)
+    if len(tokens_prod) < min_tokens:
+        return None, 0.0
+    primeiro = tokens_prod[0]
+    melhor_idx, melhor_score = None, 0.0
+    data_dt = time.strptime(data_prod, "%d/%m/%Y")
+    base = date(data_dt.tm_year, data_dt.tm_mon, data_dt.tm_mday)
+    datas = [data_prod] + [(base + timedelta(days=d)).strftime("%d/%m/%Y") for d in (-1, 1)]
+    for data_cand in datas:
+        for (data_rep, pac_rep), idxs in indice_repasse.items():
+            if data_rep != data_cand:
+                continue
+            matches = correlate._tokens_fuzzy_em_comum(tokens_prod, pac_rep, limiar_token)
+            if len(matches) < min_tokens or not any(tp == primeiro for tp, _, _ in matches):
+                continue
+            for i in idxs:
+                if df_rep.at[i, "_matched"]:
+                    continue
+                score = similaridade._similaridade_procedimento(proc_prod, df_rep.at[i, "Procedimento"], cache)
+                if score >= limiar_similaridade and score > melhor_score:
+                    melhor_idx, melhor_score = i, score
+    return melhor_idx, melhor_score
+
+
+def main(n_repasse: int = 50_000, n_consultas: int = 300, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    df_rep = _gerar_repasse(n_repasse, rng)
+
+    # Consultas: metade com typo de um paciente real (deve casar), metade aleatória
+    consultas = []
+    for k in range(n_consultas):
+        i = rng.randrange(n_repasse)
+        nome = df_rep.at[i, "Paciente"]
+        nome = _typo(nome, rng) if k % 2 == 0 else _nome(rng)
+        consultas.append((df_rep.at[i, "Data"], nome, df_rep.at[i, "Procedimento"]))
+
+    t0 = time.perf_counter()
+    indice_repasse  = correlate._criar_indice_repasse(df_rep)
+    indice_por_data = correlate._criar_indice_repasse_por_data(indice_repasse)
+    t_indice = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    antigo = [
+        _fallback1_varredura_completa(d, n, df_rep, indice_repasse, p, {})
+        for d, n, p in consultas
+    ]
+    t_antigo = time.perf_counter() - t0
+
+    cache_sim: dict = {}
+    cache_tokens: dict = {}
+    t0 = time.perf_counter()
+    novo = [
+        correlate._buscar_fallback1_combinacoes_nome(
+            d, n, df_rep, indice_repasse, p, cache_sim,
+            indice_por_data=indice_por_data, cache_tokens=cache_tokens,
+        )
+        for d, n, p in consultas
+    ]
+    t_novo = time.perf_counter() - t0
+
+    assert antigo == novo, "Resultados divergentes entre varredura completa e índice por data"
+
+    encontrados = sum(1 for idx, _ in novo if idx is not None)
+    print(f"REPASSE: {n_repasse} linhas | {len(indice_repasse)} chaves | {len(indice_por_data)} datas")
+    print(f"Consultas FB1: {n_consultas} ({encontrados} com match)")
+    print(f"Índices (principal + por data): {t_indice:.3f}s")
+    print(f"Varredura completa: {t_antigo:.3f}s ({t_antigo / n_consultas * 1000:.2f} ms/consulta)")
+    print(f"Índice por data:    {t_novo:.3f}s ({t_novo / n_consultas * 1000:.2f} ms/consulta)")
+    print(f"Speedup: {t_antigo / t_novo:.1f}x")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,73 @@
+"""
+Benchmark de inicialização do app (time-to-first-render).
+
+Cada repetição roda num processo Python novo, como num container recém-subido:
+importa o Streamlit e executa o script uma vez via AppTest (import do app +
+primeira renderização completa da página, sem interação). Informa também se
+CrewAI/LiteLLM foram carregados — no modo local não deveriam ser.
+
+Uso:
+    python bench_startup.py [repeticoes] [caminho_app]
+    python bench_startup.py 5
+    python bench_startup.py 5 ../multibanco/app.py
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Executado em um processo novo por repetição
+_MEDICAO = """
+import json, sys, time
+from pathlib import Path
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_streamlit = time.perf_counter() - t0
+app = Path(sys.argv[1]).resolve()
+sys.path.insert(0, str(app.parent))  # como o `streamlit run`
+at = AppTest.from_file(str(app), default_timeout=300)
+t0 = time.perf_counter()
+at.run()
+t_render = time.perf_counter() - t0
+print(json.dumps({
+    "streamlit": t_streamlit,
+    "render": t_render,
+    "excecao": bool(at.exception),
+    "crewai": "crewai" in sys.modules,
+    "litellm": "litellm" in sys.modules,
+}))
+"""
+
+
+def medir(app: Path) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _MEDICAO, str(app)],
+        capture_output=True, text=True, cwd=app.parent, stdin=subprocess.DEVNULL,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(repeticoes: int = 5, app: str = str(Path(__file__).parent / "app.py")) -> None:
+    caminho = Path(app).resolve()
+    medicoes = [medir(caminho) for _ in range(repeticoes)]
+
+    streamlit = [m["streamlit"] for m in medicoes]
+    render = [m["render"] for m in medicoes]
+    total = [s + r for s, r in zip(streamlit, render)]
+    print(f"App: {caminho} ({repeticoes} processo(s) novo(s))")
+    print(f"Import do Streamlit:              mediana {statistics.median(streamlit):.2f}s")
+    print(f"Script (import + 1ª renderização): mediana {statistics.median(render):.2f}s "
+          f"(mín {min(render):.2f}s, máx {max(render):.2f}s)")
+    print(f"Time-to-first-render:             mediana {statistics.median(total):.2f}s")
+    print(f"CrewAI carregado: {any(m['crewai'] for m in medicoes)} | "
+          f"LiteLLM carregado: {any(m['litellm'] for m in medicoes)} | "
+          f"exceção no script: {any(m['excecao'] for m in medicoes)}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    main(int(args[0]) if args else 5, *args[1:])
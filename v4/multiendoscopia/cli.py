@@ -0,0 +1,314 @@
+"""
+Pipeline local pela linha de comando: transformação → correlação → cobrança.
+
+Mesmo motor da interface (pacote motor/), sem Streamlit e sem CrewAI — sobe em
+uma fração do tempo do app e pode ser agendado (cron) sobre o diretório
+de planilhas mensais.
+
+Entradas podem ser arquivos (.xlsx, .xls, .csv, .txt) ou diretórios (lidos
+sem recursão). Todos os arquivos PRODUCAO são concatenados numa única
+tabela, assim como os REPASSE, antes da correlação. Arquivos .parquet são
+tabelas já transformadas (producao.parquet/repasse.parquet de uma execução
+anterior) e pulam a transformação.
+
+Com --estado DIR a correlação é incremental (motor.correlacionar_incremental):
+o REPASSE das entradas é acumulado ao do estado e só as linhas PRODUCAO
+próximas (±7 dias) de dados novos/alterados são casadas de novo. O fechamento
+mensal passa só a PRODUCAO acumulada e o REPASSE do mês; o estado é regravado
+ao final. Sem estado em DIR, a primeira execução é completa.
+
+Saída (no diretório indicado por -o):
+    producao.parquet           tabelas transformadas (Parquet, lidas por
+    repasse.parquet            memory-map; motor.armazenamento)
+    correlacao.parquet         resultado de correlacionar_dataframes (tipado:
+                               datas, valores e category)
+    correlacao.csv             o mesmo resultado em CSV, para exportação
+    tuss_valores.csv           estimativas de valor por convênio; execuções
+                               seguintes atualizam só o ano corrente
+    formulario_cobranca.xlsx   formulário de revisão de procedimentos
+
+Uso:
+    python cli.py ENTRADA [ENTRADA ...] -o SAIDA [opções]
+    python cli.py /dados/2025 -o /saidas/2025 --empresa "ENDOPRIME SERVICOS MEDICOS"
+    python cli.py /saidas/2025/producao.parquet /saidas/2025/repasse.parquet -o /saidas/2025b
+    python cli.py producao_acumulada.xlsx repasse_marco.xlsx -o /saidas/2025-03 --estado /dados/estado
+
+Código de saída: 0 em sucesso, 1 se faltar PRODUCAO/REPASSE ou a correlação falhar.
+"""
+
+import argparse
+import logging
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import motor
+from motor import armazenamento, transform, tuss
+
+logger = logging.getLogger("cli")
+
+_EXTENSOES_PLANILHA = {"xlsx", "xls"}
+_EXTENSOES_TEXTO = {"csv", "txt"}
+_EXTENSOES_TABELA = {"parquet"}
+_TIPOS_COBRANCA = ("downgrade", "ausente", "nao_faturado")
+
+
+def _listar_entradas(caminhos: list[str]) -> list[Path]:
+    """Expande diretórios (sem recursão) e mantém só as extensões suportadas, em ordem de nome."""
+    arquivos: list[Path] = []
+    for caminho in map(Path, caminhos):
+        candidatos = sorted(caminho.iterdir()) if caminho.is_dir() else [caminho]
+        for arquivo in candidatos:
+            extensao = arquivo.suffix.lstrip(".").lower()
+            if not arquivo.is_file() or arquivo.name.startswith(("~$", ".")):
+                continue
+            if extensao in _EXTENSOES_PLANILHA | _EXTENSOES_TEXTO | _EXTENSOES_TABELA:
+                arquivos.append(arquivo)
+            elif not caminho.is_dir():
+                logger.warning(f"Formato não suportado, ignorado: {arquivo}")
+    return arquivos
+
+
+def _transformar_arquivo(arquivo: Path, workers: int | str | None) -> pd.DataFrame | None:
+    extensao = arquivo.suffix.lstrip(".").lower()
+    if extensao in _EXTENSOES_TABELA:
+        return armazenamento.ler_parquet(arquivo)
+    if extensao in _EXTENSOES_PLANILHA:
+        with open(arquivo, "rb") as f:
+            abas = motor.ler_abas_excel(f)
+        return motor.transformar_abas_arquivo(abas, arquivo.name, workers=workers)
+    conteudo = arquivo.read_text(encoding="utf-8", errors="ignore")
+    return motor.transformar_texto_arquivo(conteudo, arquivo.name, workers=workers)
+
+
+def _tipo_tabela(df: pd.DataFrame) -> str:
+    """PRODUCAO / REPASSE pela coluna TipoArquivo (mesma regra da aba Correlação)."""
+    if "TipoArquivo" not in df.columns or df.empty:
+        return ""
+    tipo = str(df["TipoArquivo"].iloc[0]).upper()
+    return "PRODUCAO" if "PRODUCAO" in tipo else "REPASSE" if "REPASSE" in tipo else ""
+
+
+def _carregar_estado(diretorio: Path) -> dict | None:
+    if not (diretorio / "objeto.pkl").exists():
+        logger.info(f"Sem estado de correlação em {diretorio} — correlação completa")
+        return None
+    return armazenamento.carregar_objeto(diretorio)
+
+
+def _salvar_estado(estado: dict, diretorio: Path) -> None:
+    """
+    Grava num diretório temporário e troca pelo anterior: os Parquet do estado
+    carregado podem estar mapeados em memória e não são sobrescritos no lugar.
+    """
+    temporario = diretorio.with_name(diretorio.name + ".novo")
+    shutil.rmtree(temporario, ignore_errors=True)
+    armazenamento.salvar_objeto(estado, temporario)
+    shutil.rmtree(diretorio, ignore_errors=True)
+    temporario.rename(diretorio)
+
+
+def executar_pipeline(
+    arquivos: list[Path],
+    saida: Path,
+    empresa: str,
+    data_formulario,
+    tipos_cobranca: tuple[str, ...] = _TIPOS_COBRANCA,
+    estimar_valor: bool = True,
+    workers: int | str | None = None,
+    estado: Path | None = None,
+) -> dict:
+    """
+    Transforma, correlaciona e gera os arquivos de saída. Arquivos que falham na
+    transformação são registrados no log e ignorados. Com `estado`, a correlação
+    é incremental sobre o estado gravado nesse diretório, regravado ao final.
+
+    Returns:
+        {"correlacao": Path (CSV), "tabelas": {"producao" | "repasse" | "correlacao": Path (Parquet)},
+         "tuss_valores": Path, "cobranca": Path, "linhas": int, "itens_cobranca": int,
+         "erros": {arquivo: mensagem}, "incremental": resumo da correlação incremental ou None}
+
+    Raises:
+        RuntimeError: nenhum PRODUCAO/REPASSE válido ou falha na correlação.
+    """
+    tabelas: dict[str, list[pd.DataFrame]] = {"PRODUCAO": [], "REPASSE": []}
+    erros: dict[str, str] = {}
+    for arquivo in arquivos:
+        t0 = time.perf_counter()
+        try:
+            df = _transformar_arquivo(arquivo, workers)
+        except Exception as e:
+            logger.error(f"Erro ao transformar {arquivo}: {e}", exc_info=True)
+            erros[str(arquivo)] = str(e)
+            continue
+        tipo = _tipo_tabela(df) if df is not None else ""
+        if not tipo:
+            logger.warning(f"Nenhum dado PRODUCAO/REPASSE extraído de {arquivo}")
+            erros[str(arquivo)] = "Nenhum dado PRODUCAO/REPASSE extraído"
+            continue
+        tabelas[tipo].append(df)
+        logger.info(f"{arquivo.name}: {tipo} com {len(df)} linhas em {time.perf_counter() - t0:.1f}s")
+
+    faltando = [tipo for tipo, dfs in tabelas.items() if not dfs]
+    if faltando:
+        raise RuntimeError(f"Nenhum arquivo {' / '.join(faltando)} válido entre as entradas")
+    df_producao = pd.concat(tabelas["PRODUCAO"], ignore_index=True)
+    df_repasse = pd.concat(tabelas["REPASSE"], ignore_index=True)
+
+    saida.mkdir(parents=True, exist_ok=True)
+    tabelas_parquet = {
+        "producao": armazenamento.salvar_parquet(df_producao, saida / "producao.parquet"),
+        "repasse": armazenamento.salvar_parquet(df_repasse, saida / "repasse.parquet"),
+    }
+    caminho_valores = saida / "tuss_valores.csv"
+    tabela_tuss = tuss._carregar_tabela_tuss()
+
+    t0 = time.perf_counter()
+    resumo_incremental = None
+    if estado is None:
+        df_corr = motor.correlacionar_dataframes(
+            df_producao, df_repasse,
+            tabela_tuss_preloaded=tabela_tuss,
+            valores_tuss_preloaded=tuss._carregar_valores_tuss(caminho_valores),
+        )
+    else:
+        df_corr, novo_estado = motor.correlacionar_incremental(
+            df_producao, df_repasse, _carregar_estado(estado),
+            tabela_tuss_preloaded=tabela_tuss,
+            valores_tuss_preloaded=tuss._carregar_valores_tuss(caminho_valores),
+        )
+        if df_corr is not None:
+            _salvar_estado(novo_estado, estado)
+            # Descrições e cobrança olham o REPASSE acumulado, não só o do upload
+            df_repasse = novo_estado["repasse"]
+            resumo_incremental = novo_estado["resumo"]
+    if df_corr is None:
+        raise RuntimeError("A correlação local falhou — veja o log")
+    logger.info(f"Correlação: {len(df_corr)} linhas em {time.perf_counter() - t0:.1f}s")
+
+    caminho_correlacao = saida / "correlacao.csv"
+    df_corr.to_csv(caminho_correlacao, index=False, sep=",", encoding="utf-8-sig")
+
+    # A partir daqui o resultado segue como a interface o exibe (lido de volta do CSV);
+    # o Parquet guarda a forma tipada da sessão (datas, valores e category)
+    df_corr = transform._df_como_csv_lido(df_corr)
+    tabelas_parquet["correlacao"] = armazenamento.salvar_parquet(
+        transform._df_tipado(df_corr), saida / "correlacao.parquet"
+    )
+    if not df_corr.empty:
+        tuss._gerar_valores_tuss(df_corr, caminho_saida=caminho_valores)
+
+    itens = motor.montar_itens_cobranca(
+        motor.preparar_df_cobranca(df_corr),
+        tuss._carregar_valores_tuss(caminho_valores),
+        tabela_tuss,
+        tuss._construir_desc_por_codigo(df_repasse),
+        incluir_downgrade="downgrade" in tipos_cobranca,
+        incluir_ausente="ausente" in tipos_cobranca,
+        incluir_nao_faturado="nao_faturado" in tipos_cobranca,
+    )
+    caminho_cobranca = saida / "formulario_cobranca.xlsx"
+    caminho_cobranca.write_bytes(
+        motor.gerar_formulario_cobranca(itens, empresa, data_formulario, estimar_valor)
+    )
+
+    return {
+        "correlacao": caminho_correlacao,
+        "tabelas": tabelas_parquet,
+        "tuss_valores": caminho_valores,
+        "cobranca": caminho_cobranca,
+        "linhas": len(df_corr),
+        "itens_cobranca": len(itens),
+        "erros": erros,
+        "incremental": resumo_incremental,
+    }
+
+
+def _argumentos(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Transformação → correlação PRODUCAO × REPASSE → formulário de cobrança, sem interface.",
+    )
+    parser.add_argument("entradas", nargs="+", help="Arquivos ou diretórios de planilhas PRODUCAO/REPASSE")
+    parser.add_argument("-o", "--saida", required=True, type=Path, help="Diretório de saída")
+    parser.add_argument("--empresa", default="ENDOPRIME SERVICOS MEDICOS", help="Empresa/prestador do formulário")
+    parser.add_argument(
+        "--data",
+        type=lambda s: datetime.strptime(s, "%d/%m/%Y"),
+        default=datetime.today(),
+        help="Data do formulário (DD/MM/AAAA; padrão: hoje)",
+    )
+    parser.add_argument(
+        "--tipos",
+        default=",".join(_TIPOS_COBRANCA),
+        help=f"Tipos de item de cobrança, separados por vírgula ({', '.join(_TIPOS_COBRANCA)})",
+    )
+    parser.add_argument("--sem-valor", action="store_true", help="Não preenche a coluna VALOR do formulário")
+    parser.add_argument(
+        "--workers",
+        default=None,
+        help="Processos para transformar abas em paralelo (número ou 'auto'; padrão: TRANSFORM_WORKERS)",
+    )
+    parser.add_argument(
+        "--estado",
+        type=Path,
+        default=None,
+        help="Diretório do estado da correlação incremental (criado na primeira execução)",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log detalhado do motor")
+    args = parser.parse_args(argv)
+    args.tipos = tuple(t.strip() for t in args.tipos.split(",") if t.strip())
+    invalidos = set(args.tipos) - set(_TIPOS_COBRANCA)
+    if invalidos:
+        parser.error(f"tipo(s) de cobrança desconhecido(s): {', '.join(sorted(invalidos))}")
+    if args.workers and args.workers.isdigit():
+        args.workers = int(args.workers)
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _argumentos(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    if not args.verbose:
+        logging.getLogger("motor").setLevel(logging.WARNING)
+
+    arquivos = _listar_entradas(args.entradas)
+    if not arquivos:
+        logger.error("Nenhum arquivo .xlsx/.xls/.csv/.txt/.parquet nas entradas")
+        return 1
+
+    t0 = time.perf_counter()
+    try:
+        resultado = executar_pipeline(
+            arquivos,
+            args.saida,
+            args.empresa,
+            args.data,
+            tipos_cobranca=args.tipos,
+            estimar_valor=not args.sem_valor,
+            workers=args.workers,
+            estado=args.estado,
+        )
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+
+    logger.info(
+        f"Concluído em {time.perf_counter() - t0:.1f}s: {resultado['linhas']} linhas correlacionadas, "
+        f"{resultado['itens_cobranca']} itens de cobrança → {args.saida}"
+    )
+    if resultado["incremental"]:
+        logger.info(f"Correlação incremental: {resultado['incremental']}")
+    for arquivo, erro in resultado["erros"].items():
+        logger.warning(f"Ignorado: {arquivo} ({erro})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Gerador sintético e reproduzível de pares PRODUCAO/REPASSE.
+
+Produz as duas tabelas já no formato padronizado da transformação (mesmas
+colunas de _processar_aba_producao / _processar_aba_repasse, tudo texto), prontas
+para correlacionar_dataframes — sem depender de planilhas reais de pacientes.
+
+Cada linha PRODUCAO gera, em regra, uma linha REPASSE equivalente. O ruído
+injetado imita o que aparece nos arquivos reais:
+    sem_repasse     procedimento não faturado (linha REPASSE ausente)
+    typo_nome       erro de digitação no nome (MICHELE → MICHELLE, letra omitida/trocada)
+    data_vizinha    data do REPASSE deslocada em ±1 dia
+    data_ampla      data deslocada em ±2..deslocamento_max_dias dias
+    nome_abreviado  sobrenomes do meio abreviados no REPASSE (MARIA S OLIVEIRA)
+    sinonimo        procedimento da PRODUCAO escrito com sinônimo/abreviação (EDA, COLONO, AP)
+    glosa           ValorLiberado = 0 no REPASSE
+    repasse_orfao   linhas REPASSE sem PRODUCAO (parte antes do período)
+    companion       linha extra de Teste de Urease junto da EDA com urease
+
+sem_repasse, typo_nome, data_vizinha, data_ampla e nome_abreviado são
+mutuamente exclusivas (no máximo uma por linha); sinonimo e glosa são
+sorteados à parte.
+
+O gabarito vai em colunas que a correlação não usa para casar: Observacao na
+PRODUCAO e NrInternoConta no REPASSE recebem o mesmo identificador ("SINT-<n>"),
+o que permite medir acerto por MetodoMatch (ver bench_correlacao.py).
+
+Uso:
+    python gerador_sintetico.py LINHAS -o SAIDA [--seed 42] [--dias 365]
+    python gerador_sintetico.py 100000 -o /tmp/sintetico
+
+Grava producao.csv e repasse.csv (entrada de correlacionar_csv_arquivos).
+"""
+
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from motor.transform import _MAP_PRODUCAO_2026, _MAP_REPASSE
+
+COLUNAS_PRODUCAO = list(dict.fromkeys(_MAP_PRODUCAO_2026.values())) + ["TipoArquivo", "AbaOrigemDados"]
+COLUNAS_REPASSE = list(dict.fromkeys(_MAP_REPASSE.values())) + ["TipoArquivo", "AbaOrigemDados"]
+
+# Proporções padrão (fração das linhas PRODUCAO, exceto companion: fração das EDA com urease)
+RUIDO_PADRAO = {
+    "sem_repasse": 0.06,
+    "typo_nome": 0.06,
+    "data_vizinha": 0.04,
+    "data_ampla": 0.03,
+    "nome_abreviado": 0.02,
+    "sinonimo": 0.15,
+    "glosa": 0.04,
+    "repasse_orfao": 0.04,
+    "companion": 0.5,
+    "deslocamento_max_dias": 5,
+}
+# Ordem das categorias exclusivas sorteadas por linha
+_CATEGORIAS_EXCLUSIVAS = ("sem_repasse", "typo_nome", "data_vizinha", "data_ampla", "nome_abreviado")
+
+_PRIMEIROS = [
+    "MARIA", "JOAO", "ANA", "JOSE", "MICHELE", "FABIANO", "APARECIDA", "LUCAS", "PEDRO",
+    "KAROLINNE", "CARLOS", "FERNANDA", "PAULO", "BEATRIZ", "RAFAEL", "JULIANA", "MARCOS",
+    "PATRICIA", "ANTONIO", "LUIZA", "GABRIEL", "HELENA", "RODRIGO", "CAMILA", "THIAGO",
+    "FRANCISCA", "RAIMUNDO", "SEBASTIAO", "ROSANGELA", "VALDIR",
+]
+_SOBRENOMES = [
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "PEREIRA", "FERNANDES", "VASCONCELOS",
+    "GUERREIRO", "LIMA", "COSTA", "RIBEIRO", "ALMEIDA", "CARVALHO", "GOMES", "MARTINS",
+    "ARAUJO", "BARBOSA", "ROCHA", "DIAS", "MOREIRA", "NUNES", "MENDES", "CARDOSO",
+    "TEIXEIRA", "CAVALCANTI", "NASCIMENTO", "FREITAS", "MONTEIRO",
+]
+_CONVENIOS = ["UNIMED", "BRADESCO SAUDE", "SULAMERICA", "AMIL", "CASSI", "PORTO SEGURO", "PARTICULAR"]
+_MESES = ["JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO", "JULHO", "AGOSTO",
+          "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO"]
+
+# (Procedimento PRODUCAO, ProcedimentosAdicionais, Procedimento REPASSE, CodigoTUSS, peso).
+# O primeiro apelido de cada tupla é a grafia usual; os demais entram com o ruído "sinonimo".
+_CATALOGO = [
+    (("EDA", "ENDOSCOPIA", "ENDOSCOPIA DIGESTIVA ALTA"), ("",),
+     "Endoscopia Digestiva Alta", "40201120", 30),
+    (("COLONOSCOPIA", "COLONO", "COLONOCOPIA"), ("",),
+     "Colonoscopia (Inclui A Retossigmoidoscopia)", "40201082", 20),
+    (("COLONO", "COLONOSCOPIA"), ("ANATOMO PATOLOGICO", "AP", "BIOPSIA"),
+     "Colonoscopia Com Biópsia E/Ou Citologia", "40202666", 10),
+    (("EDA", "ENDOSCOPIA"), ("TESTE DE UREASE", "TESTE DA UREASE", "H PYLORI"),
+     "Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)", "40202615", 10),
+    (("ENDOSCOPIA", "EDA", "ESOFAGOGASTRODUODENOSCOPIA"), ("BIOPSIA", "ANATOMO PATOLOGICO", "AP"),
+     "Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia", "40202038", 10),
+    (("COLONO", "COLONOSCOPIA"), ("POLIPECTOMIA", "POLIPO"),
+     "Polipectomia De Cólon (Independente Do Número De Pólipos)", "40202542", 6),
+    (("CPRE",), ("",), "Colangiopancreatografia Retrógrada Endoscópica", "40201074", 3),
+    (("GASTROSTOMIA",), ("",), "Gastrostomia Endoscópica", "40202283", 3),
+    (("PASSAGEM DE SONDA",), ("",), "Passagem De Sonda Naso-Enteral", "40202534", 3),
+    (("ECOENDOSCOPIA", "ECOEDA"), ("",), "Ecoendoscopia Alta Sem Punção", "40201104", 2),
+    (("RETOSSIGMOIDOSCOPIA",), ("",), "Retossigmoidoscopia Flexível", "40201171", 3),
+]
+_IDX_UREASE = 3
+_COMPANION_UREASE = ("Pesquisa De H. Pylori - Teste Da Urease", "40202615")
+
+# Margem de dias antes do início (REPASSE órfão de período anterior) e depois do fim
+_MARGEM_ANTES = 120
+_MARGEM_DEPOIS = 30
+
+
+def _typo_nome(nome: str, rng: random.Random) -> str:
+    """Um erro de digitação em uma das partes do nome: letra dobrada, omitida ou trocada."""
+    partes = nome.split()
+    i = rng.randrange(len(partes))
+    p = partes[i]
+    j = rng.randrange(1, len(p))
+    tipo = rng.random()
+    if tipo < 0.4:
+        p = p[:j] + p[j - 1] + p[j:]             # MICHELE → MICHELLE
+    elif tipo < 0.7 and len(p) > 4:
+        p = p[:j] + p[j + 1:]                    # letra omitida
+    else:
+        p = p[:j - 1] + p[j] + p[j - 1] + p[j + 1:]  # letras adjacentes trocadas
+    partes[i] = p
+    return " ".join(partes)
+
+
+def _abreviar_nome(nome: str) -> str:
+    """Mantém primeiro e último nome; sobrenomes do meio viram iniciais."""
+    partes = nome.split()
+    if len(partes) < 3:
+        return nome
+    return " ".join([partes[0]] + [p[0] for p in partes[1:-1]] + [partes[-1]])
+
+
+def gerar_producao_repasse(
+    linhas: int,
+    seed: int = 42,
+    inicio: date = date(2025, 1, 1),
+    dias: int = 365,
+    ruido: dict | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Gera `linhas` linhas PRODUCAO e o REPASSE correspondente com ruído.
+
+    Mesma seed e parâmetros → mesmas tabelas. Operações por linha ficam em
+    arrays numpy; só nomes com typo/abreviação passam por Python puro.
+
+    Returns:
+        (df_producao, df_repasse, injetados) — injetados conta as linhas
+        afetadas por categoria de ruído, além do total de cada tabela.
+    """
+    cfg = {**RUIDO_PADRAO, **(ruido or {})}
+    rng = np.random.default_rng(seed)
+    rng_py = random.Random(seed)
+    n = int(linhas)
+
+    # Pacientes recorrentes (~3 procedimentos por paciente)
+    n_pac = max(50, n // 3)
+    primeiros = rng.integers(len(_PRIMEIROS), size=n_pac)
+    qtd_sobrenomes = rng.choice([1, 2, 2, 3], size=n_pac)
+    pacientes = np.array([
+        " ".join([_PRIMEIROS[p]] + rng_py.sample(_SOBRENOMES, int(q)))
+        for p, q in zip(primeiros, qtd_sobrenomes)
+    ], dtype=object)
+
+    # Datas e abas pré-formatadas por deslocamento a partir do início
+    desloc = range(-_MARGEM_ANTES, dias + _MARGEM_DEPOIS)
+    datas = [inicio + timedelta(days=d) for d in desloc]
+    datas_str = np.array([d.strftime("%d/%m/%Y") for d in datas], dtype=object)
+    abas_str = np.array([f"ABA: {_MESES[d.month - 1]} {d.year}" for d in datas], dtype=object)
+
+    pesos = np.array([c[4] for c in _CATALOGO], dtype=float)
+    proc = rng.choice(len(_CATALOGO), size=n, p=pesos / pesos.sum())
+    pac = rng.integers(n_pac, size=n)
+    dia = rng.integers(dias, size=n) + _MARGEM_ANTES
+    conv = np.array(_CONVENIOS, dtype=object)[rng.integers(len(_CONVENIOS), size=n)]
+    atend = rng.integers(100_000, 10_000_000, size=n).astype(str).astype(object)
+    ids = np.char.add("SINT-", np.arange(n).astype(str)).astype(object)
+
+    # Categoria exclusiva por linha (-1 = sem ruído de nome/data)
+    limites = np.cumsum([cfg[c] for c in _CATEGORIAS_EXCLUSIVAS])
+    sorteio = rng.random(n)
+    categoria = np.searchsorted(limites, sorteio, side="right")
+    categoria[categoria >= len(_CATEGORIAS_EXCLUSIVAS)] = -1
+    sinonimo = rng.random(n) < cfg["sinonimo"]
+    glosa = rng.random(n) < cfg["glosa"]
+    escolha_apelido = rng.integers(1 << 30, size=n)
+
+    def _apelido(apelidos: tuple, trocar: bool, escolha: int) -> str:
+        if not trocar or len(apelidos) == 1:
+            return apelidos[0]
+        return apelidos[1 + escolha % (len(apelidos) - 1)]
+
+    procedimento = [
+        _apelido(_CATALOGO[c][0], s, e) for c, s, e in zip(proc, sinonimo, escolha_apelido)
+    ]
+    adicional = [
+        _apelido(_CATALOGO[c][1], s, e >> 8) for c, s, e in zip(proc, sinonimo, escolha_apelido)
+    ]
+
+    df_producao = pd.DataFrame({
+        "QTD": (np.arange(n) % 30 + 1).astype(str),
+        "Data": datas_str[dia],
+        "Paciente": pacientes[pac],
+        "NrAtendimento": atend,
+        "Convenio": conv,
+        "Origem": "AMB",
+        "Procedimento": procedimento,
+        "ProcedimentosAdicionais": adicional,
+        "MedicoExecutor": "DR FULANO",
+        "LocalSetor": "ENDOSCOPIA",
+        "Sala": "1",
+        "Carater": "ELETIVO",
+        "Observacao": ids,
+        "TipoArquivo": "PRODUCAO",
+        "AbaOrigemDados": abas_str[dia],
+    }, columns=COLUNAS_PRODUCAO)
+
+    # ── REPASSE correspondente ─────────────────────────────────────────────────
+    com_repasse = categoria != _CATEGORIAS_EXCLUSIVAS.index("sem_repasse")
+    idx = np.flatnonzero(com_repasse)
+    cat_rep = categoria[idx]
+
+    nomes_rep = pacientes[pac[idx]].copy()
+    for pos in np.flatnonzero(cat_rep == _CATEGORIAS_EXCLUSIVAS.index("typo_nome")):
+        nomes_rep[pos] = _typo_nome(nomes_rep[pos], rng_py)
+    for pos in np.flatnonzero(cat_rep == _CATEGORIAS_EXCLUSIVAS.index("nome_abreviado")):
+        nomes_rep[pos] = _abreviar_nome(nomes_rep[pos])
+
+    deslocamento = np.zeros(len(idx), dtype=int)
+    sinal = rng.choice([-1, 1], size=len(idx))
+    vizinha = cat_rep == _CATEGORIAS_EXCLUSIVAS.index("data_vizinha")
+    ampla = cat_rep == _CATEGORIAS_EXCLUSIVAS.index("data_ampla")
+    max_desloc = max(2, int(cfg["deslocamento_max_dias"]))
+    deslocamento[vizinha] = sinal[vizinha]
+    deslocamento[ampla] = sinal[ampla] * rng.integers(2, max_desloc + 1, size=int(ampla.sum()))
+    dia_rep = dia[idx] + deslocamento
+
+    valores = np.char.mod("%.2f", rng.uniform(80, 900, size=len(idx))).astype(object)
+    valores[glosa[idx]] = "0"
+
+    proc_rep = proc[idx]
+    rep = {
+        "NrAtendimento": atend[idx],
+        "NrInternoConta": ids[idx],
+        "Paciente": nomes_rep,
+        "Convenio": conv[idx],
+        "CodigoTUSS": np.array([c[3] for c in _CATALOGO], dtype=object)[proc_rep],
+        "Procedimento": np.array([c[2] for c in _CATALOGO], dtype=object)[proc_rep],
+        "Data": datas_str[dia_rep],
+        "ValorLiberado": valores,
+    }
+
+    # Companion: Teste de Urease faturado em linha própria junto da EDA
+    companion = np.flatnonzero((proc_rep == _IDX_UREASE) & (rng.random(len(idx)) < cfg["companion"]))
+    extra = {col: vals[companion].copy() for col, vals in rep.items()}
+    extra["Procedimento"][:] = _COMPANION_UREASE[0]
+    extra["CodigoTUSS"][:] = _COMPANION_UREASE[1]
+    extra["ValorLiberado"] = np.char.mod("%.2f", rng.uniform(30, 120, size=len(companion))).astype(object)
+
+    # Órfãos: REPASSE sem PRODUCAO, parte deles antes do período da PRODUCAO
+    n_orf = int(round(n * cfg["repasse_orfao"]))
+    proc_orf = rng.choice(len(_CATALOGO), size=n_orf, p=pesos / pesos.sum())
+    dia_orf = rng.integers(_MARGEM_ANTES - 90, _MARGEM_ANTES + dias, size=n_orf)
+    orfaos = {
+        "NrAtendimento": rng.integers(100_000, 10_000_000, size=n_orf).astype(str).astype(object),
+        "NrInternoConta": np.char.add("SINT-O", np.arange(n_orf).astype(str)).astype(object),
+        "Paciente": pacientes[rng.integers(n_pac, size=n_orf)],
+        "Convenio": np.array(_CONVENIOS, dtype=object)[rng.integers(len(_CONVENIOS), size=n_orf)],
+        "CodigoTUSS": np.array([c[3] for c in _CATALOGO], dtype=object)[proc_orf],
+        "Procedimento": np.array([c[2] for c in _CATALOGO], dtype=object)[proc_orf],
+        "Data": datas_str[dia_orf],
+        "ValorLiberado": np.char.mod("%.2f", rng.uniform(80, 900, size=n_orf)).astype(object),
+    }
+
+    df_repasse = pd.concat([pd.DataFrame(rep), pd.DataFrame(extra), pd.DataFrame(orfaos)], ignore_index=True)
+    df_repasse = df_repasse.iloc[rng.permutation(len(df_repasse))].reset_index(drop=True)
+    constantes = {
+        "Estabelecimento": "HOSPITAL SAO CAMILO",
+        "CNPJ": "60.975.737/0001-51",
+        "Terceiro": "ENDOPRIME SERVICOS MEDICOS",
+        "Status": "LIBERADO",
+        "NrRepasse": "7301",
+        "TipoItem": "P",
+        "TipoAtendimento": "E",
+        "Categoria": "GERAL",
+        "Via": "U",
+        "MedicoExecutor": "FULANO DE TAL",
+        "Porcentagem": "100",
+        "Funcao": "Cirurgiao",
+        "Especialidade": "ENDOSCOPIA",
+        "QtProcedimento": "1",
+        "TipoArquivo": "REPASSE",
+        "AbaOrigemDados": "ABA: REPASSE",
+    }
+    for col, valor in constantes.items():
+        df_repasse[col] = valor
+    df_repasse = df_repasse[COLUNAS_REPASSE]
+
+    injetados = {
+        "linhas_producao": n,
+        "linhas_repasse": len(df_repasse),
+        **{c: int((categoria == i).sum()) for i, c in enumerate(_CATEGORIAS_EXCLUSIVAS)},
+        "sinonimo": int(sinonimo.sum()),
+        "glosa": int(glosa[idx].sum()),
+        "repasse_orfao": n_orf,
+        "companion": len(companion),
+    }
+    return df_producao, df_repasse, injetados
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera PRODUCAO/REPASSE sintéticos com ruído (formato padronizado).")
+    parser.add_argument("linhas", type=int, help="Linhas PRODUCAO (o REPASSE sai com tamanho parecido)")
+    parser.add_argument("-o", "--saida", required=True, type=Path, help="Diretório de saída")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dias", type=int, default=365, help="Período coberto pela PRODUCAO, a partir de 01/01/2025")
+    args = parser.parse_args(argv)
+
+    df_producao, df_repasse, injetados = gerar_producao_repasse(args.linhas, seed=args.seed, dias=args.dias)
+    args.saida.mkdir(parents=True, exist_ok=True)
+    df_producao.to_csv(args.saida / "producao.csv", index=False, encoding="utf-8")
+    df_repasse.to_csv(args.saida / "repasse.csv", index=False, encoding="utf-8")
+    print(f"PRODUCAO: {len(df_producao)} linhas | REPASSE: {len(df_repasse)} linhas → {args.saida}")
+    print("Ruído injetado: " + ", ".join(f"{k}={v}" for k, v in injetados.items() if not k.startswith("linhas")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Motor local do sistema de endoscopia — sem Streamlit e sem CrewAI.
+
+Pacote importável sem efeitos colaterais: nenhum arquivo é lido ou gravado,
+nenhum logging é configurado e nenhuma variável de ambiente é carregada na
+importação. Usado pela interface (app.py), pela linha de comando (cli.py),
+pelos workers de jobs e pelos benchmarks.
+
+Módulos:
+    leitura       leitura de planilhas Excel por aba
+    transform     transformação PRODUCAO/REPASSE e fronteira DataFrame ↔ CSV
+    similaridade  sinônimos e similaridade de procedimentos, normalização de nomes
+    correlate     correlação local PRODUCAO × REPASSE (completa ou incremental)
+    tuss          tabela TUSS, valores por convênio e verificação pós-correlação
+    cobranca      formulário de cobrança (itens e XLSX)
+    armazenamento tabelas em Parquet (pyarrow) com leitura por memory-map
+    diferenca     impressões por linha e diferença entre uploads sucessivos
+    jobs          fila persistente de jobs e worker (`python -m motor.jobs <dir>`)
+
+As funções públicas são reexportadas aqui, exceto as de motor.jobs (executado
+também como script); os helpers privados continuam acessíveis pelos
+submódulos (ex.: motor.tuss._carregar_tabela_tuss).
+"""
+
+from .leitura import PlanilhaSemDadosError, abas_para_texto, ler_abas_excel
+from .transform import (
+    desmembrar_procedimentos_adicionais_csv_arquivo,
+    desmembrar_procedimentos_adicionais_df,
+    transformar_abas_arquivo,
+    transformar_csv_arquivo,
+    transformar_texto_arquivo,
+)
+from .similaridade import SINONIMOS_PROCEDIMENTOS
+from .correlate import correlacionar_csv_arquivos, correlacionar_dataframes, correlacionar_incremental
+from .tuss import verificar_tuss_adicionais
+from .cobranca import gerar_formulario_cobranca, montar_itens_cobranca, preparar_df_cobranca
+from .armazenamento import carregar_objeto, ler_parquet, salvar_objeto, salvar_parquet
+from .diferenca import DiferencaLinhas, diferenca_linhas, diferenca_tabelas, impressoes_linhas
+
+__all__ = [
+    "PlanilhaSemDadosError",
+    "abas_para_texto",
+    "ler_abas_excel",
+    "desmembrar_procedimentos_adicionais_csv_arquivo",
+    "desmembrar_procedimentos_adicionais_df",
+    "transformar_abas_arquivo",
+    "transformar_csv_arquivo",
+    "transformar_texto_arquivo",
+    "SINONIMOS_PROCEDIMENTOS",
+    "correlacionar_csv_arquivos",
+    "correlacionar_dataframes",
+    "correlacionar_incremental",
+    "verificar_tuss_adicionais",
+    "gerar_formulario_cobranca",
+    "montar_itens_cobranca",
+    "preparar_df_cobranca",
+    "carregar_objeto",
+    "ler_parquet",
+    "salvar_objeto",
+    "salvar_parquet",
+    "DiferencaLinhas",
+    "diferenca_linhas",
+    "diferenca_tabelas",
+    "impressoes_linhas",
+]
@@ -0,0 +1,129 @@
+"""
+Armazenamento colunar (Parquet via pyarrow) das tabelas do pipeline.
+
+Tabelas transformadas PRODUCAO/REPASSE e o resultado da correlação são
+gravados em Parquet e lidos por memory-map; CSV fica só como formato de
+exportação (downloads, correlacao.csv da CLI, entrada do LLM). Colunas de
+baixa cardinalidade são gravadas como category (dicionário no Parquet) e
+voltam como category na leitura.
+"""
+
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# =============================================================================
+# PARQUET
+# =============================================================================
+
+# Colunas gravadas como category — nome exato ou com sufixo (_PRODUCAO/_REPASSE)
+COLUNAS_CATEGORIA = ("Convenio", "StatusCorrelacao", "CodigoTUSS", "MetodoMatch")
+
+
+def _colunas_categoria(df: pd.DataFrame) -> list[str]:
+    return [
+        c for c in df.columns
+        if isinstance(c, str) and any(c == base or c.startswith(base + "_") for base in COLUNAS_CATEGORIA)
+        and df[c].dtype == object
+    ]
+
+
+def _texto_misto_para_str(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas object com tipos misturados (ex.: texto e int vindos do Excel) não
+    têm tipo Arrow; viram texto, preservando os nulos. Devolve o próprio df
+    quando nada precisa mudar.
+    """
+    mistas = [
+        c for c, t in zip(df.columns, df.dtypes)
+        if t == object and pd.api.types.infer_dtype(df[c], skipna=True).startswith("mixed")
+    ]
+    if not mistas:
+        return df
+    df = df.copy()
+    for c in mistas:
+        df[c] = df[c].where(df[c].isna(), df[c].astype(str))
+    return df
+
+
+def salvar_parquet(df: pd.DataFrame, caminho: Path | str) -> Path:
+    """
+    Grava `df` em Parquet (sem o índice). Colunas de COLUNAS_CATEGORIA viram
+    category; as demais mantêm o dtype, exceto object com tipos misturados,
+    que vira texto.
+    """
+    caminho = Path(caminho)
+    df = _texto_misto_para_str(df)
+    categorias = _colunas_categoria(df)
+    if categorias:
+        df = df.astype({c: "category" for c in categorias})
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(tabela, caminho)
+    return caminho
+
+
+def ler_parquet(caminho: Path | str, colunas: list[str] | None = None) -> pd.DataFrame:
+    """Lê um Parquet por memory-map; colunas gravadas como category voltam como category."""
+    tabela = pq.read_table(caminho, columns=colunas, memory_map=True)
+    return tabela.to_pandas()
+
+
+# =============================================================================
+# OBJETOS COM TABELAS (entradas e resultados de jobs)
+# =============================================================================
+# Dicionários/listas que carregam DataFrames (ex.: {"df_producao": ...,
+# "tabela_tuss": {...}}) são gravados num diretório: cada DataFrame em
+# <n>.parquet e o restante da estrutura em objeto.pkl, com referências no
+# lugar das tabelas.
+
+_ARQUIVO_OBJETO = "objeto.pkl"
+
+
+@dataclass(frozen=True)
+class _RefParquet:
+    arquivo: str
+
+
+def _separar_tabelas(obj, diretorio: Path, arquivos: list[str]):
+    if isinstance(obj, pd.DataFrame):
+        arquivo = f"{len(arquivos)}.parquet"
+        salvar_parquet(obj, diretorio / arquivo)
+        arquivos.append(arquivo)
+        return _RefParquet(arquivo)
+    if isinstance(obj, dict):
+        return {k: _separar_tabelas(v, diretorio, arquivos) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_separar_tabelas(v, diretorio, arquivos) for v in obj)
+    return obj
+
+
+def _restaurar_tabelas(obj, diretorio: Path):
+    if isinstance(obj, _RefParquet):
+        return ler_parquet(diretorio / obj.arquivo)
+    if isinstance(obj, dict):
+        return {k: _restaurar_tabelas(v, diretorio) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_restaurar_tabelas(v, diretorio) for v in obj)
+    return obj
+
+
+def salvar_objeto(obj, diretorio: Path | str) -> Path:
+    """Grava `obj` em `diretorio` (criado se preciso), com os DataFrames em Parquet."""
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    estrutura = _separar_tabelas(obj, diretorio, [])
+    with open(diretorio / _ARQUIVO_OBJETO, "wb") as f:
+        pickle.dump(estrutura, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return diretorio
+
+
+def carregar_objeto(diretorio: Path | str):
+    """Inverso de salvar_objeto: DataFrames lidos dos Parquet por memory-map."""
+    diretorio = Path(diretorio)
+    with open(diretorio / _ARQUIVO_OBJETO, "rb") as f:
+        estrutura = pickle.load(f)
+    return _restaurar_tabelas(estrutura, diretorio)
@@ -0,0 +1,1272 @@
+"""
+Correlação local PRODUCAO × REPASSE.
+
+Índices de busca no REPASSE, fallbacks fuzzy por nome/data, cache persistente
+da matriz de similaridade e correlacionar_dataframes / correlacionar_csv_arquivos.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .similaridade import (
+    SINONIMOS_PROCEDIMENTOS,
+    _datas_vizinhas,
+    _e_procedimento_companion,
+    _extrair_valor_numerico,
+    _normalizar_nome_paciente,
+    _normalizar_procedimento,
+    _sao_anatomicamente_divergentes,
+    _similaridade_procedimento,
+)
+from .transform import (
+    _MAP_PRODUCAO,
+    _MAP_PRODUCAO_2025_NOVO,
+    _MAP_PRODUCAO_2026,
+    _MAP_REPASSE,
+    _df_para_csv,
+    _mapear_valores_unicos,
+    _normalizar_nulos_csv,
+    _padronizar_datas,
+)
+from .diferenca import (
+    COLUNAS_CHAVE_PRODUCAO,
+    COLUNAS_CHAVE_REPASSE,
+    diferenca_linhas,
+    impressoes_linhas,
+)
+from .tuss import (
+    _TABELA_TUSS_EMBUTIDA,
+    _TUSS_DIR,
+    _TUSS_LOOKUP_PATH,
+    _carregar_valores_tuss,
+    _construir_desc_por_tuss_code,
+    _construir_indice_tuss_repasse,
+    _enriquecer_com_valores_tuss,
+    verificar_tuss_adicionais,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# ÍNDICES E FALLBACKS DE BUSCA NO REPASSE
+# =============================================================================
+
+def _criar_indice_repasse(df_rep: pd.DataFrame) -> Dict[Tuple[str, str], List[int]]:
+    """
+    Cria índice para busca rápida no REPASSE por (Data, Paciente).
+    Usa a coluna pré-computada `_pac_norm` quando presente (correlação colunar).
+    """
+    pacientes = (
+        df_rep["_pac_norm"] if "_pac_norm" in df_rep.columns
+        else _mapear_valores_unicos(df_rep["Paciente"], _normalizar_nome_paciente)
+    )
+    indice: Dict[Tuple[str, str], List[int]] = {}
+    for idx, data, paciente in zip(df_rep.index, df_rep["Data"], pacientes):
+        indice.setdefault((data, paciente), []).append(idx)
+    return indice
+
+def _criar_indice_repasse_atendimento(df_rep: pd.DataFrame) -> Dict[Tuple[str, str], List[int]]:
+    """Cria índice para busca rápida no REPASSE por (Data, NrAtendimento)."""
+    indice: Dict[Tuple[str, str], List[int]] = {}
+    for idx, data, nr_atend in zip(df_rep.index, df_rep["Data"], df_rep["NrAtendimento"]):
+        nr_atend = str(nr_atend).strip()
+        if nr_atend and nr_atend not in ("", "nan", "NaN"):
+            indice.setdefault((data, nr_atend), []).append(idx)
+    return indice
+
+def _criar_indice_repasse_por_data(
+    indice_repasse: Dict[Tuple[str, str], List[int]],
+) -> Dict[str, List[Tuple[str, Tuple[str, ...], List[int]]]]:
+    """
+    Índice secundário do REPASSE por Data, derivado de `indice_repasse`.
+
+    Cada data aponta para a lista de (paciente_norm, tokens_significativos, idxs),
+    na mesma ordem de inserção do índice principal — preserva o desempate do FB1.
+    Permite ao Fallback 1 visitar apenas os candidatos dos 3 dias relevantes em
+    vez de varrer todas as chaves do índice por linha sem match.
+    """
+    por_data: Dict[str, List[Tuple[str, Tuple[str, ...], List[int]]]] = {}
+    for (data_rep, pac_rep), idxs in indice_repasse.items():
+        tokens = tuple(t for t in pac_rep.split() if len(t) > 2)
+        por_data.setdefault(data_rep, []).append((pac_rep, tokens, idxs))
+    return por_data
+
+def _determinar_status_correlacao(valor_liberado: float, tem_match: bool) -> str:
+    """Determina o status de correlação baseado no valor liberado."""
+    if not tem_match:
+        return "NAO_FATURADO_NO_REPASSE"
+    
+    if valor_liberado == 0:
+        return "CORRELACIONADO_COM_GLOSA_TOTAL"
+    elif valor_liberado > 0:
+        return "CORRELACIONADO"
+    else:
+        return "CORRELACIONADO"
+
+def _extrair_tokens_nome(nome: str) -> list[str]:
+    """
+    Retorna os tokens significativos do nome normalizado, limitado a 4.
+
+    Remove partículas (DE, DA, DO, DOS, DAS, E) e tokens curtos (≤ 2 chars).
+    Usado pelo FB1 para gerar combinações de busca por partes do nome.
+
+    Exemplos:
+        "MARIA DAS GRACAS SILVA"  → ["MARIA", "GRACAS", "SILVA"]
+        "JOAO DE SOUZA PEREIRA"   → ["JOAO", "SOUZA", "PEREIRA"]
+        "ANA"                     → ["ANA"]
+    """
+    PARTICULAS = {"DE", "DA", "DO", "DOS", "DAS", "E"}
+    partes = _normalizar_nome_paciente(nome).split()
+    validos = [p for p in partes if p not in PARTICULAS and len(p) > 2]
+    return validos[:4]  # limita a 4 tokens
+
+
+def _similaridade_token(tp: str, tr: str, cache: Optional[Dict] = None) -> float:
+    """SequenceMatcher.ratio() entre dois tokens de nome, memorizado em `cache`."""
+    if cache is None:
+        return SequenceMatcher(None, tp, tr).ratio()
+    s = cache.get((tp, tr))
+    if s is None:
+        s = cache[(tp, tr)] = SequenceMatcher(None, tp, tr).ratio()
+    return s
+
+
+def _tokens_fuzzy_em_comum(
+    tokens_prod: list[str],
+    nome_rep_norm: str,
+    limiar_token: float = 0.82,
+    cache_tokens: Optional[Dict] = None,
+) -> list[tuple[str, str, float]]:
+    """
+    Para cada token da PRODUCAO, encontra o token mais similar no REPASSE
+    usando SequenceMatcher. Retorna apenas os pares que atingem o limiar.
+
+    Cada token do REPASSE só pode ser usado uma vez (match exclusivo),
+    evitando que um único token do REPASSE satisfaça múltiplos tokens da PRODUCAO.
+
+    Retorna lista de (token_prod, token_rep, score) ordenada por score desc.
+
+    Exemplo:
+        tokens_prod = ["MICHELE", "KAROLINNE", "FERNANDES"]
+        nome_rep    = "MICHELLE KAROLINNE FERNANDES GUERREIRO"
+        → [("MICHELE","MICHELLE",0.93), ("KAROLINNE","KAROLINNE",1.0), ("FERNANDES","FERNANDES",1.0)]
+
+    `cache_tokens` (opcional) memoriza os ratios por par de tokens entre chamadas —
+    o vocabulário de nomes é pequeno e se repete muito entre candidatos.
+    """
+    tokens_rep = [t for t in nome_rep_norm.split() if len(t) > 2]
+    usados: set[str] = set()
+    resultado: list[tuple[str, str, float]] = []
+
+    for tp in tokens_prod:
+        melhor_rep = None
+        melhor_s = 0.0
+        for tr in tokens_rep:
+            if tr in usados:
+                continue
+            s = _similaridade_token(tp, tr, cache_tokens)
+            if s >= limiar_token and s > melhor_s:
+                melhor_s = s
+                melhor_rep = tr
+        if melhor_rep is not None:
+            resultado.append((tp, melhor_rep, round(melhor_s, 3)))
+            usados.add(melhor_rep)
+
+    return sorted(resultado, key=lambda x: x[2], reverse=True)
+
+
+def _buscar_fallback1_combinacoes_nome(
+    data_prod: str,
+    nome_prod: str,
+    df_rep: pd.DataFrame,
+    indice_repasse: Dict[Tuple[str, str], List[int]],
+    proc_prod: str,
+    cache_similaridade: Dict,
+    limiar_similaridade: float = 0.65,
+    limiar_token: float = 0.82,
+    min_tokens_similares: int = 3,
+    indice_por_data: Optional[Dict[str, List[Tuple[str, Tuple[str, ...], List[int]]]]] = None,
+    cache_tokens: Optional[Dict] = None,
+) -> Tuple[Optional[int], float]:
+    """
+    Fallback 1 — Similaridade fuzzy por token + Data ±1 dia + Procedimento.
+
+    Estratégia:
+      Para cada candidato no REPASSE (dentro de ±1 dia), compara token a token
+      o nome da PRODUCAO com o nome do REPASSE usando SequenceMatcher por token.
+      Aceita o match se AMBAS as condições forem satisfeitas:
+        1. >= min_tokens_similares tokens com similaridade >= limiar_token
+        2. O primeiro token da PRODUCAO tem um similar no REPASSE
+           (evita matches onde só sobrenomes coincidem)
+
+    Por que fuzzy e não match exato:
+      Typos reais como MICHELE/MICHELLE, VASCONCELOS/VASCONCELLOS,
+      APPARECIDA/APARECIDA passam no limiar 0.82 e seriam perdidos
+      com match exato de string.
+
+    Por que primeiro token obrigatório:
+      Impede que pares de sobrenomes genéricos (SILVA+SANTOS, PEREIRA+SILVA)
+      matcheiem pacientes completamente diferentes.
+
+    Por que min 3 tokens:
+      Com apenas 2 tokens, combinações como MARIA+SILVA ou FABIANO+SILVA
+      ainda geram falsos positivos frequentes em bases hospitalares.
+
+    Parâmetros:
+        limiar_token:        similaridade mínima por par de tokens (padrão 0.82)
+        min_tokens_similares: quantidade mínima de tokens similares (padrão 3)
+        indice_por_data:     índice secundário de _criar_indice_repasse_por_data;
+                             construído aqui a partir de indice_repasse se ausente
+        cache_tokens:        cache de similaridade por par de tokens (entre chamadas)
+
+    Busca limitada aos buckets das 3 datas candidatas. Antes da comparação
+    completa, descarta o candidato se o primeiro token da PRODUCAO não tiver
+    nenhum token similar no REPASSE (condição 2 — ver abaixo), sem alterar o
+    resultado: o primeiro token é o primeiro a escolher par em
+    _tokens_fuzzy_em_comum, portanto nunca perde um token para outro.
+
+    Retorna (idx, score_procedimento) do melhor candidato, ou (None, 0.0).
+    """
+    tokens_prod = _extrair_tokens_nome(nome_prod)
+    if len(tokens_prod) < min_tokens_similares:
+        # Não há tokens suficientes para atingir o mínimo — não tenta
+        return None, 0.0
+
+    primeiro_token = tokens_prod[0]
+
+    melhor_idx: Optional[int] = None
+    melhor_score: float = 0.0
+
+    datas_candidatas = [data_prod]
+    try:
+        data_dt = datetime.strptime(data_prod, "%d/%m/%Y")
+        datas_candidatas += [
+            (data_dt + timedelta(days=d)).strftime("%d/%m/%Y")
+            for d in [-1, 1]
+        ]
+    except ValueError:
+        pass
+
+    if indice_por_data is None:
+        indice_por_data = _criar_indice_repasse_por_data(indice_repasse)
+
+    for data_cand in datas_candidatas:
+        for pac_rep, tokens_rep, idxs in indice_por_data.get(data_cand, ()):
+            # Poda barata: sem tokens suficientes ou sem similar ao primeiro token
+            if len(tokens_rep) < min_tokens_similares:
+                continue
+            if not any(
+                _similaridade_token(primeiro_token, tr, cache_tokens) >= limiar_token
+                for tr in tokens_rep
+            ):
+                continue
+
+            # Avalia tokens fuzzy contra o nome normalizado do candidato
+            matches = _tokens_fuzzy_em_comum(tokens_prod, pac_rep, limiar_token, cache_tokens)
+
+            # Condição 1: mínimo de tokens similares
+            if len(matches) < min_tokens_similares:
+                continue
+
+            # Condição 2: primeiro token da PRODUCAO deve ter similar no REPASSE
+            primeiro_tem_match = any(tp == primeiro_token for tp, tr, s in matches)
+            if not primeiro_tem_match:
+                continue
+
+            # Candidato passou nas duas condições — avalia procedimento
+            for i in idxs:
+                if df_rep.at[i, "_matched"]:
+                    continue
+                proc_rep = df_rep.at[i, "Procedimento"]
+                score = _similaridade_procedimento(proc_prod, proc_rep, cache_similaridade)
+                if score >= limiar_similaridade and score > melhor_score:
+                    melhor_score = score
+                    melhor_idx = i
+
+    return melhor_idx, melhor_score
+
+
+def _buscar_fallback2_paciente_proc_data_ampla(
+    data_prod: str,
+    paciente_norm: str,
+    proc_prod: str,
+    df_rep: pd.DataFrame,
+    indice_repasse: Dict[Tuple[str, str], List[int]],
+    cache_similaridade: Dict,
+    limiar_similaridade: float = 0.65,
+    tolerancia_dias: int = 7,
+) -> Tuple[Optional[int], float]:
+    """
+    Fallback 2 — Nome exato + Procedimento ≥ limiar + Data ±7 dias.
+
+    Usa o mesmo índice por (data, paciente), mas varre a janela de 2 a 7 dias
+    (os ±1 dia já foram cobertos pela chave principal). O nome deve ser idêntico
+    após normalização; o procedimento deve atingir o mesmo limiar de similaridade.
+
+    Cenário típico resolvido:
+        Procedimento realizado em 10/03, lançado no REPASSE como 14/03
+        → ±1 dia não bate, mas ±7 dias captura.
+
+    Retorna (idx, score) do melhor candidato, ou (None, 0.0).
+    """
+    melhor_idx: Optional[int] = None
+    melhor_score: float = 0.0
+
+    try:
+        data_dt = datetime.strptime(data_prod, "%d/%m/%Y")
+    except ValueError:
+        return None, 0.0
+
+    for delta in range(-tolerancia_dias, tolerancia_dias + 1):
+        if abs(delta) <= 1:
+            continue  # ±1 dia já coberto pela chave principal
+        data_candidata = (data_dt + timedelta(days=delta)).strftime("%d/%m/%Y")
+        key = (data_candidata, paciente_norm)
+        if key not in indice_repasse:
+            continue
+        for i in indice_repasse[key]:
+            if df_rep.at[i, "_matched"]:
+                continue
+            proc_rep = df_rep.at[i, "Procedimento"]
+            score = _similaridade_procedimento(proc_prod, proc_rep, cache_similaridade)
+            if score >= limiar_similaridade and score > melhor_score:
+                melhor_score = score
+                melhor_idx = i
+
+    return melhor_idx, melhor_score
+
+
+# ── Cache persistente de similaridade de procedimentos ───────────────────────
+# Matriz distintos(PRODUCAO) × distintos(REPASSE) de _similaridade_procedimento,
+# salva ao lado de tuss_lookup_table.csv. Cada linha carrega o hash das regras
+# (SINONIMOS_PROCEDIMENTOS + versão do algoritmo): alterar os sinônimos invalida
+# o cache automaticamente. Reprocessar o mesmo mês não recalcula nenhum par.
+
+_PROC_SIM_CACHE_PATH   = _TUSS_DIR / "proc_similaridade_cache.csv"
+_PROC_SIM_CACHE_VERSAO = 1  # incrementar ao alterar a lógica de _similaridade_procedimento
+
+
+def _hash_regras_similaridade() -> str:
+    """Hash estável de SINONIMOS_PROCEDIMENTOS + versão do algoritmo de similaridade."""
+    payload = json.dumps(
+        {"versao": _PROC_SIM_CACHE_VERSAO, "sinonimos": SINONIMOS_PROCEDIMENTOS},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _carregar_cache_similaridade() -> dict:
+    """
+    Carrega proc_similaridade_cache.csv como dict {(proc_prod, proc_rep) → score}.
+    Linhas geradas com outro hash de regras são ignoradas. Retorna {} se ausente.
+    """
+    if not _PROC_SIM_CACHE_PATH.exists():
+        return {}
+    try:
+        df = pd.read_csv(_PROC_SIM_CACHE_PATH, dtype=str, keep_default_na=False)
+    except Exception as e:
+        logger.warning(f"Cache de similaridade ilegível — ignorado: {e}")
+        return {}
+    df = df[df["HashRegras"] == _hash_regras_similaridade()]
+    return {
+        (p1, p2): float(score)
+        for p1, p2, score in zip(df["Procedimento1"], df["Procedimento2"], df["Score"])
+    }
+
+
+def _salvar_cache_similaridade(cache: dict) -> None:
+    """
+    Persiste o cache de similaridade (apenas entradas do hash de regras atual).
+    Grava num temporário do mesmo diretório e troca com os.replace: sessões,
+    workers de jobs e a CLI leem o arquivo ao mesmo tempo e nunca o veem pela metade.
+    """
+    hash_regras = _hash_regras_similaridade()
+    df = pd.DataFrame(
+        [(hash_regras, p1, p2, repr(score)) for (p1, p2), score in cache.items()],
+        columns=["HashRegras", "Procedimento1", "Procedimento2", "Score"],
+    )
+    temporario = None
+    try:
+        fd, temporario = tempfile.mkstemp(
+            prefix=_PROC_SIM_CACHE_PATH.name + ".", suffix=".tmp", dir=_PROC_SIM_CACHE_PATH.parent,
+        )
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            df.to_csv(f, index=False)
+        os.replace(temporario, _PROC_SIM_CACHE_PATH)
+        logger.info(f"proc_similaridade_cache.csv salvo ({len(df)} pares)")
+    except Exception as e:
+        logger.warning(f"Não foi possível salvar o cache de similaridade: {e}")
+        if temporario and os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _construir_matriz_similaridade(procs_prod, procs_rep, cache: dict) -> int:
+    """
+    Preenche `cache` com o score de todos os pares distintos PRODUCAO × REPASSE
+    ainda ausentes. Retorna a quantidade de pares efetivamente calculados.
+    """
+    calculados = 0
+    procs_rep = list(dict.fromkeys(procs_rep))
+    for p1 in dict.fromkeys(procs_prod):
+        for p2 in procs_rep:
+            if (p1, p2) not in cache:
+                _similaridade_procedimento(p1, p2, cache)
+                calculados += 1
+    return calculados
+
+
+# =============================================================================
+# CORRELAÇÃO PRODUCAO × REPASSE
+# =============================================================================
+
+def correlacionar_csv_arquivos(
+    csv_producao: str,
+    csv_repasse: str,
+    limiar_similaridade: float = 0.65,
+    tabela_tuss_preloaded: dict | None = None,
+    valores_tuss_preloaded: dict | None = None,
+    progresso: Callable[[float, str], None] | None = None,
+) -> str:
+    """
+    Versão CSV de correlacionar_dataframes (entrada vinda do LLM ou de arquivos).
+
+    Returns:
+        CSV correlacionado com sufixos _PRODUCAO e _REPASSE, ou "" em caso de erro.
+    """
+    try:
+        df_prod = pd.read_csv(io.StringIO(csv_producao), dtype=str)
+        df_rep  = pd.read_csv(io.StringIO(csv_repasse),  dtype=str)
+    except Exception as e:
+        logger.error(f"Erro na correlacao local: {e}", exc_info=True)
+        return ""
+    return _df_para_csv(correlacionar_dataframes(
+        df_prod, df_rep, limiar_similaridade, tabela_tuss_preloaded, valores_tuss_preloaded,
+        progresso=progresso,
+    ))
+
+
+# Schemas canônicos da correlação: todas as colunas de cada mapa (valores
+# únicos, ordem estável) — toda coluna canônica aparece na saída, vazia se
+# ausente no arquivo físico
+_COLUNAS_PRODUCAO = list(dict.fromkeys(
+    list(_MAP_PRODUCAO.values()) +
+    list(_MAP_PRODUCAO_2025_NOVO.values()) +
+    list(_MAP_PRODUCAO_2026.values())
+))
+# Remove Procedimento2 — coluna interna descartada antes de chegar aqui
+_COLUNAS_PRODUCAO = [c for c in _COLUNAS_PRODUCAO if c != "Procedimento2"]
+# AbaOrigemDados e adicionada pelo processador, nao consta nos mapas — inclui explicitamente
+if "AbaOrigemDados" not in _COLUNAS_PRODUCAO:
+    _COLUNAS_PRODUCAO.append("AbaOrigemDados")
+
+_COLUNAS_REPASSE = list(dict.fromkeys(_MAP_REPASSE.values()))
+# AbaOrigemDados e adicionada pelo processador, nao consta no _MAP_REPASSE — inclui explicitamente
+if "AbaOrigemDados" not in _COLUNAS_REPASSE:
+    _COLUNAS_REPASSE.append("AbaOrigemDados")
+
+# Colunas internas/de controle que nao devem aparecer no CSV final
+_EXCLUIR_PROD = {"TipoArquivo"}
+_EXCLUIR_REP  = {"TipoArquivo", "_matched"}
+
+# Faixas da barra de progresso por etapa de correlacionar_dataframes
+_PROGRESSO_LACO_PRODUCAO = (0.15, 0.75)
+_PROGRESSO_LACO_REPASSE  = (0.75, 0.85)
+# Quantas atualizações, no máximo, cada laço envia ao callback
+_PROGRESSO_PASSOS = 100
+
+
+def _passo_progresso(total: int) -> int:
+    return max(1, total // _PROGRESSO_PASSOS)
+
+
+def correlacionar_dataframes(
+    df_producao: pd.DataFrame,
+    df_repasse: pd.DataFrame,
+    limiar_similaridade: float = 0.65,
+    tabela_tuss_preloaded: dict | None = None,
+    valores_tuss_preloaded: dict | None = None,
+    progresso: Callable[[float, str], None] | None = None,
+) -> pd.DataFrame | None:
+    """
+    Correlaciona PRODUCAO e REPASSE (DataFrames padronizados) usando chave composta otimizada.
+
+    Garantias de schema:
+    - TODAS as colunas canonicas de _MAP_PRODUCAO aparecem com sufixo _PRODUCAO
+    - TODAS as colunas canonicas de _MAP_REPASSE aparecem com sufixo _REPASSE
+    - Colunas ausentes no arquivo fisico ficam vazias — nunca omitidas
+
+    Otimizacoes implementadas:
+    - Indice hash para busca O(1) por Data+Paciente
+    - Fallback por NrAtendimento quando nao encontra por nome
+    - Normalizacao de nomes sem acentos e caracteres especiais
+    - Cache de similaridade de procedimentos
+    - Busca com tolerancia de +-1 dia
+    - Chaves (data, nome normalizado, NrAtendimento, procedimento) pré-computadas
+      uma vez por valor distinto; etapa exata via lookups em dict, sem iterrows
+    - Apenas o resíduo sem match exato segue para os fallbacks fuzzy
+    - Matriz de similaridade de procedimentos pré-computada e persistida em disco
+      (proc_similaridade_cache.csv, invalidada pelo hash de SINONIMOS_PROCEDIMENTOS)
+
+    - Entrada e saída em DataFrame; CSV só na fronteira (correlacionar_csv_arquivos)
+
+    Args:
+        df_producao: DataFrame padronizado da PRODUCAO (não é modificado)
+        df_repasse: DataFrame padronizado do REPASSE (não é modificado)
+        limiar_similaridade: Threshold para match de procedimento (0.0-1.0)
+        progresso: callback (fração 0-1, mensagem) chamado na thread da
+            correlação a cada etapa e, nos laços, a cada ~1% das linhas
+
+    Returns:
+        DataFrame correlacionado com sufixos _PRODUCAO e _REPASSE em todas as
+        colunas, ou None em caso de erro
+    """
+    resultado = _correlacionar(
+        df_producao, df_repasse, limiar_similaridade, tabela_tuss_preloaded, valores_tuss_preloaded,
+        progresso=progresso,
+    )
+    return None if resultado is None else resultado[0]
+
+
+def _correlacionar(
+    df_producao: pd.DataFrame,
+    df_repasse: pd.DataFrame,
+    limiar_similaridade: float = 0.65,
+    tabela_tuss_preloaded: dict | None = None,
+    valores_tuss_preloaded: dict | None = None,
+    progresso: Callable[[float, str], None] | None = None,
+    anterior: dict | None = None,
+) -> tuple[pd.DataFrame, dict] | None:
+    """
+    Corpo de correlacionar_dataframes / correlacionar_incremental.
+
+    `anterior` (só na incremental, montado por correlacionar_incremental):
+        casamentos: casamento anterior por posição da PRODUCAO atual
+                    ((idx REPASSE, MetodoMatch, score) ou None)
+        novas:      posições PRODUCAO sem casamento anterior (novas/alteradas)
+        alteradas:  posições REPASSE novas ou alteradas
+        liberadas:  posições REPASSE casadas por linhas PRODUCAO removidas
+
+    Returns:
+        (DataFrame correlacionado, {"casamentos": [...], "recalculadas": int}),
+        ou None em caso de erro
+    """
+    def _reportar(fracao: float, mensagem: str) -> None:
+        if progresso is not None:
+            progresso(fracao, mensagem)
+
+    try:
+        _reportar(0.02, "Normalizando PRODUCAO e REPASSE...")
+        # ── Normaliza entradas (cópias texto, nulos como "") ──────────────────
+        # Índice 0..n-1: posições do REPASSE indexam as listas do laço principal
+        df_prod = _normalizar_nulos_csv(df_producao).reset_index(drop=True)
+        df_rep  = _normalizar_nulos_csv(df_repasse).reset_index(drop=True)
+
+        logger.info(f"Correlacao: {len(df_prod)} linhas PRODUCAO, {len(df_rep)} linhas REPASSE")
+
+        # ── Schemas canonicos (derivados dos mapas) ───────────────────────────
+        _COLS_PROD = _COLUNAS_PRODUCAO
+        _COLS_REP  = _COLUNAS_REPASSE
+
+        # Garante que todas as colunas canonicas existam nos DataFrames
+        # (arquivo fisico pode nao ter todas)
+        for col in _COLS_PROD:
+            if col not in df_prod.columns:
+                df_prod[col] = ""
+        for col in _COLS_REP:
+            if col not in df_rep.columns:
+                df_rep[col] = ""
+
+        # ── Normaliza datas (vetorizado) ──────────────────────────────────────
+        for df in [df_prod, df_rep]:
+            if "Data" in df.columns:
+                df["Data"] = _padronizar_datas(df["Data"])
+
+        # ── Colunas-chave pré-computadas ──────────────────────────────────────
+        # Normalização feita uma vez por valor distinto; o laço de correlação abaixo
+        # trabalha apenas com listas Python e lookups em dict (sem iterrows/iloc).
+        df_prod["_pac_norm"] = _mapear_valores_unicos(df_prod["Paciente"], _normalizar_nome_paciente)
+        df_rep["_pac_norm"]  = _mapear_valores_unicos(df_rep["Paciente"],  _normalizar_nome_paciente)
+        _proc_norm_prod = _mapear_valores_unicos(df_prod["Procedimento"], _normalizar_procedimento).tolist()
+        _vizinhas       = {d: _datas_vizinhas(d) for d in df_prod["Data"].unique()}
+
+        # ── Cria indices de busca rapida ──────────────────────────────────────
+        _reportar(0.08, f"Indexando REPASSE ({len(df_rep)} linhas)...")
+        indice_repasse      = _criar_indice_repasse(df_rep)
+        indice_atendimento  = _criar_indice_repasse_atendimento(df_rep)
+        indice_por_data     = _criar_indice_repasse_por_data(indice_repasse)
+        logger.info(f"Indice por nome: {len(indice_repasse)} chaves | por atendimento: {len(indice_atendimento)} chaves")
+
+        df_rep["_matched"] = False
+        cache_tokens: dict = {}
+
+        # Matriz de similaridade distintos × distintos (cache persistente em disco)
+        _reportar(0.11, "Montando matriz de similaridade de procedimentos...")
+        cache_similaridade: dict = _carregar_cache_similaridade()
+        _pares_em_disco = len(cache_similaridade)
+        _pares_calculados = _construir_matriz_similaridade(
+            df_prod["Procedimento"].unique(), df_rep["Procedimento"].unique(), cache_similaridade,
+        )
+        logger.info(
+            f"Matriz de similaridade: {_pares_em_disco} pares do cache em disco, "
+            f"{_pares_calculados} calculados"
+        )
+
+        # Valores de saída por linha, na ordem canônica das colunas
+        _cols_saida_prod = [c for c in _COLS_PROD if c not in _EXCLUIR_PROD]
+        _cols_saida_rep  = [c for c in _COLS_REP if c not in _EXCLUIR_REP]
+        _chaves_prod     = [f"{c}_PRODUCAO" for c in _cols_saida_prod]
+        _chaves_rep      = [f"{c}_REPASSE" for c in _cols_saida_rep]
+        _valores_prod    = df_prod[_cols_saida_prod].to_numpy(dtype=object).tolist()
+        _valores_rep     = df_rep[_cols_saida_rep].to_numpy(dtype=object).tolist()
+        _rep_vazio       = [""] * len(_chaves_rep)
+        _rep_proc        = df_rep["Procedimento"].tolist()
+        _rep_valor       = df_rep["ValorLiberado"].tolist()
+        _n_prod          = len(df_prod)
+        _datas_prod      = df_prod["Data"].tolist()
+        _pacs_prod       = df_prod["_pac_norm"].tolist()
+        _atend_prod      = df_prod["NrAtendimento"].astype(str).str.strip().tolist()
+        _procs_prod      = df_prod["Procedimento"].tolist()
+        _nomes_prod      = df_prod["Paciente"].tolist()
+
+        # Casamento de cada linha PRODUCAO: (idx REPASSE, MetodoMatch, score) ou
+        # None (SEM_MATCH). Na correlação completa todas as linhas são casadas;
+        # na incremental, as mantidas chegam com o casamento anterior e só as
+        # demais passam pelo laço (ver _planejar_incremental).
+        _casamentos: list = [None] * _n_prod
+        if anterior is None:
+            _recalcular = set(range(_n_prod))
+        else:
+            _recalcular, _datas_sujas = _planejar_incremental(anterior, _datas_prod, df_rep["Data"].tolist())
+
+        while True:
+            _rep_matched = [False] * len(df_rep)
+            if anterior is not None:
+                for pos, casamento in enumerate(anterior["casamentos"]):
+                    if pos not in _recalcular:
+                        _casamentos[pos] = casamento
+                        if casamento is not None:
+                            _rep_matched[casamento[0]] = True
+                df_rep["_matched"] = _rep_matched  # lido pelos fallbacks
+
+            matches_encontrados     = 0
+            matches_por_atendimento = 0
+            matches_fallback1       = 0
+            matches_fallback2       = 0
+            _posicoes               = sorted(_recalcular)
+            _total_prod             = len(_posicoes)
+            _passo_prod             = _passo_progresso(_total_prod)
+            _ini_prod, _fim_prod    = _PROGRESSO_LACO_PRODUCAO
+
+            # ── Itera PRODUCAO e busca match no REPASSE ───────────────────────
+            for i_pos, pos in enumerate(_posicoes):
+                data_prod, paciente_norm, nr_atend_prod, proc_prod = (
+                    _datas_prod[pos], _pacs_prod[pos], _atend_prod[pos], _procs_prod[pos]
+                )
+                if i_pos % _passo_prod == 0:
+                    _reportar(
+                        _ini_prod + (_fim_prod - _ini_prod) * i_pos / _total_prod,
+                        f"PRODUCAO {i_pos}/{_total_prod} · {matches_encontrados} match(es) "
+                        f"(fallback 1: {matches_fallback1} · fallback 2: {matches_fallback2})",
+                    )
+                candidatos   = []
+                metodo_busca = "1_NOME_COMPLETO_DATA_PROCEDIMENTO"
+
+                # Busca exata por nome
+                candidatos.extend(indice_repasse.get((data_prod, paciente_norm), ()))
+
+                # Busca com tolerancia de +-1 dia por nome
+                if not candidatos:
+                    for data_tol in _vizinhas[data_prod]:
+                        candidatos.extend(indice_repasse.get((data_tol, paciente_norm), ()))
+
+                # Fallback: busca por NrAtendimento
+                if not candidatos and nr_atend_prod and nr_atend_prod not in ("", "nan", "NaN"):
+                    metodo_busca = "2_FALLBACK_NR-ATENDIMENTO_DATA_PROCEDIMENTO"
+                    candidatos.extend(indice_atendimento.get((data_prod, nr_atend_prod), ()))
+                    if not candidatos:
+                        for data_tol in _vizinhas[data_prod]:
+                            candidatos.extend(indice_atendimento.get((data_tol, nr_atend_prod), ()))
+
+                # Seleciona melhor match por similaridade de procedimento
+                melhor_score = 0.0
+                melhor_idx   = None
+
+                for idx_rep in candidatos:
+                    if _rep_matched[idx_rep]:
+                        continue
+                    sim = _similaridade_procedimento(proc_prod, _rep_proc[idx_rep], cache_similaridade)
+                    if sim >= limiar_similaridade and sim > melhor_score:
+                        melhor_score = sim
+                        melhor_idx   = idx_rep
+
+                # ── Fallbacks quando chave principal não encontrou match ──────
+                # Apenas o resíduo sem match exato chega aqui.
+                metodo_match = metodo_busca  # 1_NOME_COMPLETO ou 2_FALLBACK_NR-ATENDIMENTO
+
+                if melhor_idx is None:
+                    # Fallback 1: combinações de tokens do nome + data ±1 dia
+                    idx_fb1, score_fb1 = _buscar_fallback1_combinacoes_nome(
+                        data_prod, _nomes_prod[pos],
+                        df_rep, indice_repasse,
+                        proc_prod, cache_similaridade,
+                        limiar_similaridade,
+                        indice_por_data=indice_por_data,
+                        cache_tokens=cache_tokens,
+                    )
+                    if idx_fb1 is not None:
+                        melhor_idx   = idx_fb1
+                        melhor_score = score_fb1
+                        metodo_match = "3_FALLBACK_NOME_PARCIAL_FUZZY_DATA_FIXA"
+                        matches_fallback1 += 1
+
+                if melhor_idx is None:
+                    # Fallback 2: nome exato + procedimento + data ±7 dias
+                    idx_fb2, score_fb2 = _buscar_fallback2_paciente_proc_data_ampla(
+                        data_prod, paciente_norm, proc_prod,
+                        df_rep, indice_repasse, cache_similaridade,
+                        limiar_similaridade,
+                        tolerancia_dias=_JANELA_CORRELACAO_DIAS,
+                    )
+                    if idx_fb2 is not None:
+                        melhor_idx   = idx_fb2
+                        melhor_score = score_fb2
+                        metodo_match = "4_FALLBACK_NOME_COMPLETO_DATA-FLEXIVEL"
+                        matches_fallback2 += 1
+
+                if melhor_idx is not None:
+                    _rep_matched[melhor_idx] = True
+                    df_rep.at[melhor_idx, "_matched"] = True  # lido pelos fallbacks
+                    matches_encontrados += 1
+                    if metodo_busca == "2_FALLBACK_NR-ATENDIMENTO_DATA_PROCEDIMENTO":
+                        matches_por_atendimento += 1
+                    _casamentos[pos] = (melhor_idx, metodo_match, melhor_score)
+                else:
+                    _casamentos[pos] = None
+
+            if anterior is None:
+                break
+            # REPASSE solto por uma linha recalculada (casado antes, livre agora)
+            # pode ser o melhor candidato de uma linha mantida vizinha: a data
+            # entra nas sujas e a janela dela é recalculada, até estabilizar.
+            _soltas = {
+                anterior["casamentos"][pos][0] for pos in _recalcular
+                if anterior["casamentos"][pos] is not None and not _rep_matched[anterior["casamentos"][pos][0]]
+            }
+            _novas_sujas = {df_rep.at[idx, "Data"] for idx in _soltas} - _datas_sujas
+            _ampliado = _recalcular | _posicoes_na_janela(_datas_prod, _novas_sujas)
+            if len(_ampliado) == len(_recalcular):
+                break
+            _datas_sujas |= _novas_sujas
+            _recalcular = _ampliado
+
+        if anterior is not None:
+            logger.info(f"Correlacao incremental: {len(_recalcular)}/{_n_prod} linhas PRODUCAO recalculadas")
+        logger.info(f"Matches encontrados: {matches_encontrados}/{_total_prod} ({matches_encontrados/max(_total_prod, 1)*100:.1f}%)")
+        logger.info(f"Matches por atendimento: {matches_por_atendimento}")
+
+        # ── Monta as linhas correlacionadas, na ordem da PRODUCAO ─────────────
+        linhas_resultado = []
+        # Fallback 5: índice (paciente_norm, data) das linhas PRODUCAO já correlacionadas
+        _corr_idx: Dict[Tuple[str, str], bool] = {}
+        # _sao_anatomicamente_divergentes por par distinto de procedimentos
+        _divergencia: Dict[Tuple[str, str], bool] = {}
+
+        for pos, casamento in enumerate(_casamentos):
+            data_prod, paciente_norm, proc_prod = _datas_prod[pos], _pacs_prod[pos], _procs_prod[pos]
+            linha_corr: dict = {
+                "ChaveCorrelacao": f"{paciente_norm}_{_atend_prod[pos]}_{data_prod}_{_proc_norm_prod[pos]}".replace(" ", "-")
+            }
+
+            # Todas as colunas canonicas da PRODUCAO com sufixo _PRODUCAO
+            linha_corr.update(zip(_chaves_prod, _valores_prod[pos]))
+
+            # ── StatusCorrelacao e SimilaridadeProcedimento ───────────────────
+            if casamento is not None:
+                melhor_idx, metodo_match, melhor_score = casamento
+                valor_rep   = _extrair_valor_numerico(_rep_valor[melhor_idx])
+                status_base = _determinar_status_correlacao(valor_rep, True)
+
+                # Sufixo de rastreabilidade por método de correlação
+                if metodo_match == "3_FALLBACK_NOME_PARCIAL_FUZZY_DATA_FIXA":
+                    status = f"{status_base}_FALLBACK_1"
+                elif metodo_match == "4_FALLBACK_NOME_COMPLETO_DATA-FLEXIVEL":
+                    status = f"{status_base}_FALLBACK_2"
+                elif metodo_match == "2_FALLBACK_NR-ATENDIMENTO_DATA_PROCEDIMENTO":
+                    status = f"{status_base}_VIA_NR_ATENDIMENTO"
+                else:
+                    status = status_base
+
+                # Ajuste A: sinaliza procedimentos anatomicamente divergentes para revisão humana
+                # (ex: ENDOSCOPIA da PRODUCAO casou com "Colonoscopia" do REPASSE via
+                # similaridade acidental de string — precisam ser conferidos manualmente)
+                _par = (proc_prod, _rep_proc[melhor_idx])
+                _divergente = _divergencia.get(_par)
+                if _divergente is None:
+                    _divergente = _divergencia[_par] = _sao_anatomicamente_divergentes(*_par)
+                if _divergente:
+                    status = f"{status}_PROCEDIMENTO_DIVERGENTE"
+
+                linha_corr["SimilaridadeProcedimento"] = f"{melhor_score:.2f}"
+                linha_corr["MetodoMatch"]              = metodo_match
+
+                if paciente_norm and data_prod:
+                    _corr_idx[(paciente_norm, data_prod)] = True
+            else:
+                melhor_idx = None
+                status = "NAO_FATURADO_NO_REPASSE"
+                linha_corr["SimilaridadeProcedimento"] = "0.00"
+                linha_corr["MetodoMatch"]              = "SEM_MATCH"
+
+            linha_corr["StatusCorrelacao"] = status
+
+            # Todas as colunas canonicas do REPASSE com sufixo _REPASSE
+            linha_corr.update(zip(
+                _chaves_rep,
+                _valores_rep[melhor_idx] if melhor_idx is not None else _rep_vazio,
+            ))
+
+            linhas_resultado.append(linha_corr)
+
+        # ── Pré-computação para Fallback 6 ────────────────────────────────────
+
+        # Fallback 6: data mínima da PRODUCAO com buffer de 30 dias.
+        # Entradas do REPASSE anteriores a essa data são faturamentos tardios (late billing)
+        # sem correspondência possível na PRODUCAO — recebem status informativo próprio.
+        try:
+            _datas_prod_parsed = [
+                datetime.strptime(d.strip(), "%d/%m/%Y")
+                for d in df_prod["Data"].dropna().unique()
+                if re.match(r"\d{2}/\d{2}/\d{4}", str(d).strip())
+            ]
+            _data_min_producao = min(_datas_prod_parsed) - timedelta(days=30) if _datas_prod_parsed else None
+        except Exception:
+            _data_min_producao = None
+
+        # ── Linhas do REPASSE sem match → inseridas no final ──────────────────
+        _prod_vazio    = [""] * len(_chaves_prod)
+        nao_matcheados = 0
+        _total_rep     = len(df_rep)
+        _passo_rep     = _passo_progresso(_total_rep)
+        _ini_rep, _fim_rep = _PROGRESSO_LACO_REPASSE
+        for idx_rep, (paciente_norm, nr_atend_rep, data_rep, proc_rep) in enumerate(zip(
+            df_rep["_pac_norm"].tolist(),
+            df_rep["NrAtendimento"].astype(str).str.strip().tolist(),
+            df_rep["Data"].tolist(),
+            _rep_proc,
+        )):
+            if idx_rep % _passo_rep == 0:
+                _reportar(
+                    _ini_rep + (_fim_rep - _ini_rep) * idx_rep / _total_rep,
+                    f"Fallbacks 5/6 no REPASSE sem match: {idx_rep}/{_total_rep} "
+                    f"({nao_matcheados} sem match até aqui)",
+                )
+            if _rep_matched[idx_rep]:
+                continue
+            nao_matcheados += 1
+
+            proc_norm = _normalizar_procedimento(proc_rep)
+
+            linha_corr = {
+                "ChaveCorrelacao": f"{paciente_norm}_{nr_atend_rep}_{data_rep}_{proc_norm}".replace(" ", "-")
+            }
+
+            # PRODUCAO vazia (schema completo, tudo vazio)
+            linha_corr.update(zip(_chaves_prod, _prod_vazio))
+
+            # Determina status do REPASSE não matcheado (com fallbacks 5 e 6)
+            status_repasse = "REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO"
+            linha_corr["MetodoMatch"] = ""
+
+            # Fallback 5: procedimento companion (Urease/Helicobacter standalone) cujo
+            # procedimento principal já foi correlacionado no mesmo episódio.
+            # Condições: (a) proc é companion puro, (b) mesmo paciente tem CORRELACIONADO
+            # na mesma data ±1 dia. Risco de falso positivo: muito baixo — requer
+            # keyword específico + ausência de proc principal + match de episódio.
+            if _e_procedimento_companion(proc_rep):
+                try:
+                    _data_rep_dt = datetime.strptime(data_rep, "%d/%m/%Y")
+                    _datas_f5 = [data_rep] + [
+                        (_data_rep_dt + timedelta(days=d)).strftime("%d/%m/%Y")
+                        for d in [-1, 1]
+                    ]
+                except ValueError:
+                    _datas_f5 = [data_rep]
+                for _dc in _datas_f5:
+                    if (paciente_norm, _dc) in _corr_idx:
+                        status_repasse = "CORRELACIONADO_PROCEDIMENTO_ADICIONAL"
+                        linha_corr["MetodoMatch"] = "5_FALLBACK_COMPANION_PROCEDIMENTO_ADICIONAL"
+                        break
+
+            # Fallback 6: data do REPASSE anterior ao período coberto pela PRODUCAO
+            # (faturamento tardio de exames de períodos anteriores ao arquivo enviado).
+            if status_repasse == "REPASSE_NAO_IDENTIFICADO_NA_PRODUCAO" and _data_min_producao:
+                try:
+                    if datetime.strptime(data_rep, "%d/%m/%Y") < _data_min_producao:
+                        status_repasse = "REPASSE_DATA_FORA_DO_PERIODO_PRODUCAO"
+                except ValueError:
+                    pass
+
+            linha_corr["SimilaridadeProcedimento"] = "0.00"
+            linha_corr["StatusCorrelacao"]         = status_repasse
+
+            # REPASSE preenchido (schema completo)
+            linha_corr.update(zip(_chaves_rep, _valores_rep[idx_rep]))
+
+            linhas_resultado.append(linha_corr)
+
+        logger.info(f"Linhas REPASSE nao matcheadas: {nao_matcheados}")
+        logger.info(f"Cache de similaridade: {len(cache_similaridade)} entradas")
+        if len(cache_similaridade) > _pares_em_disco:
+            _salvar_cache_similaridade(cache_similaridade)
+
+        # ── Verificação TUSS pós-correlação ───────────────────────────────────
+        _reportar(0.87, "Verificando códigos TUSS adicionais...")
+        tabela_tuss: dict = {}
+        _tuss_debug_log = _TUSS_DIR / "tuss_debug.log"
+        try:
+            def _dbg(msg):
+                """Grava diagnóstico em arquivo para inspeção mesmo sem acesso ao terminal."""
+                import threading
+                linha = f"[{datetime.now().isoformat()} T={threading.current_thread().name}] {msg}\n"
+                logger.info(msg)
+                try:
+                    with open(_tuss_debug_log, "a", encoding="utf-8") as _f:
+                        _f.write(linha)
+                except Exception:
+                    pass
+
+            _dbg(f"TUSS-INIT preloaded={bool(tabela_tuss_preloaded)} len={len(tabela_tuss_preloaded) if tabela_tuss_preloaded else 0}")
+            _dbg(f"TUSS-PATH exists={_TUSS_LOOKUP_PATH.exists()} path={_TUSS_LOOKUP_PATH}")
+
+            if tabela_tuss_preloaded:
+                tabela_tuss = tabela_tuss_preloaded
+                _dbg(f"TUSS-LOAD via preloaded ({len(tabela_tuss)} entradas)")
+            elif _TUSS_LOOKUP_PATH.exists():
+                _df_lookup = pd.read_csv(
+                    _TUSS_LOOKUP_PATH,
+                    dtype={"CodigosTUSS": str, "codigo_base_proc_principal": str},
+                )
+                tabela_tuss = {str(r["chave_norm"]): dict(r) for _, r in _df_lookup.iterrows()}
+                _dbg(f"TUSS-LOAD via read_csv ({len(tabela_tuss)} entradas)")
+            else:
+                tabela_tuss = dict(_TABELA_TUSS_EMBUTIDA)
+                _dbg(f"TUSS-LOAD via embutida ({len(tabela_tuss)} entradas)")
+
+            if tabela_tuss:
+                tuss_idx = _construir_indice_tuss_repasse(df_rep)
+                _dbg(f"TUSS-IDX construído ({len(tuss_idx)} entradas)")
+                linhas_antes = len(linhas_resultado)
+                linhas_resultado = verificar_tuss_adicionais(linhas_resultado, df_rep, tabela_tuss, tuss_idx)
+                n_com_status = sum(1 for l in linhas_resultado if "StatusTUSS" in l)
+                _dbg(f"TUSS-VERIFY concluído: {linhas_antes} linhas, {n_com_status} com StatusTUSS")
+            else:
+                _dbg("TUSS-SKIP tabela_tuss vazia")
+        except Exception as _e_tuss:
+            logger.warning(f"Verificação TUSS ignorada: {_e_tuss}", exc_info=True)
+            try:
+                with open(_tuss_debug_log, "a", encoding="utf-8") as _f:
+                    import traceback
+                    _f.write(f"TUSS-EXCEPTION: {_e_tuss}\n{traceback.format_exc()}\n")
+            except Exception:
+                pass
+
+        # ── Monta DataFrame final e ordena por data ───────────────────────────
+        df_final = pd.DataFrame(linhas_resultado)
+        df_final.fillna("", inplace=True)
+
+        # ── Enriquecimento com valores e descrições TUSS ──────────────────────
+        _reportar(0.94, "Enriquecendo com valores TUSS...")
+        try:
+            # Mesmo padrão: preloaded (não vazio) → fallback para _carregar_valores_tuss
+            # (valores_tuss muda com mais frequência, cache stale menos crítico aqui)
+            _valores_tuss_corr = (
+                valores_tuss_preloaded if valores_tuss_preloaded
+                else _carregar_valores_tuss()
+            )
+            _desc_lookup_corr  = _construir_desc_por_tuss_code(tabela_tuss)
+            df_final = _enriquecer_com_valores_tuss(df_final, _valores_tuss_corr, _desc_lookup_corr)
+            logger.info("Enriquecimento TUSS concluído")
+        except Exception as _e_enr:
+            logger.warning(f"Enriquecimento TUSS ignorado: {_e_enr}", exc_info=True)
+
+        if "Data_PRODUCAO" in df_final.columns:
+            _data_prod_final = df_final["Data_PRODUCAO"]
+            df_final["_sort_date"] = _data_prod_final.where(
+                _data_prod_final.astype(bool),
+                df_final["Data_REPASSE"] if "Data_REPASSE" in df_final.columns else "",
+            )
+            df_final.sort_values("_sort_date", inplace=True)
+            df_final.drop(columns=["_sort_date"], inplace=True)
+            df_final.reset_index(drop=True, inplace=True)
+
+        _reportar(1.0, f"Concluído: {len(df_final)} linhas correlacionadas")
+        return df_final, {"casamentos": _casamentos, "recalculadas": len(_recalcular)}
+
+    except Exception as e:
+        logger.error(f"Erro na correlacao local: {e}", exc_info=True)
+
+
+# =============================================================================
+# CORRELAÇÃO INCREMENTAL
+# =============================================================================
+# A cada mês chega a PRODUCAO acumulada e o REPASSE novo. O estado da execução
+# anterior (impressões e casamento de cada linha PRODUCAO; REPASSE acumulado,
+# ou só as impressões dele quando cada execução recebe o REPASSE completo)
+# permite casar de novo só as linhas PRODUCAO cuja janela de datas encosta em
+# alguma mudança; as demais mantêm o casamento anterior.
+
+# Janela (± dias) em que uma linha PRODUCAO enxerga o REPASSE — a do Fallback 2
+_JANELA_CORRELACAO_DIAS = 7
+_ESTADO_CORRELACAO_VERSAO = 3
+
+def _datas_na_janela(datas: set[str]) -> set[str]:
+    """Datas a até _JANELA_CORRELACAO_DIAS de alguma de `datas` (não parseáveis só casam com si mesmas)."""
+    janela = set(datas)
+    for data in datas:
+        try:
+            data_dt = datetime.strptime(data, "%d/%m/%Y")
+        except ValueError:
+            continue
+        janela.update(
+            (data_dt + timedelta(days=d)).strftime("%d/%m/%Y")
+            for d in range(-_JANELA_CORRELACAO_DIAS, _JANELA_CORRELACAO_DIAS + 1)
+        )
+    return janela
+
+
+def _posicoes_na_janela(datas_prod: list[str], datas: set[str]) -> set[int]:
+    if not datas:
+        return set()
+    janela = _datas_na_janela(datas)
+    return {pos for pos, data in enumerate(datas_prod) if data in janela}
+
+
+def _planejar_incremental(anterior: dict, datas_prod: list[str], datas_rep: list[str]) -> tuple[set[int], set[str]]:
+    """
+    Linhas PRODUCAO a casar de novo e as datas REPASSE "sujas" que as motivaram.
+
+    Sujas: datas das linhas REPASSE novas/alteradas/removidas, das liberadas
+    por linhas PRODUCAO removidas ou alteradas e das linhas PRODUCAO novas
+    (que disputam o REPASSE do mesmo dia). Recalculadas: as novas, as que
+    casavam com REPASSE alterado e todas cuja janela (±_JANELA_CORRELACAO_DIAS)
+    contém uma data suja — inclusive as que casavam com REPASSE removido, já
+    que todo casamento fica dentro da janela.
+    """
+    sujas = {datas_rep[i] for i in anterior["alteradas"] | anterior["liberadas"]}
+    sujas |= set(anterior["datas_removidas"])
+    sujas |= {datas_prod[pos] for pos in anterior["novas"]}
+    recalcular = set(anterior["novas"]) | _posicoes_na_janela(datas_prod, sujas)
+    recalcular |= {
+        pos for pos, casamento in enumerate(anterior["casamentos"])
+        if casamento is not None and casamento[0] in anterior["alteradas"]
+    }
+    return recalcular, sujas
+
+
+def _impressoes_repasse(df_rep: pd.DataFrame) -> pd.DataFrame:
+    """Impressões de cada linha REPASSE (motor.diferenca) com a Data, para as janelas."""
+    conteudo = [c for c in _COLUNAS_REPASSE if c not in _EXCLUIR_REP]
+    return impressoes_linhas(df_rep, COLUNAS_CHAVE_REPASSE, conteudo).assign(
+        Data=pd.Categorical(df_rep.reindex(columns=["Data"], fill_value="")["Data"].to_numpy()),
+    )
+
+
+def _alinhar_repasse(
+    estado: dict,
+    df_novo: pd.DataFrame,
+    acumular: bool,
+) -> tuple[pd.DataFrame, np.ndarray, set[int], list[str]]:
+    """
+    REPASSE desta execução frente ao do estado, linha a linha (motor.diferenca).
+
+    acumular=True: o REPASSE do estado com as linhas reenviadas com outro
+    conteúdo substituídas no lugar e as inéditas no final; linhas ausentes do
+    upload permanecem (o upload pode ser só o mês novo). acumular=False: o
+    upload é o REPASSE completo; linhas ausentes dele foram removidas — basta
+    o estado ter as impressões do REPASSE anterior.
+
+    Returns:
+        (REPASSE da execução, posição atual de cada linha anterior ou -1,
+         posições novas ou alteradas, datas das linhas removidas)
+    """
+    novo = df_novo.reset_index(drop=True)
+    if not acumular:
+        anteriores = estado.get("repasse_impressoes")
+        if anteriores is None:
+            anteriores = _impressoes_repasse(_normalizar_nulos_csv(estado["repasse"]))
+        dif = diferenca_linhas(anteriores, _impressoes_repasse(novo))
+        mapa = np.full(len(anteriores), -1, dtype=np.int64)
+        existe = dif.posicao_anterior >= 0
+        mapa[dif.posicao_anterior[existe]] = np.flatnonzero(existe)
+        alteradas = set(dif.alteradas.tolist()) | set(dif.adicionadas.tolist())
+        return novo, mapa, alteradas, anteriores["Data"].iloc[dif.removidas].tolist()
+
+    df_anterior = _normalizar_nulos_csv(estado["repasse"])
+    colunas = list(dict.fromkeys([*df_anterior.columns, *novo.columns]))
+    anterior = df_anterior.reindex(columns=colunas, fill_value="").reset_index(drop=True)
+    novo = novo.reindex(columns=colunas, fill_value="")
+    dif = diferenca_linhas(_impressoes_repasse(anterior), _impressoes_repasse(novo))
+    pos_anterior = dif.posicao_anterior[dif.alteradas]
+    if len(pos_anterior):
+        anterior.iloc[pos_anterior] = novo.iloc[dif.alteradas].to_numpy()
+    acumulado = pd.concat([anterior, novo.iloc[dif.adicionadas]], ignore_index=True)
+    alteradas = set(pos_anterior.tolist()) | set(range(len(anterior), len(acumulado)))
+    return acumulado, np.arange(len(anterior)), alteradas, []
+
+
+def _motivo_estado_invalido(estado: dict, limiar_similaridade: float) -> str:
+    if estado.get("versao") != _ESTADO_CORRELACAO_VERSAO:
+        return "versão do estado diferente"
+    if estado.get("limiar_similaridade") != limiar_similaridade:
+        return "limiar de similaridade diferente"
+    if estado.get("regras") != _hash_regras_similaridade():
+        return "regras de similaridade alteradas"
+    return ""
+
+
+def correlacionar_incremental(
+    df_producao: pd.DataFrame,
+    df_repasse: pd.DataFrame,
+    estado: dict | None = None,
+    limiar_similaridade: float = 0.65,
+    tabela_tuss_preloaded: dict | None = None,
+    valores_tuss_preloaded: dict | None = None,
+    progresso: Callable[[float, str], None] | None = None,
+    repasse_completo: bool = False,
+) -> tuple[pd.DataFrame | None, dict | None]:
+    """
+    Correlação incremental sobre o estado da execução anterior.
+
+    `df_producao` é a PRODUCAO completa (acumulada). `df_repasse` pode ser só
+    o REPASSE novo — é acumulado ao do estado (ver _alinhar_repasse) — ou,
+    com repasse_completo=True, o REPASSE inteiro, e linhas ausentes dele são
+    removidas. As mudanças linha a linha de cada tabela frente ao estado vêm
+    de motor.diferenca (chave + conteúdo por linha).
+
+    Só as linhas PRODUCAO novas/alteradas ou cuja janela de ±7 dias encosta
+    em REPASSE novo/alterado/removido/liberado passam de novo pelo laço de
+    casamento (ver _planejar_incremental); as demais mantêm o casamento
+    anterior e disputam o REPASSE restante antes das recalculadas. Índices,
+    fallbacks 5/6, verificação TUSS e enriquecimento rodam sobre todas as
+    linhas (lineares).
+
+    O resultado coincide com o de correlacionar_dataframes sobre o mesmo
+    REPASSE quando as mudanças não disputam REPASSE com linhas mantidas; se
+    disputam, o casamento anterior prevalece. Sem estado, ou com estado de
+    outra versão/limiar/regras de similaridade, a correlação é completa.
+
+    O novo estado guarda as impressões e o casamento de cada linha PRODUCAO
+    e o REPASSE acumulado — com repasse_completo=True, só as impressões do
+    REPASSE (a próxima execução também recebe o REPASSE inteiro).
+
+    Returns:
+        (DataFrame como o de correlacionar_dataframes, novo estado) — o estado
+        é gravável com armazenamento.salvar_objeto e seu "resumo" conta as
+        linhas alteradas e recalculadas —, ou (None, None) em caso de erro
+
+    Raises:
+        ValueError: estado gerado com repasse_completo=True numa execução que
+            acumula o REPASSE
+    """
+    df_prod = _normalizar_nulos_csv(df_producao).reset_index(drop=True)
+    df_rep = _normalizar_nulos_csv(df_repasse).reset_index(drop=True)
+
+    if estado is not None:
+        motivo = _motivo_estado_invalido(estado, limiar_similaridade)
+        if motivo:
+            logger.info(f"Correlacao incremental: estado descartado ({motivo}) — correlação completa")
+            estado = None
+        elif not repasse_completo and "repasse" not in estado:
+            raise ValueError(
+                "Estado gerado com repasse_completo=True não guarda o REPASSE para acumular; "
+                "passe o REPASSE completo (repasse_completo=True) ou descarte o estado."
+            )
+
+    impressoes = impressoes_linhas(
+        df_prod, COLUNAS_CHAVE_PRODUCAO, [c for c in _COLUNAS_PRODUCAO if c not in _EXCLUIR_PROD],
+    )
+    anterior = None
+    resumo = {
+        "completa": estado is None,
+        "producao": {"adicionadas": len(df_prod), "removidas": 0, "alteradas": 0, "inalteradas": 0},
+        "repasse": {"adicionadas_ou_alteradas": len(df_rep), "removidas": 0},
+        "recalculadas": len(df_prod),
+    }
+
+    if estado is not None:
+        df_rep, mapa_repasse, alteradas, datas_removidas = _alinhar_repasse(
+            estado, df_rep, acumular=not repasse_completo,
+        )
+        producao_anterior = estado["producao"]
+        dif = diferenca_linhas(producao_anterior, impressoes)
+        novas = set(dif.adicionadas.tolist()) | set(dif.alteradas.tolist())
+
+        # Casamento anterior de cada linha, com o REPASSE na posição desta execução
+        idx_anterior = producao_anterior["idx_repasse"].to_numpy()
+        idx_atual = np.full(len(idx_anterior), -1, dtype=np.int64)
+        casadas = idx_anterior >= 0
+        idx_atual[casadas] = mapa_repasse[idx_anterior[casadas]]
+        casamentos = [None] * len(df_prod)
+        for pos, pos_ant in enumerate(dif.posicao_anterior.tolist()):
+            if pos_ant >= 0 and pos not in novas and idx_atual[pos_ant] >= 0:
+                casamentos[pos] = (
+                    int(idx_atual[pos_ant]),
+                    producao_anterior["metodo"].iat[pos_ant],
+                    float(producao_anterior["score"].iat[pos_ant]),
+                )
+        # REPASSE casado por linhas PRODUCAO removidas ou alteradas fica livre
+        soltas = np.concatenate([dif.removidas, dif.posicao_anterior[dif.alteradas]])
+        liberadas = {int(i) for i in idx_atual[soltas] if i >= 0}
+
+        anterior = {
+            "casamentos": casamentos,
+            "novas": novas,
+            "alteradas": alteradas,
+            "liberadas": liberadas,
+            "datas_removidas": datas_removidas,
+        }
+        resumo.update(
+            producao=dif.resumo(),
+            repasse={"adicionadas_ou_alteradas": len(alteradas), "removidas": len(datas_removidas)},
+        )
+
+    retorno = _correlacionar(
+        df_prod, df_rep, limiar_similaridade, tabela_tuss_preloaded, valores_tuss_preloaded,
+        progresso=progresso, anterior=anterior,
+    )
+    if retorno is None:
+        return None, None
+    df_final, info = retorno
+    resumo["recalculadas"] = info["recalculadas"]
+    logger.info(f"Correlacao incremental: {resumo}")
+
+    casamentos = info["casamentos"]
+    producao = impressoes.assign(
+        idx_repasse=[-1 if c is None else c[0] for c in casamentos],
+        metodo=pd.Categorical(["SEM_MATCH" if c is None else c[1] for c in casamentos]),
+        score=[0.0 if c is None else c[2] for c in casamentos],
+    )
+    novo_estado = {
+        "versao": _ESTADO_CORRELACAO_VERSAO,
+        "limiar_similaridade": limiar_similaridade,
+        "regras": _hash_regras_similaridade(),
+        "producao": producao,
+        "resumo": resumo,
+    }
+    if repasse_completo:
+        novo_estado["repasse_impressoes"] = _impressoes_repasse(df_rep)
+    else:
+        novo_estado["repasse"] = df_rep
+    return df_final, novo_estado
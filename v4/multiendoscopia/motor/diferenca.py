@@ -0,0 +1,134 @@
+"""
+Impressões digitais por linha e diferença entre uploads sucessivos.
+
+Cada linha de uma tabela transformada (saída de _processar_aba_producao /
+_processar_aba_repasse) recebe impressões estáveis entre execuções e
+processos (hash_pandas_object com a chave fixa do pandas):
+    chave       hash das colunas-chave normalizadas — identifica "a mesma
+                linha" entre uploads; `ocorrencia` separa chaves repetidas,
+                na ordem da tabela
+    conteudo    hash das colunas de conteúdo — muda quando a linha é corrigida
+
+Comparando as impressões do upload anterior com as do atual sai a diferença:
+linhas adicionadas, removidas e alteradas (mesma chave, outro conteúdo).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .transform import _normalizar_nulos_csv
+
+# =============================================================================
+# IMPRESSÕES POR LINHA
+# =============================================================================
+
+# Colunas-chave já normalizadas pelo processador da aba (Data padronizada,
+# aba de origem). Paciente e Procedimento entram na chave: sem NrAtendimento,
+# só a ocorrência separaria as linhas do dia, e inserir uma linha deslocaria
+# todas as seguintes. Corrigir Convênio, Médico etc. altera só o conteúdo — a
+# linha aparece como alterada; corrigir o nome ou o procedimento aparece como
+# removida + adicionada.
+COLUNAS_CHAVE_PRODUCAO = ["AbaOrigemDados", "Data", "NrAtendimento", "Paciente", "Procedimento"]
+COLUNAS_CHAVE_REPASSE = ["Data", "Paciente", "NrAtendimento", "NrInternoConta", "Procedimento"]
+
+# Colunas de controle, fora do conteúdo comparado
+_COLUNAS_IGNORADAS = {"TipoArquivo", "_matched"}
+
+
+def _hash_colunas(df: pd.DataFrame, colunas: list[str]) -> np.ndarray:
+    return pd.util.hash_pandas_object(df.reindex(columns=colunas, fill_value=""), index=False).to_numpy()
+
+
+def impressoes_linhas(
+    df: pd.DataFrame,
+    colunas_chave: list[str],
+    colunas_conteudo: list[str],
+) -> pd.DataFrame:
+    """
+    Impressões de cada linha de `df`, na ordem da tabela: colunas chave,
+    ocorrencia e conteudo. Colunas ausentes contam como vazias; nulos e
+    category são normalizados como no CSV (_normalizar_nulos_csv), então a
+    mesma linha lida de CSV, Parquet ou da transformação tem a mesma impressão.
+    """
+    texto = _normalizar_nulos_csv(df.reindex(columns=list(dict.fromkeys([*colunas_chave, *colunas_conteudo]))))
+    chave = _hash_colunas(texto, colunas_chave)
+    return pd.DataFrame({
+        "chave": chave,
+        "ocorrencia": pd.Series(chave).groupby(chave).cumcount().to_numpy(),
+        "conteudo": _hash_colunas(texto, colunas_conteudo),
+    })
+
+
+# =============================================================================
+# DIFERENÇA ENTRE UPLOADS
+# =============================================================================
+
+@dataclass(frozen=True)
+class DiferencaLinhas:
+    """
+    posicao_anterior: por linha atual, a posição da linha de mesma chave no
+        upload anterior, ou -1 (adicionada)
+    alteradas: posições (no atual) com a mesma chave e outro conteúdo
+    removidas: posições (no anterior) sem linha de mesma chave no atual
+    """
+    posicao_anterior: np.ndarray
+    alteradas: np.ndarray
+    removidas: np.ndarray
+
+    @property
+    def adicionadas(self) -> np.ndarray:
+        return np.flatnonzero(self.posicao_anterior < 0)
+
+    @property
+    def inalteradas(self) -> int:
+        return int((self.posicao_anterior >= 0).sum()) - len(self.alteradas)
+
+    @property
+    def vazia(self) -> bool:
+        return not (len(self.adicionadas) or len(self.alteradas) or len(self.removidas))
+
+    def resumo(self) -> dict[str, int]:
+        return {
+            "adicionadas": len(self.adicionadas),
+            "removidas": len(self.removidas),
+            "alteradas": len(self.alteradas),
+            "inalteradas": self.inalteradas,
+        }
+
+
+def diferenca_linhas(anteriores: pd.DataFrame, atuais: pd.DataFrame) -> DiferencaLinhas:
+    """Diferença entre duas tabelas de impressões (impressoes_linhas com as mesmas colunas)."""
+    anteriores = anteriores[["chave", "ocorrencia", "conteudo"]].assign(posicao=np.arange(len(anteriores)))
+    pares = atuais[["chave", "ocorrencia", "conteudo"]].merge(
+        anteriores, on=["chave", "ocorrencia"], how="left", suffixes=("", "_anterior"),
+    )
+    existe = pares["posicao"].notna().to_numpy()
+    posicao_anterior = pares["posicao"].fillna(-1).to_numpy().astype(np.int64)
+    alteradas = np.flatnonzero(existe & (pares["conteudo"].to_numpy() != pares["conteudo_anterior"].to_numpy()))
+    vistas = np.zeros(len(anteriores), dtype=bool)
+    vistas[posicao_anterior[existe]] = True
+    return DiferencaLinhas(posicao_anterior, alteradas, np.flatnonzero(~vistas))
+
+
+def colunas_chave(df: pd.DataFrame) -> list[str]:
+    """Colunas-chave pelo TipoArquivo da tabela (PRODUCAO ou REPASSE)."""
+    tipo = str(df["TipoArquivo"].iloc[0]).upper() if "TipoArquivo" in df.columns and len(df) else ""
+    return COLUNAS_CHAVE_REPASSE if "REPASSE" in tipo else COLUNAS_CHAVE_PRODUCAO
+
+
+def diferenca_tabelas(df_anterior: pd.DataFrame, df_atual: pd.DataFrame) -> DiferencaLinhas:
+    """
+    Diferença linha a linha entre dois uploads da mesma planilha (já
+    transformados). Conteúdo comparado: todas as colunas das duas tabelas,
+    exceto as de controle.
+    """
+    chave = colunas_chave(df_atual)
+    conteudo = sorted(
+        c for c in set(df_anterior.columns) | set(df_atual.columns) if c not in _COLUNAS_IGNORADAS
+    )
+    return diferenca_linhas(
+        impressoes_linhas(df_anterior, chave, conteudo),
+        impressoes_linhas(df_atual, chave, conteudo),
+    )
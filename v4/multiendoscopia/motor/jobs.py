@@ -0,0 +1,418 @@
+"""
+Fila persistente de jobs (segundo plano) e o processo worker que a atende.
+
+Correlação e transformação locais podem ir para uma fila SQLite atendida por
+processos worker (`python -m motor.jobs <dir>`), independentes da execução do
+script Streamlit: um rerun, uma aba fechada ou um websocket caído não perdem o
+resultado. Entradas e resultados ficam em disco (entradas/<id>/,
+resultados/<id>/: tabelas em Parquet, o restante em pickle —
+motor.armazenamento) e a interface consulta o estado pelo id do job.
+
+O worker não importa Streamlit nem o app: sobe só o motor.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from .armazenamento import carregar_objeto, salvar_objeto
+from .correlate import correlacionar_dataframes
+from .transform import transformar_abas_arquivo, transformar_texto_arquivo
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# FILA
+# =============================================================================
+
+# Worker sem jobs por esse tempo encerra; é recriado na próxima submissão
+_JOBS_WORKER_OCIOSO_S = float(os.getenv("JOBS_WORKER_OCIOSO_S", "600"))
+# Jobs concluídos mantidos (com seus arquivos) antes de descartar os mais antigos
+_JOBS_MAX_HISTORICO = int(os.getenv("JOBS_MAX_HISTORICO", "50"))
+# Intervalo de consulta da fila pelo worker ocioso
+_JOBS_POLL_WORKER_S = 1.0
+# Gravações de progresso no SQLite, no máximo uma a cada
+_JOBS_INTERVALO_PROGRESSO_S = 0.5
+# Cada worker renova seu batimento (e o do job que executa) a cada
+# _JOBS_BATIMENTO_S; sem batimento há _JOBS_LEASE_S, worker e job são dados
+# como mortos. PIDs gravados não servem: o diretório sobrevive a reinícios do
+# contêiner e um PID reaproveitado faria um worker morto parecer vivo.
+_JOBS_BATIMENTO_S = 5.0
+_JOBS_LEASE_S = float(os.getenv("JOBS_LEASE_S", "60"))
+
+JOB_PENDENTE, JOB_EXECUTANDO, JOB_CONCLUIDO, JOB_ERRO = "pendente", "executando", "concluido", "erro"
+_ESTADOS_JOB_ATIVOS = (JOB_PENDENTE, JOB_EXECUTANDO)
+
+
+class FilaJobs:
+    """
+    Fila de jobs em SQLite compartilhada entre a interface (submete e consulta)
+    e os processos worker (reivindicam e executam). Cada operação abre sua
+    própria conexão; a reivindicação é um compare-and-set no estado.
+
+    Cada job pertence ao `dono` que o submeteu (token da sessão da interface):
+    listar, carregar e remover só enxergam os jobs do dono. Um job de outra
+    sessão só é recuperado pelo id completo (assumir).
+    """
+
+    def __init__(self, diretorio: Path):
+        self.diretorio = diretorio
+        self.caminho = diretorio / "jobs.sqlite"
+        (diretorio / "entradas").mkdir(parents=True, exist_ok=True)
+        (diretorio / "resultados").mkdir(parents=True, exist_ok=True)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id           TEXT PRIMARY KEY,
+                    tipo         TEXT NOT NULL,
+                    rotulo       TEXT NOT NULL DEFAULT '',
+                    estado       TEXT NOT NULL,
+                    progresso    REAL NOT NULL DEFAULT 0,
+                    mensagem     TEXT NOT NULL DEFAULT '',
+                    erro         TEXT,
+                    pid          INTEGER,
+                    criado_em    REAL NOT NULL,
+                    iniciado_em  REAL,
+                    concluido_em REAL
+                )
+                """
+            )
+            colunas = {l["name"] for l in con.execute("PRAGMA table_info(jobs)").fetchall()}
+            for coluna, tipo in (("worker", "TEXT"), ("batimento", "REAL"), ("dono", "TEXT")):
+                if coluna not in colunas:
+                    con.execute(f"ALTER TABLE jobs ADD COLUMN {coluna} {tipo}")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_estado ON jobs (estado, criado_em)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dono ON jobs (dono, tipo, criado_em)")
+            # Registro de workers por PID (versão anterior) é descartado
+            colunas = {l["name"] for l in con.execute("PRAGMA table_info(workers)").fetchall()}
+            if colunas and "batimento" not in colunas:
+                con.execute("DROP TABLE workers")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS workers (
+                    id          TEXT PRIMARY KEY,
+                    pid         INTEGER,
+                    iniciado_em REAL NOT NULL,
+                    batimento   REAL NOT NULL
+                )
+                """
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.caminho, timeout=30)
+        con.row_factory = sqlite3.Row
+        return con
+
+    def _dir_entrada(self, job_id: str) -> Path:
+        return self.diretorio / "entradas" / job_id
+
+    def _dir_resultado(self, job_id: str) -> Path:
+        return self.diretorio / "resultados" / job_id
+
+    # ── Interface ──────────────────────────────────────────────────────────
+    def submeter(self, tipo: str, entrada: dict, dono: str, rotulo: str = "") -> str:
+        if tipo not in _TIPOS_JOB:
+            raise ValueError(f"Tipo de job desconhecido: {tipo}")
+        job_id = uuid.uuid4().hex
+        salvar_objeto(entrada, self._dir_entrada(job_id))
+        with self._conectar() as con:
+            con.execute(
+                "INSERT INTO jobs (id, tipo, rotulo, estado, criado_em, dono) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, tipo, rotulo, JOB_PENDENTE, time.time(), dono),
+            )
+        self._descartar_historico()
+        logger.info(f"Job {job_id[:8]} ({tipo}) enfileirado: {rotulo}")
+        return job_id
+
+    def obter(self, job_id: str) -> dict | None:
+        with self._conectar() as con:
+            linha = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(linha) if linha else None
+
+    def listar(self, dono: str, tipo: str | None = None, limite: int = 10) -> list[dict]:
+        sql, args = "SELECT * FROM jobs WHERE dono = ?", [dono]
+        if tipo:
+            sql, args = sql + " AND tipo = ?", [*args, tipo]
+        with self._conectar() as con:
+            linhas = con.execute(sql + " ORDER BY criado_em DESC LIMIT ?", (*args, limite)).fetchall()
+        return [dict(l) for l in linhas]
+
+    def carregar_resultado(self, job_id: str, dono: str):
+        job = self.obter(job_id)
+        if job is None or job["dono"] != dono or job["estado"] != JOB_CONCLUIDO:
+            raise LookupError(f"Job {job_id[:8]} não encontrado entre os concluídos desta sessão")
+        return carregar_objeto(self._dir_resultado(job_id))
+
+    def assumir(self, job_id: str, tipo: str, dono: str) -> bool:
+        """Passa o job `job_id` (id completo) do tipo `tipo` para `dono`; False se não existir."""
+        with self._conectar() as con:
+            return con.execute(
+                "UPDATE jobs SET dono = ? WHERE id = ? AND tipo = ?", (dono, job_id, tipo)
+            ).rowcount > 0
+
+    def remover(self, job_id: str, dono: str) -> None:
+        """Remove um job já finalizado do dono e seus arquivos; jobs ativos são ignorados."""
+        with self._conectar() as con:
+            removido = con.execute(
+                "DELETE FROM jobs WHERE id = ? AND dono = ? AND estado NOT IN (?, ?)",
+                (job_id, dono, *_ESTADOS_JOB_ATIVOS),
+            ).rowcount
+        if removido:
+            self._apagar_arquivos(job_id)
+
+    def _apagar_arquivos(self, job_id: str) -> None:
+        for diretorio in (self._dir_entrada(job_id), self._dir_resultado(job_id)):
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+    def _descartar_historico(self) -> None:
+        with self._conectar() as con:
+            antigos = [
+                l["id"] for l in con.execute(
+                    "SELECT id FROM jobs WHERE estado NOT IN (?, ?) ORDER BY criado_em DESC LIMIT -1 OFFSET ?",
+                    (*_ESTADOS_JOB_ATIVOS, _JOBS_MAX_HISTORICO),
+                ).fetchall()
+            ]
+            con.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in antigos])
+        for job_id in antigos:
+            self._apagar_arquivos(job_id)
+
+    # ── Workers ────────────────────────────────────────────────────────────
+    def reivindicar(self, worker_id: str) -> dict | None:
+        """Passa o job pendente mais antigo para `executando` em nome do worker."""
+        while True:
+            with self._conectar() as con:
+                linha = con.execute(
+                    "SELECT id FROM jobs WHERE estado = ? ORDER BY criado_em LIMIT 1", (JOB_PENDENTE,)
+                ).fetchone()
+                if linha is None:
+                    return None
+                agora = time.time()
+                tomado = con.execute(
+                    "UPDATE jobs SET estado = ?, worker = ?, pid = ?, iniciado_em = ?, batimento = ? "
+                    "WHERE id = ? AND estado = ?",
+                    (JOB_EXECUTANDO, worker_id, os.getpid(), agora, agora, linha["id"], JOB_PENDENTE),
+                ).rowcount
+            if tomado:
+                return self.obter(linha["id"])
+
+    def carregar_entrada(self, job_id: str) -> dict:
+        return carregar_objeto(self._dir_entrada(job_id))
+
+    def atualizar_progresso(self, job_id: str, fracao: float, mensagem: str) -> None:
+        with self._conectar() as con:
+            con.execute(
+                "UPDATE jobs SET progresso = ?, mensagem = ? WHERE id = ?", (fracao, mensagem, job_id)
+            )
+
+    def concluir(self, job_id: str, resultado) -> None:
+        salvar_objeto(resultado, self._dir_resultado(job_id))
+        shutil.rmtree(self._dir_entrada(job_id), ignore_errors=True)
+        with self._conectar() as con:
+            con.execute(
+                "UPDATE jobs SET estado = ?, progresso = 1, concluido_em = ? WHERE id = ?",
+                (JOB_CONCLUIDO, time.time(), job_id),
+            )
+
+    def falhar(self, job_id: str, erro: str) -> None:
+        with self._conectar() as con:
+            con.execute(
+                "UPDATE jobs SET estado = ?, erro = ?, concluido_em = ? WHERE id = ?",
+                (JOB_ERRO, erro, time.time(), job_id),
+            )
+
+    def registrar_worker(self, worker_id: str, pid: int | None = None) -> None:
+        """Registra o worker com batimento agora (chamado também antes de o processo subir)."""
+        agora = time.time()
+        with self._conectar() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO workers (id, pid, iniciado_em, batimento) VALUES (?, ?, ?, ?)",
+                (worker_id, pid, agora, agora),
+            )
+
+    def bater(self, worker_id: str) -> None:
+        """Renova o batimento do worker e do job que ele executa."""
+        agora = time.time()
+        with self._conectar() as con:
+            con.execute(
+                "INSERT INTO workers (id, pid, iniciado_em, batimento) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET pid = excluded.pid, batimento = excluded.batimento",
+                (worker_id, os.getpid(), agora, agora),
+            )
+            con.execute(
+                "UPDATE jobs SET batimento = ? WHERE worker = ? AND estado = ?",
+                (agora, worker_id, JOB_EXECUTANDO),
+            )
+
+    def remover_worker(self, worker_id: str) -> None:
+        with self._conectar() as con:
+            con.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def workers_vivos(self) -> int:
+        """
+        Descarta workers sem batimento há _JOBS_LEASE_S e marca como erro os
+        jobs em execução sem batimento há esse tempo (worker morto ou reiniciado).
+        """
+        limite = time.time() - _JOBS_LEASE_S
+        with self._conectar() as con:
+            con.execute("DELETE FROM workers WHERE batimento < ?", (limite,))
+            con.execute(
+                "UPDATE jobs SET estado = ?, erro = ?, concluido_em = ? "
+                "WHERE estado = ? AND COALESCE(batimento, iniciado_em, 0) < ?",
+                (JOB_ERRO, "Worker interrompido durante a execução", time.time(), JOB_EXECUTANDO, limite),
+            )
+            return con.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+
+
+# =============================================================================
+# TIPOS DE JOB E WORKER
+# =============================================================================
+
+def _job_correlacao_local(entrada: dict, progresso) -> pd.DataFrame:
+    df = correlacionar_dataframes(
+        entrada["df_producao"], entrada["df_repasse"],
+        tabela_tuss_preloaded=entrada.get("tabela_tuss"),
+        valores_tuss_preloaded=entrada.get("valores_tuss"),
+        progresso=progresso,
+    )
+    if df is None:
+        raise RuntimeError("A correlação local falhou — verifique o log do worker.")
+    return df
+
+
+def _job_transformacao_local(entrada: dict, progresso) -> dict:
+    """Transforma cada arquivo; falha de um arquivo não derruba os demais."""
+    docs = entrada["extratos"]
+    dfs: dict[str, pd.DataFrame] = {}
+    erros: dict[str, str] = {}
+    for i, doc in enumerate(docs):
+        progresso(i / len(docs), f"Transformando {doc['filename']} ({i + 1}/{len(docs)})")
+        try:
+            df = (
+                transformar_abas_arquivo(doc["abas"], doc["filename"]) if doc.get("abas")
+                else transformar_texto_arquivo(doc["content"], doc["filename"])
+            )
+        except Exception as exc:
+            logger.error(f"Erro ao transformar {doc['filename']}: {exc}", exc_info=True)
+            erros[doc["filename"]] = str(exc)
+            continue
+        if df is None:
+            erros[doc["filename"]] = (
+                "Nenhum dado extraído. Verifique se o arquivo está no formato padrão PRODUCAO ou REPASSE."
+            )
+        else:
+            dfs[doc["filename"]] = df
+    if not dfs:
+        raise RuntimeError("; ".join(f"{nome}: {erro}" for nome, erro in erros.items()))
+    progresso(1.0, f"{len(dfs)} arquivo(s) transformado(s)" + (
+        f" · ❌ {len(erros)} com erro: {', '.join(erros)}" if erros else ""
+    ))
+    return {"dfs": dfs, "erros": erros}
+
+
+_TIPOS_JOB = {
+    "correlacao_local": _job_correlacao_local,
+    "transformacao_local": _job_transformacao_local,
+}
+
+
+def _executar_job(fila: FilaJobs, job: dict) -> None:
+    ultimo = 0.0
+
+    def _progresso(fracao: float, mensagem: str) -> None:
+        nonlocal ultimo
+        agora = time.monotonic()
+        if fracao >= 1.0 or agora - ultimo >= _JOBS_INTERVALO_PROGRESSO_S:
+            ultimo = agora
+            fila.atualizar_progresso(job["id"], fracao, mensagem)
+
+    logger.info(f"Job {job['id'][:8]} ({job['tipo']}) iniciado")
+    try:
+        resultado = _TIPOS_JOB[job["tipo"]](fila.carregar_entrada(job["id"]), _progresso)
+        fila.concluir(job["id"], resultado)
+        logger.info(f"Job {job['id'][:8]} concluído")
+    except Exception as exc:
+        logger.error(f"Job {job['id'][:8]} falhou: {exc}", exc_info=True)
+        fila.falhar(job["id"], str(exc))
+
+
+def _bater_periodicamente(fila: FilaJobs, worker_id: str, parar: threading.Event) -> None:
+    """Thread do worker: batimento a cada _JOBS_BATIMENTO_S, inclusive durante um job longo."""
+    while not parar.wait(_JOBS_BATIMENTO_S):
+        try:
+            fila.bater(worker_id)
+        except sqlite3.Error as exc:
+            logger.warning(f"Batimento do worker {worker_id[:8]} falhou: {exc}")
+
+
+def executar_worker_jobs(
+    diretorio: Path,
+    ocioso_s: float = _JOBS_WORKER_OCIOSO_S,
+    worker_id: str | None = None,
+) -> None:
+    """
+    Laço do processo worker: atende a fila até ficar `ocioso_s` sem jobs.
+    `worker_id` é o id com que a interface já registrou este worker ao subi-lo.
+    """
+    fila = FilaJobs(diretorio)
+    worker_id = worker_id or uuid.uuid4().hex
+    fila.bater(worker_id)
+    parar = threading.Event()
+    threading.Thread(
+        target=_bater_periodicamente, args=(fila, worker_id, parar), name="batimento", daemon=True,
+    ).start()
+    pid = os.getpid()
+    logger.info(f"Worker de jobs {worker_id[:8]} (pid {pid}) atendendo {fila.caminho}")
+    ultimo_job = time.monotonic()
+    try:
+        while True:
+            job = fila.reivindicar(worker_id)
+            if job is None:
+                if time.monotonic() - ultimo_job > ocioso_s:
+                    break
+                time.sleep(_JOBS_POLL_WORKER_S)
+                continue
+            _executar_job(fila, job)
+            ultimo_job = time.monotonic()
+    finally:
+        parar.set()
+        fila.remover_worker(worker_id)
+        logger.info(f"Worker de jobs {worker_id[:8]} (pid {pid}) encerrado")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Worker da fila de jobs em segundo plano.")
+    parser.add_argument("diretorio", type=Path, help="Diretório da fila (JOBS_DIR)")
+    parser.add_argument("--id", default=None, help="Id do worker (registrado pela interface ao subi-lo)")
+    parser.add_argument("--log", type=Path, default=None, help="Arquivo de log (além do stderr)")
+    args = parser.parse_args(argv)
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
+    if args.log:
+        try:
+            handlers.insert(0, logging.FileHandler(args.log, encoding="utf-8"))
+        except OSError:
+            pass
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=handlers,
+    )
+    executar_worker_jobs(args.diretorio, worker_id=args.id)
+    return 0
+
+
+if __name__ == "__main__":
+    # Roda a cópia importada como motor.jobs (logger "motor.jobs", não "__main__")
+    from motor.jobs import main as _main
+
+    sys.exit(_main())
@@ -0,0 +1,109 @@
+"""
+Leitura de planilhas Excel em DataFrames por aba.
+
+Erros de leitura são levantados como exceções; cabe a quem chama (interface
+ou CLI) decidir como exibi-los.
+"""
+
+import importlib.util
+import logging
+import os
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# LEITURA DE PLANILHAS
+# =============================================================================
+
+class PlanilhaSemDadosError(ValueError):
+    """Excel lido sem erro, mas sem nenhuma aba com dados."""
+
+
+# Backend de leitura de Excel. "auto" usa python-calamine quando instalado
+# (leitor nativo, percorre só o intervalo usado de cada aba) e recorre a
+# openpyxl (.xlsx) / xlrd (.xls) caso contrário. Forçável pela variável de
+# ambiente EXCEL_READER_BACKEND (auto | calamine | openpyxl), lida a cada chamada.
+
+
+def _engine_excel(extensao: str, backend: str | None = None) -> str:
+    """Resolve o engine do pandas para o backend pedido e a extensão do arquivo."""
+    backend = (backend or os.getenv("EXCEL_READER_BACKEND", "auto")).strip().lower()
+    if backend in ("auto", "calamine"):
+        if importlib.util.find_spec("python_calamine") is not None:
+            return "calamine"
+        if backend == "calamine":
+            logger.warning("python-calamine não instalado; usando openpyxl/xlrd")
+    return "openpyxl" if extensao == "xlsx" else "xlrd"
+
+
+def _limpar_quebras_de_linha(df: pd.DataFrame) -> pd.DataFrame:
+    """Remove quebras de linha internas e espaços nas bordas de todas as células."""
+    df = df.replace(r"[\r\n]+", " ", regex=True)
+    return df.apply(lambda col: col.str.strip() if col.dtype == object else col)
+
+
+def ler_abas_excel(
+    file,
+    backend: str | None = None,
+    tempos: list | None = None,
+) -> list[tuple[str, pd.DataFrame]]:
+    """
+    Lê todas as abas não vazias de um Excel como DataFrames de texto.
+
+    É a entrada do pipeline em DataFrame (transformar_abas_arquivo); a versão
+    em texto (abas_para_texto) é derivada daqui só para preview e LLM.
+
+    Args:
+        file:     Arquivo enviado (UploadedFile ou file-like com .name).
+        backend:  "auto", "calamine" ou "openpyxl" (padrão: EXCEL_READER_BACKEND).
+        tempos:   Se informado, recebe um dict por etapa com Aba, Linhas,
+                  Colunas e Segundos (abertura do arquivo + cada aba).
+
+    Raises:
+        PlanilhaSemDadosError: nenhuma aba com dados. Erros de leitura do arquivo propagam.
+    """
+    file.seek(0)
+    # Identifica a extensão do arquivo
+    file_extension = file.name.split('.')[-1].lower()
+    engine = _engine_excel(file_extension, backend)
+
+    t0 = time.perf_counter()
+    xls = pd.ExcelFile(file, engine=engine)
+    if tempos is not None:
+        tempos.append({"Aba": "(abertura)", "Linhas": 0, "Colunas": 0,
+                       "Segundos": round(time.perf_counter() - t0, 3)})
+
+    abas = []
+    for sheet_name in xls.sheet_names:
+        t0 = time.perf_counter()
+        df = xls.parse(sheet_name, dtype=str)
+        df.fillna("", inplace=True)
+
+        if not df.empty:
+            # Remove quebras de linha internas em células (vetorizado)
+            df = _limpar_quebras_de_linha(df)
+            abas.append((str(sheet_name), df))
+
+        dt = time.perf_counter() - t0
+        logger.info(
+            f"Excel [{engine}] aba '{sheet_name}': {len(df)}x{len(df.columns)} em {dt * 1000:.0f} ms"
+        )
+        if tempos is not None:
+            tempos.append({"Aba": str(sheet_name), "Linhas": len(df),
+                           "Colunas": len(df.columns), "Segundos": round(dt, 3)})
+
+    if not abas:
+        raise PlanilhaSemDadosError("O arquivo Excel não contém dados nas abas.")
+    return abas
+
+
+def abas_para_texto(abas: list[tuple[str, pd.DataFrame]]) -> str:
+    """Texto com blocos "=== ABA: <nome> ===" + CSV de cada aba (preview/LLM)."""
+    return "\n\n".join(
+        f"=== ABA: {nome} ===\n{df.to_csv(index=False, sep=',', encoding='utf-8')}"
+        for nome, df in abas
+    )
@@ -0,0 +1,477 @@
+"""
+Similaridade de procedimentos e normalização das chaves de correlação.
+
+Sinônimos de procedimentos, compatibilidade anatômica, normalização de nomes
+de pacientes e datas vizinhas — funções puras usadas pela correlação e pela
+verificação TUSS.
+"""
+
+import functools
+import logging
+import re
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Dict, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# SIMILARIDADE DE PROCEDIMENTOS E NOMES
+# =============================================================================
+# Dicionário de sinônimos e variações de procedimentos
+SINONIMOS_PROCEDIMENTOS = {
+    # Colonoscopia e variações
+    "COLONO": ["COLONOSCOPIA", "COLONOSCOPIA INCLUI", "RETOSSIGMOIDOSCOPIA"],
+    "COLONOSCOPIA": ["COLONO", "COLONOSCOPIA INCLUI", "RETOSSIGMOIDOSCOPIA"],
+    "COLONOCOPIA": ["COLONO", "COLONOSCOPIA"],  # Typo comum
+    "RETOSSIGMOIDOSCOPIA": ["COLONOSCOPIA", "COLONO"],
+    
+    # Endoscopia Digestiva Alta
+    "ENDOSCOPIA": ["EDA", "ENDOSCOPIA DIGESTIVA ALTA", "ESOFAGOGASTRODUODENOSCOPIA", "ESOFAGO GASTRO DUODENOSCOPIA"],
+    "EDA": ["ENDOSCOPIA", "ENDOSCOPIA DIGESTIVA ALTA", "ESOFAGOGASTRODUODENOSCOPIA"],
+    "ENDOCOSPIA": ["ENDOSCOPIA"],  # Typo
+    "ENDDOSCOPIA": ["ENDOSCOPIA"],  # Typo
+    "ESOFAGOGASTRODUODENOSCOPIA": ["ENDOSCOPIA", "EDA"],
+    "ESOFAGO GASTRO DUODENOSCOPIA": ["ENDOSCOPIA", "EDA"],
+    
+    # Ecoendoscopia
+    "ECOENDOSCOPIA": ["ECOEDA", "ULTRASSOM ENDOSCOPICO"],
+    "ECOEDA": ["ECOENDOSCOPIA", "ULTRASSOM ENDOSCOPICO"],
+    
+    # Teste de Urease / H. Pylori
+    "TESTE": ["PESQUISA", "EXAME"],
+    "UREASE": ["H PYLORI", "HELICOBACTER", "HELICOBACTER PYLORI"],
+    "TESTE DE UREASE": ["PESQUISA H PYLORI", "TESTE UREASE", "UREASE", "H PYLORI", "HELICOBACTER"],
+    "TESTE DA UREASE": ["TESTE DE UREASE", "PESQUISA H PYLORI", "HELICOBACTER"],
+    "HP": ["H PYLORI", "HELICOBACTER"],
+    "HPYLORI": ["H PYLORI", "HELICOBACTER"],
+    "HELICOBACTER": ["H PYLORI", "UREASE", "HP"],
+    "HELICOBACTER PYLORI": ["H PYLORI", "UREASE", "HP"],
+    
+    # Anátomo Patológico / Biópsia / Citologia
+    "ANATOMO": ["BIOPSIA", "CITOLOGIA", "AP"],
+    "ANATOMIA": ["BIOPSIA", "CITOLOGIA", "AP"],
+    "ANATOMIA PATOLOGICA": ["BIOPSIA", "CITOLOGIA", "AP", "ANÁTOMO PATOLÓGICO"],
+    "ANATOMO PATOLOGICA": ["BIOPSIA", "CITOLOGIA", "AP", "ANÁTOMO PATOLÓGICO"],
+    "ANATOMO PATOLOGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANÁTOMO PATOLÓGICO", "ANATOMOPATOLOGICO"],
+    "ANÁTOMO PATOLÓGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANATOMO PATOLOGICO", "ANATOMOPATOLOGICO"],
+    "ANÁTOMO PATLÓGICO": ["ANÁTOMO PATOLÓGICO", "BIOPSIA", "AP"],  # Typo
+    "ANATOMOPATOLOGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANATOMO PATOLOGICO"],
+    "ANÁTOMOPATOLOGICO": ["AP", "BIOPSIA", "CITOLOGIA", "ANÁTOMO PATOLÓGICO"],
+    "AP": ["ANATOMO PATOLOGICO", "BIOPSIA", "CITOLOGIA", "ANÁTOMO PATOLÓGICO", "ANATOMOPATOLOGICO"],
+    "BIOPSIA": ["ANATOMO PATOLOGICO", "AP", "CITOLOGIA", "BIOPSIAS"],
+    "BIOPSIAS": ["BIOPSIA", "ANATOMO PATOLOGICO", "AP"],
+    "BIOPSIA SERIADO": ["BIOPSIA", "ANÁTOMO PATOLÓGICO", "AP"],
+    "CITOLOGIA": ["BIOPSIA", "ANATOMO PATOLOGICO", "AP"],
+    
+    # Polipectomia
+    "POLIPECTOMIA": ["POLIPO", "RESSECCAO POLIPO", "RETIRADA POLIPO"],
+    "POLIPO": ["POLIPECTOMIA", "RESSECCAO POLIPO"],
+    "PÓLIPO": ["POLIPECTOMIA", "POLIPO"],
+    "POLIOECTOMIA": ["POLIPECTOMIA"],  # Typo
+    
+    # Hemostasia
+    "HEMOSTASIA": ["HEMOSTASE", "CONTROLE SANGRAMENTO", "HEMOSTASE ENDOSCOPICA"],
+    "HEMOSTASE": ["HEMOSTASIA", "CONTROLE SANGRAMENTO"],
+    
+    # Mucosectomia
+    "MUCOSECTOMIA": ["RESSECCAO MUCOSA", "RESSECCAO ENDOSCOPICA"],
+    
+    # Tatuagem
+    "TATUAGEM": ["MARCACAO", "TATUAGEM ENDOSCOPICA"],
+    
+    # Biópsia Hepática
+    "BIOPSIA HEPATICA": ["BIOPSIA", "HEPATICA"],
+    "HEPATICA": ["BIOPSIA HEPATICA", "FIGADO"],
+    
+    # CPRE / Colangiopancreatografia / Papilotomia
+    "CPRE": ["COLANGIOPANCREATOGRAFIA", "COLANGIOPANCREATOGRAFIA RETROGRADA", "PAPILOTOMIA"],
+    "COLANGIOPANCREATOGRAFIA": ["CPRE", "PAPILOTOMIA", "COLANGIOPANCREATOGRAFIA RETROGRADA"],
+    "COLANGIOPANCREATOGRAFIA RETROGRADA": ["CPRE", "COLANGIOPANCREATOGRAFIA", "PAPILOTOMIA"],
+    "PAPILOTOMIA": ["CPRE", "COLANGIOPANCREATOGRAFIA"],
+    "PAPILOTOMIA ENDOSCOPICA": ["CPRE", "PAPILOTOMIA"],
+    
+    # Dilatação
+    "DILATACAO": ["DILATAÇÃO", "DILATACAO PNEUMATICA"],
+    "DILATAÇÃO": ["DILATACAO", "DILATACAO PNEUMATICA"],
+    
+    # Gastrostomia
+    "GASTROSTOMIA": ["GTT", "GASTROSTOMIA ENDOSCOPICA"],
+    "GASTROSTOMIA ENDOSCOPICA": ["GASTROSTOMIA", "GTT"],
+    "GTT": ["GASTROSTOMIA"],
+    
+    # Passagem de Sonda
+    "SONDA": ["PASSAGEM SONDA", "SONDA NASO ENTERAL", "SONDA NASOENTERAL"],
+    "PASSAGEM DE SONDA": ["SONDA", "SONDA NASO ENTERAL", "PASSAGEM SONDAS"],
+    "PASSAGEM DE SONDAS": ["PASSAGEM DE SONDA", "SONDA"],
+    "SONDA NASO ENTERAL": ["SONDA", "PASSAGEM SONDA"],
+    
+    # Anuscopia / Retoscopia
+    "ANUSCOPIA": ["RETOSCOPIA", "EXAME ANORRETAL"],
+    "RETOSCOPIA": ["ANUSCOPIA"],
+    
+    # Prótese
+    "PROTESE": ["COLOCACAO PROTESE", "IMPLANTE PROTESE"],
+    "PRÓTESE": ["PROTESE", "COLOCACAO PROTESE"],
+    "COLOCACAO DE PROTESE": ["PROTESE", "IMPLANTE PROTESE"],
+    "COLOCACAO PROTESE": ["PROTESE", "COLOCACAO DE PROTESE"],
+    
+    # Visita Hospitalar
+    "VISITA": ["VISITA HOSPITALAR", "VISITA PACIENTE INTERNADO", "HOSPITALAR"],
+    "VISITA HOSPITALAR": ["VISITA", "VISITA PACIENTE INTERNADO", "HOSPITALAR"],
+    "HOSPITALAR": ["VISITA", "VISITA HOSPITALAR"],
+    
+    # Cromoscopia
+    "CROMOSCOPIA": ["CROMOSCOPIA ENDOSCOPICA", "COLORACAO"],
+    
+    # Esôfago
+    "ESOFAGO": ["ESOFAGICO", "ESOFAGICA"],
+    "ESOFAGICO": ["ESOFAGO"],
+    
+    # Cálculo / Coledociano
+    "CALCULO": ["CALCULOSE", "PEDRA"],
+    "COLEDOCIANO": ["COLECOCO", "BILIAR"],
+    
+    # Drenagem
+    "DRENAGEM": ["DRENAGEM BILIAR", "DESCOMPRESSAO"],
+    "DESCOMPRESSAO": ["DRENAGEM"],
+    "DESCOMPRESSAO COLONICA": ["DESCOMPRESSAO", "COLONICA"],
+    "COLONICA": ["COLON", "COLONOSCOPIA"],
+    
+    # Ostomia
+    "OSTOMIA": ["GASTROSTOMIA", "COLOSTOMIA"],
+    "TROCA DE GTT": ["GTT", "GASTROSTOMIA"],
+}
+
+# Pares anatomicamente incompatíveis: EDA (trato alto) ≠ Colonoscopia (trato baixo).
+# Usados para sinalizar matches via SequenceMatcher acidental (ex: ENDOSCOPIA↔COLONOSCOPIA
+# compartilham "OSCOPIA" como substring, gerando sim=0.73 acima do limiar 0.65).
+_PARES_ANATOMICAMENTE_DIVERGENTES: list[frozenset] = [
+    frozenset({"ENDOSCOPIA", "COLONOSCOPIA"}),
+    frozenset({"ENDOSCOPIA", "COLONO"}),
+    frozenset({"ENDOSCOPIA", "RETOSSIGMOIDOSCOPIA"}),
+    frozenset({"EDA", "COLONOSCOPIA"}),
+    frozenset({"EDA", "COLONO"}),
+    frozenset({"EDA", "RETOSSIGMOIDOSCOPIA"}),
+]
+
+# Palavras-chave de procedimentos companion (Urease/Helicobacter standalone).
+_KEYWORDS_COMPANION_PROC = {"UREASE", "HELICOBACTER"}
+# Palavras-chave de procedimentos principais — excluem uma linha do perfil companion.
+_KEYWORDS_PRINCIPAL_PROC = {
+    "ENDOSCOPIA", "COLONOSCOPIA", "COLONO", "ECOENDOSCOPIA",
+    "GASTROSTOMIA", "MUCOSECTOMIA", "CPRE", "COLANGIOPANCREATOGRAFIA",
+    "PAPILOTOMIA", "BRONCOSCOPIA", "RETOSSIGMOIDOSCOPIA",
+}
+
+
+def _sao_anatomicamente_divergentes(proc1: str, proc2: str) -> bool:
+    """
+    Retorna True quando os dois procedimentos pertencem a grupos anatômicos
+    reconhecidamente distintos (ex: ENDOSCOPIA/EDA vs COLONOSCOPIA/trato baixo).
+    Não bloqueia o match — apenas sinaliza para revisão humana via status.
+    """
+    p1 = _normalizar_procedimento(proc1)
+    p2 = _normalizar_procedimento(proc2)
+    tokens1 = set(p1.split())
+    tokens2 = set(p2.split())
+    for par in _PARES_ANATOMICAMENTE_DIVERGENTES:
+        t1, t2 = tuple(par)
+        if (t1 in tokens1 and t2 in tokens2) or (t2 in tokens1 and t1 in tokens2):
+            return True
+    return False
+
+
+def _e_procedimento_companion(proc: str) -> bool:
+    """
+    Retorna True para procedimentos reconhecidamente acompanhantes/adicionais
+    (ex: Teste de Urease standalone) que na PRODUCAO costumam estar em
+    ProcedimentosAdicionais. Exclui procedimentos compostos que já contêm o
+    exame principal no nome (ex: 'EDA Com Biópsia E Teste De Urease').
+    """
+    p_norm = _normalizar_procedimento(proc)
+    tokens = set(p_norm.split())
+    return bool(tokens & _KEYWORDS_COMPANION_PROC) and not bool(tokens & _KEYWORDS_PRINCIPAL_PROC)
+
+
+def _normalizar_procedimento(proc: str) -> str:
+    """Normaliza nome de procedimento para comparação semântica."""
+    if not proc or str(proc).strip() in ("", "nan", "NaN"):
+        return ""
+    s = str(proc).upper().strip()
+    # Remove acentos
+    s = s.replace('Á', 'A').replace('É', 'E').replace('Í', 'I').replace('Ó', 'O').replace('Ú', 'U')
+    s = s.replace('Â', 'A').replace('Ê', 'E').replace('Ô', 'O')
+    s = s.replace('Ã', 'A').replace('Õ', 'O')
+    s = s.replace('Ç', 'C')
+    s = re.sub(r'[^\w\s]', ' ', s)
+    s = re.sub(r'\s+', ' ', s).strip()
+    # Remove plural (S no final de palavras)
+    s = re.sub(r'\bBIOPSIAS\b', 'BIOPSIA', s)
+    s = re.sub(r'\bPOLIPOS\b', 'POLIPO', s)
+    s = re.sub(r'\bSONDAS\b', 'SONDA', s)
+    # Remove separadores comuns em procedimentos compostos
+    s = re.sub(r'\s*[/+]\s*', ' ', s)  # Remove / e +
+    return s
+
+def _expandir_abreviacao(proc: str) -> str:
+    """Expande abreviações comuns de procedimentos."""
+    ABREVIACOES = {
+        "COLONO": "COLONOSCOPIA",
+        "EDA": "ENDOSCOPIA DIGESTIVA ALTA",
+        "RETO": "RETOSSIGMOIDOSCOPIA",
+        "RETOSSIGMOIDO": "RETOSSIGMOIDOSCOPIA",
+        "POLIPECTOMIA": "POLIPECTOMIA",
+        "LIGADURA": "LIGADURA ELASTICA",
+        "DILATACAO": "DILATACAO ESOFAGICA",
+        "ESCLEROSE": "ESCLEROTERAPIA",
+        "MUCOSECTOMIA": "MUCOSECTOMIA",
+        "HEMOSTASIA": "HEMOSTASIA ENDOSCOPICA",
+    }
+    proc_norm = _normalizar_procedimento(proc)
+    
+    # Verifica match exato
+    if proc_norm in ABREVIACOES:
+        return ABREVIACOES[proc_norm]
+    
+    # Verifica se começa com abreviação
+    for abrev, expandido in ABREVIACOES.items():
+        if proc_norm.startswith(abrev + " ") or proc_norm == abrev:
+            return proc_norm.replace(abrev, expandido, 1)
+    
+    return proc_norm
+
+def _match_palavra_contida(proc1: str, proc2: str) -> bool:
+    """Verifica se um procedimento está contido no outro ou compartilha palavra-chave."""
+    p1 = _normalizar_procedimento(proc1).strip()
+    p2 = _normalizar_procedimento(proc2).strip()
+    
+    if not p1 or not p2:
+        return False
+    
+    # Verifica contenção direta
+    if p1 in p2 or p2 in p1:
+        return True
+    
+    # Verifica se primeira palavra significativa é igual (mínimo 4 caracteres)
+    palavras1 = [p for p in p1.split() if len(p) >= 4]
+    palavras2 = [p for p in p2.split() if len(p) >= 4]
+    
+    if palavras1 and palavras2:
+        # Verifica se primeira palavra significativa é igual
+        if palavras1[0] == palavras2[0]:
+            return True
+        # Verifica se alguma palavra significativa está contida
+        for palavra in palavras1:
+            if len(palavra) >= 6 and any(palavra in p2_word or p2_word in palavra for p2_word in palavras2):
+                return True
+    
+    return False
+
+class _AutomatoPadroes:
+    """
+    Automato Aho-Corasick mínimo: encontra, em uma única passada, todos os padrões
+    (inclusive sobrepostos) contidos em um texto — equivalente a testar `p in texto`
+    para cada padrão, sem percorrer a lista de padrões a cada chamada.
+    """
+
+    def __init__(self, padroes):
+        self._goto: list[dict] = [{}]
+        self._falha: list[int] = [0]
+        self._saida: list[frozenset] = [frozenset()]
+        saidas: list[set] = [set()]
+        for padrao in padroes:
+            estado = 0
+            for ch in padrao:
+                prox = self._goto[estado].get(ch)
+                if prox is None:
+                    prox = len(self._goto)
+                    self._goto[estado][ch] = prox
+                    self._goto.append({})
+                    self._falha.append(0)
+                    saidas.append(set())
+                estado = prox
+            saidas[estado].add(padrao)
+
+        # BFS: links de falha e propagação das saídas pelos sufixos
+        fila = list(self._goto[0].values())
+        for estado in fila:
+            for ch, prox in self._goto[estado].items():
+                f = self._falha[estado]
+                while f and ch not in self._goto[f]:
+                    f = self._falha[f]
+                self._falha[prox] = self._goto[f].get(ch, 0)
+                saidas[prox] |= saidas[self._falha[prox]]
+                fila.append(prox)
+        self._saida = [frozenset(s) for s in saidas]
+
+    def encontrar(self, texto: str) -> set:
+        """Retorna o conjunto de padrões contidos em `texto`."""
+        encontrados: set = set()
+        estado = 0
+        for ch in texto:
+            while estado and ch not in self._goto[estado]:
+                estado = self._falha[estado]
+            estado = self._goto[estado].get(ch, 0)
+            if self._saida[estado]:
+                encontrados |= self._saida[estado]
+        return encontrados
+
+
+# Construído sob demanda na primeira chamada: (automato, chaves, chaves_por_sinonimo)
+_AUTOMATO_SINONIMOS: Optional[Tuple[_AutomatoPadroes, frozenset, Dict[str, set]]] = None
+
+
+@functools.lru_cache(maxsize=4096)
+def _conceitos_sinonimo(p_norm: str) -> Tuple[frozenset, frozenset]:
+    """
+    Conceitos canônicos (chaves de SINONIMOS_PROCEDIMENTOS) presentes em um
+    procedimento normalizado, em dois papéis:
+      - como_chave: chaves contidas no texto
+      - como_alvo:  chaves com algum sinônimo contido no texto
+
+    Dois procedimentos são sinônimos quando como_chave de um intersecta
+    como_alvo do outro — mesmo critério do teste `chave in p1 and sin in p2`.
+    """
+    global _AUTOMATO_SINONIMOS
+    if _AUTOMATO_SINONIMOS is None:
+        chaves_por_sinonimo: Dict[str, set] = {}
+        for chave, sinonimos in SINONIMOS_PROCEDIMENTOS.items():
+            for sin in sinonimos:
+                chaves_por_sinonimo.setdefault(sin, set()).add(chave)
+        chaves = frozenset(SINONIMOS_PROCEDIMENTOS)
+        automato = _AutomatoPadroes(sorted(chaves | set(chaves_por_sinonimo)))
+        _AUTOMATO_SINONIMOS = (automato, chaves, chaves_por_sinonimo)
+
+    automato, chaves, chaves_por_sinonimo = _AUTOMATO_SINONIMOS
+    encontrados = automato.encontrar(p_norm)
+    como_chave = frozenset(encontrados & chaves)
+    como_alvo: set = set()
+    for padrao in encontrados:
+        como_alvo |= chaves_por_sinonimo.get(padrao, set())
+    return como_chave, frozenset(como_alvo)
+
+
+def _verificar_sinonimo(proc1: str, proc2: str) -> bool:
+    """Verifica se dois procedimentos são sinônimos conhecidos."""
+    p1_norm = _normalizar_procedimento(proc1)
+    p2_norm = _normalizar_procedimento(proc2)
+    
+    # Verifica match direto no dicionário (conceitos canônicos via automato)
+    chave1, alvo1 = _conceitos_sinonimo(p1_norm)
+    chave2, alvo2 = _conceitos_sinonimo(p2_norm)
+    if chave1 & alvo2 or chave2 & alvo1:
+        return True
+    
+    # Para procedimentos compostos (ex: "ANATOMO + POLIPECTOMIA")
+    # Verifica se todas as palavras-chave de um estão no outro
+    palavras1 = set(p1_norm.split())
+    palavras2 = set(p2_norm.split())
+    
+    # Se tem pelo menos 2 palavras em comum e são palavras-chave
+    palavras_chave = {'BIOPSIA', 'POLIPECTOMIA', 'POLIPO', 'ANATOMO', 'TESTE', 'UREASE', 
+                      'MUCOSECTOMIA', 'HEMOSTASIA', 'ENDOSCOPIA', 'COLONOSCOPIA', 'COLONO'}
+    comuns = palavras1 & palavras2 & palavras_chave
+    if len(comuns) >= 2:
+        return True
+    
+    return False
+
+def _similaridade_procedimento(proc1: str, proc2: str, cache: Dict = None) -> float:
+    """Calcula similaridade entre dois procedimentos (0.0 a 1.0) com cache e sinônimos."""
+    if cache is not None:
+        key = (proc1, proc2)
+        if key in cache:
+            return cache[key]
+    
+    # Expande abreviações antes de comparar
+    p1_expandido = _expandir_abreviacao(proc1)
+    p2_expandido = _expandir_abreviacao(proc2)
+    
+    if not p1_expandido or not p2_expandido:
+        return 0.0
+    
+    # Match exato após expansão
+    if p1_expandido == p2_expandido:
+        if cache is not None:
+            cache[(proc1, proc2)] = 1.0
+        return 1.0
+    
+    # Verifica match por palavra contida
+    if _match_palavra_contida(p1_expandido, p2_expandido):
+        if cache is not None:
+            cache[(proc1, proc2)] = 0.95
+        return 0.95
+    
+    # Verifica sinônimos conhecidos
+    if _verificar_sinonimo(proc1, proc2):
+        if cache is not None:
+            cache[(proc1, proc2)] = 1.0
+        return 1.0
+    
+    # Verifica se um contém o outro (palavras-chave)
+    palavras1 = set(p1_expandido.split())
+    palavras2 = set(p2_expandido.split())
+    intersecao = palavras1 & palavras2
+    
+    if intersecao:
+        # Se tem palavras em comum, calcula similaridade
+        ratio = len(intersecao) / max(len(palavras1), len(palavras2))
+        if ratio >= 0.4:
+            score = SequenceMatcher(None, p1_expandido, p2_expandido).ratio()
+            if cache is not None:
+                cache[(proc1, proc2)] = score
+            return score
+    
+    # Fallback para SequenceMatcher completo
+    score = SequenceMatcher(None, p1_expandido, p2_expandido).ratio()
+    if cache is not None:
+        cache[(proc1, proc2)] = score
+    return score
+
+def _datas_compativeis(data1: str, data2: str, tolerancia_dias: int = 1) -> bool:
+    """Verifica se duas datas são compatíveis (tolerância ±N dias)."""
+    if data1 == data2:
+        return True
+    try:
+        d1 = datetime.strptime(data1, "%d/%m/%Y")
+        d2 = datetime.strptime(data2, "%d/%m/%Y")
+        return abs((d1 - d2).days) <= tolerancia_dias
+    except:
+        return False
+
+def _extrair_valor_numerico(valor: str) -> float:
+    """Extrai valor numérico de string."""
+    if not valor or str(valor).strip() in ("", "nan", "NaN"):
+        return 0.0
+    try:
+        s = str(valor).replace("R$", "").replace(",", ".").strip()
+        return float(s)
+    except:
+        return 0.0
+
+def _normalizar_nome_paciente(nome: str) -> str:
+    """Normaliza nome de paciente removendo acentos e caracteres especiais."""
+    if not nome or str(nome).strip() in ("", "nan", "NaN"):
+        return ""
+    s = str(nome).upper().strip()
+    # Remove acentos
+    s = s.replace('Á', 'A').replace('É', 'E').replace('Í', 'I').replace('Ó', 'O').replace('Ú', 'U')
+    s = s.replace('Â', 'A').replace('Ê', 'E').replace('Ô', 'O')
+    s = s.replace('Ã', 'A').replace('Õ', 'O')
+    s = s.replace('Ç', 'C')
+    s = s.replace('À', 'A').replace('È', 'E').replace('Ì', 'I').replace('Ò', 'O').replace('Ù', 'U')
+    s = s.replace('Ü', 'U').replace('Ö', 'O').replace('Ä', 'A')
+    # Remove caracteres especiais, mantém apenas letras e espaços
+    s = re.sub(r'[^A-Z\s]', '', s)
+    s = re.sub(r'\s+', ' ', s).strip()
+    return s
+
+def _datas_vizinhas(data: str) -> tuple:
+    """Retorna (D-1, D+1) em DD/MM/AAAA, ou tupla vazia se a data não for parseável."""
+    try:
+        data_dt = datetime.strptime(data, "%d/%m/%Y")
+    except (ValueError, TypeError):
+        return ()
+    return tuple((data_dt + timedelta(days=d)).strftime("%d/%m/%Y") for d in (-1, 1))
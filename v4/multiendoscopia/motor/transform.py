@@ -0,0 +1,1302 @@
+"""
+Transformação de planilhas PRODUCAO/REPASSE em DataFrames padronizados.
+
+Detecção de formato e cabeçalho por aba, renomeação para as colunas canônicas,
+padronização de datas e valores, processamento paralelo de abas e a fronteira
+DataFrame ↔ CSV usada nos downloads e no LLM.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# FUNÇÕES DE TRANSFORMAÇÃO DE ARQUIVOS
+# =============================================================================
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+# Padrão da linha de título informativo (descartada)
+_RE_LINHA_INFORMATIVA = re.compile(
+    r"CONTROLE DE EXAMES E PROCEDIMENTOS NA ENDOSCOPIA",
+    re.IGNORECASE,
+)
+
+# Colunas canônicas do formato PRODUCAO com QTD (2026) — 13 campos
+_COLUNAS_COM_QTD = [
+    "QTD", "Data", "Paciente", "NrAtendimento",
+    "Convenio", "Origem", "Procedimento",
+    "ProcedimentosAdicionais", "MedicoExecutor",
+    "LocalSetor", "Sala", "Carater", "Observacao",
+]
+
+# Colunas canônicas do formato PRODUCAO sem QTD (legado 2025) — 13 campos
+# O primeiro campo é Data (sem QTD), e há EXAME REALIZADO 1 + EXAME REALIZADO 2
+_COLUNAS_SEM_QTD = [
+    "Data", "Paciente", "NrAtendimento",
+    "Convenio", "Origem", "Procedimento", "Procedimento2",
+    "ProcedimentosAdicionais", "MedicoExecutor",
+    "LocalSetor", "Sala", "Carater", "Observacao",
+]
+
+# Colunas canônicas do formato PRODUCAO 2025 NOVO (MAIO+ 2025) — 12 campos
+# Sem QTD, sem EXAME REALIZADO 1/2, apenas EXAME REALIZADO único
+_COLUNAS_2025_NOVO = [
+    "Data", "Paciente", "NrAtendimento",
+    "Convenio", "Origem", "Procedimento",
+    "ProcedimentosAdicionais", "MedicoExecutor",
+    "LocalSetor", "Sala", "Carater", "Observacao",
+]
+
+# =============================================================================
+# MAPEAMENTOS DE COLUNAS → NOMES PADRONIZADOS
+# =============================================================================
+
+_MAP_PRODUCAO = {
+    "qtd":                                   "QTD",
+    "data":                                  "Data",
+    "nome do paciente":                      "Paciente",
+    "nº atendimento":                        "NrAtendimento",
+    "n° atendimento":                        "NrAtendimento",
+    "n atendimento":                         "NrAtendimento",
+    "nr atendimento":                        "NrAtendimento",
+    "convênio":                              "Convenio",
+    "convenio":                              "Convenio",
+    "origem":                                "Origem",
+    "exame realizado":                       "Procedimento",      # com ou sem espaço trailing
+    "exame realizado 1":                     "Procedimento",
+    "exame realizado 2":                     "Procedimento2",
+    "procedimento adicional":                "ProcedimentosAdicionais",
+    "procedimentos adicionais":              "ProcedimentosAdicionais",
+    "procedimento adocional":                "ProcedimentosAdicionais",  # typo real do arquivo
+    "médico executor":                       "MedicoExecutor",
+    "medico executor":                       "MedicoExecutor",
+    "local / setor":                         "LocalSetor",
+    "local/setor":                           "LocalSetor",
+    "sala":                                  "Sala",
+    "carater":                               "Carater",
+    "caráter":                               "Carater",
+    "observação + procedimentos adicionais": "Observacao",
+    "observacao":                            "Observacao",
+    "observação":                            "Observacao",
+}
+
+# Mapeamento para formato 2025 NOVO (MAIO+ 2025) - sem QTD, sem EXAME REALIZADO 1/2
+_MAP_PRODUCAO_2025_NOVO = {
+    "data":                                  "Data",
+    "nome do paciente":                      "Paciente",
+    "nº atendimento":                        "NrAtendimento",
+    "n° atendimento":                        "NrAtendimento",
+    "n atendimento":                         "NrAtendimento",
+    "nr atendimento":                        "NrAtendimento",
+    "convênio":                              "Convenio",
+    "convenio":                              "Convenio",
+    "origem":                                "Origem",
+    "exame realizado":                       "Procedimento",
+    "procedimentos adicionais":              "ProcedimentosAdicionais",
+    "procedimento adicional":                "ProcedimentosAdicionais",
+    "médico executor":                       "MedicoExecutor",
+    "medico executor":                       "MedicoExecutor",
+    "local / setor":                         "LocalSetor",
+    "local/setor":                           "LocalSetor",
+    "sala":                                  "Sala",
+    "carater":                               "Carater",
+    "caráter":                               "Carater",
+    "observação + procedimentos adicionais": "Observacao",
+    "observacao":                            "Observacao",
+    "observação":                            "Observacao",
+}
+
+# Mapeamento para formato 2026 (com QTD no início)
+_MAP_PRODUCAO_2026 = {
+    "qtd":                                   "QTD",
+    "data":                                  "Data",
+    "nome do paciente":                      "Paciente",
+    "nº atendimento":                        "NrAtendimento",
+    "n° atendimento":                        "NrAtendimento",
+    "n atendimento":                         "NrAtendimento",
+    "nr atendimento":                        "NrAtendimento",
+    "convênio":                              "Convenio",
+    "convenio":                              "Convenio",
+    "origem":                                "Origem",
+    "exame realizado":                       "Procedimento",
+    "procedimento":                          "Procedimento",
+    "procedimentos adicionais":              "ProcedimentosAdicionais",
+    "procedimento adicional":                "ProcedimentosAdicionais",
+    "médico executor":                       "MedicoExecutor",
+    "medico executor":                       "MedicoExecutor",
+    "local / setor":                         "LocalSetor",
+    "local/setor":                           "LocalSetor",
+    "sala":                                  "Sala",
+    "carater":                               "Carater",
+    "caráter":                               "Carater",
+    "observação + procedimentos adicionais": "Observacao",
+    "observacao":                            "Observacao",
+    "observação":                            "Observacao",
+}
+
+_MAP_REPASSE = {
+    "ds estabelecimento": "Estabelecimento",
+    "cnpj estabelecimento": "CNPJ",
+    "ds terceiro": "Terceiro",
+    "ds status": "Status",
+    "nr repasse terceiro": "NrRepasse",
+    "tipo": "TipoItem",
+    "nr atendimento": "NrAtendimento",
+    "tp atend": "TipoAtendimento",
+    "nr interno conta": "NrInternoConta",
+    "paciente": "Paciente",
+    "convenio": "Convenio",
+    "convênio": "Convenio",
+    "ds categoria": "Categoria",
+    "cód item tuss": "CodigoTUSS",
+    "cod item tuss": "CodigoTUSS",
+    "ds procedimento": "Procedimento",
+    "via unid med": "Via",
+    "nm medico executor": "MedicoExecutor",
+    "médico executor": "MedicoExecutor",
+    "porcentagem": "Porcentagem",
+    "ds funcao": "Funcao",
+    "ds especialidade": "Especialidade",
+    "qt procedimento": "QtProcedimento",
+    "dt procedimento": "Data",
+    "vl liberado": "ValorLiberado",
+    "valor liberado": "ValorLiberado"
+}
+
+# Conjunto de todas as colunas canônicas do REPASSE (derivado automaticamente do mapa)
+# Usado para garantir que todas as colunas estejam presentes após o processamento
+_COLUNAS_CANONICAS_REPASSE = set(_MAP_REPASSE.values())
+
+# =============================================================================
+# FUNÇÕES AUXILIARES PRIVADAS
+# =============================================================================
+
+def _normalizar_coluna(col: str) -> str:
+    return re.sub(r"\s+", " ", col.strip()).lower()
+
+
+def _renomear_colunas(df: pd.DataFrame, mapa: dict) -> pd.DataFrame:
+    novo = {
+        col: mapa[_normalizar_coluna(col)]
+        for col in df.columns
+        if _normalizar_coluna(col) in mapa
+    }
+    return df.rename(columns=novo)
+
+
+def _detectar_formato_producao(df: pd.DataFrame, nome_aba: str = "") -> str:
+    """
+    Detecta o formato da planilha baseado nas colunas e nome da aba.
+    Retorna: '2025_LEGADO' (JAN-ABR 2025), '2025_NOVO' (MAI+ 2025), '2026'
+    """
+    colunas_norm = [_normalizar_coluna(col) for col in df.columns]
+    aba_upper = nome_aba.upper()
+    
+    # Formato 2025 LEGADO: tem "EXAME REALIZADO 1" e "EXAME REALIZADO 2"
+    if "exame realizado 1" in colunas_norm or "exame realizado 2" in colunas_norm:
+        return "2025_LEGADO"
+    
+    # Formato 2026: tem coluna QTD no início
+    if "qtd" in colunas_norm:
+        return "2026"
+    
+    # Formato 2025 NOVO (a partir de MAIO): sem QTD, sem EXAME REALIZADO 1/2
+    # Tem apenas "EXAME REALIZADO" e "PROCEDIMENTOS ADICIONAIS"
+    if "exame realizado" in colunas_norm and "procedimentos adicionais" in colunas_norm:
+        return "2025_NOVO"
+    
+    # Fallback: tenta detectar pelo nome da aba
+    if "2025" in aba_upper:
+        # Se é JAN-ABR 2025, provavelmente é legado
+        meses_legado = ["JANEIRO", "FEVEREIRO", "MARÇO", "MARCO", "ABRIL"]
+        if any(mes in aba_upper for mes in meses_legado):
+            return "2025_LEGADO"
+        return "2025_NOVO"
+    
+    return "2026"
+
+
+def _mapear_valores_unicos(serie: pd.Series, func) -> pd.Series:
+    """
+    Aplica `func` uma única vez por valor distinto da coluna e propaga o resultado.
+
+    Datas, nomes e procedimentos se repetem muito (dezenas de milhares de linhas,
+    poucos milhares de valores distintos), então isto substitui `Series.apply`
+    linha a linha sem alterar o resultado.
+    """
+    unicos = serie.unique()
+    return serie.map(dict(zip(unicos, map(func, unicos))))
+
+
+def _padronizar_data(valor: str) -> str:
+    """
+    Converte qualquer formato de data reconhecível para DD/MM/AAAA.
+
+    Formatos suportados (em ordem de tentativa):
+      1. Serial numérico do Excel  — ex: 45344  → 22/02/2024
+         Origem: arquivos de REPASSE exportados diretamente do Excel sem
+         formatação de célula, onde a data fica como inteiro (dias desde
+         30/12/1899, conforme convenção do Excel/Lotus).
+         Faixa válida: 40000–50000 (aprox. 2009–2036) para evitar
+         confundir com NrAtendimento ou outros números de 5 dígitos.
+      2. ISO 8601  — ex: 2024-04-24 ou 2024-04-24 00:00:00
+      3. Demais formatos reconhecidos pelo pandas (dayfirst=True)
+    """
+    if pd.isna(valor):
+        return ""
+
+    s = str(valor).strip()
+
+    try:
+        # 1. Serial numérico do Excel (5 dígitos na faixa 40000–50000)
+        if re.match(r'^\d{5}$', s) and 40000 <= int(s) <= 50000:
+            from datetime import date, timedelta
+            dt = date(1899, 12, 30) + timedelta(days=int(s))
+            return dt.strftime("%d/%m/%Y")
+
+        # 2. ISO 8601 (YYYY-MM-DD ou YYYY-MM-DD HH:MM:SS)
+        if re.match(r'^\d{4}-\d{2}-\d{2}', s):
+            dt = pd.to_datetime(s, format='ISO8601')
+            return dt.strftime("%d/%m/%Y")
+
+        # 3. Outros formatos reconhecidos pelo pandas
+        dt = pd.to_datetime(s, dayfirst=True)
+        return dt.strftime("%d/%m/%Y")
+
+    except Exception:
+        return s
+
+
+def _padronizar_datas(serie: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de _padronizar_data para uma coluna inteira.
+
+    Serial do Excel, DD/MM/AAAA e ISO 8601 são convertidos por operações de
+    coluna (pd.to_datetime com formato explícito). Apenas o que não for
+    reconhecido nesses formatos cai em _padronizar_data, uma vez por valor
+    distinto — o resultado é idêntico ao `apply` linha a linha.
+    """
+    # Trabalha sobre os valores distintos (datas se repetem muito) e propaga no final
+    s = pd.Series(serie.fillna("").astype(str).str.strip().unique(), dtype=object)
+    resultado = pd.Series("", index=s.index, dtype=object)
+    pendente = pd.Series(True, index=s.index)
+
+    def _resolver(datas: pd.Series) -> None:
+        ok = datas.notna()
+        idx = datas.index[ok]
+        resultado[idx] = datas[ok].dt.strftime("%d/%m/%Y")
+        pendente[idx] = False
+
+    # 1. Serial numérico do Excel (5 dígitos na faixa 40000–50000)
+    serial = s.str.fullmatch(r"[0-9]{5}")
+    if serial.any():
+        dias = pd.to_numeric(s[serial])
+        dias = dias[dias.between(40000, 50000)]
+        _resolver(pd.Timestamp(1899, 12, 30) + pd.to_timedelta(dias, unit="D"))
+
+    # 2. DD/MM/AAAA (formato dominante nas planilhas) e 3. ISO 8601
+    for padrao, formato in ((r"[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}", "%d/%m/%Y"),
+                            (r"[0-9]{4}-[0-9]{2}-[0-9]{2}.*", "ISO8601")):
+        mascara = pendente & s.str.fullmatch(padrao)
+        if not mascara.any():
+            continue
+        try:
+            _resolver(pd.to_datetime(s[mascara], format=formato, errors="coerce"))
+        except Exception:
+            pass  # ex.: fusos horários mistos — resolvidos pelo caminho escalar
+
+    # Demais formatos (e falhas acima): caminho escalar original
+    if pendente.any():
+        resultado[pendente] = s[pendente].map(_padronizar_data)
+    return serie.fillna("").astype(str).str.strip().map(dict(zip(s, resultado)))
+
+
+def _corrigir_data_malformada(data: str, aba_origem: str) -> str:
+    """
+    Corrige datas malformadas usando o mês da AbaOrigemDados como referência.
+    Exemplos:
+    - 18/032025 + ABA: MARÇO 2025 → 18/03/2025
+    - 170/2025 + ABA: MAIO 2025 → 17/05/2025
+    - 2706/2025 + ABA: JUNHO 2025 → 27/06/2025
+    """
+    if not data or not aba_origem:
+        return data
+    
+    # Extrai mês e ano da AbaOrigemDados
+    meses = {
+        "JANEIRO": "01", "FEVEREIRO": "02", "MARÇO": "03", "MARCO": "03",
+        "ABRIL": "04", "MAIO": "05", "JUNHO": "06",
+        "JULHO": "07", "AGOSTO": "08", "SETEMBRO": "09",
+        "OUTUBRO": "10", "NOVEMBRO": "11", "DEZEMBRO": "12"
+    }
+    
+    mes_ref = None
+    ano_ref = None
+    aba_upper = aba_origem.upper()
+    
+    for nome_mes, num_mes in meses.items():
+        if nome_mes in aba_upper:
+            mes_ref = num_mes
+            # Extrai ano (4 dígitos)
+            match_ano = re.search(r'20\d{2}', aba_upper)
+            if match_ano:
+                ano_ref = match_ano.group()
+            break
+    
+    if not mes_ref or not ano_ref:
+        return data
+    
+    # Padrões de datas malformadas
+    data_limpa = data.replace("/", "").replace("-", "").strip()
+    
+    # Padrão: 18032025 (sem separadores)
+    if len(data_limpa) == 8 and data_limpa.isdigit():
+        dia = data_limpa[:2]
+        mes = data_limpa[2:4]
+        ano = data_limpa[4:]
+        if mes == mes_ref:  # Valida se o mês bate
+            return f"{dia}/{mes}/{ano}"
+    
+    # Padrão: 170/2025 (dia com 3 dígitos)
+    if re.match(r'^\d{3}/\d{4}$', data):
+        dia = data[:2]  # Pega os 2 primeiros dígitos
+        ano = data[-4:]
+        return f"{dia}/{mes_ref}/{ano}"
+    
+    # Padrão: 2706/2025 (dia+mes sem separador)
+    if re.match(r'^\d{4}/\d{4}$', data):
+        dia = data[:2]
+        mes = data[2:4]
+        ano = data[-4:]
+        if mes == mes_ref:  # Valida se o mês bate
+            return f"{dia}/{mes}/{ano}"
+    
+    # Padrão: 17/042025 (ano sem separador)
+    if re.match(r'^\d{2}/\d{6}$', data):
+        dia = data[:2]
+        mes = data[3:5]
+        ano = data[5:]
+        if mes == mes_ref:  # Valida se o mês bate
+            return f"{dia}/{mes}/{ano}"
+    
+    return data
+
+
+def _padronizar_valor(valor: str) -> str:
+    """Remove R$, espaços e normaliza separadores decimais."""
+    s = str(valor).strip() if valor else ""
+    if not s:
+        return ""
+    s = re.sub(r"[R$\s]", "", s)
+    if re.search(r"\d\.\d{3},", s):      # 1.234,56 → 1234.56
+        s = s.replace(".", "").replace(",", ".")
+    else:
+        s = s.replace(",", ".")           # 664,61 → 664.61
+    return re.sub(r"[,.]$", "", s)
+
+
+def _padronizar_valores(serie: pd.Series) -> pd.Series:
+    """Versão vetorizada de _padronizar_valor (str accessors sobre a coluna)."""
+    s = serie.fillna("").astype(str).str.strip()
+    s = s.str.replace(r"[R$\s]", "", regex=True)
+    milhar = s.str.contains(r"\d\.\d{3},", regex=True)              # 1.234,56 → 1234.56
+    s = s.where(~milhar, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    s = s.where(milhar, s.str.replace(",", ".", regex=False))        # 664,61 → 664.61
+    return s.str.replace(r"[,.]$", "", regex=True)
+
+
+_RE_VALOR_UNNAMED = re.compile(r"\s*unnamed:", re.IGNORECASE)
+_e_valor_unnamed = np.frompyfunc(lambda v: _RE_VALOR_UNNAMED.match(str(v)) is not None, 1, 1)
+
+
+def _limpar_valores_unnamed(df: pd.DataFrame) -> pd.DataFrame:
+    """Substitui por "" os valores "Unnamed: N" gerados pelo pandas ao ler Excel."""
+    if df.empty:
+        return df
+    mascara = _e_valor_unnamed(df.to_numpy(dtype=object)).astype(bool)
+    if not mascara.any():
+        return df
+    return df.where(~mascara, "")
+
+
+def _identificar_tipo_arquivo(nome_aba: str, nome_arquivo: str = "") -> str:
+    """
+    Retorna 'REPASSE' ou 'PRODUCAO'.
+    Prioridade: nome_aba → nome_arquivo → fallback PRODUCAO.
+    """
+    if "REPASSE" in nome_aba.upper():
+        return "REPASSE"
+    if "REPASSE" in nome_arquivo.upper():
+        return "REPASSE"
+    return "PRODUCAO"
+
+
+def _detectar_tipo_por_cabecalho(linhas: list[str]) -> str:
+    """
+    Detecta o tipo (PRODUCAO ou REPASSE) inspecionando as primeiras linhas.
+    Usa colunas exclusivas do REPASSE como indicadores.
+    """
+    _COLS_REPASSE = {
+        "ds estabelecimento", "ds terceiro", "nr repasse terceiro",
+        "ds procedimento", "nm medico executor", "dt procedimento",
+        "vl liberado", "cód item tuss", "ds categoria",
+    }
+    for linha in linhas[:3]:
+        cols = {c.strip().lower() for c in linha.split(",")}
+        if cols & _COLS_REPASSE:
+            return "REPASSE"
+    return "PRODUCAO"
+
+
+def _linha_e_valida(linha: str) -> bool:
+    """
+    Descarta:
+    - linhas em branco ou só vírgulas/espaços
+    - linhas com apenas 1 valor não vazio (ex: "429,,,,,,,,,,,")
+    - linha de título informativo ("CONTROLE DE EXAMES...")
+    - linha com colunas todas 'Unnamed: N'
+    """
+    s = linha.strip()
+    if not s or re.match(r"^[,\s]*$", s):
+        return False
+    nao_vazios = [p.strip() for p in s.split(",") if p.strip()]
+    if len(nao_vazios) <= 1:
+        return False
+    if _RE_LINHA_INFORMATIVA.search(s):
+        return False
+    if all(re.match(r"^unnamed\s*:\s*\d+$", v, re.I) for v in nao_vazios):
+        return False
+    
+    return True
+
+
+def _detectar_cabecalho_producao(linhas: list[str]) -> tuple[str, int]:
+    """
+    Inspeciona as primeiras linhas válidas e retorna:
+      ("COM_QTD", idx)   — cabeçalho explícito com a coluna QTD
+      ("SEM_QTD", idx)   — cabeçalho explícito sem QTD (formato 2025)
+      ("SEM_HEADER", 0)  — sem cabeçalho; dados começam na linha 0
+
+    idx = índice em `linhas` onde está o cabeçalho (ou 0 se não houver).
+    """
+    for idx, linha in enumerate(linhas[:5]):
+        upper = linha.upper()
+        campos = [c.strip() for c in linha.split(",")]
+
+        # Cabeçalho 2026 com QTD
+        if "QTD" in campos[0].upper() and "DATA" in upper:
+            return "COM_QTD", idx
+
+        # Cabeçalho 2025 sem QTD — começa com DATA
+        if campos[0].strip().upper() in ("DATA",) and "NOME DO PACIENTE" in upper:
+            return "SEM_QTD", idx
+
+    return "SEM_HEADER", 0
+
+
+def _atribuir_colunas(df: pd.DataFrame, formato: str, nome_aba: str = "") -> pd.DataFrame:
+    """
+    Atribui cabeçalho canônico a DataFrames sem cabeçalho explícito.
+    """
+    n = len(df.columns)
+    
+    # Detecta qual base usar baseado no número de colunas e nome da aba
+    if n == 12:
+        # 12 colunas = formato 2025 NOVO (MAIO+ 2025)
+        base = _COLUNAS_2025_NOVO
+    elif n == 13:
+        # 13 colunas: pode ser COM_QTD (2026) ou SEM_QTD (2025 LEGADO)
+        # Verifica se primeira coluna parece QTD
+        amostra = df.iloc[:, 0].dropna().head(5).tolist()
+        primeiro_parece_qtd = all(
+            re.match(r"^\d*$", str(v).strip()) for v in amostra if str(v).strip()
+        )
+        base = _COLUNAS_COM_QTD if primeiro_parece_qtd else _COLUNAS_SEM_QTD
+    else:
+        # Fallback: tenta detectar pelo nome da aba
+        if "2025" in nome_aba.upper():
+            meses_legado = ["JANEIRO", "FEVEREIRO", "MARÇO", "MARCO", "ABRIL"]
+            if any(mes in nome_aba.upper() for mes in meses_legado):
+                base = _COLUNAS_SEM_QTD
+            else:
+                base = _COLUNAS_2025_NOVO
+        else:
+            base = _COLUNAS_COM_QTD
+
+    df.columns = (base + [f"Extra_{k}" for k in range(n - len(base))])[:n] if n <= len(base) else \
+                 base + [f"Extra_{k}" for k in range(n - len(base))]
+    return df
+
+
+# =============================================================================
+# PROCESSADORES POR TIPO
+# =============================================================================
+
+def _processar_aba_producao(df: pd.DataFrame, nome_aba: str) -> pd.DataFrame:
+    """
+    Normaliza um DataFrame de PRODUCAO:
+    - Detecta formato (2025_LEGADO, 2025_NOVO, 2026)
+    - Renomeia colunas pelo mapa apropriado
+    - Garante QTD (0 se ausente), Data, Paciente, Procedimento
+    - Gera linhas extras para 'Procedimento2' (EXAME REALIZADO 2 das abas 2025 LEGADO)
+    - Adiciona TipoArquivo = 'PRODUCAO' e AbaOrigemDados
+    - Descarta linhas sem Paciente válido
+    """
+    # Detecta formato baseado nas colunas e nome da aba
+    formato = _detectar_formato_producao(df, nome_aba)
+    
+    # Seleciona mapa apropriado
+    if formato == "2025_LEGADO":
+        mapa = _MAP_PRODUCAO
+    elif formato == "2025_NOVO":
+        mapa = _MAP_PRODUCAO_2025_NOVO
+    else:  # 2026
+        mapa = _MAP_PRODUCAO_2026
+    
+    # CORREÇÃO: Remove primeira coluna se for Unnamed e formato não é 2026
+    # Isso acontece quando pandas lê cabeçalho sem QTD mas dados têm coluna extra
+    if formato != "2026" and len(df.columns) > 0:
+        primeira_col = str(df.columns[0]).lower()
+        if "unnamed" in primeira_col or primeira_col.strip() in ("", "nan"):
+            df = df.iloc[:, 1:]  # Remove primeira coluna
+    
+    df = _renomear_colunas(df, mapa)
+    
+    # CORREÇÃO: Limpa valores "Unnamed: N" dos dados (problema do Excel)
+    df = _limpar_valores_unnamed(df)
+
+    for col in ("QTD", "Data", "Paciente", "Procedimento", "Procedimento2",
+                "Convenio", "Origem", "NrAtendimento", "MedicoExecutor",
+                "LocalSetor", "Sala", "Carater", "Observacao",
+                "ProcedimentosAdicionais"):
+        if col not in df.columns:
+            df[col] = ""
+
+    # Normaliza QTD
+    qtd = df["QTD"].astype(str).str.strip()
+    df["QTD"] = qtd.where(~qtd.isin(["", "nan", "NaN"]), "0")
+
+    # Primeiro aplica padronização básica; depois corrige datas malformadas usando
+    # o mês/ano da aba (uma vez por valor distinto) e padroniza novamente
+    # (_padronizar_data é idempotente: só as datas alteradas pela correção são refeitas)
+    datas = _padronizar_datas(df["Data"])
+    corrigidas = _mapear_valores_unicos(datas, lambda d: _corrigir_data_malformada(d, nome_aba))
+    alteradas = corrigidas != datas
+    if alteradas.any():
+        datas = datas.where(~alteradas, _padronizar_datas(corrigidas[alteradas]))
+    df["Data"] = datas
+
+    df["Paciente"] = (
+        df["Paciente"].astype(str).str.strip()
+        .str.replace(r"\s+", " ", regex=True).str.upper()
+    )
+    proc = df["Procedimento"].astype(str).str.strip()
+    df["Procedimento"] = proc.str.upper().where(~proc.isin(["", "-", "nan"]), "")
+
+    # Descarta linhas de formatação sem paciente real
+    df = df[~df["Paciente"].isin(["", "NAN"])].reset_index(drop=True)
+    df["TipoArquivo"]    = "PRODUCAO"
+    df["AbaOrigemDados"] = f"ABA: {nome_aba}"
+
+    # Trata Procedimento2 (EXAME REALIZADO 2 das abas 2025 LEGADO) como linha extra,
+    # logo abaixo da linha principal: cada linha é repetida 1x ou 2x (expansão tipo
+    # explode) e a segunda cópia recebe os campos do procedimento adicional
+    proc2 = df["Procedimento2"].astype(str).str.strip().str.upper()
+    tem_proc2 = ~proc2.isin(["", "-", "NAN", "NONE"])
+    df_saida = df.loc[df.index.repeat(tem_proc2.astype(int) + 1)]
+    extra = df_saida.index.duplicated(keep="first")
+    if extra.any():
+        df_saida = df_saida.copy()
+        df_saida.loc[extra, "Procedimento"]  = proc2[df_saida.index[extra]].to_numpy()
+        df_saida.loc[extra, "Procedimento2"] = ""
+        df_saida.loc[extra, "Observacao"]    = "PROCEDIMENTO_ADICIONAL"
+        df_saida.loc[extra, "QTD"]           = "0"
+    if df_saida.empty:
+        return pd.DataFrame()
+    df_saida = df_saida.reset_index(drop=True)
+    df_saida.drop(columns=["Procedimento2"], inplace=True, errors="ignore")
+    # Remove colunas lixo: Extra_N e duplicatas pandas (sufixo .1, .2, ...)
+    lixo = [c for c in df_saida.columns
+            if re.match(r"^Extra_\d+$", str(c)) or re.search(r"\.\d+$", str(c))]
+    df_saida.drop(columns=lixo, inplace=True, errors="ignore")
+    return df_saida
+
+
+def _processar_aba_repasse(df: pd.DataFrame, nome_aba: str) -> pd.DataFrame:
+    """
+    Normaliza um DataFrame de REPASSE:
+    - Renomeia colunas pelo mapa
+    - Limpa valores "Unnamed: N" gerados pelo pandas ao ler Excel
+    - Garante que TODAS as colunas canonicas do _MAP_REPASSE existam (vazias se ausentes)
+    - Padroniza Data, Paciente e ValorLiberado
+    - Adiciona TipoArquivo = 'REPASSE' e AbaOrigemDados
+    - Remove colunas lixo: Extra_N e duplicatas pandas (sufixo .1, .2, ...)
+    """
+    df = _renomear_colunas(df, _MAP_REPASSE)
+
+    # Limpa valores "Unnamed: N" nos dados (problema do Excel com colunas sem cabecalho)
+    df = _limpar_valores_unnamed(df)
+
+    # Garante TODAS as colunas canonicas do _MAP_REPASSE, nao apenas um subconjunto.
+    # Isso evita que colunas ausentes no arquivo fisico (ex: NrAtendimento) sejam
+    # omitidas do CSV de saida. Derivado automaticamente do mapa - sem listas manuais.
+    for col in _COLUNAS_CANONICAS_REPASSE:
+        if col not in df.columns:
+            df[col] = ""
+
+    df["Data"]          = _padronizar_datas(df["Data"])
+    df["Paciente"]      = (
+        df["Paciente"].astype(str).str.strip()
+        .str.replace(r"\s+", " ", regex=True).str.upper()
+    )
+    df["ValorLiberado"] = _padronizar_valores(df["ValorLiberado"])
+    df["TipoArquivo"]   = "REPASSE"
+    df["AbaOrigemDados"] = f"ABA: {nome_aba}"
+
+    # Remove colunas lixo: Extra_N e duplicatas pandas (sufixo .1, .2, ...)
+    # Alinhado com o mesmo tratamento ja feito em _processar_aba_producao
+    lixo = [c for c in df.columns
+            if re.match(r"^Extra_\d+$", str(c)) or re.search(r"\.\d+$", str(c))]
+    df.drop(columns=lixo, inplace=True, errors="ignore")
+    return df
+
+
+# =============================================================================
+# FRONTEIRA DataFrame ↔ CSV
+# =============================================================================
+# O pipeline interno trabalha com DataFrames (abas → transformação → correlação);
+# CSV só é gerado para download e para o LLM. Os helpers abaixo reproduzem, sem
+# serializar, o que o antigo ciclo to_csv → read_csv(dtype=str) fazia com os
+# dados, para que o resultado continue idêntico ao do pipeline em texto.
+
+# Valores que pd.read_csv trata como nulos por padrão (na_values)
+_VALORES_NULOS_CSV = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+})
+
+
+def _nomes_colunas_csv(nomes) -> list[str]:
+    """
+    Nomes de colunas como o read_csv os devolveria a partir de uma linha de
+    cabeçalho: vazios viram "Unnamed: N" e duplicados ganham sufixo ".1", ".2"...
+    """
+    resultado: list[str] = []
+    contagem: dict = {}
+    for i, nome in enumerate(nomes):
+        nome = str(nome)
+        if nome == "":
+            nome = f"Unnamed: {i}"
+        atual = contagem.get(nome, 0)
+        while atual > 0:
+            contagem[nome] = atual + 1
+            nome = f"{nome}.{atual}"
+            atual = contagem.get(nome, 0)
+        resultado.append(nome)
+        contagem[nome] = atual + 1
+    return resultado
+
+
+def _normalizar_nulos_csv(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Equivalente a to_csv → read_csv(dtype=str) → fillna("") sobre um DataFrame:
+    valores não-texto viram texto e os marcadores de nulo do pandas viram "".
+    Sempre devolve uma cópia. Colunas category (lidas de Parquet) voltam a texto.
+    """
+    categorias = [c for c, t in zip(df.columns, df.dtypes) if isinstance(t, pd.CategoricalDtype)]
+    if categorias:
+        df = df.astype({c: object for c in categorias})
+    df = df.fillna("")
+    nao_texto = [c for c, t in zip(df.columns, df.dtypes) if t != object]
+    if nao_texto:
+        df[nao_texto] = df[nao_texto].astype(str)
+    if df.empty:
+        return df
+    mascara = df.isin(_VALORES_NULOS_CSV)
+    if mascara.to_numpy().any():
+        df = df.where(~mascara, "")
+    return df
+
+
+def _df_como_csv_lido(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reproduz texto_para_dataframe(df.to_csv()) sem passar por texto: colunas com
+    nomes de CSV (strip) e células vazias/nulas como NaN. É a forma esperada
+    pelas telas de exibição e cobrança.
+    """
+    df = _normalizar_nulos_csv(df)
+    df.columns = [c.strip() for c in _nomes_colunas_csv(df.columns)]
+    return df.where(df != "").reset_index(drop=True)
+
+
+# Forma tipada da tabela de exibição (guardada na sessão e em Parquet): datas em
+# datetime64, valores em float e texto repetitivo em category. Uma coluna só vira
+# data/valor se TODOS os valores não nulos estiverem no formato do pipeline —
+# datas malformadas da planilha (ex.: 01/022025) continuam texto, sem perda.
+_COLUNAS_DATA  = ("Data", "Data_PRODUCAO", "Data_REPASSE")
+_COLUNAS_VALOR = ("ValorLiberado", "ValorLiberado_REPASSE", "ValorEstimado_TUSS")
+_RE_DATA_TIPADA  = r"[0-9]{2}/[0-9]{2}/[0-9]{4}"
+_RE_VALOR_TIPADO = r"-?[0-9]+(?:\.[0-9]{1,2})?"
+# Texto vira category quando os valores distintos são no máximo esta fração das linhas
+_FRACAO_CATEGORIA = 0.5
+
+
+def _df_tipado(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte a forma de exibição (_df_como_csv_lido: texto com NaN) para dtypes
+    compactos. Inverso: _df_tipado_para_texto. Devolve um novo DataFrame.
+    """
+    colunas: dict[str, pd.Series] = {}
+    for nome in df.columns:
+        col = df[nome]
+        if col.dtype != object:
+            colunas[nome] = col
+            continue
+        valores = col.dropna().astype(str)
+        if nome in _COLUNAS_DATA and valores.str.fullmatch(_RE_DATA_TIPADA).all():
+            datas = pd.to_datetime(col, format="%d/%m/%Y", errors="coerce")
+            if datas.notna().sum() == len(valores):  # 31/02/2025 etc. → continua texto
+                colunas[nome] = datas
+                continue
+        if nome in _COLUNAS_VALOR and valores.str.fullmatch(_RE_VALOR_TIPADO).all():
+            colunas[nome] = pd.to_numeric(col).astype("float64")
+            continue
+        if valores.nunique() <= _FRACAO_CATEGORIA * len(col):
+            colunas[nome] = col.astype("category")
+        else:
+            colunas[nome] = col
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def _df_tipado_para_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Volta à forma de exibição em texto (CSV de exportação, cobrança, TUSS):
+    datas como DD/MM/AAAA e valores com 2 casas decimais. Devolve um novo DataFrame.
+    """
+    colunas: dict[str, pd.Series] = {}
+    for nome in df.columns:
+        col = df[nome]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype(object)
+        elif nome in _COLUNAS_DATA and pd.api.types.is_datetime64_any_dtype(col):
+            col = col.dt.strftime("%d/%m/%Y").astype(object)
+        elif nome in _COLUNAS_VALOR and pd.api.types.is_float_dtype(col):
+            col = col.map("{:.2f}".format, na_action="ignore").astype(object)
+        colunas[nome] = col
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def _csv_para_df(csv_texto: str) -> pd.DataFrame | None:
+    """Converte CSV em texto (saída do LLM ou upload) para DataFrame de texto puro."""
+    if not csv_texto or not csv_texto.strip():
+        return None
+    try:
+        return pd.read_csv(io.StringIO(csv_texto.strip()), dtype=str).fillna("")
+    except Exception as exc:
+        logger.warning(f"Falha ao ler CSV: {exc}")
+        return None
+
+
+def _df_para_csv(df: pd.DataFrame | None) -> str:
+    """Serializa um DataFrame do pipeline para CSV (download/LLM); "" se vazio."""
+    if df is None:
+        return ""
+    return df.to_csv(index=False, encoding="utf-8")
+
+
+# =============================================================================
+# PROCESSAMENTO DE UMA ABA
+# =============================================================================
+
+def _processar_linhas_validas(
+    linhas_validas: list[str],
+    montar_df,
+    nome_aba: str,
+    nome_arquivo: str,
+) -> pd.DataFrame | None:
+    """
+    Detecta tipo/formato a partir das linhas válidas de uma aba e processa.
+
+    `montar_df(inicio, com_cabecalho)` devolve o DataFrame (texto, sem nulos) das
+    linhas válidas a partir de `inicio`, usando a primeira como cabeçalho ou não.
+    """
+    tipo = _identificar_tipo_arquivo(nome_aba, nome_arquivo)
+    if tipo == "PRODUCAO":
+        tipo = _detectar_tipo_por_cabecalho(linhas_validas)
+
+    # ── REPASSE — cabeçalho sempre explícito ─────────────────────────────────
+    if tipo == "REPASSE":
+        try:
+            return _processar_aba_repasse(montar_df(0, True), nome_aba)
+        except Exception as exc:
+            logger.warning(f"Erro REPASSE '{nome_aba}': {exc}")
+            return None
+
+    # ── PRODUCAO — detecta formato ───────────────────────────────────────────
+    formato, idx_hdr = _detectar_cabecalho_producao(linhas_validas)
+
+    if formato in ("COM_QTD", "SEM_QTD"):
+        # Cabeçalho explícito na linha idx_hdr; descarta linhas anteriores
+        try:
+            df = montar_df(idx_hdr, True)
+        except Exception as exc:
+            logger.warning(f"Erro PRODUCAO com header '{nome_aba}': {exc}")
+            return None
+    else:
+        # SEM_HEADER: nenhum cabeçalho encontrado → aplica cabeçalho canônico
+        try:
+            df = _atribuir_colunas(montar_df(0, False), formato, nome_aba)
+        except Exception as exc:
+            logger.warning(f"Erro PRODUCAO sem header '{nome_aba}': {exc}")
+            return None
+
+    return _processar_aba_producao(df, nome_aba)
+
+
+def _colapsar_quebras_entre_aspas(texto: str) -> str:
+    """FIX defensivo: colapsa \n internos em campos entre aspas (origem: CSV/TXT)."""
+    return re.sub(
+        r'"([^"]*)"',
+        lambda m: '"' + m.group(1).replace('\n', ' ').replace('\r', '') + '"',
+        texto,
+    )
+
+
+def _processar_bloco_texto(
+    dados_aba: str,
+    nome_aba: str,
+    nome_arquivo: str,
+) -> pd.DataFrame | None:
+    """Filtra, detecta formato e processa o texto de uma única aba (CSV/TXT)."""
+
+    dados_aba = _colapsar_quebras_entre_aspas(dados_aba)
+    linhas_validas = [l for l in dados_aba.splitlines() if _linha_e_valida(l)]
+    if not linhas_validas:
+        return None
+
+    def _montar(inicio: int, com_cabecalho: bool) -> pd.DataFrame:
+        df = pd.read_csv(
+            io.StringIO("\n".join(linhas_validas[inicio:])),
+            header=0 if com_cabecalho else None, dtype=str,
+        )
+        return df.fillna("")
+
+    return _processar_linhas_validas(linhas_validas, _montar, nome_aba, nome_arquivo)
+
+
+def _processar_aba_df(
+    df_aba: pd.DataFrame,
+    nome_aba: str,
+    nome_arquivo: str,
+) -> pd.DataFrame | None:
+    """
+    Processa uma aba já lida como DataFrame (ler_abas_excel), sem passar por CSV.
+
+    A primeira linha considerada é o cabeçalho lido do Excel, seguida das linhas
+    de dados — exatamente as linhas que read_excel_file escreveria no texto.
+    Filtro e detecção de formato usam as células unidas por vírgula.
+    """
+    cabecalho = [str(c).replace("\n", " ").replace("\r", "") for c in df_aba.columns]
+    if cabecalho:
+        cabecalho[0] = cabecalho[0].lstrip()  # o bloco de texto era strip()-ado
+    linhas = [cabecalho] + df_aba.to_numpy(dtype=object).tolist()
+    textos = [",".join(l) for l in linhas]
+    validas = [i for i, t in enumerate(textos) if _linha_e_valida(t)]
+    if not validas:
+        return None
+
+    def _montar(inicio: int, com_cabecalho: bool) -> pd.DataFrame:
+        sel = [linhas[i] for i in validas[inicio:]]
+        if com_cabecalho:
+            df = pd.DataFrame(sel[1:], columns=_nomes_colunas_csv(sel[0]), dtype=object)
+        else:
+            df = pd.DataFrame(sel, dtype=object)
+        return _normalizar_nulos_csv(df)
+
+    return _processar_linhas_validas([textos[i] for i in validas], _montar, nome_aba, nome_arquivo)
+
+
+def _consolidar_dfs(dfs: list) -> pd.DataFrame | None:
+    """Une os DataFrames das abas em um único, com o schema da primeira ocorrência."""
+    partes = []
+    for df in dfs:
+        if df is None or len(df.columns) == 0:
+            continue
+        df = _normalizar_nulos_csv(df)
+        df.columns = _nomes_colunas_csv(df.columns)
+        partes.append(df)
+    if not partes:
+        return None
+    df_final = pd.concat(partes, ignore_index=True, sort=False)
+    df_final.fillna("", inplace=True)
+    return df_final
+
+
+def _consolidar_blocos(blocos_csv: list[str]) -> str:
+    """Une múltiplos CSVs em um único, com cabeçalho único na primeira linha."""
+    return _df_para_csv(_consolidar_dfs([_csv_para_df(b) for b in blocos_csv]))
+
+
+# =============================================================================
+# PROCESSAMENTO PARALELO DE ABAS
+# =============================================================================
+# Cada aba é transformada de forma independente, então as abas podem ir para
+# processos separados e ser reunidas na ordem original. TRANSFORM_WORKERS:
+# "auto" (padrão — núcleos disponíveis), "1" (sequencial) ou um número fixo;
+# lida a cada chamada, como EXCEL_READER_BACKEND.
+#
+# Arquivos transformados ao mesmo tempo (threads da aplicação) dividem um
+# orçamento único de processos: TRANSFORM_MAX_PROCESSOS (padrão: núcleos
+# disponíveis). O arquivo que não consegue ao menos 2 processos livres
+# processa as abas em sequência na própria thread.
+#
+# Os processos vêm de um forkserver (spawn onde não houver): fork dentro do
+# servidor Streamlit, com outras threads segurando locks de logging, pode
+# deixar o filho travado e o pool.map esperando para sempre.
+
+# No modo "auto", abaixo disso o custo de subir o pool não compensa
+_MIN_ABAS_PARALELO = 4
+
+_processos_lock = threading.Lock()
+_processos_em_uso = 0
+
+
+def _nucleos_disponiveis() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _limite_processos() -> int:
+    """Total de processos de transformação simultâneos neste processo."""
+    try:
+        return max(1, int(os.getenv("TRANSFORM_MAX_PROCESSOS", "") or _nucleos_disponiveis()))
+    except ValueError:
+        logger.warning("TRANSFORM_MAX_PROCESSOS inválido; usando o número de núcleos")
+        return _nucleos_disponiveis()
+
+
+def _reservar_processos(n_workers: int) -> int:
+    """Reserva até `n_workers` processos do orçamento; devolve 0 se sobrarem menos de 2."""
+    global _processos_em_uso
+    with _processos_lock:
+        n_workers = min(n_workers, _limite_processos() - _processos_em_uso)
+        if n_workers < 2:
+            return 0
+        _processos_em_uso += n_workers
+        return n_workers
+
+
+def _liberar_processos(n_workers: int) -> None:
+    global _processos_em_uso
+    with _processos_lock:
+        _processos_em_uso -= n_workers
+
+
+def _contexto_processos():
+    """Contexto forkserver (com motor.transform pré-carregado) ou, sem forkserver, spawn."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context("forkserver")
+        contexto.set_forkserver_preload([__name__])
+        return contexto
+    return multiprocessing.get_context("spawn")
+
+
+def _resolver_workers(workers: int | str | None, n_tarefas: int) -> int:
+    """Número efetivo de processos para `n_tarefas` abas (1 = sequencial)."""
+    if workers is None:
+        workers = os.getenv("TRANSFORM_WORKERS", "auto").strip().lower()
+    if workers == "auto":
+        if n_tarefas < _MIN_ABAS_PARALELO:
+            return 1
+        workers = _nucleos_disponiveis()
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        logger.warning(f"TRANSFORM_WORKERS inválido ({workers!r}); usando modo sequencial")
+        return 1
+    return max(1, min(workers, n_tarefas))
+
+
+def _executar_tarefa_aba(funcao, dados, nome_aba: str, nome_arquivo: str):
+    """Processa uma aba isolando a falha (a aba com erro é descartada, como no laço)."""
+    try:
+        return funcao(dados, nome_aba, nome_arquivo)
+    except Exception as exc:
+        logger.warning(f"Falha ao processar aba '{nome_aba}': {exc}")
+        return None
+
+
+def _processar_abas(
+    funcao,
+    tarefas: list[tuple],
+    nome_arquivo: str,
+    workers: int | str | None = None,
+) -> list:
+    """
+    Aplica `funcao(dados, nome_aba, nome_arquivo)` a cada (dados, nome_aba) de
+    `tarefas` e devolve os resultados na ordem original.
+
+    Com mais de um worker (e processos livres no orçamento) usa um pool de
+    processos; se o pool não puder ser criado ou quebrar (ex.: objeto não
+    serializável), repete tudo em sequência no processo atual.
+    """
+    n_workers = _resolver_workers(workers, len(tarefas))
+    n_workers = _reservar_processos(n_workers) if n_workers > 1 else 0
+    if n_workers:
+        try:
+            t0 = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=_contexto_processos()) as pool:
+                resultados = list(pool.map(
+                    _executar_tarefa_aba,
+                    [funcao] * len(tarefas),
+                    [dados for dados, _ in tarefas],
+                    [nome_aba for _, nome_aba in tarefas],
+                    [nome_arquivo] * len(tarefas),
+                ))
+            logger.info(
+                f"{len(tarefas)} aba(s) de '{nome_arquivo}' em {n_workers} processos: "
+                f"{time.perf_counter() - t0:.2f}s"
+            )
+            return resultados
+        except Exception as exc:
+            logger.warning(f"Pool de processos indisponível ({exc}); processando abas em sequência")
+        finally:
+            _liberar_processos(n_workers)
+    return [_executar_tarefa_aba(funcao, dados, nome_aba, nome_arquivo) for dados, nome_aba in tarefas]
+
+
+# =============================================================================
+# FUNÇÃO PÚBLICA PRINCIPAL
+# =============================================================================
+
+def _finalizar_transformacao(
+    dfs: list,
+    nome_arquivo: str,
+    desmembrar_procedimentos_adicionais: bool,
+) -> pd.DataFrame | None:
+    """Consolida as abas e aplica o desmembramento opcional (só PRODUCAO)."""
+    resultado = _consolidar_dfs(dfs)
+    if resultado is None:
+        return None
+    if desmembrar_procedimentos_adicionais and _identificar_tipo_arquivo(nome_arquivo) == "PRODUCAO":
+        resultado = desmembrar_procedimentos_adicionais_df(resultado)
+    return resultado
+
+
+def transformar_abas_arquivo(
+    abas: list[tuple[str, pd.DataFrame]],
+    nome_arquivo: str = "",
+    desmembrar_procedimentos_adicionais: bool = False,
+    workers: int | str | None = None,
+) -> pd.DataFrame | None:
+    """
+    Versão DataFrame de transformar_csv_arquivo para planilhas já lidas por
+    ler_abas_excel: mesmas regras, sem o ciclo texto → CSV → DataFrame por aba.
+
+    Args:
+        workers: processos para transformar abas em paralelo ("auto", N ou 1 para
+                 sequencial). None usa TRANSFORM_WORKERS.
+
+    Returns:
+        DataFrame padronizado (todas as colunas texto) ou None em caso de falha total.
+    """
+    tarefas = [(df_aba, str(nome_aba).strip()) for nome_aba, df_aba in abas]
+    dfs = _processar_abas(_processar_aba_df, tarefas, nome_arquivo, workers)
+    return _finalizar_transformacao(dfs, nome_arquivo, desmembrar_procedimentos_adicionais)
+
+
+def transformar_texto_arquivo(
+    conteudo_texto: str,
+    nome_arquivo: str = "",
+    desmembrar_procedimentos_adicionais: bool = False,
+    workers: int | str | None = None,
+) -> pd.DataFrame | None:
+    """
+    Versão DataFrame de transformar_csv_arquivo para conteúdo em texto
+    (CSV/TXT/PDF/DOCX ou texto com marcadores "=== ABA: <nome> ===").
+
+    Args:
+        workers: processos para transformar abas em paralelo ("auto", N ou 1 para
+                 sequencial). None usa TRANSFORM_WORKERS.
+
+    Returns:
+        DataFrame padronizado (todas as colunas texto) ou None em caso de falha total.
+    """
+    dfs = []
+
+    # Divide por marcadores de aba (formato gerado por read_excel_file)
+    partes = re.split(r"(===\s*ABA:\s*.+?===)", conteudo_texto)
+
+    if len(partes) > 1:
+        it = iter(partes[1:])
+        tarefas = []
+        for marcador, dados_aba in zip(it, it):
+            nome_aba = re.sub(r"===\s*ABA:\s*|===", "", marcador).strip()
+            dados_aba = dados_aba.strip()
+            if dados_aba:
+                tarefas.append((dados_aba, nome_aba))
+        dfs = _processar_abas(_processar_bloco_texto, tarefas, nome_arquivo, workers)
+    else:
+        # Arquivo CSV/TXT simples sem marcador de aba
+        nome_aba = re.sub(r"\.[^.]+$", "", nome_arquivo)
+        try:
+            df = _processar_bloco_texto(conteudo_texto.strip(), nome_aba, nome_arquivo)
+            if df is not None:
+                dfs.append(df)
+        except Exception as exc:
+            logger.error(f"Falha ao processar '{nome_arquivo}': {exc}")
+            return None
+
+    return _finalizar_transformacao(dfs, nome_arquivo, desmembrar_procedimentos_adicionais)
+
+
+def transformar_csv_arquivo(
+    conteudo_texto: str,
+    nome_arquivo: str = "",
+    desmembrar_procedimentos_adicionais: bool = False,
+    workers: int | str | None = None,
+) -> str:
+    """
+    Transforma o conteúdo extraído de um arquivo de endoscopia (PRODUCAO ou REPASSE)
+    em um CSV padronizado puro, sem linhas vazias ou texto explicativo.
+
+    Serializa o resultado de transformar_texto_arquivo; dentro do app as abas
+    seguem como DataFrame (transformar_abas_arquivo) e o CSV só é gerado para
+    download e para o LLM.
+
+    Regras aplicadas:
+    - Remove linhas completamente vazias, com só vírgulas (ex: "429,,,,,,,,,,,,")
+      ou com apenas um valor não vazio
+    - Remove linhas informativas de título ("CONTROLE DE EXAMES E PROCEDIMENTOS
+      NA ENDOSCOPIA / MÊS ANO,Unnamed: 1,Unnamed: 2,...")
+    - Extrai o nome da aba do marcador "=== ABA: <nome> ===" e insere na coluna
+      AbaOrigemDados (ex: "ABA: JANEIRO 2026")
+    - Primeira linha do CSV = cabeçalho obrigatório
+    - Data padronizada para DD/MM/AAAA
+    - Paciente em MAIÚSCULAS sem espaços extras
+    - TipoArquivo = 'PRODUCAO' ou 'REPASSE' (identificado pelo nome da aba/arquivo)
+    - Coluna QTD incluída; preenchida com "0" quando ausente na aba de origem
+    - Abas com formato legado 2025 (EXAME REALIZADO 1 / EXAME REALIZADO 2) têm
+      "EXAME REALIZADO 2" tratado como linha extra de procedimento
+    - Todas as colunas canônicas do _MAP_REPASSE são sempre incluídas no CSV de REPASSE,
+      mesmo que o arquivo físico não as contenha (ficam vazias)
+
+    Args:
+        conteudo_texto:   Texto extraído por extract_text_from_file.
+                          Para Excel: contém blocos "=== ABA: <nome> ===" separando abas.
+        nome_arquivo:     Nome original do arquivo (fallback para identificar tipo).
+        desmembrar_procedimentos_adicionais:
+                          Se True E TipoArquivo for PRODUCAO, chama
+                          desmembrar_procedimentos_adicionais_df antes de retornar.
+        workers:          Processos para transformar as abas em paralelo ("auto",
+                          N ou 1 para sequencial). None usa TRANSFORM_WORKERS.
+
+    Returns:
+        CSV puro (str) com cabeçalho na primeira linha, ou "" em caso de falha total.
+    """
+    return _df_para_csv(transformar_texto_arquivo(
+        conteudo_texto, nome_arquivo, desmembrar_procedimentos_adicionais, workers,
+    ))
+
+
+# =============================================================================
+# FUNÇÃO PÚBLICA: DESMEMBRAMENTO DE PROCEDIMENTOS ADICIONAIS
+# =============================================================================
+
+def desmembrar_procedimentos_adicionais_csv_arquivo(csv_texto: str) -> str:
+    """
+    Recebe um CSV de PRODUCAO já padronizado e desmembra a coluna
+    'ProcedimentosAdicionais' em linhas extras.
+
+    Regras:
+    - Para cada valor em 'ProcedimentosAdicionais', gera uma LINHA EXTRA com:
+        * Procedimento  = nome do procedimento adicional (MAIÚSCULAS)
+        * Observacao    = "PROCEDIMENTO_ADICIONAL"
+        * QTD           = "0"
+        * demais campos = replicados da linha principal
+    - A linha principal mantém sua Observacao original (vazia ou com valor já existente).
+    - Não altera linhas de REPASSE (TipoArquivo != 'PRODUCAO').
+    - Remove a coluna 'ProcedimentosAdicionais' do CSV final.
+    - Delimitadores suportados: ponto-e-vírgula, '+', quebra de linha.
+      Vírgulas são delimitadoras apenas quando não fazem parte de número decimal.
+
+    Args:
+        csv_texto: CSV puro (string) com cabeçalho na primeira linha.
+
+    Returns:
+        CSV puro (string) com as linhas extras já inseridas e sem
+        a coluna 'ProcedimentosAdicionais'.
+    """
+    if not csv_texto or not csv_texto.strip():
+        return csv_texto
+
+    try:
+        df = pd.read_csv(io.StringIO(csv_texto.strip()), dtype=str)
+        df.fillna("", inplace=True)
+    except Exception as exc:
+        logger.warning(f"desmembrar_procedimentos_adicionais_csv_arquivo: erro ao ler CSV: {exc}")
+        return csv_texto
+
+    if "ProcedimentosAdicionais" not in df.columns:
+        return csv_texto
+    return _df_para_csv(desmembrar_procedimentos_adicionais_df(df))
+
+
+def desmembrar_procedimentos_adicionais_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Versão DataFrame de desmembrar_procedimentos_adicionais_csv_arquivo
+    (mesmas regras). Devolve o próprio `df` se não houver 'ProcedimentosAdicionais'.
+    """
+    if "ProcedimentosAdicionais" not in df.columns:
+        return df
+
+    linhas_saida = []
+    for row in df.to_dict("records"):
+        linhas_saida.append(row)
+
+        # Só desmembra linhas de PRODUCAO
+        if str(row.get("TipoArquivo", "")).strip().upper() != "PRODUCAO":
+            continue
+
+        proc_adicionais = str(row.get("ProcedimentosAdicionais", "")).strip()
+        if proc_adicionais.upper() in ("", "NAN", "NONE", "NAN", "-"):
+            continue
+
+        # Delimitadores: ; | + | quebra de linha
+        # Vírgula apenas quando não separa dígitos (evita quebrar "1,234")
+        separados = re.split(r"[;+\n\r]+|(?<!\d),(?!\d)", proc_adicionais)
+
+        for proc in separados:
+            proc = proc.strip().upper()
+            if not proc or proc in ("-", ""):
+                continue
+            extra = dict(row)
+            extra["Procedimento"]            = proc
+            extra["ProcedimentosAdicionais"] = ""
+            extra["Observacao"]              = "PROCEDIMENTO_ADICIONAL"
+            extra["QTD"]                     = "0"
+            linhas_saida.append(extra)
+
+    df_saida = pd.DataFrame(linhas_saida) if linhas_saida else df.copy()
+    df_saida.drop(columns=["ProcedimentosAdicionais"], inplace=True, errors="ignore")
+    df_saida.fillna("", inplace=True)
+    return df_saida
+
+###############################################################################
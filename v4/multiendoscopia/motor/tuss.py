@@ -0,0 +1,823 @@
+"""
+Tabela TUSS: geração, carregamento e verificação pós-correlação.
+
+Os arquivos (tuss_lookup_table.csv, tuss_valores.csv, XLSX de origem) ficam no
+diretório do app; nada é lido ou gravado na importação do módulo.
+"""
+
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .similaridade import _normalizar_nome_paciente
+from .transform import _mapear_valores_unicos
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# TABELA TUSS — geração, carregamento e verificação pós-correlação
+# =============================================================================
+
+# Arquivos TUSS e caches ficam no diretório do app (pai do pacote motor)
+_TUSS_DIR = Path(__file__).resolve().parent.parent
+_TUSS_LOOKUP_PATH = _TUSS_DIR / "tuss_lookup_table.csv"
+_TUSS_VALORES_PATH = _TUSS_DIR / "tuss_valores.csv"
+_TUSS_XLSX_PATH    = _TUSS_DIR / "TUSS (ATUALIZADO).xlsx"
+
+# Mapeamento PRODUCAO→TUSS embutido. Atualizar quando o XLSX mudar (re-executar _gerar_tabela_tuss).
+_TABELA_TUSS_EMBUTIDA: dict[str, dict] = {
+    'ANUSCOPIA_': {"TipoCobranca": 'sem_mapeamento_tuss', "CodigosTUSS": '', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Sem correspondência exata TUSS'},
+    'COLONO_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
+    'COLONO_ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
+    'COLONO_ANATOMO PATLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
+    'COLONO_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
+    'COLONO_ANATOMO PATOLOGICO+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Mucosectomia'},
+    'COLONO_ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
+    'COLONO_ANATOMO PATOLOGICO+TATUAGEM': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202135', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Tatuagem'},
+    'COLONO_ANATOMO PATOLOGICO+MUCOSECTOMIA+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202712, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia, Mucosectomia E Polipectomia'},
+    'COLONO_ANATOMO PATOLOGICO+POLIPO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
+    'COLONO_ANATOMO+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Mucosectomia'},
+    'COLONO_ANATOMO+POLIOECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
+    'COLONO_ANATOMOPATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
+    'COLONO_ANATOMOPATOLOGICO+POLIPO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
+    'COLONO_BRADES': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
+    'COLONO_MUCOSECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Mucosectomia'},
+    'COLONO_POLEPECTOMIA+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202542, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Polipectomia E Mucosectomia'},
+    'COLONO_POLIECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
+    'COLONO_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
+    'COLONO_POLIPECTOMIA+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202542, 40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Polipectomia E Mucosectomia'},
+    'COLONO_POLIPOECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
+    'COLONO_RETIRADA DE CORPO ESRANHO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202569', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Retirada de corpo estranho do cólon'},
+    'COLONO_TESTE DE UREASE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
+    'COLONO_TESTE DE UREASE+ANATOMO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
+    'COLONO_TESTE UREASE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
+    'COLONOCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
+    'COLONOCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
+    'COLONOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
+    'COLONOSCOPIA_-': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201082', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia (Inclui A Retossigmoidoscopia)'},
+    'COLONOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
+    'COLONOSCOPIA_ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202666, 40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E Polipectomia'},
+    'COLONOSCOPIA_BIOPSIA SERIADO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202666', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Biópsia E/Ou Citologia'},
+    'COLONOSCOPIA_DESCOMPRESSAO COLONICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202143', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Descompressão colônica por colonoscopia'},
+    'COLONOSCOPIA_HEMOSTASIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202313', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Hemostasias de cólon'},
+    'COLONOSCOPIA_MUCOSECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202712', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia Com Mucosectomia'},
+    'COLONOSCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202542', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Polipectomia De Cólon (Independente Do Número De Pólipos)'},
+    'COLONOSCOPIA_TESTE DE UREASE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
+    'COLONOSCOPIA_TESTE DE UREASE - NEGATIVO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
+    'COLONOSCOPIA_TESTE UREASE - NEGATIVO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
+    'COLONOSCOPIA_TESTE UREASE+ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201082, 40202615', "codigo_base_proc_principal": '40201082', "Descricao_REPASSE": 'Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori'},
+    'CPRE_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
+    'CPRE_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201074, 40202038', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica Com Biópsia'},
+    'CPRE_COLOCACAO DE PROTESE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40813320', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colocação De Stent Biliar'},
+    'CPRE_PROTESE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40813320', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colocação De Stent Biliar'},
+    'CPRE_RETIRADA DE PROTESE BILIAR': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
+    'ECOEDA ALTA C+PUNCAO_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202240, 40202038', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Punção E Biópsia'},
+    'ECOEDA ALTA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
+    'ECOENDOCOPIA ALTA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
+    'ECOENDOSCOPIA BAIXA_': {"TipoCobranca": 'sem_mapeamento_tuss', "CodigosTUSS": '', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Não há código TUSS específico para baixa na tabela (apenas alta)'},
+    'ECOENDOSCOPIA ALTA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
+    'ECOENDOSCOPIA ALTA_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201104, 40202038', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Biópsia E/Ou Citologia'},
+    'ECOENDOSCOPIA ALTA_ANATOMOPATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201104, 40202038', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Biópsia E/Ou Citologia'},
+    'ECOENDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201104', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia alta sem punção'},
+    'ECOENDOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40201104, 40202038', "codigo_base_proc_principal": '40201104', "Descricao_REPASSE": 'Ecoendoscopia Alta Com Biópsia E/Ou Citologia'},
+    'ENCOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
+    'ENCOSCOPIA_TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDDOSCOPIA_ANATOMO PATOLOGICO+TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOCOSPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
+    'ENDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
+    'ENDOSCOPIA_ENDOSCOPIA': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201120', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta'},
+    'ENDOSCOPIA_UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_ANATOMIA PATOLOGICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Polipectomia'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO+HP+CICATRIZ GASTRICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO+TESTE DE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO+HPYLORI+BUBO GASTRICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO+TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_ANATOMO PATOLOGICO+POLIPO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Polipectomia'},
+    'ENDOSCOPIA_ANATOMO+MUCOSECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202470', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Mucosectomia'},
+    'ENDOSCOPIA_ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202038, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Biópsia E Polipectomia'},
+    'ENDOSCOPIA_ANATOMOPATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
+    'ENDOSCOPIA_ANATOMOPATOLOGICO+TESTE DE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_BIOPSIA HEPATICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202038', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia'},
+    'ENDOSCOPIA_COM DILATACAO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202186', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Dilatação De Esôfago Com Balão Pneumático'},
+    'ENDOSCOPIA_CPRE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
+    'ENDOSCOPIA_DILATACAO DE OSTOMIA+TROCA DE GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
+    'ENDOSCOPIA_DILATACAO ESOFAGICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202186', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Dilatação De Esôfago Com Balão Pneumático'},
+    'ENDOSCOPIA_DILATACAO PNEUMATICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202186', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Dilatação De Esôfago Com Balão Pneumático'},
+    'ENDOSCOPIA_GASTROSTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
+    'ENDOSCOPIA_GASTROSTOMIA (1ª PASSGEM)': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
+    'ENDOSCOPIA_GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
+    'ENDOSCOPIA_GTT 1ª PASSAGEM': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
+    'ENDOSCOPIA_HEMOCLIP': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202291', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Hemostasia mecânica do esôfago, estômago ou duodeno'},
+    'ENDOSCOPIA_HEMOSTASIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202291', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Hemostasia mecânica do esôfago, estômago ou duodeno'},
+    'ENDOSCOPIA_HEMOSTASIA LEVE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202291', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Hemostasia mecânica do esôfago, estômago ou duodeno'},
+    'ENDOSCOPIA_HPYLORI': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_HPYLORI+POLIPOS GASTRICOS+LIGADURA ELASTICA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550, 40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease, Polipectomia E Ligadura'},
+    'ENDOSCOPIA_LIGADURA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Ligadura Elástica Do Esôfago, Estômago Ou Duodeno'},
+    'ENDOSCOPIA_LIGADURA DE VARIZES ESOFAGO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Ligadura Elástica Do Esôfago, Estômago Ou Duodeno'},
+    'ENDOSCOPIA_LIGADURA ELASTICA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202453', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Ligadura Elástica Do Esôfago, Estômago Ou Duodeno'},
+    'ENDOSCOPIA_MUCOSECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202470', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Mucosectomia Do Esôfago, Estômago Ou Duodeno'},
+    'ENDOSCOPIA_PASSAGEM SNE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
+    'ENDOSCOPIA_PASSAGEM DE SNE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
+    'ENDOSCOPIA_PASSAGEM DE SONDA NASO ENTERAL': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
+    'ENDOSCOPIA_PASSAGEM DE SONDA NASOENTERAL': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
+    'ENDOSCOPIA_PASSAGEN SNE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
+    'ENDOSCOPIA_PLASMA DE ARGONIO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40201376', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Aplicação de plasma de argônio por endoscopia digestiva alta'},
+    'ENDOSCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Polipectomia Do Esôfago, Estômago Ou Duodeno (Independente Do Número De Pólipos)'},
+    'ENDOSCOPIA_REMOCAO DE BALAO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202577', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Retirada de corpo estranho do esôfago, estômago ou duodeno'},
+    'ENDOSCOPIA_RETIRADA DE CORPO ESTRANHO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202577', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Retirada de corpo estranho do esôfago, estômago ou duodeno'},
+    'ENDOSCOPIA_RETIRADA DE GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202577', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Retirada de corpo estranho do esôfago, estômago ou duodeno'},
+    'ENDOSCOPIA_TESTE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE DE UEASE+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
+    'ENDOSCOPIA_TESTE DE UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE DE UREASE - NEGATIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO PATOLOGICO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
+    'ENDOSCOPIA_TESTE DE UREASE - POSITIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO+POLIOECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
+    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE DE UREASE+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
+    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE DE UREASE+ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
+    'ENDOSCOPIA_TESTE DE UREASE+POLIPECTOMIA+ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
+    'ENDOSCOPIA_TESTE DE UREASEA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE DE URESE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE E UREASE': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE UREASE - NEGATIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE UREASE - POSITIVO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE UREASE+ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202615', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)'},
+    'ENDOSCOPIA_TESTE UREASE+ANATOMO+POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202615, 40202550', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Endoscopia Alta Com Urease E Polipectomia'},
+    'ENDOSCOPIA_TROCA DE GTT (BOTTON)': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
+    'ENDOSCOPIA_TROCA DE GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
+    'ENDOSCOPIA_TROCA GTT': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40201120', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
+    'EXAME REALIZADO_PROCEDIMENTOS ADICIONAIS': {"TipoCobranca": 'sem_mapeamento_tuss', "CodigosTUSS": '', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Erro de leitura de cabeçalho do PDF'},
+    'GASTROSTOMIA 1ª PASSAGEM_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
+    'GASTROSTOMIA ENDOSCOPICA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
+    'GASTROSTOMIA ENDOSCOPICA_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202283, 40202038', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica Com Biópsia E/Ou Citologia'},
+    'GASTROSTOMIA ENDOSCOPICA_GASTROSTOMIA+ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202283, 40202038', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica Com Biópsia E/Ou Citologia'},
+    'GASTROSTOMIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
+    'GTT_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica'},
+    'HEMOSTASIA_POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202291, 40202550', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Endoscopia Alta Com Hemostasia E Polipectomia'},
+    'LIGADURA ELASTICA_HEMOSTASIA LEVE': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202453, 40202291', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Endoscopia Alta Com Ligadura E Hemostasia'},
+    'MUCOSECTOMIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202470', "codigo_base_proc_principal": '40202470', "Descricao_REPASSE": 'Mucosectomia Do Esôfago, Estômago Ou Duodeno'},
+    'MUCOSECTOMIA_POLIPECTOMIA': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202470, 40202550', "codigo_base_proc_principal": '40202470', "Descricao_REPASSE": 'Endoscopia Alta Com Mucosectomia E Polipectomia'},
+    'PASSAGEM DE SNE_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40202534', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
+    'PASSAGEM DE SONDA POR ENDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40202534', "Descricao_REPASSE": 'Passagem de Sondas por Endoscopia'},
+    'PASSAGEM SNE_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202534', "codigo_base_proc_principal": '40202534', "Descricao_REPASSE": 'Passagem de sonda naso-enteral'},
+    'RETIRADA DE PROTESE TRANSPAPILAR_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201074', "codigo_base_proc_principal": '40201074', "Descricao_REPASSE": 'Colangiopancreatografia Retrógrada Endoscópica'},
+    'RETO_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
+    'RETO_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
+    'RETOSIGMOIDECTOMIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
+    'RETOSSIGMOIDECTOMIA FLEXIVEL_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
+    'RETOSSIGMOIDECTOMIA FLEXIVEL_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
+    'RETOSSIGMOIDOSCOPIA FLEXIVEL_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
+    'RETOSSIGMOIDOSCOPIA_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40201171', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível'},
+    'RETOSSIGMOIDOSCOPIA_ANATOMO PATOLOGICO': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202690', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia flexível com biópsia e/ou citologia'},
+    'RETOSSIGMOIDOSCOPIA_POLIPECTOMIA': {"TipoCobranca": 'unico_cod_tuss_inclui_proc_adicional_e_principal', "CodigosTUSS": '40202682', "codigo_base_proc_principal": '40201171', "Descricao_REPASSE": 'Retossigmoidoscopia Flexível Com Polipectomia'},
+    'TROCA DE GTT_': {"TipoCobranca": 'unico_cod_tuss_somente_proc_principal', "CodigosTUSS": '40202283', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia endoscópica'},
+    'TROCA DE GTT_ANATOMO PATOLOGICO': {"TipoCobranca": 'multiplos_cod_tuss_proced_adicional', "CodigosTUSS": '40202283, 40202038', "codigo_base_proc_principal": '40202283', "Descricao_REPASSE": 'Gastrostomia Endoscópica Com Biópsia E/Ou Citologia'},
+}
+
+
+def _normalizar_chave_tuss(s: str) -> str:
+    """Normaliza chave CONCATENAR: remove acentos, colapsa separadores e espaços."""
+    import unicodedata
+    s = str(s).strip().upper()
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(c for c in s if unicodedata.category(c) != "Mn")
+    s = re.sub(r"[+/;,]+", "+", s)
+    s = re.sub(r"\s*\+\s*", "+", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def _gerar_tabela_tuss(
+    caminho_xlsx: Path = _TUSS_XLSX_PATH,
+    caminho_saida: Path = _TUSS_LOOKUP_PATH,
+) -> pd.DataFrame:
+    """
+    Lê TUSS (ATUALIZADO).xlsx e gera tuss_lookup_table.csv com classificação de tipo
+    de cobrança. Retorna o DataFrame gerado. Chame sempre que o XLSX for atualizado.
+    """
+    import unicodedata
+
+    df = pd.read_excel(caminho_xlsx, sheet_name=0)
+    df.columns = ["Proc_PRODUCAO", "ProcAdic_PRODUCAO", "CONCATENAR", "CodigoTUSS", "Descricao_REPASSE"]
+    # Remover linha de cabeçalho duplicado que entra como dado
+    df = df[~df["Proc_PRODUCAO"].astype(str).str.strip().isin(["EXAME REALIZADO 1", "EXAME REALIZADO 2"])]
+
+    # Mapa código base por procedimento principal (linha sem adicional)
+    codigos_base: dict[str, str] = {}
+    sem_adic = df[df["ProcAdic_PRODUCAO"].isna() | (df["ProcAdic_PRODUCAO"].astype(str).str.strip() == "")]
+    for _, r in sem_adic.iterrows():
+        proc_norm = _normalizar_chave_tuss(str(r["Proc_PRODUCAO"]))
+        raw = str(r["CodigoTUSS"]).strip()
+        sem_tuss = raw.lower() in ("nan", "sem correspondência exata tuss", "sem correspondência")
+        if not sem_tuss:
+            codigos_base[proc_norm] = raw.split(",")[0].strip()
+
+    # Descrições corrigidas por conjunto de códigos (base de conhecimento curada)
+    _CORRECOES_DESC: dict[frozenset, str] = {
+        frozenset(["40201082"]): "Colonoscopia (Inclui A Retossigmoidoscopia)",
+        frozenset(["40202038"]): "Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia",
+        frozenset(["40202186"]): "Dilatação De Esôfago Com Balão Pneumático",
+        frozenset(["40202453"]): "Ligadura Elástica Do Esôfago, Estômago Ou Duodeno",
+        frozenset(["40202470"]): "Mucosectomia Do Esôfago, Estômago Ou Duodeno",
+        frozenset(["40202542"]): "Polipectomia De Cólon (Independente Do Número De Pólipos)",
+        frozenset(["40202550"]): "Polipectomia Do Esôfago, Estômago Ou Duodeno (Independente Do Número De Pólipos)",
+        frozenset(["40202615"]): "Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)",
+        frozenset(["40202666"]): "Colonoscopia Com Biópsia E/Ou Citologia",
+        frozenset(["40202712"]): "Colonoscopia Com Mucosectomia",
+        frozenset(["40813320"]): "Colocação De Stent Biliar",
+        frozenset(["40201082", "40202615"]): "Colonoscopia + Teste De Urease Para Pesquisa De Helicobacter Pylori",
+        frozenset(["40201074", "40202038"]): "Colangiopancreatografia Retrógrada Endoscópica Com Biópsia",
+        frozenset(["40201104", "40202038"]): "Ecoendoscopia Alta Com Biópsia E/Ou Citologia",
+        frozenset(["40202283", "40202038"]): "Gastrostomia Endoscópica Com Biópsia E/Ou Citologia",
+        frozenset(["40202666", "40202542"]): "Colonoscopia Com Biópsia E Polipectomia",
+        frozenset(["40202666", "40202712"]): "Colonoscopia Com Biópsia E Mucosectomia",
+        frozenset(["40202666", "40202712", "40202542"]): "Colonoscopia Com Biópsia, Mucosectomia E Polipectomia",
+        frozenset(["40202666", "40202135"]): "Colonoscopia Com Biópsia E Tatuagem",
+        frozenset(["40202542", "40202712"]): "Colonoscopia Com Polipectomia E Mucosectomia",
+        frozenset(["40202038", "40202550"]): "Endoscopia Alta Com Biópsia E Polipectomia",
+        frozenset(["40202038", "40202470"]): "Endoscopia Alta Com Biópsia E Mucosectomia",
+        frozenset(["40202615", "40202550"]): "Endoscopia Alta Com Urease E Polipectomia",
+        frozenset(["40202615", "40202550", "40202453"]): "Endoscopia Alta Com Urease, Polipectomia E Ligadura",
+        frozenset(["40202240", "40202038"]): "Ecoendoscopia Alta Com Punção E Biópsia",
+        frozenset(["40202453", "40202291"]): "Endoscopia Alta Com Ligadura E Hemostasia",
+        frozenset(["40202291", "40202550"]): "Endoscopia Alta Com Hemostasia E Polipectomia",
+        frozenset(["40202470", "40202550"]): "Endoscopia Alta Com Mucosectomia E Polipectomia",
+    }
+
+    registros = []
+    for _, r in df.iterrows():
+        proc_raw  = str(r["Proc_PRODUCAO"]).strip()
+        adic_raw  = str(r["ProcAdic_PRODUCAO"]).strip() if pd.notna(r["ProcAdic_PRODUCAO"]) else ""
+        concat_raw = str(r["CONCATENAR"]).strip()
+        codigos_raw = str(r["CodigoTUSS"]).strip()
+
+        chave_norm = _normalizar_chave_tuss(concat_raw)
+        proc_norm  = _normalizar_chave_tuss(proc_raw)
+        sem_tuss   = codigos_raw.lower() in ("nan", "sem correspondência exata tuss", "sem correspondência")
+
+        if sem_tuss:
+            codigos_lista, tipo = [], "sem_mapeamento_tuss"
+        else:
+            codigos_lista = [c.strip() for c in codigos_raw.split(",") if c.strip()]
+            base = codigos_base.get(proc_norm)
+            adic_vazio = not adic_raw or adic_raw in ("nan",)
+            if adic_vazio or (len(codigos_lista) == 1 and base and codigos_lista[0] == base):
+                tipo = "unico_cod_tuss_somente_proc_principal"
+            elif len(codigos_lista) > 1:
+                tipo = "multiplos_cod_tuss_proced_adicional"
+            else:
+                tipo = "unico_cod_tuss_inclui_proc_adicional_e_principal"
+
+        chave_frozen = frozenset(codigos_lista)
+        desc = _CORRECOES_DESC.get(chave_frozen, str(r["Descricao_REPASSE"]).strip())
+
+        registros.append({
+            "chave_norm":              chave_norm,
+            "Proc_PRODUCAO_raw":       proc_raw,
+            "ProcAdic_PRODUCAO_raw":   adic_raw,
+            "CONCATENAR_raw":          concat_raw,
+            "CodigosTUSS":             ", ".join(codigos_lista),
+            "QtdCodigos":              len(codigos_lista),
+            "TipoCobranca":            tipo,
+            "codigo_base_proc_principal": codigos_base.get(proc_norm, ""),
+            "Descricao_REPASSE":       desc,
+        })
+
+    df_out = pd.DataFrame(registros)
+    df_out.to_csv(caminho_saida, index=False, encoding="utf-8-sig")
+    logger.info(f"tuss_lookup_table.csv gerado: {len(df_out)} linhas, {df_out['chave_norm'].nunique()} chaves únicas")
+    return df_out
+
+
+def _normalizar_convenio(s: str) -> str:
+    """Normaliza nome de convênio: maiúsculas, sem acentos, espaços colapsados."""
+    import unicodedata as _ud
+    s = str(s).upper().strip()
+    s = _ud.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", s)
+
+
+def _gerar_valores_tuss(
+    df_correlacao: pd.DataFrame,
+    caminho_saida: Path = _TUSS_VALORES_PATH,
+    ano: int | None = None,
+) -> pd.DataFrame:
+    """
+    Calcula estatísticas de valor por (Convênio, Código TUSS) a partir do
+    DataFrame de correlação e atualiza (ou cria) tuss_valores.csv.
+
+    Estrutura gerada:
+        Ano | Convenio | CodigoTUSS | Descricao | Qtd | Media | UltimoValor | DataUltimo | Confianca
+
+    Uma linha por (Convênio normalizado, Código) + linha Convenio="GERAL" como
+    fallback agregado por código.  Chamada automaticamente pela aba Gerar Cobrança
+    quando o arquivo não existe.
+    """
+    import unicodedata as _ud
+
+    # ── Descrições oficiais ────────────────────────────────────────────────
+    _DESC_OFICIAL: dict[str, str] = {
+        "40201074": "Colangiopancreatografia Retrógrada Endoscópica",
+        "40201082": "Colonoscopia (Inclui A Retossigmoidoscopia)",
+        "40201104": "Ecoendoscopia Alta Sem Punção",
+        "40201120": "Endoscopia Digestiva Alta",
+        "40201171": "Retossigmoidoscopia Flexível",
+        "40201376": "Aplicação De Plasma De Argônio Por Endoscopia Digestiva Alta",
+        "40202038": "Endoscopia Digestiva Alta Com Biópsia E/Ou Citologia",
+        "40202135": "Colonoscopia Com Magnificação E Tatuagem",
+        "40202143": "Descompressão Colônica Por Colonoscopia",
+        "40202186": "Dilatação De Esôfago Com Balão Pneumático",
+        "40202240": "Ecoendoscopia Alta Com Punção",
+        "40202283": "Gastrostomia Endoscópica",
+        "40202291": "Hemostasia Mecânica Do Esôfago, Estômago Ou Duodeno",
+        "40202313": "Hemostasias De Cólon",
+        "40202453": "Ligadura Elástica Do Esôfago, Estômago Ou Duodeno",
+        "40202470": "Mucosectomia Do Esôfago, Estômago Ou Duodeno",
+        "40202534": "Passagem De Sonda Naso-Enteral",
+        "40202542": "Polipectomia De Cólon (Independente Do Número De Pólipos)",
+        "40202550": "Polipectomia Do Esôfago, Estômago Ou Duodeno (Independente Do Número De Pólipos)",
+        "40202569": "Retirada De Corpo Estranho Do Cólon",
+        "40202577": "Retirada De Corpo Estranho Do Esôfago, Estômago Ou Duodeno",
+        "40202615": "Endoscopia Digestiva Alta Com Biópsia E Teste De Urease (Pesquisa Helicobacter Pylori)",
+        "40202666": "Colonoscopia Com Biópsia E/Ou Citologia",
+        "40202682": "Retossigmoidoscopia Flexível Com Polipectomia",
+        "40202690": "Retossigmoidoscopia Flexível Com Biópsia E/Ou Citologia",
+        "40202712": "Colonoscopia Com Mucosectomia",
+        "40813320": "Colocação De Stent Biliar",
+    }
+
+    def _desc(cod, desc_real_map):
+        return desc_real_map.get(cod) or _DESC_OFICIAL.get(cod) or f"Código TUSS {cod}"
+
+    def _confianca(sub: pd.Series) -> str:
+        qtd = len(sub)
+        if qtd == 0:
+            return "Sem dados"
+        if qtd == 1:
+            return "Baixa"
+        std = float(sub.std())
+        media = float(sub.mean())
+        desvio_pct = (std / media * 100) if media > 0 else 100
+        if qtd >= 5 and desvio_pct <= 5:
+            return "Alta"
+        if qtd >= 5 and desvio_pct <= 20:
+            return "Boa"
+        if qtd >= 2:
+            return "Moderada"
+        return "Baixa"
+
+    # ── Inferir ano dominante ──────────────────────────────────────────────
+    if ano is None:
+        col_data = next((c for c in ["Data_REPASSE", "Data_PRODUCAO"] if c in df_correlacao.columns), None)
+        if col_data:
+            try:
+                anos = df_correlacao[col_data].dropna().astype(str).str.strip().str[-4:].astype(int)
+                ano = int(anos.mode().iloc[0]) if len(anos) > 0 else datetime.now().year
+            except Exception:
+                ano = datetime.now().year
+        else:
+            ano = datetime.now().year
+
+    # ── Preparar dados válidos do REPASSE ──────────────────────────────────
+    df_rep = df_correlacao.copy()
+    df_rep["_cod"]  = (df_rep.get("CodigoTUSS_REPASSE", pd.Series(dtype=str))
+                       .astype(str).str.replace(".0", "", regex=False).str.strip())
+    df_rep["_val"]  = pd.to_numeric(
+        df_rep.get("ValorLiberado_REPASSE", pd.Series(dtype=float)), errors="coerce")
+    df_rep["_data"] = pd.to_datetime(
+        df_rep.get("Data_REPASSE", pd.Series(dtype=str)), dayfirst=True, errors="coerce")
+    df_rep["_conv"] = (df_rep.get("Convenio_PRODUCAO", pd.Series(dtype=str))
+                       .astype(str).apply(_normalizar_convenio))
+
+    # Filtrar: ano corrente, valor > 0, código numérico
+    mask_ano = df_rep["_data"].dt.year == ano
+    mask_val = df_rep["_val"] > 0
+    mask_cod = df_rep["_cod"].str.match(r"^\d+$", na=False)
+    df_ano   = df_rep[mask_ano & mask_val & mask_cod].copy()
+
+    # Mapa de descrição real (mais frequente por código)
+    desc_real_map: dict[str, str] = {}
+    if "Procedimento_REPASSE" in df_correlacao.columns and not df_ano.empty:
+        desc_real = (
+            df_ano.groupby(["_cod", "Procedimento_REPASSE"])
+            .size().reset_index(name="freq")
+            .sort_values(["_cod", "freq"], ascending=[True, False])
+            .groupby("_cod").first().reset_index()[["_cod", "Procedimento_REPASSE"]]
+        )
+        desc_real_map = dict(zip(desc_real["_cod"], desc_real["Procedimento_REPASSE"]))
+
+    novas_linhas: list[dict] = []
+
+    # ── 1. Linhas por (Convênio normalizado, Código) ───────────────────────
+    if not df_ano.empty:
+        df_sorted = df_ano.sort_values("_data")
+        for (conv_norm, cod), grp in df_sorted.groupby(["_conv", "_cod"]):
+            if conv_norm in ("NAN", ""):
+                continue
+            sub   = grp["_val"]
+            ult   = grp.iloc[-1]
+            novas_linhas.append({
+                "Ano":          ano,
+                "Convenio":     conv_norm,
+                "CodigoTUSS":   cod,
+                "Descricao":    _desc(cod, desc_real_map),
+                "Qtd":          len(sub),
+                "Media":        round(float(sub.mean()), 2),
+                "UltimoValor":  round(float(ult["_val"]), 2),
+                "DataUltimo":   ult["_data"].strftime("%d/%m/%Y") if pd.notna(ult["_data"]) else "",
+                "Confianca":    _confianca(sub),
+            })
+
+    # ── 2. Linhas GERAL (fallback agregado por código, todos convênios) ────
+    todos_codigos: set[str] = set(df_ano["_cod"].unique()) if not df_ano.empty else set()
+    # incluir códigos da tabela TUSS mesmo sem valor histórico
+    tabela = _carregar_tabela_tuss()
+    for entry in tabela.values():
+        for c in [x.strip() for x in str(entry.get("CodigosTUSS", "")).split(",") if x.strip()]:
+            if c.isdigit():
+                todos_codigos.add(c)
+
+    df_sorted_geral = df_ano.sort_values("_data") if not df_ano.empty else df_ano
+    for cod in sorted(todos_codigos):
+        sub_geral = df_ano[df_ano["_cod"] == cod]["_val"] if not df_ano.empty else pd.Series(dtype=float)
+        qtd       = len(sub_geral)
+        if qtd > 0:
+            ult_geral = df_sorted_geral[df_sorted_geral["_cod"] == cod].iloc[-1]
+            ultimo_val  = round(float(ult_geral["_val"]), 2)
+            ultimo_data = ult_geral["_data"].strftime("%d/%m/%Y") if pd.notna(ult_geral["_data"]) else ""
+        else:
+            ultimo_val  = None
+            ultimo_data = ""
+        novas_linhas.append({
+            "Ano":          ano,
+            "Convenio":     "GERAL",
+            "CodigoTUSS":   cod,
+            "Descricao":    _desc(cod, desc_real_map),
+            "Qtd":          qtd,
+            "Media":        round(float(sub_geral.mean()), 2) if qtd > 0 else None,
+            "UltimoValor":  ultimo_val,
+            "DataUltimo":   ultimo_data,
+            "Confianca":    _confianca(sub_geral) if qtd > 0 else "Sem dados",
+        })
+
+    if not novas_linhas:
+        logger.warning("_gerar_valores_tuss: nenhum dado de valor encontrado no DataFrame")
+        return pd.DataFrame()
+
+    df_novo = pd.DataFrame(novas_linhas)
+
+    # ── Acumular: preservar anos/convênios anteriores, sobrescrever (Convenio, Ano) atual ──
+    if caminho_saida.exists():
+        df_existente = pd.read_csv(caminho_saida, dtype={"CodigoTUSS": str})
+        # Retrocompatibilidade: CSV antigo sem coluna Convenio → descartar e reger
+        if "Convenio" not in df_existente.columns:
+            logger.info("tuss_valores.csv antigo (sem Convenio) — regerando com nova estrutura")
+            df_existente = pd.DataFrame()
+        else:
+            df_existente = df_existente[df_existente["Ano"] != ano]
+        df_final_val = pd.concat([df_existente, df_novo], ignore_index=True).sort_values(
+            ["Ano", "Convenio", "CodigoTUSS"])
+    else:
+        df_final_val = df_novo
+
+    df_final_val.to_csv(caminho_saida, index=False, encoding="utf-8-sig")
+    n_conv = df_novo[df_novo["Convenio"] != "GERAL"]["Convenio"].nunique()
+    logger.info(f"tuss_valores.csv atualizado: ano={ano}, {n_conv} convênios, {len(df_novo)} linhas")
+    return df_final_val
+
+
+def _carregar_tabela_tuss() -> dict:
+    """
+    Carrega tuss_lookup_table.csv como dict {chave_norm → entry}.
+    Prioridade: arquivo local → XLSX → constante embutida (_TABELA_TUSS_EMBUTIDA).
+    A constante embutida garante funcionamento em Docker sem volume montado.
+    """
+    if _TUSS_LOOKUP_PATH.exists():
+        df = pd.read_csv(_TUSS_LOOKUP_PATH, dtype={"CodigosTUSS": str, "codigo_base_proc_principal": str})
+        logger.info(f"tabela_tuss carregada do arquivo local ({len(df)} linhas)")
+        return {str(r["chave_norm"]): dict(r) for _, r in df.iterrows()}
+    elif _TUSS_XLSX_PATH.exists():
+        logger.info("tuss_lookup_table.csv não encontrado — gerando a partir do XLSX")
+        df = _gerar_tabela_tuss()
+        return {str(r["chave_norm"]): dict(r) for _, r in df.iterrows()}
+    else:
+        logger.info("tuss_lookup_table.csv não encontrado — usando constante embutida _TABELA_TUSS_EMBUTIDA")
+        return dict(_TABELA_TUSS_EMBUTIDA)
+
+
+def _carregar_valores_tuss(caminho: Path = _TUSS_VALORES_PATH) -> dict:
+    """
+    Carrega tuss_valores.csv como dict de dois níveis (ano mais recente):
+      - chave str  "CodigoTUSS"            → stats GERAL (fallback)
+      - chave tuple (conv_norm, CodigoTUSS) → stats por convênio
+
+    Retorna {} se arquivo não existir ou sem coluna Convenio (formato antigo).
+    """
+    if not caminho.exists():
+        logger.warning("tuss_valores.csv não encontrado — será gerado automaticamente")
+        return {}
+    df = pd.read_csv(caminho, dtype={"CodigoTUSS": str})
+    if df.empty or "Convenio" not in df.columns:
+        return {}
+    ano_mais_recente = int(df["Ano"].max())
+    df_atual = df[df["Ano"] == ano_mais_recente]
+    resultado: dict = {}
+    for _, r in df_atual.iterrows():
+        cod  = str(r["CodigoTUSS"])
+        conv = str(r.get("Convenio", "GERAL"))
+        stats = dict(r)
+        if conv == "GERAL":
+            resultado[cod] = stats            # fallback por código
+        else:
+            resultado[(conv, cod)] = stats    # específico por plano
+    return resultado
+
+
+def _construir_indice_tuss_repasse(df_rep: pd.DataFrame) -> set:
+    """Retorna set de (paciente_norm, data, codigo_tuss) para lookup O(1)."""
+    vazio = pd.Series("", index=df_rep.index, dtype=object)
+    pacientes = (
+        df_rep["_pac_norm"] if "_pac_norm" in df_rep.columns
+        else _mapear_valores_unicos(df_rep.get("Paciente", vazio).astype(str), _normalizar_nome_paciente)
+    )
+    datas   = df_rep.get("Data", vazio).astype(str).str.strip()
+    codigos = df_rep.get("CodigoTUSS", vazio).astype(str).str.replace(".0", "", regex=False).str.strip()
+    idx: set = set()
+    for pac, data, cod in zip(pacientes, datas, codigos):
+        if pac and data and cod and cod != "nan":
+            idx.add((pac, data, cod))
+    return idx
+
+
+def _construir_desc_por_tuss_code(tabela_tuss: dict) -> dict:
+    """
+    Reverse-map {cod_tuss: descricao} a partir do tuss_lookup_table.
+    Prioridade: código que é codigo_base_proc_principal (descrição canônica)
+    sobre códigos adicionais. Ignora entradas 'Sem correspondência exata TUSS'.
+    """
+    desc_map: dict[str, str] = {}
+    # Primeira passagem: apenas entradas onde o código é o código-base (mais canônico)
+    for entry in tabela_tuss.values():
+        desc = str(entry.get("Descricao_REPASSE", "")).strip()
+        if not desc or "sem correspondência" in desc.lower():
+            continue
+        base = str(entry.get("codigo_base_proc_principal", "")).replace(".0", "").strip()
+        if base and base not in desc_map:
+            desc_map[base] = desc
+    # Segunda passagem: demais códigos (adicionais) da combinação
+    for entry in tabela_tuss.values():
+        desc = str(entry.get("Descricao_REPASSE", "")).strip()
+        if not desc or "sem correspondência" in desc.lower():
+            continue
+        for cod in str(entry.get("CodigosTUSS", "")).split(","):
+            cod = cod.strip().replace(".0", "")
+            if cod and cod != "nan" and cod not in desc_map:
+                desc_map[cod] = desc
+    return desc_map
+
+
+def _construir_desc_por_codigo(df_rep: pd.DataFrame) -> dict:
+    """
+    Retorna dict {codigo_tuss: descricao_oficial} extraído das linhas reais do REPASSE.
+    Usa a descrição mais frequente para cada código como fonte canônica.
+    """
+    if "CodigoTUSS" not in df_rep.columns or "Procedimento" not in df_rep.columns:
+        return {}
+    df_rep = df_rep.copy()
+    df_rep["_cod"] = df_rep["CodigoTUSS"].astype(str).str.replace(".0", "", regex=False).str.strip()
+    grp = (
+        df_rep[df_rep["_cod"].str.match(r"^\d+$", na=False)]
+        .groupby(["_cod", "Procedimento"]).size().reset_index(name="freq")
+        .sort_values(["_cod", "freq"], ascending=[True, False])
+        .groupby("_cod").first().reset_index()
+    )
+    return dict(zip(grp["_cod"], grp["Procedimento"]))
+
+
+def _enriquecer_com_valores_tuss(
+    df: pd.DataFrame,
+    valores_tuss: dict,
+    desc_lookup: dict,
+) -> pd.DataFrame:
+    """
+    Enriquece o DataFrame de correlação com:
+      - ValorEstimado_TUSS: UltimoValor (ou Media) do código esperado, por convênio
+      - DescricaoTUSS: preserva o que verificar_tuss_adicionais já preencheu via
+        Descricao_REPASSE; completa/melhora via desc_lookup quando disponível.
+
+    ValorEstimado_TUSS é preenchido para status que indicam divergência ou ausência:
+      TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES
+      TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE
+      TUSS_CODIGO_PRINCIPAL_DIVERGENTE
+    Também preenche NAO_FATURADO_NO_REPASSE quando CodigosTUSS_Esperados estiver preenchido.
+    DescricaoTUSS é preenchida/completada para qualquer linha com CodigosTUSS_Esperados.
+    """
+    if df.empty:
+        return df
+
+    # Garante que as colunas existam sem apagar o que verificar_tuss_adicionais já populou
+    if "ValorEstimado_TUSS" not in df.columns:
+        df = df.copy()
+        df["ValorEstimado_TUSS"] = ""
+    if "DescricaoTUSS" not in df.columns:
+        df = df.copy()
+        df["DescricaoTUSS"] = ""
+
+    _STATUS_COM_VALOR = {
+        "TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES",
+        "TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE",
+        "TUSS_CODIGO_PRINCIPAL_DIVERGENTE",
+    }
+
+    vals:  list = [""] * len(df)
+    # Inicializa preservando DescricaoTUSS já preenchida por verificar_tuss_adicionais
+    descs: list = list(df["DescricaoTUSS"].fillna("").astype(str))
+
+    # Colunas extraídas uma vez — evita iterrows (Series por linha) no DataFrame inteiro
+    _vazio = pd.Series("", index=df.index, dtype=object)
+    _cols = {
+        c: df.get(c, _vazio).tolist()
+        for c in ("StatusTUSS", "StatusCorrelacao", "CodigosTUSS_Esperados", "Convenio_PRODUCAO")
+    }
+
+    for i, (st_tuss, st_corr, cod, convenio) in enumerate(zip(
+        _cols["StatusTUSS"], _cols["StatusCorrelacao"],
+        _cols["CodigosTUSS_Esperados"], _cols["Convenio_PRODUCAO"],
+    )):
+        st_tuss = str(st_tuss).strip()
+        st_corr = str(st_corr).strip().upper()
+        cod = str(cod).split(",")[0].strip().replace(".0", "")
+        if not cod:
+            continue
+
+        quer_valor = (
+            st_tuss in _STATUS_COM_VALOR
+            or st_corr == "NAO_FATURADO_NO_REPASSE"
+        )
+
+        # Sempre tenta completar DescricaoTUSS se ainda vazia
+        if not descs[i]:
+            d = desc_lookup.get(cod, "")
+            if not d and valores_tuss:
+                d = str(valores_tuss.get(cod, {}).get("Descricao", ""))
+            if d:
+                descs[i] = d
+
+        if not quer_valor or not valores_tuss:
+            continue
+
+        conv  = _normalizar_convenio(str(convenio))
+        entry = (valores_tuss.get((conv, cod), {}) if conv else {}) or valores_tuss.get(cod, {})
+        v = entry.get("UltimoValor") or entry.get("Media")
+        if v is not None:
+            vals[i] = round(float(v), 2)
+
+        # Melhora descrição se desc_lookup tiver algo mais preciso
+        desc_novo = desc_lookup.get(cod) or str(entry.get("Descricao", ""))
+        if desc_novo and (not descs[i] or descs[i].startswith("Código TUSS ")):
+            descs[i] = desc_novo
+
+    df = df.copy()
+    df["ValorEstimado_TUSS"] = vals
+    df["DescricaoTUSS"]      = descs
+    return df
+
+
+def verificar_tuss_adicionais(
+    linhas_resultado: list,
+    df_rep: pd.DataFrame,
+    tabela_tuss: dict,
+    tuss_idx: set,
+) -> list:
+    """
+    Pós-processamento: para TODA linha CORRELACIONADO (com ou sem ProcedimentosAdicionais),
+    verifica os códigos TUSS esperados e preenche StatusTUSS, CodigosTUSS_Esperados,
+    CodigosTUSS_Ausentes e DescricaoTUSS.
+
+    Casos cobertos:
+    - Proc simples (sem PA): TUSS_PROC_PRINCIPAL_OK / TUSS_CODIGO_PRINCIPAL_DIVERGENTE
+    - PA incorporado no principal: TUSS_ADICIONAL_INCORPORADO_NO_PRINCIPAL
+    - PA com código único: TUSS_PROC_ADICIONAL_RECONHECIDO / TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES
+    - PA com múltiplos códigos: TUSS_TODOS_CODIGOS_ADICIONAIS_FATURADOS / TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE
+    - Companion rows (CORRELACIONADO_PROCEDIMENTO_ADICIONAL sem proc_princ): TUSS_PROC_ADICIONAL_RECONHECIDO
+    """
+    from datetime import timedelta
+
+    chaves_norm: dict[str, str] = {}  # combinações PROC_PA se repetem muito entre linhas
+
+    for linha in linhas_resultado:
+        status = str(linha.get("StatusCorrelacao", ""))
+        if not status.startswith("CORRELACIONADO"):
+            continue
+
+        proc_adic  = str(linha.get("ProcedimentosAdicionais_PRODUCAO", "")).strip()
+        sem_pa     = not proc_adic or proc_adic == "nan"
+        proc_princ = str(linha.get("Procedimento_PRODUCAO", "")).strip()
+        sem_princ  = not proc_princ or proc_princ == "nan"
+
+        # Causa 2: companion row — CORRELACIONADO_PROCEDIMENTO_ADICIONAL sem proc_princ nem PA
+        # O código já está presente no repasse; apenas registrar como reconhecido.
+        if sem_pa and sem_princ:
+            if status == "CORRELACIONADO_PROCEDIMENTO_ADICIONAL":
+                linha["StatusTUSS"] = "TUSS_PROC_ADICIONAL_RECONHECIDO"
+            continue
+
+        # Monta chave: com PA → "PROC_PA", sem PA → "PROC_"
+        chave_raw = f"{proc_princ}_{proc_adic}" if not sem_pa else f"{proc_princ}_"
+        chave = chaves_norm.get(chave_raw)
+        if chave is None:
+            chave = chaves_norm[chave_raw] = _normalizar_chave_tuss(chave_raw)
+        entry = tabela_tuss.get(chave)
+
+        if not entry:
+            linha["StatusTUSS"] = "TUSS_COMBINACAO_SEM_MAPEAMENTO"
+            continue
+
+        tipo       = str(entry.get("TipoCobranca", ""))
+        codigos_raw = str(entry.get("CodigosTUSS", ""))
+        codigos    = [c.strip() for c in codigos_raw.split(",") if c.strip() and c.strip() != "nan"]
+        base       = str(entry.get("codigo_base_proc_principal", "")).replace(".0", "").strip()
+        desc       = str(entry.get("Descricao_REPASSE", "")).strip()
+
+        if tipo == "sem_mapeamento_tuss":
+            linha["StatusTUSS"] = "TUSS_COMBINACAO_SEM_MAPEAMENTO"
+            if desc:
+                linha["DescricaoTUSS"] = desc
+            continue
+
+        # Proc simples sem PA: verificar se o código no REPASSE bate com o esperado
+        if sem_pa and tipo == "unico_cod_tuss_somente_proc_principal":
+            cod_repasse = str(linha.get("CodigoTUSS_REPASSE", "")).replace(".0", "").strip()
+            esperado    = codigos[0] if codigos else ""
+            linha["StatusTUSS"] = (
+                "TUSS_PROC_PRINCIPAL_OK"
+                if esperado and cod_repasse == esperado
+                else "TUSS_CODIGO_PRINCIPAL_DIVERGENTE"
+            )
+            if esperado:
+                linha["CodigosTUSS_Esperados"] = esperado
+            if desc:
+                linha["DescricaoTUSS"] = desc
+            continue
+
+        # PA com código igual ao do proc principal (adicional incorporado)
+        if tipo == "unico_cod_tuss_somente_proc_principal":
+            linha["StatusTUSS"] = "TUSS_ADICIONAL_INCORPORADO_NO_PRINCIPAL"
+            if codigos:
+                linha["CodigosTUSS_Esperados"] = codigos[0]
+            if desc:
+                linha["DescricaoTUSS"] = desc
+            continue
+
+        cod_repasse = str(linha.get("CodigoTUSS_REPASSE", "")).replace(".0", "").strip()
+
+        if tipo == "unico_cod_tuss_inclui_proc_adicional_e_principal":
+            if codigos and cod_repasse == codigos[0]:
+                linha["StatusTUSS"] = "TUSS_PROC_ADICIONAL_RECONHECIDO"
+            else:
+                linha["StatusTUSS"] = "TUSS_PROC_ADICIONAL_COBRADO_COMO_SIMPLES"
+            linha["CodigosTUSS_Esperados"] = codigos[0] if codigos else ""
+            if desc:
+                linha["DescricaoTUSS"] = desc
+            continue
+
+        # tipo == "multiplos_cod_tuss_proced_adicional"
+        # Verificar cada código adicional (diferente do base) no índice do REPASSE
+        pac  = _normalizar_nome_paciente(str(linha.get("Paciente_PRODUCAO", "")))
+        data = str(linha.get("Data_PRODUCAO", "")).strip()
+        try:
+            data_dt = datetime.strptime(data, "%d/%m/%Y")
+            datas_check = [(data_dt + timedelta(days=d)).strftime("%d/%m/%Y") for d in (0, -1, 1)]
+        except ValueError:
+            datas_check = [data]
+
+        codigos_adicionais = [c for c in codigos if c != base]
+        if not codigos_adicionais:
+            codigos_adicionais = codigos
+
+        encontrados, ausentes = [], []
+        for cod in codigos_adicionais:
+            achou = any((pac, d, cod) in tuss_idx for d in datas_check)
+            (encontrados if achou else ausentes).append(cod)
+
+        if not ausentes:
+            linha["StatusTUSS"] = "TUSS_TODOS_CODIGOS_ADICIONAIS_FATURADOS"
+        else:
+            linha["StatusTUSS"] = "TUSS_CODIGO_ADICIONAL_AUSENTE_NO_REPASSE"
+
+        linha["CodigosTUSS_Esperados"] = ", ".join(codigos_adicionais)
+        if ausentes:
+            linha["CodigosTUSS_Ausentes"] = ", ".join(ausentes)
+        if desc:
+            linha["DescricaoTUSS"] = desc
+
+    return linhas_resultado
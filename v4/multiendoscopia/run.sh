@@ -16,6 +16,7 @@ docker run -d \
   -p $PORTA:8501 \
   -v $(pwd)/logs:/app/logs \
   -v $(pwd)/outputs:/app/outputs \
+  -v $(pwd)/jobs:/app/jobs \
   $IMAGE
 
 echo "Running... porta: $PORTA"